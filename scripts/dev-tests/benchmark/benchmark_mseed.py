@@ -0,0 +1,221 @@
+######################################### ~Librerias~ #################################################
+import os
+import sys
+import glob
+import json
+import time
+import platform
+import argparse
+import tempfile
+import datetime
+import importlib.util
+import multiprocessing
+import numpy as np
+#######################################################################################################
+
+##################################### ~Variables globales~ ############################################
+TAMANO_TRAMA = 2506
+MUESTRAS_POR_TRAMA = 250
+DIRECTORIO_REPOSITORIO = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..', '..'))
+CONVERSOR_POR_DEFECTO = sorted(glob.glob(os.path.join(DIRECTORIO_REPOSITORIO, 'scripts', 'operation', 'mseed', 'binary_to_mseed*.py')))[-1]
+CONFIG_MSEED_POR_DEFECTO = os.path.join(DIRECTORIO_REPOSITORIO, 'configuration', 'configuracion_mseed.json')
+# Duraciones de los archivos sinteticos (segundos)
+DURACIONES = {'1min': 60, '1h': 3600, '24h': 86400}
+# Tramas que se generan a la vez al escribir el archivo sintetico
+TRAMAS_POR_BLOQUE = 3600
+#######################################################################################################
+
+######################################### ~Funciones~ #################################################
+# Valor crudo de 20 bits conocido para cada muestra: una rampa distinta por canal que recorre todo el rango,
+# incluidos los valores negativos en complemento a 2.
+def patron_crudo(indice_muestra, canal):
+    return (indice_muestra * 2654435761 + canal * 349525) & 0xFFFFF
+
+
+# Valor que debe devolver el decodificador para un valor crudo (mismo criterio que ObtenerValorAceleracion en C).
+def patron_esperado(valores_crudos):
+    valores = valores_crudos.astype(np.int64)
+    negativos = valores >= 0x80000
+    valores[negativos] = -((-valores[negativos]) & 0x7FFFF)
+    return valores.astype(np.int32)
+
+
+# Devuelve los segundos (relativos al inicio) que se eliminan del archivo segun el patron de huecos:
+# 'ninguno', 'aleatorio' (0.1 % de los segundos, semilla fija) o 'rafagas' (30 s cada 10 minutos). En archivos
+# de menos de una hora las rafagas se escalan a la duracion (al menos 6 por archivo, cada una de 1/20 del periodo)
+# para que todos los tamaños tengan tramos con datos y huecos.
+def segundos_faltantes(patron_huecos, duracion):
+    if patron_huecos == 'ninguno':
+        return np.zeros(0, dtype=np.int64)
+    if patron_huecos == 'aleatorio':
+        rng = np.random.default_rng(0)
+        num_faltantes = max(1, duracion // 1000)
+        return np.sort(rng.choice(np.arange(1, duracion - 1), size=num_faltantes, replace=False))
+    if patron_huecos == 'rafagas':
+        periodo = max(2, min(600, duracion // 6))
+        longitud = max(1, periodo // 20)
+        inicios = np.arange(periodo // 2, duracion - longitud, periodo)
+        return (inicios[:, None] + np.arange(longitud)).reshape(-1)
+    raise ValueError(f"Patron de huecos desconocido: {patron_huecos}")
+
+
+# Escribe un archivo binario sintetico con el formato de registro_continuo y devuelve los segundos presentes.
+def generar_archivo_sintetico(archivo, duracion, patron_huecos, inicio=datetime.datetime(2024, 7, 5, 0, 0, 0)):
+    faltantes = segundos_faltantes(patron_huecos, duracion)
+    presentes = np.setdiff1d(np.arange(duracion), faltantes)
+    with open(archivo, 'wb') as f:
+        for i in range(0, len(presentes), TRAMAS_POR_BLOQUE):
+            segundos = presentes[i:i + TRAMAS_POR_BLOQUE]
+            tramas = np.zeros((len(segundos), TAMANO_TRAMA), dtype=np.uint8)
+            muestras = tramas[:, :MUESTRAS_POR_TRAMA * 10].reshape(len(segundos), MUESTRAS_POR_TRAMA, 10)
+            indices = segundos[:, None] * MUESTRAS_POR_TRAMA + np.arange(MUESTRAS_POR_TRAMA)
+            for canal in range(3):
+                crudo = patron_crudo(indices, canal)
+                muestras[:, :, canal * 3 + 1] = (crudo >> 12) & 0xFF
+                muestras[:, :, canal * 3 + 2] = (crudo >> 4) & 0xFF
+                muestras[:, :, canal * 3 + 3] = (crudo & 0xF) << 4
+            for j, segundo in enumerate(segundos):
+                t = inicio + datetime.timedelta(seconds=int(segundo))
+                tramas[j, -6:] = (t.year - 2000, t.month, t.day, t.hour, t.minute, t.second)
+            tramas.tofile(f)
+    return presentes
+
+
+# Resetea el pico de memoria residente del proceso (VmHWM) si el kernel lo permite.
+def resetear_pico_rss():
+    try:
+        with open('/proc/self/clear_refs', 'w') as f:
+            f.write('5')
+        return True
+    except OSError:
+        return False
+
+
+# Devuelve el pico de memoria residente en MB (VmHWM en Linux, ru_maxrss en otros sistemas).
+def pico_rss_mb():
+    try:
+        with open('/proc/self/status') as f:
+            for linea in f:
+                if linea.startswith('VmHWM:'):
+                    return int(linea.split()[1]) / 1024
+    except OSError:
+        pass
+    import resource
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+# Carga el modulo del conversor desde su ruta (el nombre del archivo incluye la version y puntos).
+def cargar_conversor(ruta_conversor):
+    sys.path.insert(0, os.path.dirname(ruta_conversor))
+    spec = importlib.util.spec_from_file_location('binary_to_mseed', ruta_conversor)
+    modulo = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(modulo)
+    return modulo
+
+
+# Ejecuta una etapa midiendo tiempo y pico de memoria residente.
+def medir_etapa(funcion):
+    resetear_pico_rss()
+    start_time = time.perf_counter()
+    resultado = funcion()
+    duracion = time.perf_counter() - start_time
+    return resultado, duracion, pico_rss_mb()
+
+
+# Proceso hijo: ejecuta las etapas del conversor sobre un archivo y devuelve las mediciones por la cola.
+# Cada archivo se mide en un proceso nuevo para que la memoria de un caso no afecte al siguiente.
+def ejecutar_etapas(ruta_conversor, ruta_config_mseed, archivo, presentes, directorio_salida, cola):
+    import logging
+    conversor = cargar_conversor(ruta_conversor)
+    with open(ruta_config_mseed) as f:
+        config_mseed = json.load(f)
+    logger = logging.getLogger('benchmark')
+    logger.addHandler(logging.NullHandler())
+    logger.propagate = False
+
+    # Los prints del conversor se descartan para no distorsionar los tiempos
+    salida_estandar = sys.stdout
+    sys.stdout = open(os.devnull, 'w')
+    try:
+        tiempo_binario = conversor.extraer_tiempo_binario(archivo)
+        num_tramas = os.path.getsize(archivo) // TAMANO_TRAMA
+
+        # El segundo valor devuelto depende de la version del conversor (segundos faltantes o tiempos de trama);
+        # se pasa tal cual a las siguientes etapas
+        (datos, info_tiempo), t_lectura, rss_lectura = medir_etapa(lambda: conversor.leer_archivo_binario(archivo, logger))
+        _, t_trazas, rss_trazas = medir_etapa(lambda: [conversor.obtenerTraza(config_mseed["SENSOR(2)"], canal + 1, datos[canal], tiempo_binario, info_tiempo, config_mseed) for canal in range(3)])
+        _, t_mseed, rss_mseed = medir_etapa(lambda: conversor.conversion_mseed_digital('benchmark.mseed', directorio_salida + os.sep, tiempo_binario, datos, info_tiempo, config_mseed, logger))
+    finally:
+        sys.stdout.close()
+        sys.stdout = salida_estandar
+
+    # Verifica que los datos decodificados coinciden con el patron conocido
+    indices = presentes[:, None] * MUESTRAS_POR_TRAMA + np.arange(MUESTRAS_POR_TRAMA)
+    correcto = all(np.array_equal(datos[canal], patron_esperado(patron_crudo(indices, canal)).reshape(-1)) for canal in range(3))
+
+    os.remove(os.path.join(directorio_salida, 'benchmark.mseed'))
+    cola.put({
+        'tramas': int(num_tramas),
+        'decodificacion_correcta': bool(correcto),
+        'etapas': {
+            'leer_archivo_binario': {'tiempo_s': t_lectura, 'rss_pico_mb': rss_lectura},
+            'obtenerTraza': {'tiempo_s': t_trazas, 'rss_pico_mb': rss_trazas},
+            'conversion_mseed_digital': {'tiempo_s': t_mseed, 'rss_pico_mb': rss_mseed}
+        }
+    })
+
+#######################################################################################################
+
+############################################ ~Main~ ###################################################
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark de lectura, relleno de huecos y escritura Mini-SEED del conversor.')
+    parser.add_argument('--conversor', default=CONVERSOR_POR_DEFECTO, help='Ruta del binary_to_mseed_X.Y.Z.py a medir')
+    parser.add_argument('--config-mseed', default=CONFIG_MSEED_POR_DEFECTO, help='Archivo configuracion_mseed.json')
+    parser.add_argument('--duraciones', default='1min,1h', help=f'Duraciones separadas por coma: {",".join(DURACIONES)}')
+    parser.add_argument('--huecos', default='ninguno,aleatorio', help='Patrones de huecos separados por coma: ninguno, aleatorio, rafagas')
+    parser.add_argument('--directorio', default=tempfile.gettempdir(), help='Directorio para los archivos sinteticos')
+    parser.add_argument('--salida', default=None, help='Archivo JSON de resultados')
+    args = parser.parse_args()
+
+    version = os.path.splitext(os.path.basename(args.conversor))[0]
+    salida = args.salida or f"benchmark_{version}_{datetime.datetime.now():%Y%m%d-%H%M%S}.json"
+    resultados = {
+        'conversor': version,
+        'fecha': datetime.datetime.now().isoformat(timespec='seconds'),
+        'sistema': {'plataforma': platform.platform(), 'python': platform.python_version(), 'numpy': np.__version__, 'nucleos': os.cpu_count()},
+        'casos': []
+    }
+
+    print(f"Conversor: {args.conversor}")
+    print(f"{'duracion':>8} {'huecos':>10} {'etapa':>26} {'tiempo (s)':>11} {'tramas/s':>10} {'RSS pico (MB)':>14}")
+    contexto = multiprocessing.get_context('spawn')
+    for nombre_duracion in args.duraciones.split(','):
+        for patron_huecos in args.huecos.split(','):
+            archivo = os.path.join(args.directorio, f'benchmark_{nombre_duracion}_{patron_huecos}.dat')
+            presentes = generar_archivo_sintetico(archivo, DURACIONES[nombre_duracion], patron_huecos)
+            cola = contexto.Queue()
+            proceso = contexto.Process(target=ejecutar_etapas, args=(args.conversor, args.config_mseed, archivo, presentes, args.directorio, cola))
+            proceso.start()
+            proceso.join()
+            os.remove(archivo)
+            if proceso.exitcode != 0:
+                print(f"ERROR: fallo la medicion del caso {nombre_duracion}, {patron_huecos} (codigo {proceso.exitcode})")
+                continue
+            caso = cola.get()
+
+            caso.update({'duracion': nombre_duracion, 'huecos': patron_huecos})
+            for etapa, medicion in caso['etapas'].items():
+                medicion['tramas_por_s'] = caso['tramas'] / medicion['tiempo_s'] if medicion['tiempo_s'] > 0 else None
+                print(f"{nombre_duracion:>8} {patron_huecos:>10} {etapa:>26} {medicion['tiempo_s']:>11.3f} {medicion['tramas_por_s'] or 0:>10.0f} {medicion['rss_pico_mb']:>14.1f}")
+            if not caso['decodificacion_correcta']:
+                print(f"ERROR: los datos decodificados no coinciden con el patron ({nombre_duracion}, {patron_huecos})")
+            resultados['casos'].append(caso)
+
+    with open(salida, 'w') as f:
+        json.dump(resultados, f, indent=4)
+    print(f"Resultados guardados en {salida}")
+
+#######################################################################################################
+if __name__ == '__main__':
+    main()
+#######################################################################################################
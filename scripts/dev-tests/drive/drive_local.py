@@ -0,0 +1,208 @@
+######################################### ~Librerias~ #################################################
+import os
+import re
+import ssl
+import sys
+import json
+import asyncio
+import hashlib
+import tempfile
+import subprocess
+#######################################################################################################
+
+##################################### ~Variables globales~ ############################################
+# Servidor HTTP minimo que imita la API de Drive v3 para probar cargador_drive.py sin acceso a Google.
+# Soporta subidas reanudables (POST /upload/drive/v3/files?uploadType=resumable y PUT con Content-Range, con
+# respuestas 308 y cabecera Range), consultas de estado de la sesion (bytes */total), GET del md5Checksum y
+# DELETE de archivos. No valida credenciales y guarda los archivos en memoria.
+# Atiende por HTTPS con un certificado autofirmado: con url_api googleapiclient cambia el host de la URL de
+# subida pero deja el esquema https de Drive.
+PUERTO_POR_DEFECTO = 8765
+UNIDAD_FRAGMENTO = 256 * 1024
+# Fallas que se simulan (se pueden cambiar desde una prueba que importe este modulo):
+#   'parcial': de cada fragmento solo se guarda la primera mitad (multiplo de 256 KiB), como hace Drive a veces;
+#              el cliente debe seguir desde el byte que indica Range
+#   'cortar': numero de fragmentos en los que se lee la mitad del cuerpo y se corta la conexion sin responder
+#   'cortar_despues': fragmentos que se reciben bien en cada sesion antes de empezar a cortar
+#   'md5_erroneo': se informa un md5Checksum distinto del real
+fallas = {'parcial': False, 'cortar': 0, 'cortar_despues': 0, 'md5_erroneo': False}
+sesiones = {}
+archivos = {}
+estadisticas = {'sesiones': 0, 'fragmentos': 0, 'consultas': 0, 'cortes': 0, 'borrados': 0}
+#######################################################################################################
+
+######################################### ~Funciones~ #################################################
+# Lee la cabecera de una peticion HTTP. Devuelve (metodo, ruta, cabeceras en minusculas, longitud del cuerpo) o
+# None si el cliente cerro la conexion. El cuerpo lo lee quien atiende la peticion.
+async def leer_peticion(reader):
+    try:
+        cabecera = await reader.readuntil(b'\r\n\r\n')
+    except (asyncio.IncompleteReadError, ConnectionError):
+        return None
+    lineas = cabecera.decode('latin-1').split('\r\n')
+    metodo, ruta, _ = lineas[0].split(' ', 2)
+    cabeceras = {}
+    for linea in lineas[1:]:
+        if ':' in linea:
+            nombre, valor = linea.split(':', 1)
+            cabeceras[nombre.strip().lower()] = valor.strip()
+    return metodo, ruta, cabeceras, int(cabeceras.get('content-length', 0))
+
+
+# Escribe una respuesta HTTP con cuerpo JSON (o vacio)
+def responder(writer, codigo, datos=None, cabeceras=None):
+    cuerpo = json.dumps(datos).encode('utf-8') if datos is not None else b''
+    texto = {200: 'OK', 204: 'No Content', 308: 'Resume Incomplete', 400: 'Bad Request', 404: 'Not Found'}.get(codigo, '')
+    lineas = [f"HTTP/1.1 {codigo} {texto}", f"Content-Length: {len(cuerpo)}"]
+    if datos is not None:
+        lineas.append("Content-Type: application/json")
+    lineas += [f"{nombre}: {valor}" for nombre, valor in (cabeceras or {}).items()]
+    writer.write(('\r\n'.join(lineas) + '\r\n\r\n').encode('latin-1') + cuerpo)
+
+
+# Respuesta 308 con los bytes recibidos de una sesion (sin Range si todavia no se recibio nada)
+def responder_incompleta(writer, sesion):
+    recibidos = len(sesion['datos'])
+    responder(writer, 308, cabeceras={'Range': f"bytes=0-{recibidos - 1}"} if recibidos else None)
+
+
+# Cierra una sesion completa: guarda el archivo y devuelve su descripcion como la devuelve Drive
+def completar_sesion(id_sesion):
+    sesion = sesiones.pop(id_sesion)
+    md5 = hashlib.md5(sesion['datos']).hexdigest()
+    id_archivo = f"archivo-{id_sesion}"
+    archivos[id_archivo] = {'id': id_archivo, 'name': sesion['nombre'], 'size': str(len(sesion['datos'])),
+                            'md5Checksum': '0' * 32 if fallas['md5_erroneo'] else md5, 'datos': bytes(sesion['datos'])}
+    return {clave: valor for clave, valor in archivos[id_archivo].items() if clave != 'datos'}
+
+
+# PUT a una sesion de subida: consulta de estado (bytes */total) o fragmento (bytes inicio-fin/total).
+# Devuelve False si se corto la conexion.
+async def recibir_fragmento(reader, writer, id_sesion, cabeceras, longitud):
+    sesion = sesiones.get(id_sesion)
+    if sesion is None:
+        await reader.readexactly(longitud)
+        responder(writer, 404, {'error': {'code': 404, 'message': 'Sesion de subida no encontrada'}})
+        return True
+    rango = cabeceras.get('content-range', '')
+    consulta = re.match(r'bytes \*/(\d+)', rango)
+    if consulta:
+        estadisticas['consultas'] += 1
+        await reader.readexactly(longitud)
+        if len(sesion['datos']) == int(consulta.group(1)):
+            responder(writer, 200, completar_sesion(id_sesion))
+        else:
+            responder_incompleta(writer, sesion)
+        return True
+
+    fragmento = re.match(r'bytes (\d+)-(\d+)/(\d+|\*)', rango)
+    if not fragmento:
+        await reader.readexactly(longitud)
+        responder(writer, 400, {'error': {'code': 400, 'message': f"Content-Range no valido: {rango}"}})
+        return True
+    if fallas['cortar'] > 0 and sesion['fragmentos'] >= fallas['cortar_despues']:
+        fallas['cortar'] -= 1
+        estadisticas['cortes'] += 1
+        await reader.readexactly(longitud // 2)
+        return False
+    datos = await reader.readexactly(longitud)
+    estadisticas['fragmentos'] += 1
+    sesion['fragmentos'] += 1
+    inicio, total = int(fragmento.group(1)), fragmento.group(3)
+    if inicio != len(sesion['datos']):
+        # Bytes que no continuan lo recibido: se informa hasta donde llego la sesion, como Drive
+        responder_incompleta(writer, sesion)
+        return True
+    if fallas['parcial'] and len(datos) > UNIDAD_FRAGMENTO:
+        datos = datos[:max(UNIDAD_FRAGMENTO, len(datos) // 2 // UNIDAD_FRAGMENTO * UNIDAD_FRAGMENTO)]
+    sesion['datos'] += datos
+    if total != '*' and len(sesion['datos']) == int(total):
+        responder(writer, 200, completar_sesion(id_sesion))
+    else:
+        responder_incompleta(writer, sesion)
+    return True
+
+
+# Atiende la conexion de un cliente (HTTP/1.1 con conexion persistente) hasta que se cierra
+async def atender_cliente(reader, writer):
+    try:
+        while True:
+            peticion = await leer_peticion(reader)
+            if peticion is None:
+                return
+            metodo, ruta, cabeceras, longitud = peticion
+            subida = re.search(r'upload_id=([^&]+)', ruta)
+            archivo = re.match(r'.*/drive/v3/files/([^/?]+)', ruta)
+            if metodo == 'POST' and ruta.startswith('/upload/drive/v3/files') and 'uploadType=resumable' in ruta:
+                metadatos = json.loads(await reader.readexactly(longitud) or b'{}')
+                estadisticas['sesiones'] += 1
+                id_sesion = str(estadisticas['sesiones'])
+                sesiones[id_sesion] = {'nombre': metadatos.get('name'), 'datos': bytearray(), 'fragmentos': 0}
+                responder(writer, 200, cabeceras={
+                    'Location': f"https://{cabeceras.get('host')}/upload/drive/v3/files?uploadType=resumable&upload_id={id_sesion}"})
+            elif metodo == 'PUT' and subida:
+                if not await recibir_fragmento(reader, writer, subida.group(1), cabeceras, longitud):
+                    # Corte abrupto, sin cerrar TLS, como una caida de la red
+                    writer.transport.abort()
+                    return
+            elif metodo == 'GET' and archivo and archivo.group(1) in archivos:
+                await reader.readexactly(longitud)
+                responder(writer, 200, {clave: valor for clave, valor in archivos[archivo.group(1)].items() if clave != 'datos'})
+            elif metodo == 'DELETE' and archivo and archivo.group(1) in archivos:
+                await reader.readexactly(longitud)
+                del archivos[archivo.group(1)]
+                estadisticas['borrados'] += 1
+                responder(writer, 204)
+            else:
+                await reader.readexactly(longitud)
+                responder(writer, 404, {'error': {'code': 404, 'message': f"{metodo} {ruta} no soportado"}})
+            await writer.drain()
+    except (asyncio.IncompleteReadError, ConnectionError):
+        pass
+    finally:
+        writer.close()
+
+
+# Crea con openssl un certificado autofirmado para 127.0.0.1 en el directorio indicado y devuelve (certificado, clave).
+# Para que httplib2 lo acepte, la ruta del certificado debe estar en HTTPLIB2_CA_CERTS antes de importar httplib2.
+def generar_certificado(directorio):
+    certificado = os.path.join(directorio, 'drive_local.pem')
+    clave = os.path.join(directorio, 'drive_local.key')
+    subprocess.run(['openssl', 'req', '-x509', '-newkey', 'rsa:2048', '-nodes', '-days', '1', '-subj', '/CN=127.0.0.1',
+                    '-addext', 'subjectAltName=IP:127.0.0.1', '-keyout', clave, '-out', certificado],
+                   check=True, capture_output=True)
+    return certificado, clave
+
+
+async def servir(puerto, certificado, clave, iniciado=None):
+    contexto = ssl.SSLContext(ssl.PROTOCOL_TLS_SERVER)
+    contexto.load_cert_chain(certificado, clave)
+    servidor = await asyncio.start_server(atender_cliente, '127.0.0.1', puerto, ssl=contexto)
+    print(f"Drive de prueba escuchando en 127.0.0.1:{puerto} (url_api: https://127.0.0.1:{puerto}/drive/v3/)")
+    if iniciado is not None:
+        iniciado.set()
+    async with servidor:
+        await servidor.serve_forever()
+
+#######################################################################################################
+
+############################################ ~Main~ ###################################################
+# Uso: python3 drive_local.py [puerto] [--parcial] [--cortar N] [--cortar-despues N] [--md5-erroneo]
+# Para probar el cargador, poner "url_api": "https://127.0.0.1:<puerto>/drive/v3/" en la seccion cargador_drive
+# de configuracion_dispositivo.json y exportar HTTPLIB2_CA_CERTS con la ruta del certificado que se muestra.
+if __name__ == '__main__':
+    argumentos = sys.argv[1:]
+    fallas['parcial'] = '--parcial' in argumentos
+    fallas['md5_erroneo'] = '--md5-erroneo' in argumentos
+    if '--cortar' in argumentos:
+        fallas['cortar'] = int(argumentos[argumentos.index('--cortar') + 1])
+    if '--cortar-despues' in argumentos:
+        fallas['cortar_despues'] = int(argumentos[argumentos.index('--cortar-despues') + 1])
+    puerto = int(argumentos[0]) if argumentos and argumentos[0].isdigit() else PUERTO_POR_DEFECTO
+    certificado, clave = generar_certificado(tempfile.mkdtemp(prefix='drive_local_'))
+    print(f"export HTTPLIB2_CA_CERTS={certificado}")
+    try:
+        asyncio.run(servir(puerto, certificado, clave))
+    except KeyboardInterrupt:
+        print("Servidor detenido")
+#######################################################################################################
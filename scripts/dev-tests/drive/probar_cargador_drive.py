@@ -0,0 +1,197 @@
+######################################### ~Librerias~ #################################################
+import os
+import sys
+import json
+import asyncio
+import hashlib
+import tempfile
+import threading
+from types import SimpleNamespace
+import drive_local
+#######################################################################################################
+
+##################################### ~Variables globales~ ############################################
+PUERTO = 8766
+# Fragmentos de 512 KiB (dos veces el minimo de Drive) para que un archivo chico se suba en varios fragmentos y
+# el servidor pueda aceptar solo una parte de cada uno
+FRAGMENTO = 2 * 256 * 1024
+TAMANO_ARCHIVO = 5 * FRAGMENTO + 12345
+# Subida en paralelo: mas archivos que hilos, para que cada hilo reutilice su conexion
+HILOS = 3
+ARCHIVOS_PARALELO = 7
+#######################################################################################################
+
+############################################ ~Funciones~ ############################################
+# Inicia el servidor de Drive de prueba en un hilo y espera a que escuche
+def iniciar_servidor(puerto, certificado, clave):
+    iniciado = threading.Event()
+    threading.Thread(target=lambda: asyncio.run(drive_local.servir(puerto, certificado, clave, iniciado)), daemon=True).start()
+    iniciado.wait(5)
+
+
+# Crea el servicio de Drive apuntando al servidor local, sin credenciales (el servidor no las valida)
+def crear_servicio(cargador_drive, puerto):
+    from googleapiclient.discovery import build
+    return build('drive', 'v3', http=cargador_drive.crear_http(), static_discovery=True,
+                 client_options={'api_endpoint': f"https://127.0.0.1:{puerto}/drive/v3/"})
+
+
+# Sube el archivo con insert_file y compara lo recibido por el servidor con el original.
+# Devuelve (correcto, progreso, error).
+def subir(cargador_drive, service, archivo, registro_sesiones):
+    progreso = {}
+    try:
+        respuesta = cargador_drive.insert_file(service, os.path.basename(archivo), '', None, 'text/plain', archivo,
+                                               cargador_drive.crear_http(), FRAGMENTO, registro_sesiones, progreso)
+    except Exception as e:
+        return False, progreso, e
+    with open(archivo, 'rb') as f:
+        original = f.read()
+    recibido = drive_local.archivos.get(respuesta.get('id'), {}).get('datos')
+    correcto = (recibido == original and progreso.get('md5') == hashlib.md5(original).hexdigest()
+                and progreso.get('md5_remoto') == progreso.get('md5'))
+    return correcto, progreso, None
+
+
+# Sube varios archivos con el pool de hilos de cargador_drive (crear_cargador y subir_archivos), con fragmentos
+# aceptados en parte para alargar las subidas. Comprueba que cada archivo llega completo con su MD5 verificado,
+# que cada hilo usa su propia conexion HTTP y que el registro de sesiones compartido (SesionesSubidaDrive.json)
+# llega a tener varias sesiones a la vez, queda como JSON valido y termina vacio. Devuelve (correcto, detalle).
+def subir_en_paralelo(cargador_drive, service, directorio):
+    conexiones = {}
+    bloqueo = threading.Lock()
+
+    # El servidor de prueba no valida credenciales: authorize solo registra la conexion de cada hilo
+    def autorizar(http):
+        with bloqueo:
+            conexiones.setdefault(threading.get_ident(), []).append(http)
+        return http
+
+    archivo_sesiones = os.path.join(directorio, 'SesionesSubidaDrive_paralelo.json')
+    sesiones_simultaneas = []
+    actualizar_sesion = cargador_drive.actualizar_sesion
+
+    # Despues de cada escritura el archivo debe seguir siendo JSON valido; si no, json.load falla y la subida del
+    # hilo termina con error
+    def actualizar_y_contar(registro, ruta, sesion):
+        actualizar_sesion(registro, ruta, sesion)
+        with registro['bloqueo'], open(registro['archivo']) as f:
+            sesiones_simultaneas.append(len(json.load(f)))
+
+    get_authenticated = cargador_drive.get_authenticated
+    cargador_drive.get_authenticated = lambda *args, **kwargs: (service, SimpleNamespace(authorize=autorizar))
+    cargador_drive.actualizar_sesion = actualizar_y_contar
+    try:
+        cargador = cargador_drive.crear_cargador(None, None, HILOS, archivo_sesiones=archivo_sesiones,
+                                                 fragmento_mb=FRAGMENTO / (1024 * 1024))
+        archivos = []
+        for i in range(ARCHIVOS_PARALELO):
+            ruta = os.path.join(directorio, f'ST_paralelo_{i}.mseed')
+            with open(ruta, 'wb') as f:
+                f.write(os.urandom(TAMANO_ARCHIVO + i * 1000))
+            archivos.append((ruta, None, False))
+        drive_local.fallas['parcial'] = True
+        resultados, resumen = cargador_drive.subir_archivos(cargador, archivos)
+        cargador_drive.cerrar_cargador(cargador)
+    finally:
+        drive_local.fallas['parcial'] = False
+        cargador_drive.get_authenticated = get_authenticated
+        cargador_drive.actualizar_sesion = actualizar_sesion
+
+    errores = [r['error'] for r in resultados if r['error'] is not None]
+    completos = 0
+    for resultado in resultados:
+        with open(resultado['archivo'], 'rb') as f:
+            original = f.read()
+        recibido = drive_local.archivos.get(resultado['id'], {}).get('datos')
+        completos += recibido == original and resultado['verificado'] and resultado['md5'] == hashlib.md5(original).hexdigest()
+    http_por_hilo = all(len(lista) == 1 for lista in conexiones.values())
+    with open(archivo_sesiones) as f:
+        sesiones_finales = json.load(f)
+    correcto = (resumen['subidos'] == ARCHIVOS_PARALELO and completos == ARCHIVOS_PARALELO and not errores
+                and http_por_hilo and len(conexiones) > 1 and max(sesiones_simultaneas, default=0) > 1
+                and sesiones_finales == {})
+    detalle = (f"{completos}/{ARCHIVOS_PARALELO} archivos completos con MD5 verificado, {len(conexiones)} hilos con "
+               f"{sum(len(lista) for lista in conexiones.values())} conexiones, hasta {max(sesiones_simultaneas, default=0)} "
+               f"sesiones guardadas a la vez, {len(sesiones_finales)} al terminar")
+    return correcto, detalle + (f". Errores: {errores}" if errores else "")
+
+
+def mostrar(prueba, correcto, detalle=''):
+    print(f"{'OK   ' if correcto else 'FALLA'} {prueba}{': ' + detalle if detalle else ''}")
+    return correcto
+
+#####################################################################################################
+
+############################################### ~Main~ ##############################################
+# Prueba las subidas reanudables de cargador_drive.py contra drive_local.py (sin acceso a Google):
+# fragmentos con respuesta 308, fragmentos aceptados en parte, conexiones cortadas, reanudacion de una sesion
+# guardada en otra ejecucion, verificacion del MD5 y subida de varios archivos en paralelo con el pool de hilos.
+# Uso: python3 probar_cargador_drive.py
+def main():
+    project_local_root = os.getenv("PROJECT_LOCAL_ROOT")
+    if not project_local_root:
+        print("La variable de entorno no están definida.")
+        return
+    directorio = tempfile.mkdtemp(prefix='prueba_drive_')
+    certificado, clave = drive_local.generar_certificado(directorio)
+    # httplib2 lee los certificados aceptados al importarse
+    os.environ["HTTPLIB2_CA_CERTS"] = certificado
+    sys.path.append(os.path.join(project_local_root, "scripts", "drive"))
+    import cargador_drive
+    cargador_drive.ESPERA_REINTENTO = 0.1
+
+    iniciar_servidor(PUERTO, certificado, clave)
+    service = crear_servicio(cargador_drive, PUERTO)
+    archivo = os.path.join(directorio, 'ST_prueba.mseed')
+    with open(archivo, 'wb') as f:
+        f.write(os.urandom(TAMANO_ARCHIVO))
+    registro_sesiones = cargador_drive.abrir_registro_sesiones(os.path.join(directorio, 'SesionesSubidaDrive.json'))
+    resultados = []
+
+    correcto, progreso, error = subir(cargador_drive, service, archivo, registro_sesiones)
+    resultados.append(mostrar("Subida en fragmentos (308)", correcto and drive_local.estadisticas['fragmentos'] == 6,
+                              f"{drive_local.estadisticas['fragmentos']} fragmentos" if error is None else str(error)))
+
+    drive_local.fallas['parcial'] = True
+    fragmentos = drive_local.estadisticas['fragmentos']
+    correcto, progreso, error = subir(cargador_drive, service, archivo, registro_sesiones)
+    drive_local.fallas['parcial'] = False
+    resultados.append(mostrar("Fragmentos aceptados en parte (Range)", correcto and drive_local.estadisticas['fragmentos'] - fragmentos > 6,
+                              f"{drive_local.estadisticas['fragmentos'] - fragmentos} fragmentos" if error is None else str(error)))
+
+    drive_local.fallas['cortar'] = 2
+    correcto, progreso, error = subir(cargador_drive, service, archivo, registro_sesiones)
+    resultados.append(mostrar("Conexion cortada y reintento en la misma ejecucion", correcto,
+                              f"{drive_local.estadisticas['cortes']} cortes" if error is None else str(error)))
+
+    # Sin reintentos la subida falla, queda la sesion guardada y la siguiente ejecucion la reanuda. Se reciben dos
+    # fragmentos y se corta el tercero dos veces: httplib2 reenvia por su cuenta despues del primer corte.
+    reintentos = cargador_drive.REINTENTOS_HTTP, cargador_drive.REINTENTOS_CONEXION
+    cargador_drive.REINTENTOS_HTTP, cargador_drive.REINTENTOS_CONEXION = 0, 0
+    drive_local.fallas.update(cortar=2, cortar_despues=2)
+    original = subir(cargador_drive, service, archivo, registro_sesiones)
+    drive_local.fallas.update(cortar=0, cortar_despues=0)
+    cargador_drive.REINTENTOS_HTTP, cargador_drive.REINTENTOS_CONEXION = reintentos
+    guardada = cargador_drive.leer_sesiones(registro_sesiones['archivo']).get(os.path.abspath(archivo))
+    correcto, progreso, error = subir(cargador_drive, service, archivo, registro_sesiones)
+    resultados.append(mostrar("Reanudacion de una sesion guardada", original[2] is not None and guardada is not None and correcto
+                              and progreso.get('reanudado_desde', 0) > 0,
+                              f"reanudado desde el byte {progreso.get('reanudado_desde')}" if error is None else str(error)))
+
+    drive_local.fallas['md5_erroneo'] = True
+    borrados = drive_local.estadisticas['borrados']
+    correcto, progreso, error = subir(cargador_drive, service, archivo, registro_sesiones)
+    drive_local.fallas['md5_erroneo'] = False
+    resultados.append(mostrar("MD5 distinto: se borra la copia de Drive y se informa el error",
+                              isinstance(error, ValueError) and drive_local.estadisticas['borrados'] == borrados + 1, str(error)))
+
+    correcto, detalle = subir_en_paralelo(cargador_drive, service, directorio)
+    resultados.append(mostrar(f"Subida en paralelo con {HILOS} hilos y registro de sesiones compartido", correcto, detalle))
+
+    print(f"{sum(resultados)}/{len(resultados)} pruebas correctas")
+    sys.exit(0 if all(resultados) else 1)
+
+if __name__ == '__main__':
+    main()
+#####################################################################################################
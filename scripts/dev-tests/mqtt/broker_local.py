@@ -0,0 +1,186 @@
+######################################### ~Librerias~ #################################################
+import sys
+import struct
+import asyncio
+#######################################################################################################
+
+##################################### ~Variables globales~ ############################################
+# Broker MQTT 3.1.1 minimo para pruebas locales (sin mosquitto ni acceso al broker de produccion).
+# Soporta CONNECT, PUBLISH QoS 0/1/2, SUBSCRIBE/UNSUBSCRIBE con comodines + y #, PINGREQ, DISCONNECT,
+# mensajes retenidos y last will. No valida usuario ni contraseña y no guarda sesiones.
+PUERTO_POR_DEFECTO = 1883
+CONNECT, CONNACK, PUBLISH, PUBACK, PUBREC, PUBREL, PUBCOMP = 1, 2, 3, 4, 5, 6, 7
+SUBSCRIBE, SUBACK, UNSUBSCRIBE, UNSUBACK, PINGREQ, PINGRESP, DISCONNECT = 8, 9, 10, 11, 12, 13, 14
+clientes = {}
+retenidos = {}
+#######################################################################################################
+
+######################################### ~Funciones~ #################################################
+# Codifica la longitud restante de un paquete MQTT (1 a 4 bytes)
+def codificar_longitud(longitud):
+    resultado = bytearray()
+    while True:
+        byte, longitud = longitud % 128, longitud // 128
+        resultado.append(byte | (0x80 if longitud else 0))
+        if not longitud:
+            return bytes(resultado)
+
+
+# Codifica un texto con su longitud (2 bytes) como lo usa MQTT
+def codificar_texto(texto):
+    datos = texto.encode('utf-8')
+    return struct.pack('!H', len(datos)) + datos
+
+
+# Lee un texto con longitud de un paquete y devuelve (texto, posicion siguiente)
+def leer_texto(datos, posicion):
+    longitud = struct.unpack_from('!H', datos, posicion)[0]
+    return datos[posicion + 2:posicion + 2 + longitud].decode('utf-8'), posicion + 2 + longitud
+
+
+# Lee un paquete completo del cliente y devuelve (tipo, flags, cuerpo)
+async def leer_paquete(reader):
+    cabecera = (await reader.readexactly(1))[0]
+    longitud, multiplicador = 0, 1
+    while True:
+        byte = (await reader.readexactly(1))[0]
+        longitud += (byte & 0x7F) * multiplicador
+        multiplicador *= 128
+        if not byte & 0x80:
+            break
+    return cabecera >> 4, cabecera & 0x0F, await reader.readexactly(longitud)
+
+
+# Arma un paquete con su cabecera fija
+def paquete(tipo, flags, cuerpo=b''):
+    return bytes([(tipo << 4) | flags]) + codificar_longitud(len(cuerpo)) + cuerpo
+
+
+# Devuelve True si un topico coincide con un filtro de suscripcion (comodines + y #)
+def coincide(filtro, topico):
+    partes_filtro = filtro.split('/')
+    partes_topico = topico.split('/')
+    for i, parte in enumerate(partes_filtro):
+        if parte == '#':
+            return True
+        if i >= len(partes_topico) or (parte != '+' and parte != partes_topico[i]):
+            return False
+    return len(partes_filtro) == len(partes_topico)
+
+
+# Envia un mensaje a todos los clientes suscritos al topico, con el menor QoS entre el del mensaje y la suscripcion.
+def distribuir(topico, mensaje, qos, retener=False):
+    if retener:
+        if mensaje:
+            retenidos[topico] = (mensaje, qos)
+        else:
+            retenidos.pop(topico, None)
+    for cliente in list(clientes.values()):
+        qos_suscripcion = max((q for filtro, q in cliente['suscripciones'].items() if coincide(filtro, topico)), default=None)
+        if qos_suscripcion is not None:
+            enviar_publish(cliente, topico, mensaje, min(qos, qos_suscripcion))
+
+
+def enviar_publish(cliente, topico, mensaje, qos, retenido=False):
+    cuerpo = codificar_texto(topico)
+    if qos > 0:
+        cliente['siguiente_id'] = cliente['siguiente_id'] % 65535 + 1
+        cuerpo += struct.pack('!H', cliente['siguiente_id'])
+    cliente['writer'].write(paquete(PUBLISH, (qos << 1) | int(retenido), cuerpo + mensaje))
+
+
+# Atiende la conexion de un cliente hasta que se desconecta
+async def atender_cliente(reader, writer):
+    cliente = None
+    desconexion_limpia = False
+    try:
+        tipo, _, cuerpo = await leer_paquete(reader)
+        if tipo != CONNECT:
+            return
+        _, posicion = leer_texto(cuerpo, 0)
+        flags_conexion = cuerpo[posicion + 1]
+        keepalive = struct.unpack_from('!H', cuerpo, posicion + 2)[0]
+        id_cliente, posicion = leer_texto(cuerpo, posicion + 4)
+        will = None
+        if flags_conexion & 0x04:
+            topico_will, posicion = leer_texto(cuerpo, posicion)
+            longitud = struct.unpack_from('!H', cuerpo, posicion)[0]
+            will = (topico_will, cuerpo[posicion + 2:posicion + 2 + longitud], (flags_conexion >> 3) & 0x03, bool(flags_conexion & 0x20))
+        id_cliente = id_cliente or f"anonimo-{id(writer)}"
+        if id_cliente in clientes:
+            clientes[id_cliente]['writer'].close()
+        cliente = {'id': id_cliente, 'writer': writer, 'suscripciones': {}, 'siguiente_id': 0, 'will': will}
+        clientes[id_cliente] = cliente
+        writer.write(paquete(CONNACK, 0, b'\x00\x00'))
+        print(f"Conectado: {id_cliente} (keepalive {keepalive} s)")
+
+        while True:
+            # El cliente debe enviar algo cada 1.5 keepalive; si no, se cierra la conexion como haria un broker real
+            espera = keepalive * 1.5 if keepalive else None
+            tipo, flags, cuerpo = await asyncio.wait_for(leer_paquete(reader), espera)
+            if tipo == PUBLISH:
+                qos = (flags >> 1) & 0x03
+                topico, posicion = leer_texto(cuerpo, 0)
+                if qos > 0:
+                    id_paquete = cuerpo[posicion:posicion + 2]
+                    posicion += 2
+                    writer.write(paquete(PUBACK if qos == 1 else PUBREC, 0, id_paquete))
+                distribuir(topico, cuerpo[posicion:], qos, bool(flags & 0x01))
+            elif tipo == PUBREL:
+                writer.write(paquete(PUBCOMP, 0, cuerpo[:2]))
+            elif tipo == PUBREC:
+                writer.write(paquete(PUBREL, 2, cuerpo[:2]))
+            elif tipo == SUBSCRIBE:
+                id_paquete, posicion, codigos, nuevos = cuerpo[:2], 2, bytearray(), []
+                while posicion < len(cuerpo):
+                    filtro, posicion = leer_texto(cuerpo, posicion)
+                    qos = min(cuerpo[posicion], 2)
+                    posicion += 1
+                    cliente['suscripciones'][filtro] = qos
+                    codigos.append(qos)
+                    nuevos.append(filtro)
+                writer.write(paquete(SUBACK, 0, id_paquete + bytes(codigos)))
+                for topico, (mensaje, qos) in list(retenidos.items()):
+                    qos_suscripcion = max((cliente['suscripciones'][f] for f in nuevos if coincide(f, topico)), default=None)
+                    if qos_suscripcion is not None:
+                        enviar_publish(cliente, topico, mensaje, min(qos, qos_suscripcion), retenido=True)
+            elif tipo == UNSUBSCRIBE:
+                posicion = 2
+                while posicion < len(cuerpo):
+                    filtro, posicion = leer_texto(cuerpo, posicion)
+                    cliente['suscripciones'].pop(filtro, None)
+                writer.write(paquete(UNSUBACK, 0, cuerpo[:2]))
+            elif tipo == PINGREQ:
+                writer.write(paquete(PINGRESP, 0))
+            elif tipo == DISCONNECT:
+                desconexion_limpia = True
+                return
+            await writer.drain()
+    except (asyncio.IncompleteReadError, asyncio.TimeoutError, ConnectionError):
+        pass
+    finally:
+        if cliente is not None and clientes.get(cliente['id']) is cliente:
+            del clientes[cliente['id']]
+            print(f"Desconectado: {cliente['id']}{'' if desconexion_limpia else ' (sin DISCONNECT)'}")
+            if cliente['will'] and not desconexion_limpia:
+                distribuir(*cliente['will'])
+        writer.close()
+
+
+async def servir(puerto):
+    servidor = await asyncio.start_server(atender_cliente, '127.0.0.1', puerto)
+    print(f"Broker MQTT de prueba escuchando en 127.0.0.1:{puerto}")
+    async with servidor:
+        await servidor.serve_forever()
+
+#######################################################################################################
+
+############################################ ~Main~ ###################################################
+# Uso: python3 broker_local.py [puerto]
+# Para probar los servicios, apuntar serverAddress de configuracion_mqtt.json a 127.0.0.1 (y "port" si no es 1883).
+if __name__ == '__main__':
+    try:
+        asyncio.run(servir(int(sys.argv[1]) if len(sys.argv) > 1 else PUERTO_POR_DEFECTO))
+    except KeyboardInterrupt:
+        print("Broker detenido")
+#######################################################################################################
@@ -0,0 +1,106 @@
+######################################### ~Librerias~ #################################################
+import os
+import sys
+import json
+import time
+import datetime
+import threading
+import paho.mqtt.client as mqtt
+#######################################################################################################
+
+############################################ ~Funciones~ ############################################
+# Funcion para leer el archivo de configuracion JSON
+def read_fileJSON(nameFile):
+    try:
+        with open(nameFile, 'r') as f:
+            data = json.load(f)
+        return data
+    except FileNotFoundError:
+        print(f"Archivo {nameFile} no encontrado.")
+        return None
+    except json.JSONDecodeError:
+        print(f"Error al decodificar el archivo {nameFile}.")
+        return None
+
+#####################################################################################################
+
+############################################### ~Main~ ##############################################
+# Envia una rafaga de solicitudes de extraccion al servicio_extraccion.py y espera el estado final de cada una.
+# Uso: python3 probar_extraccion.py <aaaa-mm-ddTHH:MM:SS> <num_solicitudes> [duracion] [paso_s] [timeout_s]
+# Las solicitudes empiezan en la fecha indicada y se desplazan paso_s segundos entre si.
+# Muestra cuantas se aceptaron, completaron, rechazaron o fallaron, y los tiempos de respuesta.
+def main():
+    if len(sys.argv) < 3:
+        print("Uso: probar_extraccion.py <aaaa-mm-ddTHH:MM:SS> <num_solicitudes> [duracion] [paso_s] [timeout_s]")
+        return
+    inicio = datetime.datetime.strptime(sys.argv[1], '%Y-%m-%dT%H:%M:%S')
+    num_solicitudes = int(sys.argv[2])
+    duracion = float(sys.argv[3]) if len(sys.argv) > 3 else 60
+    paso = float(sys.argv[4]) if len(sys.argv) > 4 else 10
+    timeout = float(sys.argv[5]) if len(sys.argv) > 5 else 300
+
+    project_local_root = os.getenv("PROJECT_LOCAL_ROOT")
+    if not project_local_root:
+        print("La variable de entorno no están definida.")
+        return
+    config_mqtt = read_fileJSON(os.path.join(project_local_root, "configuracion", "configuracion_mqtt.json"))
+    if config_mqtt is None:
+        return
+
+    enviados = {}
+    estados = {}
+    finales = {}
+    terminado = threading.Event()
+
+    def on_message(client, userdata, msg):
+        mensaje = json.loads(msg.payload)
+        trabajo = mensaje.get("trabajo")
+        if trabajo not in enviados:
+            return
+        estados.setdefault(trabajo, []).append((time.time(), mensaje["status"]))
+        if mensaje["status"] in ("completado", "error", "rechazado"):
+            finales[trabajo] = mensaje
+            if len(finales) == len(enviados):
+                terminado.set()
+
+    def on_connect(client, userdata, flags, rc):
+        client.subscribe(config_mqtt["topicStatus"], qos=1)
+
+    client = mqtt.Client()
+    client.on_connect = on_connect
+    client.on_message = on_message
+    client.max_inflight_messages_set(num_solicitudes)
+    client.username_pw_set(config_mqtt["username"], config_mqtt["password"])
+    client.connect(config_mqtt["serverAddress"], int(config_mqtt.get("port", 1883)), 60)
+    client.loop_start()
+    time.sleep(1)
+
+    for i in range(num_solicitudes):
+        trabajo = f"prueba-{i:03d}"
+        solicitud = {"id": trabajo, "inicio": (inicio + datetime.timedelta(seconds=i * paso)).strftime('%Y-%m-%dT%H:%M:%S'),
+                     "duracion": duracion}
+        enviados[trabajo] = time.time()
+        client.publish(config_mqtt["topicSuscription"], json.dumps(solicitud), qos=1)
+    print(f"{num_solicitudes} solicitudes enviadas")
+
+    terminado.wait(timeout)
+    client.loop_stop()
+    client.disconnect()
+
+    resumen = {}
+    for mensaje in finales.values():
+        resumen[mensaje["status"]] = resumen.get(mensaje["status"], 0) + 1
+    print(f"Estados finales: {resumen}; sin respuesta final: {len(enviados) - len(finales)}")
+    aceptados = [estados[t][0][0] - enviados[t] for t in estados if estados[t][0][1] == "aceptado"]
+    completados = [estados[t][-1][0] - enviados[t] for t in estados if estados[t][-1][1] == "completado"]
+    if aceptados:
+        print(f"Tiempo hasta 'aceptado': max {max(aceptados):.3f} s, medio {sum(aceptados) / len(aceptados):.3f} s")
+    if completados:
+        print(f"Tiempo hasta 'completado': max {max(completados):.2f} s, medio {sum(completados) / len(completados):.2f} s")
+    for trabajo, mensaje in sorted(finales.items()):
+        if mensaje["status"] != "completado":
+            print(f"{trabajo}: {mensaje['status']} - {mensaje.get('motivo')}")
+
+if __name__ == '__main__':
+    main()
+#####################################################################################################
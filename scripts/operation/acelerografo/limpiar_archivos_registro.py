@@ -5,53 +5,34 @@ import sys
 # ///////////////////////////////// Principal /////////////////////////////////
 
 if __name__ == '__main__':
-    
+
     #******************************************************************************
-    #Obtiene el nombre de todos los archivos:
-    #Lista los archivos del directorio a subir
-    rutaCarpeta = "/home/rsa/resultados/registro-continuo/"
-    listaMeses=[] 
-    #print(rutaCarpeta)
-    listaArchivos = os.listdir(rutaCarpeta)
-    listaArchivosOrdenada = sorted(listaArchivos) 
-    #listaArchivosOrdenada = listaArchivosOrdenada[0:(len(listaArchivosOrdenada)-3)]
-    #print(listaArchivosOrdenada)    
+    #Borra los archivos de registro continuo con mas de numMeses meses de antiguedad (minimo 1).
+    #Usa el planificador de retencion (scripts/drive/retencion_archivos.py), que toma el directorio
+    #de la configuracion del dispositivo y no borra archivos que todavia no se subieron a Drive.
+    numMeses = int(sys.argv[1]) if len(sys.argv) > 1 else 3
+    simular = '--simular' in sys.argv
+
+    project_local_root = os.getenv("PROJECT_LOCAL_ROOT")
+    if not project_local_root:
+        print("La variable de entorno no están definida.")
+        sys.exit(1)
+    sys.path.append(os.path.join(project_local_root, "scripts", "drive"))
+    from retencion_archivos import read_fileJSON, calcular_retencion, mostrar_plan, ejecutar_plan
+
+    config_dispositivo = read_fileJSON(os.path.join(project_local_root, "configuracion", "configuracion_dispositivo.json"))
+    if config_dispositivo is None:
+        sys.exit(1)
     #******************************************************************************
-    
+
     #******************************************************************************
-    #Numero de meses de datos que se desea conservar (minimo 1):
-    numMeses = 3
-    
-    try:
-        #Obtiene el prefijo del maximo mes requerido:
-        for i in listaArchivosOrdenada: 
-            nombreArchivo = i
-            #print(nombreArchivo[7:11])
-            listaMeses.append(nombreArchivo[0:10])
-        
-        #Crea un set con el nombre de los meses:
-        #print(set(listaMeses))
-        setMeses = sorted(set(listaMeses))
-        #print(setMeses)
-        indiceUmbral = len(setMeses)-numMeses
-        #print(indiceUmbral)
-        if (indiceUmbral<0):
-            #print('Datos insuficientes')
-            sys.exit(1)
-        mesUmbral = setMeses[indiceUmbral]
-        print(mesUmbral)
-        #******************************************************************************
-        
-        #******************************************************************************
-        #Borra todos los archivos excepto los correspondientes al numero de meses establecido:    
-        for nombreArchivo in listaArchivosOrdenada: 
-            if (nombreArchivo[0:10]<mesUmbral):
-                print(nombreArchivo)
-                pathArchivo = rutaCarpeta + nombreArchivo
-                #print(pathArchivo)
-                os.remove(pathArchivo)
-    except:
-        print('Datos insuficientes')
+    #Solo se aplica el limite de antiguedad del registro continuo (sin cuotas ni espacio objetivo):
+    config_extra = {"dias_maximos": {"registro_continuo": max(numMeses, 1) * 30},
+                    "cuotas_mb": {}, "umbral_espacio_libre": 0}
+    plan, faltante, archivos, espacio = calcular_retencion(project_local_root, config_dispositivo, config_extra)
+    mostrar_plan(plan, faltante, archivos, espacio)
+    if not simular:
+        ejecutar_plan(plan)
     #******************************************************************************
-        
-# /////////////////////////////////////////////////////////////////////////////          
\ No newline at end of file
+
+# /////////////////////////////////////////////////////////////////////////////
@@ -0,0 +1,521 @@
+######################################### ~Librerias~ #################################################
+from googleapiclient.errors import HttpError
+from googleapiclient.http import MediaFileUpload
+from googleapiclient.discovery import build
+from httplib2 import Http, HttpLib2Error
+from oauth2client import file, client, tools
+from concurrent.futures import ThreadPoolExecutor, as_completed
+import os
+import sys
+import glob
+import hashlib
+import json
+import logging
+import threading
+import time
+from time import time as timer
+from planificador_subidas import crear_planificador, consumir, registrar_subida, fragmento_planificado
+from registro_subidas import abrir_registro, buscar_subido, registrar_subido
+#######################################################################################################
+
+##################################### ~Variables globales~ ############################################
+loggers = {}
+SCOPES = 'https://www.googleapis.com/auth/drive'
+# Numero de archivos que se suben al mismo tiempo si no se indica en la configuracion
+HILOS_POR_DEFECTO = 3
+# Tiempo maximo de espera de cada peticion HTTP (segundos)
+TIMEOUT_HTTP = 120
+# Tamaño de cada fragmento de la subida si no se indica en la configuracion. Drive exige multiplos de 256 KiB
+TAMANO_FRAGMENTO_MB = 8
+UNIDAD_FRAGMENTO = 256 * 1024
+# Reintentos de googleapiclient ante respuestas 5xx/429 y reintentos propios cuando se corta la conexion
+REINTENTOS_HTTP = 3
+REINTENTOS_CONEXION = 5
+ESPERA_REINTENTO = 5
+# Tipo de archivo: (directorio local en "directorios", carpeta de Drive en "drive"), igual que subir_archivo.py
+TIPOS_ARCHIVO = {
+    '1': ('registro_continuo', 'registro_continuo'),
+    '2': ('eventos_extraidos', 'eventos_extraidos'),
+    '3': ('archivos_mseed', 'registro_continuo')
+}
+#######################################################################################################
+
+######################################### ~Funciones~ #################################################
+# Lee un archivo de configuración en formato JSON y devuelve su contenido como un diccionario.
+def read_fileJSON(nameFile):
+    try:
+        with open(nameFile, 'r') as f:
+            data = json.load(f)
+        return data
+    except FileNotFoundError:
+        print(f"Archivo {nameFile} no encontrado.")
+        return None
+    except json.JSONDecodeError:
+        print(f"Error al decodificar el archivo {nameFile}.")
+        return None
+
+
+# Crea una conexion HTTP para la API. Drive responde 308 a cada fragmento recibido de una subida reanudable;
+# httplib2 lo trataria como una redireccion, por eso se quita de sus codigos de redireccion (como en build_http()).
+def crear_http():
+    http = Http(timeout=TIMEOUT_HTTP)
+    http.redirect_codes = http.redirect_codes - {308}
+    return http
+
+
+# Realiza la autenticacion a Google Drive una sola vez y devuelve el servicio y las credenciales.
+# Si se indica url_api (por ejemplo un servidor de pruebas local) las peticiones se envian a esa direccion.
+def get_authenticated(SCOPES, credential_file, token_file, url_api=None, service_name='drive', api_version='v3'):
+    store = file.Storage(token_file)
+    creds = store.get()
+    if not creds or creds.invalid:
+        flow = client.flow_from_clientsecrets(credential_file, SCOPES)
+        creds = tools.run_flow(flow, store)
+    client_options = {'api_endpoint': url_api} if url_api else None
+    service = build(service_name, api_version, http=creds.authorize(crear_http()), client_options=client_options)
+    return service, creds
+
+
+# Convierte el tamaño de fragmento de la configuracion (MB) en bytes, redondeado a un multiplo de 256 KiB.
+def tamano_fragmento(megabytes):
+    return max(1, int(round(float(megabytes) * 1024 * 1024 / UNIDAD_FRAGMENTO))) * UNIDAD_FRAGMENTO
+
+
+# Lee las sesiones de subida guardadas: {ruta: {'uri', 'progreso', 'tamano', 'mtime'}}.
+def leer_sesiones(archivo_sesiones):
+    if not os.path.isfile(archivo_sesiones):
+        return {}
+    sesiones = read_fileJSON(archivo_sesiones)
+    return sesiones if isinstance(sesiones, dict) else {}
+
+
+# Crea el registro de sesiones de subida guardado en archivo_sesiones (None para no guardar sesiones).
+def abrir_registro_sesiones(archivo_sesiones):
+    return {'archivo': archivo_sesiones, 'bloqueo': threading.Lock()}
+
+
+# Guarda (o borra si sesion es None) la sesion de subida de un archivo. Se vuelve a leer el archivo antes de
+# escribirlo para no perder las sesiones de otros procesos, y se reemplaza de forma atomica.
+def actualizar_sesion(registro, ruta, sesion):
+    if registro is None or registro['archivo'] is None:
+        return
+    with registro['bloqueo']:
+        sesiones = leer_sesiones(registro['archivo'])
+        if sesion is None:
+            if sesiones.pop(ruta, None) is None:
+                return
+        else:
+            sesiones[ruta] = sesion
+        archivo_temporal = registro['archivo'] + '.tmp'
+        with open(archivo_temporal, 'w') as f:
+            json.dump(sesiones, f, indent=4)
+        os.replace(archivo_temporal, registro['archivo'])
+
+
+# Pregunta a Drive cuantos bytes de una sesion de subida recibio. Devuelve el offset del siguiente byte a enviar,
+# la respuesta de Drive (dict) si la subida ya se completo, o None si la sesion ya no existe (expira en una semana).
+def consultar_sesion(http, uri, tamano):
+    resp, content = http.request(uri, "PUT", headers={"Content-Range": f"bytes */{tamano}", "content-length": "0"})
+    if resp.status in (200, 201):
+        return json.loads(content)
+    if resp.status == 308:
+        return int(resp["range"].split("-")[1]) + 1 if "range" in resp else 0
+    if resp.status in (404, 410):
+        return None
+    raise HttpError(resp, content, uri=uri)
+
+
+# Calcula el MD5 del archivo con los mismos bytes que se envian a Drive, sin una lectura aparte: next_chunk lee cada
+# fragmento con media_body.getbytes (ver insert_file), que se reemplaza por una lectura que tambien actualiza el MD5.
+# Los bytes que se reenvian despues de un corte no se cuentan dos veces; si la subida se reanuda desde un offset, la
+# parte ya subida se lee del archivo.
+def calcular_md5_al_enviar(media_body, filename):
+    estado = {'md5': hashlib.md5(), 'posicion': 0}
+    leer_fragmento = media_body.getbytes
+
+    def leer(inicio, longitud):
+        datos = leer_fragmento(inicio, longitud)
+        completar_md5(estado, filename, inicio)
+        if inicio + len(datos) > estado['posicion']:
+            estado['md5'].update(datos[estado['posicion'] - inicio:])
+            estado['posicion'] = inicio + len(datos)
+        return datos
+
+    media_body.getbytes = leer
+    return estado
+
+
+# Agrega al MD5 los bytes del archivo desde la posicion calculada hasta 'hasta'.
+def completar_md5(estado, filename, hasta):
+    if estado['posicion'] >= hasta:
+        return
+    with open(filename, 'rb') as f:
+        f.seek(estado['posicion'])
+        while estado['posicion'] < hasta:
+            bloque = f.read(min(UNIDAD_FRAGMENTO * 4, hasta - estado['posicion']))
+            if not bloque:
+                break
+            estado['md5'].update(bloque)
+            estado['posicion'] += len(bloque)
+
+
+# Compara el MD5 local con el md5Checksum de Drive. Si Drive no lo incluyo en la respuesta se pide. Si no
+# coinciden se borra la copia de Drive y se lanza una excepcion, para que el archivo se vuelva a subir.
+# Devuelve el md5Checksum de Drive (None si Drive no lo informa, por ejemplo en documentos de Google).
+def verificar_md5(service, respuesta, md5_local, http=None):
+    md5_remoto = respuesta.get('md5Checksum')
+    if md5_remoto is None and respuesta.get('id'):
+        md5_remoto = service.files().get(fileId=respuesta['id'], fields='md5Checksum').execute(http=http).get('md5Checksum')
+    if md5_remoto is not None and md5_remoto != md5_local:
+        try:
+            service.files().delete(fileId=respuesta['id']).execute(http=http)
+        except Exception:
+            pass
+        raise ValueError(f"El MD5 de Drive ({md5_remoto}) no coincide con el local ({md5_local})")
+    return md5_remoto
+
+
+# Crea el cargador: autentica una vez y prepara el pool de hilos de subida. httplib2 no se puede compartir entre
+# hilos, por eso cada hilo crea su propia conexion autorizada la primera vez y la reutiliza en todas sus subidas.
+# Las sesiones de las subidas en curso se guardan en archivo_sesiones para poder reanudarlas. El planificador
+# (planificador_subidas.py) limita la tasa de subida de todos los hilos en conjunto. En archivo_registro
+# (registro_subidas.py) se guardan los archivos subidos y confirmados, para no volver a subirlos.
+def crear_cargador(credential_file, token_file, num_hilos=HILOS_POR_DEFECTO, url_api=None, logger=None,
+                   archivo_sesiones=None, fragmento_mb=TAMANO_FRAGMENTO_MB, planificador=None, archivo_registro=None):
+    service, creds = get_authenticated(SCOPES, credential_file, token_file, url_api)
+    num_hilos = max(1, int(num_hilos))
+    return {
+        'service': service,
+        'creds': creds,
+        'num_hilos': num_hilos,
+        'tamano_fragmento': tamano_fragmento(fragmento_mb),
+        'registro_sesiones': abrir_registro_sesiones(archivo_sesiones),
+        'planificador': planificador,
+        'archivo_registro': archivo_registro,
+        'hilos': ThreadPoolExecutor(max_workers=num_hilos, thread_name_prefix='drive'),
+        'local': threading.local(),
+        'bloqueo': threading.Lock(),
+        'logger': logger,
+        'archivos_subidos': 0,
+        'archivos_fallidos': 0,
+        'bytes_subidos': 0,
+        'segundos_subida': 0.0
+    }
+
+
+# Crea el cargador con las rutas y parametros del proyecto local (seccion "cargador_drive" de la configuracion).
+# Si no se recibe un planificador se crea uno con la seccion "planificador_subidas".
+def crear_cargador_local(project_local_root, config_dispositivo, logger=None, planificador=None):
+    config_cargador = config_dispositivo.get("cargador_drive", {})
+    return crear_cargador(os.path.join(project_local_root, "configuracion", "drive_credentials.json"),
+                          os.path.join(project_local_root, "configuracion", "drive_token.json"),
+                          config_cargador.get("hilos", HILOS_POR_DEFECTO),
+                          config_cargador.get("url_api") or None,
+                          logger,
+                          os.path.join(project_local_root, "tmp-files", "SesionesSubidaDrive.json"),
+                          config_cargador.get("tamano_fragmento_mb", TAMANO_FRAGMENTO_MB),
+                          planificador or crear_planificador(config_dispositivo, os.path.join(project_local_root, "tmp-files", "MetricasSubidas.json")),
+                          os.path.join(project_local_root, "tmp-files", "RegistroSubidas.db"))
+
+
+# Devuelve la conexion HTTP autorizada del hilo actual, creandola la primera vez.
+def http_hilo(cargador):
+    local = cargador['local']
+    if not hasattr(local, 'http'):
+        local.http = cargador['creds'].authorize(crear_http())
+    return local.http
+
+
+# Devuelve la conexion al registro de subidas del hilo actual (None si el cargador no usa registro).
+def registro_hilo(cargador):
+    if cargador['archivo_registro'] is None:
+        return None
+    local = cargador['local']
+    if not hasattr(local, 'registro'):
+        local.registro = abrir_registro(cargador['archivo_registro'])
+    return local.registro
+
+
+# Metodo que permite subir un archivo a la cuenta de Drive en fragmentos. Si se recibe http, la peticion se envia
+# por esa conexion. Despues de cada fragmento confirmado se guarda la URI de la sesion y el offset en el registro
+# de sesiones; si la conexion se cae, la subida continua desde el ultimo byte confirmado, en esta ejecucion o en
+# una posterior. En progreso (dict) se devuelven el offset desde el que se reanudo, los bytes enviados, el MD5
+# calculado al enviar y el md5Checksum de Drive; si no coinciden se lanza una excepcion (ver verificar_md5).
+# Con un planificador, cada fragmento espera su turno en el limite de tasa y los bytes confirmados se registran.
+def insert_file(service, name, description, parent_id, mime_type, filename, http=None,
+                fragmento=tamano_fragmento(TAMANO_FRAGMENTO_MB), registro_sesiones=None, progreso=None, logger=None,
+                planificador=None):
+    media_body = MediaFileUpload(filename, mimetype=mime_type, chunksize=fragmento, resumable=True)
+    # Cada fragmento se envia como bytes (getbytes) y no como una porcion del flujo del archivo: si la conexion se
+    # corta antes de la respuesta httplib2 reenvia el mismo cuerpo, y una porcion de flujo ya leida se enviaria vacia
+    # (la peticion quedaria esperando hasta TIMEOUT_HTTP).
+    media_body.has_stream = lambda: False
+    body = {
+        'name': name,
+        'description': description,
+        'mimeType': mime_type
+    }
+    # Si se recibe la ID de la carpeta superior, la coloca
+    if parent_id:
+        body['parents'] = [parent_id]
+    request = service.files().create(body=body, media_body=media_body, fields='id,md5Checksum')
+    http = http or request.http
+    estado_md5 = calcular_md5_al_enviar(media_body, filename)
+
+    # Si hay una sesion guardada del mismo archivo (mismo tamaño y fecha) se pregunta a Drive hasta donde llego
+    ruta = os.path.abspath(filename)
+    tamano = media_body.size()
+    mtime = os.path.getmtime(filename)
+    progreso = progreso if progreso is not None else {}
+    progreso['reanudado_desde'] = 0
+    sesion = leer_sesiones(registro_sesiones['archivo']).get(ruta) if registro_sesiones and registro_sesiones['archivo'] else None
+    if sesion and sesion.get('tamano') == tamano and sesion.get('mtime') == mtime:
+        estado = consultar_sesion(http, sesion['uri'], tamano)
+        if isinstance(estado, dict):
+            actualizar_sesion(registro_sesiones, ruta, None)
+            progreso['bytes_enviados'] = 0
+            completar_md5(estado_md5, filename, tamano)
+            progreso['md5'] = estado_md5['md5'].hexdigest()
+            progreso['md5_remoto'] = verificar_md5(service, estado, progreso['md5'], http)
+            return estado
+        if estado is not None:
+            request.resumable_uri = sesion['uri']
+            request.resumable_progress = estado
+            progreso['reanudado_desde'] = estado
+            if logger:
+                logger.info(f"Reanudando la subida de {name} desde el byte {estado} de {tamano}")
+
+    respuesta = None
+    fallos = 0
+    while respuesta is None:
+        try:
+            enviado = request.resumable_progress
+            consumir(planificador, min(fragmento, tamano - enviado))
+            _, respuesta = request.next_chunk(http=http, num_retries=REINTENTOS_HTTP)
+            registrar_subida(planificador, (tamano if respuesta is not None else request.resumable_progress) - enviado)
+            fallos = 0
+        except HttpError as e:
+            # La sesion expiro o Drive la descarto: la proxima subida empieza desde cero
+            if e.resp.status in (404, 410):
+                actualizar_sesion(registro_sesiones, ruta, None)
+            raise
+        except (OSError, HttpLib2Error) as e:
+            # Conexion cortada: googleapiclient consulta el offset confirmado antes de enviar el siguiente fragmento
+            fallos += 1
+            if request.resumable_uri:
+                actualizar_sesion(registro_sesiones, ruta, {'uri': request.resumable_uri, 'progreso': request.resumable_progress,
+                                                            'tamano': tamano, 'mtime': mtime})
+            if fallos > REINTENTOS_CONEXION:
+                raise
+            if logger:
+                logger.warning(f"Conexion interrumpida subiendo {name} (byte {request.resumable_progress} de {tamano}): {e}. Reintento {fallos}")
+            time.sleep(ESPERA_REINTENTO * 2 ** (fallos - 1))
+            continue
+        if respuesta is None:
+            actualizar_sesion(registro_sesiones, ruta, {'uri': request.resumable_uri, 'progreso': request.resumable_progress,
+                                                        'tamano': tamano, 'mtime': mtime})
+    actualizar_sesion(registro_sesiones, ruta, None)
+    progreso['bytes_enviados'] = tamano - progreso['reanudado_desde']
+    completar_md5(estado_md5, filename, tamano)
+    progreso['md5'] = estado_md5['md5'].hexdigest()
+    progreso['md5_remoto'] = verificar_md5(service, respuesta, progreso['md5'], http)
+    return respuesta
+
+
+# Sube un archivo desde un hilo del pool y devuelve su resultado: nombre, bytes, segundos, velocidad, id en Drive,
+# MD5 y error (None si se subio). Si el archivo ya esta en el registro de subidas no se vuelve a subir (duplicado).
+# Si borrar_despues es True el archivo local se elimina, pero solo si Drive confirmo el mismo MD5.
+def subir_archivo(cargador, ruta, drive_id, borrar_despues=False):
+    nombre = os.path.basename(ruta)
+    resultado = {'archivo': ruta, 'bytes': 0, 'reanudado_desde': 0, 'segundos': 0.0, 'mb_s': 0.0, 'id': None, 'md5': None,
+                 'verificado': False, 'duplicado': False, 'error': None}
+    start_time = timer()
+    progreso = {}
+    planificador = cargador['planificador']
+    logger = cargador['logger']
+    try:
+        registro = registro_hilo(cargador)
+        previo = buscar_subido(registro, ruta, drive_id) if registro is not None else None
+        if previo is not None:
+            resultado.update(id=previo['drive_file_id'], md5=previo['md5'], verificado=True, duplicado=True)
+        else:
+            estado = os.stat(ruta)
+            respuesta = insert_file(cargador['service'], nombre, nombre, drive_id, 'text/plain', ruta, http_hilo(cargador),
+                                    fragmento_planificado(planificador, cargador['tamano_fragmento']), cargador['registro_sesiones'],
+                                    progreso, cargador['logger'], planificador)
+            resultado['id'] = respuesta.get('id') if respuesta else None
+            resultado['md5'] = progreso.get('md5')
+            resultado['verificado'] = progreso.get('md5_remoto') is not None
+            if resultado['verificado'] and registro is not None:
+                registrar_subido(registro, ruta, drive_id, resultado['md5'], resultado['id'], estado)
+    except Exception as e:
+        resultado['error'] = str(e)
+    # Solo se cuentan los bytes enviados en esta ejecucion, no los que ya se habian subido antes de reanudar
+    resultado['bytes'] = progreso.get('bytes_enviados', 0)
+    resultado['reanudado_desde'] = progreso.get('reanudado_desde', 0)
+    resultado['segundos'] = timer() - start_time
+    if resultado['segundos'] > 0:
+        resultado['mb_s'] = resultado['bytes'] / resultado['segundos'] / 1e6
+
+    with cargador['bloqueo']:
+        if resultado['error'] is None:
+            cargador['archivos_subidos'] += 1
+            cargador['bytes_subidos'] += resultado['bytes']
+            cargador['segundos_subida'] += resultado['segundos']
+        else:
+            cargador['archivos_fallidos'] += 1
+    if resultado['error'] is not None:
+        if logger:
+            logger.error(f"Error subiendo el archivo {nombre} a Google Drive. Codigo: {resultado['error']}")
+        return resultado
+    if logger:
+        if resultado['duplicado']:
+            logger.info(f"Archivo {nombre} ya estaba subido a Google Drive (id {resultado['id']}, md5 {resultado['md5']}), no se vuelve a subir")
+        else:
+            reanudado = f", reanudado desde el byte {resultado['reanudado_desde']}" if resultado['reanudado_desde'] else ""
+            logger.info(f"Archivo {nombre} subido correctamente a Google Drive ({resultado['bytes'] / 1e6:.2f} MB en {resultado['segundos']:.2f} s, "
+                        f"{resultado['mb_s']:.2f} MB/s{reanudado}, md5 {resultado['md5']}{'' if resultado['verificado'] else ' sin verificar'})")
+    if borrar_despues and not resultado['verificado']:
+        if logger:
+            logger.warning(f"Archivo {nombre} no se borra: Drive no informo su md5Checksum")
+    elif borrar_despues:
+        try:
+            os.remove(ruta)
+            if logger:
+                logger.info(f"Archivo {nombre} eliminado")
+        except OSError as e:
+            if logger:
+                logger.error(f"Error al borrar el archivo {nombre}: {e}")
+    return resultado
+
+
+# Encola la subida de un archivo en el pool de hilos y devuelve el Future con su resultado.
+def encolar_archivo(cargador, ruta, drive_id, borrar_despues=False):
+    return cargador['hilos'].submit(subir_archivo, cargador, ruta, drive_id, borrar_despues)
+
+
+# Sube una lista de archivos [(ruta, drive_id, borrar_despues)] en paralelo y espera a que terminen.
+# Devuelve los resultados por archivo (en el orden en que terminan) y un resumen del lote.
+def subir_archivos(cargador, archivos, mostrar=False):
+    start_time = timer()
+    futuros = [encolar_archivo(cargador, ruta, drive_id, borrar_despues) for ruta, drive_id, borrar_despues in archivos]
+    resultados = []
+    for futuro in as_completed(futuros):
+        resultado = futuro.result()
+        resultados.append(resultado)
+        if mostrar:
+            estado = 'OK' if resultado['error'] is None else f"ERROR: {resultado['error']}"
+            print(f"{os.path.basename(resultado['archivo'])}: {resultado['bytes'] / 1e6:.2f} MB en {resultado['segundos']:.2f} s "
+                  f"({resultado['mb_s']:.2f} MB/s) {estado}")
+
+    subidos = [r for r in resultados if r['error'] is None]
+    resumen = {
+        'archivos': len(resultados),
+        'subidos': len(subidos),
+        'fallidos': len(resultados) - len(subidos),
+        'bytes': sum(r['bytes'] for r in subidos),
+        'segundos': timer() - start_time
+    }
+    # La velocidad del lote usa el tiempo transcurrido, que con varios hilos es menor que la suma de los tiempos
+    resumen['mb_s'] = resumen['bytes'] / resumen['segundos'] / 1e6 if resumen['segundos'] > 0 else 0.0
+    if cargador['logger'] and resultados:
+        cargador['logger'].info(f"Lote de subida: {resumen['subidos']}/{resumen['archivos']} archivos, {resumen['bytes'] / 1e6:.2f} MB "
+                                f"en {resumen['segundos']:.2f} s ({resumen['mb_s']:.2f} MB/s)")
+    return resultados, resumen
+
+
+# Espera a que terminen las subidas en curso y libera el pool de hilos.
+def cerrar_cargador(cargador):
+    cargador['hilos'].shutdown(wait=True)
+
+
+# Devuelve la lista de archivos de una ruta: un archivo, un directorio o un patron glob.
+def listar_archivos(origen):
+    if os.path.isdir(origen):
+        return sorted(os.path.join(origen, f) for f in os.listdir(origen) if os.path.isfile(os.path.join(origen, f)))
+    if os.path.isfile(origen):
+        return [origen]
+    return sorted(glob.glob(origen))
+
+
+# Función para inicializar y obtener el logger de un cliente
+def obtener_logger(id_estacion, log_directory, log_filename):
+    global loggers
+    if id_estacion not in loggers:
+        # Crear un logger para el cliente
+        logger = logging.getLogger(id_estacion)
+        logger.setLevel(logging.DEBUG)
+        # Verificar si el directorio de logs existe, si no, crearlo
+        if not os.path.isdir(log_directory):
+            try:
+                os.makedirs(log_directory)
+                logger.info(f"Directorio de logs creado: {log_directory}")
+            except Exception as e:
+                logger.error(f"Error al crear el directorio de logs {log_directory}: {e}")
+        # Ruta completa del archivo de log
+        log_path = os.path.join(log_directory, log_filename)
+        # Crear manejador de archivo, apuntando al archivo existente
+        file_handler = logging.FileHandler(log_path)
+        file_handler.setLevel(logging.DEBUG)
+        # Crear formato de logging y añadirlo al manejador
+        formatter = logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+        file_handler.setFormatter(formatter)
+        # Añadir el manejador al logger
+        logger.addHandler(file_handler)
+        loggers[id_estacion] = logger
+    return loggers[id_estacion]
+
+#######################################################################################################
+
+############################################ ~Main~ ###################################################
+# Sube varios archivos con una sola autenticacion y muestra la velocidad de cada archivo y la del lote.
+def main():
+    if len(sys.argv) < 4:
+        print("Uso: cargador_drive.py <tipo_archivo: 1.Registro continuo 2.Evento extraido 3.mseed> <borrar_despues: 0.No 1.Si> <archivo|directorio|patron_glob>...")
+        return
+    tipo_archivo = sys.argv[1]
+    borrar_despues = sys.argv[2] == '1'
+    if tipo_archivo not in TIPOS_ARCHIVO:
+        print("Tipo de archivo no soportado")
+        return
+
+    project_local_root = os.getenv("PROJECT_LOCAL_ROOT")
+    if not project_local_root:
+        print("La variable de entorno no están definida.")
+        return
+    config_dispositivo = read_fileJSON(os.path.join(project_local_root, "configuracion", "configuracion_dispositivo.json"))
+    if config_dispositivo is None:
+        print("No se pudo leer el archivo de configuración del dispositivo. Terminando el programa.")
+        return
+    id_estacion = config_dispositivo.get("dispositivo", {}).get("id", "Unknown")
+    logger = obtener_logger(id_estacion, os.path.join(project_local_root, "log-files"), "drive.log")
+
+    # Las rutas relativas se buscan en el directorio del tipo de archivo, como en subir_archivo.py
+    directorio, carpeta_drive = TIPOS_ARCHIVO[tipo_archivo]
+    path_file = config_dispositivo.get("directorios", {}).get(directorio, "Unknown")
+    drive_id = config_dispositivo.get("drive", {}).get(carpeta_drive, "Unknown")
+    archivos = []
+    for origen in sys.argv[3:]:
+        archivos.extend(listar_archivos(origen if os.path.isabs(origen) or os.path.exists(origen) else os.path.join(path_file, origen)))
+    if not archivos:
+        print("No se encontraron archivos para subir.")
+        return
+
+    start_time = timer()
+    try:
+        cargador = crear_cargador_local(project_local_root, config_dispositivo, logger)
+    except Exception as e:
+        print("********** Error Inicio Drive ********")
+        logger.error("Error Inicio Drive: %s", str(e))
+        return
+    print(f"Inicio Drive Ok ({timer() - start_time:.2f} s). Subiendo {len(archivos)} archivos con {cargador['num_hilos']} hilos")
+    try:
+        _, resumen = subir_archivos(cargador, [(ruta, drive_id, borrar_despues) for ruta in archivos], mostrar=True)
+    finally:
+        cerrar_cargador(cargador)
+    print(f"Total: {resumen['subidos']}/{resumen['archivos']} archivos, {resumen['bytes'] / 1e6:.2f} MB en {resumen['segundos']:.2f} s ({resumen['mb_s']:.2f} MB/s)")
+
+#######################################################################################################
+if __name__ == '__main__':
+    main()
+#######################################################################################################
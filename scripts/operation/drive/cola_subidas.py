@@ -0,0 +1,305 @@
+######################################### ~Librerias~ #################################################
+import os
+import sys
+import json
+import time
+import random
+import sqlite3
+from concurrent.futures import wait, FIRST_COMPLETED
+from planificador_subidas import tipos_permitidos
+#######################################################################################################
+
+##################################### ~Variables globales~ ############################################
+ESQUEMA_COLA = """
+CREATE TABLE IF NOT EXISTS trabajos (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    ruta TEXT NOT NULL UNIQUE,
+    tipo TEXT NOT NULL,
+    prioridad INTEGER NOT NULL,
+    borrar_despues INTEGER NOT NULL,
+    estado TEXT NOT NULL,
+    intentos INTEGER NOT NULL DEFAULT 0,
+    proximo_intento REAL NOT NULL,
+    proceso INTEGER,
+    tamano INTEGER,
+    mtime REAL,
+    creado REAL NOT NULL,
+    actualizado REAL NOT NULL,
+    drive_file_id TEXT,
+    error TEXT
+);
+CREATE INDEX IF NOT EXISTS trabajos_pendientes ON trabajos (estado, prioridad, proximo_intento);
+"""
+# Tipos de trabajo: (prioridad, carpeta de Drive en "drive"). Los eventos se suben antes que los mseed continuos
+# y estos antes que los .dat crudos; un numero menor se atiende primero.
+TIPOS_TRABAJO = {
+    'evento': (0, 'eventos_extraidos'),
+    'mseed': (1, 'registro_continuo'),
+    'dat': (2, 'registro_continuo')
+}
+ESTADOS = ('pendiente', 'en_curso', 'subido', 'fallido')
+# Reintentos con espera exponencial (segundos) si no se indican en la seccion "cola_subidas" de la configuracion
+MAX_INTENTOS = 10
+ESPERA_INICIAL = 30
+ESPERA_MAXIMA = 3600
+#######################################################################################################
+
+######################################### ~Funciones~ #################################################
+# Lee un archivo de configuración en formato JSON y devuelve su contenido como un diccionario.
+def read_fileJSON(nameFile):
+    try:
+        with open(nameFile, 'r') as f:
+            data = json.load(f)
+        return data
+    except FileNotFoundError:
+        print(f"Archivo {nameFile} no encontrado.")
+        return None
+    except json.JSONDecodeError:
+        print(f"Error al decodificar el archivo {nameFile}.")
+        return None
+
+
+# Abre (o crea) la base de datos de la cola. Las transacciones se controlan de forma explicita (BEGIN IMMEDIATE)
+# para que varios procesos puedan encolar y tomar trabajos sin tomar dos veces el mismo.
+def abrir_cola(archivo_cola):
+    conexion = sqlite3.connect(archivo_cola, timeout=30, isolation_level=None)
+    conexion.execute("PRAGMA journal_mode=WAL")
+    conexion.executescript(ESQUEMA_COLA)
+    return conexion
+
+
+# Abre la cola del proyecto local (tmp-files/ColaSubidas.db).
+def abrir_cola_local(project_local_root):
+    return abrir_cola(os.path.join(project_local_root, "tmp-files", "ColaSubidas.db"))
+
+
+# Agrega un archivo a la cola. Si el archivo ya esta en la cola no se duplica; solo vuelve a quedar pendiente si
+# ya se habia subido o habia fallado y el archivo cambio desde entonces. Devuelve True si quedo un trabajo nuevo.
+def encolar_archivo(conexion, ruta, tipo, borrar_despues=False):
+    prioridad = TIPOS_TRABAJO[tipo][0]
+    ruta = os.path.abspath(ruta)
+    estado = os.stat(ruta)
+    ahora = time.time()
+    cursor = conexion.execute(
+        "INSERT INTO trabajos (ruta, tipo, prioridad, borrar_despues, estado, proximo_intento, tamano, mtime, creado, actualizado) "
+        "VALUES (?, ?, ?, ?, 'pendiente', ?, ?, ?, ?, ?) "
+        "ON CONFLICT(ruta) DO UPDATE SET tipo = excluded.tipo, prioridad = excluded.prioridad, borrar_despues = excluded.borrar_despues, "
+        "estado = 'pendiente', intentos = 0, proximo_intento = excluded.proximo_intento, tamano = excluded.tamano, "
+        "mtime = excluded.mtime, actualizado = excluded.actualizado, error = NULL "
+        "WHERE trabajos.estado IN ('subido', 'fallido') AND (trabajos.tamano != excluded.tamano OR trabajos.mtime != excluded.mtime)",
+        (ruta, tipo, prioridad, int(bool(borrar_despues)), ahora, estado.st_size, estado.st_mtime, ahora, ahora))
+    return cursor.rowcount > 0
+
+
+# Devuelve True si el archivo tiene un trabajo en la cola, en cualquier estado.
+def en_cola(conexion, ruta):
+    return conexion.execute("SELECT 1 FROM trabajos WHERE ruta = ?", (os.path.abspath(ruta),)).fetchone() is not None
+
+
+# Encola los archivos de un directorio con la extension indicada que todavia no estan en la cola o que cambiaron
+# (tamano o fecha de modificacion) desde que se encolaron. Sirve para incorporar archivos creados fuera de los
+# productores (por ejemplo conversiones por lotes). Los archivos de 'excluidos' (por ejemplo un mseed que todavia
+# recibe registros) no se encolan.
+def encolar_directorio(conexion, directorio, extension, tipo, borrar_despues=False, excluidos=()):
+    conocidos = {ruta: (tamano, mtime) for ruta, tamano, mtime in
+                 conexion.execute("SELECT ruta, tamano, mtime FROM trabajos WHERE ruta LIKE ?", (os.path.join(os.path.abspath(directorio), '%'),))}
+    excluidos = {os.path.abspath(ruta) for ruta in excluidos}
+    nuevos = 0
+    for entrada in sorted(os.scandir(directorio), key=lambda e: e.name):
+        ruta = os.path.abspath(entrada.path)
+        if not entrada.is_file() or not entrada.name.endswith(extension) or ruta in excluidos:
+            continue
+        if ruta in conocidos:
+            estado = entrada.stat()
+            if conocidos[ruta] == (estado.st_size, estado.st_mtime):
+                continue
+        nuevos += encolar_archivo(conexion, entrada.path, tipo, borrar_despues)
+    return nuevos
+
+
+# Devuelve True si el proceso con ese pid sigue vivo.
+def proceso_activo(pid):
+    try:
+        os.kill(pid, 0)
+        return True
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+
+
+# Devuelve a pendientes los trabajos que quedaron en curso en un proceso que ya termino (por ejemplo tras un
+# reinicio). Los trabajos de procesos que siguen activos no se tocan. Devuelve el numero de trabajos recuperados.
+def recuperar_trabajos(conexion):
+    huerfanos = [id_trabajo for id_trabajo, pid in conexion.execute("SELECT id, proceso FROM trabajos WHERE estado = 'en_curso'")
+                 if pid is None or pid == os.getpid() or not proceso_activo(pid)]
+    conexion.executemany("UPDATE trabajos SET estado = 'pendiente', proceso = NULL WHERE id = ?", [(i,) for i in huerfanos])
+    return len(huerfanos)
+
+
+# Condicion SQL y parametros para filtrar los trabajos por tipo (None: todos los tipos).
+def filtro_tipos(tipos):
+    if tipos is None:
+        return "", []
+    return f" AND tipo IN ({', '.join('?' * len(tipos))})", list(tipos)
+
+
+# Toma hasta 'limite' trabajos pendientes cuyo tiempo de espera ya vencio, en orden de prioridad y de llegada,
+# y los marca en curso para este proceso. Si se indican tipos solo se toman trabajos de esos tipos.
+# Devuelve una lista de diccionarios con los datos de cada trabajo.
+def tomar_trabajos(conexion, limite, tipos=None):
+    ahora = time.time()
+    condicion, parametros = filtro_tipos(tipos)
+    conexion.execute("BEGIN IMMEDIATE")
+    try:
+        filas = conexion.execute(
+            "SELECT id, ruta, tipo, borrar_despues, intentos FROM trabajos WHERE estado = 'pendiente' AND proximo_intento <= ?" + condicion +
+            " ORDER BY prioridad, id LIMIT ?", [ahora] + parametros + [limite]).fetchall()
+        conexion.executemany("UPDATE trabajos SET estado = 'en_curso', proceso = ?, actualizado = ? WHERE id = ?",
+                             [(os.getpid(), ahora, fila[0]) for fila in filas])
+        conexion.execute("COMMIT")
+    except Exception:
+        conexion.execute("ROLLBACK")
+        raise
+    return [{'id': id_trabajo, 'ruta': ruta, 'tipo': tipo, 'borrar_despues': bool(borrar), 'intentos': intentos}
+            for id_trabajo, ruta, tipo, borrar, intentos in filas]
+
+
+# Marca un trabajo como subido.
+def completar_trabajo(conexion, trabajo, drive_file_id=None):
+    conexion.execute("UPDATE trabajos SET estado = 'subido', intentos = intentos + 1, proceso = NULL, actualizado = ?, "
+                     "drive_file_id = ?, error = NULL WHERE id = ?", (time.time(), drive_file_id, trabajo['id']))
+
+
+# Registra un intento fallido. El trabajo vuelve a pendiente con una espera que se duplica en cada intento (con
+# una variacion aleatoria de +-20 % para no reintentar todo a la vez); al llegar a max_intentos, o si definitivo
+# es True, queda como fallido. Devuelve el estado final del trabajo.
+def fallar_trabajo(conexion, trabajo, error, config_cola=None, definitivo=False):
+    config_cola = config_cola or {}
+    intentos = trabajo['intentos'] + 1
+    espera = min(config_cola.get("espera_maxima", ESPERA_MAXIMA), config_cola.get("espera_inicial", ESPERA_INICIAL) * 2 ** (intentos - 1))
+    estado = 'fallido' if definitivo or intentos >= config_cola.get("max_intentos", MAX_INTENTOS) else 'pendiente'
+    ahora = time.time()
+    conexion.execute("UPDATE trabajos SET estado = ?, intentos = ?, proximo_intento = ?, proceso = NULL, actualizado = ?, error = ? WHERE id = ?",
+                     (estado, intentos, ahora + espera * random.uniform(0.8, 1.2), ahora, str(error), trabajo['id']))
+    return estado
+
+
+# Vuelve a dejar pendientes los trabajos fallidos (todos o los de un tipo) para reintentarlos de inmediato.
+def reintentar_fallidos(conexion, tipo=None):
+    consulta = "UPDATE trabajos SET estado = 'pendiente', intentos = 0, proximo_intento = ?, error = NULL WHERE estado = 'fallido'"
+    parametros = [time.time()]
+    if tipo:
+        consulta += " AND tipo = ?"
+        parametros.append(tipo)
+    return conexion.execute(consulta, parametros).rowcount
+
+
+# Borra los trabajos subidos hace mas de 'dias' dias, para que la base de datos no crezca indefinidamente.
+def purgar_subidos(conexion, dias=30):
+    return conexion.execute("DELETE FROM trabajos WHERE estado = 'subido' AND actualizado < ?", (time.time() - dias * 86400,)).rowcount
+
+
+# Devuelve el numero de trabajos por tipo y estado: {tipo: {estado: n}}.
+def resumen_cola(conexion):
+    resumen = {tipo: {estado: 0 for estado in ESTADOS} for tipo in TIPOS_TRABAJO}
+    for tipo, estado, cantidad in conexion.execute("SELECT tipo, estado, COUNT(*) FROM trabajos GROUP BY tipo, estado"):
+        resumen.setdefault(tipo, {})[estado] = cantidad
+    return resumen
+
+
+# Segundos hasta que venza el siguiente trabajo pendiente (0 si ya hay trabajos listos, None si no hay pendientes).
+# Si se indican tipos solo se consideran los trabajos de esos tipos.
+def espera_siguiente(conexion, tipos=None):
+    condicion, parametros = filtro_tipos(tipos)
+    (proximo,) = conexion.execute("SELECT MIN(proximo_intento) FROM trabajos WHERE estado = 'pendiente'" + condicion, parametros).fetchone()
+    return None if proximo is None else max(0.0, proximo - time.time())
+
+
+# Atiende la cola con el cargador de Drive (cargador_drive.py) hasta que no queden trabajos listos. Mantiene
+# ocupados todos los hilos del cargador: cada vez que termina una subida toma el siguiente trabajo por prioridad,
+# asi un evento encolado durante una subida larga se atiende en cuanto se libera un hilo. Los tipos que se toman
+# los decide el planificador del cargador: fuera del horario masivo solo se suben eventos.
+# continuar() permite detener el ciclo (por ejemplo al recibir una señal). Devuelve (subidos, fallidos).
+def procesar_cola(conexion, cargador, config_dispositivo, logger=None, continuar=None):
+    # Se importa aqui para que los productores puedan encolar sin cargar googleapiclient
+    from cargador_drive import encolar_archivo as encolar_subida
+    carpetas = config_dispositivo.get("drive", {})
+    config_cola = config_dispositivo.get("cola_subidas", {})
+    activos = {}
+    subidos = 0
+    fallidos = 0
+    while True:
+        libres = cargador['num_hilos'] - len(activos)
+        if libres > 0 and (continuar is None or continuar()):
+            for trabajo in tomar_trabajos(conexion, libres, tipos_permitidos(cargador['planificador'], TIPOS_TRABAJO)):
+                if not os.path.isfile(trabajo['ruta']):
+                    fallar_trabajo(conexion, trabajo, "El archivo no existe", config_cola, definitivo=True)
+                    fallidos += 1
+                    if logger:
+                        logger.warning(f"Trabajo {trabajo['id']} descartado, el archivo no existe: {trabajo['ruta']}")
+                    continue
+                drive_id = carpetas.get(TIPOS_TRABAJO[trabajo['tipo']][1], "Unknown")
+                activos[encolar_subida(cargador, trabajo['ruta'], drive_id, trabajo['borrar_despues'])] = trabajo
+        if not activos:
+            return subidos, fallidos
+
+        terminados, _ = wait(activos, return_when=FIRST_COMPLETED)
+        for futuro in terminados:
+            trabajo = activos.pop(futuro)
+            resultado = futuro.result()
+            if resultado['error'] is None:
+                completar_trabajo(conexion, trabajo, resultado['id'])
+                subidos += 1
+            else:
+                estado = fallar_trabajo(conexion, trabajo, resultado['error'], config_cola)
+                fallidos += 1
+                if logger:
+                    logger.warning(f"Trabajo {trabajo['id']} ({os.path.basename(trabajo['ruta'])}) fallo en el intento {trabajo['intentos'] + 1}: "
+                                   f"{'sin mas reintentos' if estado == 'fallido' else 'se reintentara mas tarde'}")
+
+#######################################################################################################
+
+############################################ ~Main~ ###################################################
+# Administra la cola de subidas desde la linea de comandos.
+def main():
+    uso = ("Uso: cola_subidas.py encolar <evento|mseed|dat> <borrar_despues: 0|1> <archivo>...\n"
+           "     cola_subidas.py estado\n"
+           "     cola_subidas.py reintentar [evento|mseed|dat]\n"
+           "     cola_subidas.py purgar [dias]")
+    if len(sys.argv) < 2:
+        print(uso)
+        return
+    project_local_root = os.getenv("PROJECT_LOCAL_ROOT")
+    if not project_local_root:
+        print("La variable de entorno no están definida.")
+        return
+    conexion = abrir_cola_local(project_local_root)
+    comando = sys.argv[1]
+
+    if comando == 'encolar' and len(sys.argv) >= 5 and sys.argv[2] in TIPOS_TRABAJO:
+        nuevos = 0
+        for ruta in sys.argv[4:]:
+            if not os.path.isfile(ruta):
+                print(f"El archivo {ruta} no existe")
+                continue
+            nuevos += encolar_archivo(conexion, ruta, sys.argv[2], sys.argv[3] == '1')
+        print(f"{nuevos} trabajos agregados a la cola")
+    elif comando == 'estado':
+        for tipo, estados in resumen_cola(conexion).items():
+            print(f"{tipo:7s} " + "  ".join(f"{estado}: {cantidad}" for estado, cantidad in estados.items()))
+        for id_trabajo, ruta, intentos, error in conexion.execute(
+                "SELECT id, ruta, intentos, error FROM trabajos WHERE estado = 'fallido' ORDER BY id DESC LIMIT 10"):
+            print(f"  Fallido {id_trabajo}: {os.path.basename(ruta)} ({intentos} intentos): {error}")
+    elif comando == 'reintentar':
+        print(f"{reintentar_fallidos(conexion, sys.argv[2] if len(sys.argv) > 2 else None)} trabajos pendientes de nuevo")
+    elif comando == 'purgar':
+        print(f"{purgar_subidos(conexion, float(sys.argv[2]) if len(sys.argv) > 2 else 30)} trabajos borrados")
+    else:
+        print(uso)
+    conexion.close()
+
+#######################################################################################################
+if __name__ == '__main__':
+    main()
+#######################################################################################################
@@ -1,9 +1,11 @@
 import os
-import subprocess
-import shutil
+import sys
 import socket
 import json
 import logging
+from cola_subidas import abrir_cola_local, encolar_directorio
+from paquetes_mseed import leer_config_paquetes, empaquetar_directorio
+from retencion_archivos import aplicar_retencion, archivos_protegidos
 
 # Configurar logging básico para mensajes tempranos
 logging.basicConfig(level=logging.DEBUG, format='%(asctime)s - %(levelname)s - %(message)s')
@@ -27,12 +29,6 @@ def read_fileJSON(nameFile):
         logging.error(f"Error al decodificar el archivo {nameFile}.")
         return None
 
-# Retorna el porcentaje de espacio libre en la partición donde se encuentra 'path'
-def get_free_space_percentage(path):
-    total, used, free = shutil.disk_usage(path)
-    percentage = (free / total) * 100
-    return percentage
-
 # Verifica la conexión a internet intentando conectar al servidor DNS de Google
 def check_internet_connection(logger, host="8.8.8.8", port=53, timeout=3):
     try:
@@ -44,19 +40,26 @@ def check_internet_connection(logger, host="8.8.8.8", port=53, timeout=3):
         logger.warning(f"Fallo en la conexión a internet: {e}")
         return False
 
-# Borra el archivo más antiguo con la extensión indicada en el directorio especificado
-def delete_oldest_file(directory, extension, logger):
-    files = [os.path.join(directory, f) for f in os.listdir(directory) if f.endswith(extension)]
-    if not files:
-        logger.warning(f"No se encontraron archivos con extensión {extension} en {directory}.")
-        return
-    oldest_file = min(files, key=os.path.getmtime)
-    filename = os.path.basename(oldest_file)
-    try:
-        os.remove(oldest_file)
-        logger.info(f"Se borró el archivo más antiguo: {filename}")
-    except Exception as e:
-        logger.error(f"Error al borrar el archivo {filename}: {e}")
+# Borra el indice .idx que acompaña a un archivo binario .dat, si existe
+def delete_index_file(binary_path, logger):
+    index_path = os.path.splitext(binary_path)[0] + ".idx"
+    if os.path.isfile(index_path):
+        try:
+            os.remove(index_path)
+        except Exception as e:
+            logger.error(f"Error al borrar el indice {os.path.basename(index_path)}: {e}")
+
+# Devuelve las rutas de los mseed que la conversion incremental (modo 'anexar') todavia esta completando, segun
+# los puntos de control (PuntosControlMseed.json). Esos archivos no se encolan hasta que su binario se cierra.
+def mseed_en_curso(project_local_root, mseed_directory):
+    archivo_puntos_control = os.path.join(project_local_root, "tmp-files", "PuntosControlMseed.json")
+    if not os.path.isfile(archivo_puntos_control):
+        return []
+    puntos_control = read_fileJSON(archivo_puntos_control)
+    if not isinstance(puntos_control, dict):
+        return []
+    return [os.path.join(mseed_directory, punto["mseed"]) for punto in puntos_control.values()
+            if isinstance(punto, dict) and punto.get("mseed")]
 
 # Función para inicializar y obtener el logger de un cliente
 def obtener_logger(id_estacion, log_directory, log_filename):
@@ -94,7 +97,6 @@ def main():
         return
     
     # Definir rutas de archivos y directorios
-    script_subir_archivo_drive = os.path.join(project_local_root, "scripts", "drive", "subir_archivo.py")
     mseed_directory = os.path.join(project_local_root, "resultados", "mseed")
     binary_directory = os.path.join(project_local_root, "resultados", "registro-continuo")
     config_dispositivo_path = os.path.join(project_local_root, "configuracion", "configuracion_dispositivo.json")
@@ -145,48 +147,69 @@ def main():
                     try:
                         os.remove(path_archivo)
                         logger.info(f"Archivo binario borrado: {filename_bin}")
+                        delete_index_file(path_archivo, logger)
                     except Exception as e:
                         logger.error(f"Error al borrar {filename_bin}: {e}")
         else:
             logger.warning("No se encontraron archivos binarios en el directorio.")
-
-        # Verificar espacio disponible en la partición donde se encuentra el directorio mseed
-        free_space = get_free_space_percentage(mseed_directory)
-        if free_space < 10:
-            logger.warning("El espacio disponible es menor al 10%. Se procederá a borrar el archivo mseed más antiguo.")
-            delete_oldest_file(mseed_directory, ".mseed", logger)
     
     elif mode_acq == "online":
         logger.info("Modo online activado.")
         if check_internet_connection(logger):
             #logger.info("Conexión a internet establecida. Se procederá a subir los archivos mseed a Google Drive.")
-            if archivos_mseed:
-                for archivo in archivos_mseed:
-                    #logger.info(f"Subiendo el archivo: {archivo}")
-                    result = subprocess.run(["python3", script_subir_archivo_drive, archivo, "3", "1"])
-                    if result.returncode != 0:
-                        logger.error(f"Error al subir el archivo {archivo}. Código de retorno: {result.returncode}")
+            config_paquetes = leer_config_paquetes(config_dispositivo)
+            if archivos_mseed and config_paquetes["agrupar"] == "si":
+                # Los mseed de cada periodo cerrado se agrupan en un paquete, que se encola como un solo archivo
+                try:
+                    conexion = abrir_cola_local(project_local_root)
+                    paquetes = empaquetar_directorio(mseed_directory, config_paquetes, conexion, logger)
+                    conexion.close()
+                    if paquetes:
+                        logger.info(f"Se encolaron {len(paquetes)} paquetes de archivos mseed.")
+                except Exception as e:
+                    logger.error(f"Error al empaquetar los archivos mseed: {e}")
+            elif archivos_mseed:
+                # Los archivos se suben con el servicio de subidas (servicio_subidas.py). Los productores ya encolan
+                # cada archivo que crean; aqui solo se encolan los que no estan en la cola (por ejemplo de conversiones
+                # por lotes) o que cambiaron, que se borran despues de subirlos. El mseed que la conversion incremental
+                # sigue completando se deja para cuando termine
+                try:
+                    conexion = abrir_cola_local(project_local_root)
+                    nuevos = encolar_directorio(conexion, mseed_directory, ".mseed", "mseed", True,
+                                                mseed_en_curso(project_local_root, mseed_directory))
+                    conexion.close()
+                    if nuevos:
+                        logger.info(f"Se encolaron {nuevos} archivos mseed que no estaban en la cola de subidas.")
+                except Exception as e:
+                    logger.error(f"Error al encolar los archivos mseed: {e}")
             else:
                 logger.warning("No se encontraron archivos mseed en el directorio especificado.")
-        else:
-             # Si no hay conexion a internet verifica el espacio disponible 
-            free_space = get_free_space_percentage(mseed_directory)
-            if free_space < 10:
-                logger.warning("El espacio disponible es menor al 10%. Se procederá a borrar el archivo mseed más antiguo.")
-                delete_oldest_file(mseed_directory, ".mseed", logger)
-            else:
-                logger.info("Espacio disponible suficiente en la partición.")
-
-        # Verificar espacio disponible en el directorio de archivos binarios
-        free_space = get_free_space_percentage(binary_directory)
-        if free_space < 10:
-            logger.warning("El espacio disponible es menor al 10%. Se procederá a borrar el archivo binario más antiguo.")
-            delete_oldest_file(binary_directory, ".dat", logger)
-        else:
-            logger.info("Espacio disponible suficiente en la partición.")
     
     else:
         logger.error(f"Modo de adquisición desconocido: {mode_acq}")
+        return
+
+    # Reemplaza los registros continuos mas antiguos que dias_completos por sus productos decimados (50 Hz y
+    # minimo/maximo/RMS de cada segundo), antes de que la retencion los borre por falta de espacio
+    if config_dispositivo.get("decimacion", {}).get("activar", "no") == "si":
+        try:
+            if os.path.join(project_local_root, "scripts", "mseed") not in sys.path:
+                sys.path.append(os.path.join(project_local_root, "scripts", "mseed"))
+            from decimador_registro import decimar_envejecidos
+            config_mseed = read_fileJSON(os.path.join(project_local_root, "configuracion", "configuracion_mseed.json"))
+            if config_mseed is not None:
+                decimar_envejecidos(config_dispositivo, config_mseed, logger,
+                                    archivos_protegidos(project_local_root, config_dispositivo, 'registro_continuo'))
+        except Exception as e:
+            logger.error(f"Error al decimar los registros antiguos: {e}")
+
+    # Libera espacio en una sola pasada sobre los directorios de resultados (registro continuo, mseed y eventos
+    # extraidos): borra los archivos mas antiguos hasta alcanzar el espacio libre objetivo, respetando las cuotas
+    # de cada categoria y, en modo online, sin borrar archivos que todavia no se subieron a Drive
+    try:
+        aplicar_retencion(project_local_root, config_dispositivo, logger)
+    except Exception as e:
+        logger.error(f"Error al aplicar la retencion de archivos: {e}")
  
 
 if __name__ == "__main__":
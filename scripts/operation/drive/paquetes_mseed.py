@@ -0,0 +1,323 @@
+######################################### ~Librerias~ #################################################
+import os
+import sys
+import io
+import json
+import time
+import zlib
+import hashlib
+import tarfile
+from datetime import datetime, timezone
+from cola_subidas import abrir_cola_local, encolar_archivo, en_cola
+from registro_subidas import md5_archivo
+#######################################################################################################
+
+##################################### ~Variables globales~ ############################################
+# Paquete de archivos mseed (.tar): un tar sin comprimir cuyos miembros son los mseed comprimidos por separado
+# con gzip (<nombre>.mseed.gz), seguido del manifiesto (manifiesto.json) con el intervalo de tiempo, el tamaño y
+# el MD5 de cada mseed original. Como cada miembro se comprime por separado y el tar guarda su posicion, se puede
+# listar o extraer un miembro sin descomprimir el resto del paquete.
+EXTENSION_PAQUETE = '.tar'
+EXTENSION_MIEMBRO = '.gz'
+NOMBRE_MANIFIESTO = 'manifiesto.json'
+VERSION_MANIFIESTO = 1
+# Parametros por defecto de la seccion "paquetes_mseed" de configuracion_dispositivo.json
+CONFIG_POR_DEFECTO = {
+    "agrupar": "no",                # Agrupar los mseed del registro continuo en paquetes antes de subirlos
+    "periodo_minutos": 60,          # Duracion del periodo que cubre cada paquete
+    "espera_cierre_minutos": 10,    # Tiempo despues del fin del periodo para esperar sus ultimas conversiones
+    "nivel_compresion": 6           # Nivel de gzip de cada miembro
+}
+# Un archivo se considera cerrado si no se modifico en este tiempo (segundos)
+ANTIGUEDAD_MINIMA = 120
+TAMANO_BLOQUE = 1024 * 1024
+FORMATO_FECHA = '%Y-%m-%dT%H:%M:%S.%fZ'
+#######################################################################################################
+
+######################################### ~Funciones~ #################################################
+# Lee un archivo de configuración en formato JSON y devuelve su contenido como un diccionario.
+def read_fileJSON(nameFile):
+    try:
+        with open(nameFile, 'r') as f:
+            data = json.load(f)
+        return data
+    except FileNotFoundError:
+        print(f"Archivo {nameFile} no encontrado.")
+        return None
+    except json.JSONDecodeError:
+        print(f"Error al decodificar el archivo {nameFile}.")
+        return None
+
+
+# Devuelve la configuracion de paquetes con los valores por defecto para los parametros que no esten definidos.
+def leer_config_paquetes(config_dispositivo):
+    config = dict(CONFIG_POR_DEFECTO)
+    config.update(config_dispositivo.get("paquetes_mseed", {}))
+    return config
+
+
+# Convierte segundos POSIX en texto ISO (UTC) para el manifiesto.
+def texto_fecha(segundos):
+    return datetime.fromtimestamp(segundos, timezone.utc).strftime(FORMATO_FECHA)
+
+
+# Intervalo de tiempo de un archivo mseed (segundos POSIX), leyendo solo las cabeceras: inicio de la primera muestra
+# y fin de la ultima de todos los canales.
+def rango_mseed(ruta):
+    # obspy solo se importa aqui para que listar o extraer un paquete no pague su tiempo de carga
+    from obspy import read
+    stream = read(ruta, headonly=True)
+    if len(stream) == 0:
+        return None
+    return (min(traza.stats.starttime.timestamp for traza in stream),
+            max(traza.stats.endtime.timestamp + traza.stats.delta for traza in stream))
+
+
+# Lee un archivo una sola vez y devuelve su MD5 y su contenido comprimido con gzip.
+def comprimir_miembro(ruta, nivel):
+    md5 = hashlib.md5()
+    compresor = zlib.compressobj(nivel, zlib.DEFLATED, 31)
+    comprimido = io.BytesIO()
+    with open(ruta, 'rb') as f:
+        while bloque := f.read(TAMANO_BLOQUE):
+            md5.update(bloque)
+            comprimido.write(compresor.compress(bloque))
+    comprimido.write(compresor.flush())
+    return md5.hexdigest(), comprimido.getvalue()
+
+
+# Agrega un miembro al tar a partir de sus bytes.
+def agregar_bytes(tar, nombre, datos, mtime):
+    info = tarfile.TarInfo(nombre)
+    info.size = len(datos)
+    info.mtime = int(mtime)
+    info.mode = 0o644
+    tar.addfile(info, io.BytesIO(datos))
+
+
+# Crea un paquete con los archivos mseed indicados. Se escribe en un archivo temporal que se renombra al terminar,
+# de modo que nunca queda un paquete incompleto con el nombre final. Devuelve el manifiesto.
+def crear_paquete(archivos, ruta_paquete, nivel=CONFIG_POR_DEFECTO["nivel_compresion"], datos_manifiesto=None):
+    manifiesto = {'version': VERSION_MANIFIESTO, 'creado': texto_fecha(time.time())}
+    manifiesto.update(datos_manifiesto or {})
+    manifiesto['miembros'] = []
+    archivo_temporal = ruta_paquete + '.tmp'
+    with tarfile.open(archivo_temporal, 'w', format=tarfile.PAX_FORMAT) as tar:
+        for ruta in archivos:
+            nombre = os.path.basename(ruta)
+            rango = rango_mseed(ruta)
+            estado = os.stat(ruta)
+            md5, comprimido = comprimir_miembro(ruta, nivel)
+            agregar_bytes(tar, nombre + EXTENSION_MIEMBRO, comprimido, estado.st_mtime)
+            manifiesto['miembros'].append({
+                'nombre': nombre,
+                'tiempo_inicio': texto_fecha(rango[0]) if rango else None,
+                'tiempo_fin': texto_fecha(rango[1]) if rango else None,
+                'tamano': estado.st_size,
+                'tamano_comprimido': len(comprimido),
+                'md5': md5
+            })
+        agregar_bytes(tar, NOMBRE_MANIFIESTO, json.dumps(manifiesto, indent=4).encode(), time.time())
+    os.replace(archivo_temporal, ruta_paquete)
+    return manifiesto
+
+
+# Lee el manifiesto de un paquete. El tar no esta comprimido: solo se leen las cabeceras de los miembros.
+def leer_manifiesto(ruta_paquete):
+    with tarfile.open(ruta_paquete, 'r:') as tar:
+        return json.load(tar.extractfile(NOMBRE_MANIFIESTO))
+
+
+# Extrae un miembro del paquete en el directorio destino y comprueba su MD5 con el del manifiesto.
+# Solo se descomprime ese miembro. Devuelve la ruta del archivo extraido.
+def extraer_miembro(ruta_paquete, nombre, destino, manifiesto=None):
+    manifiesto = manifiesto or leer_manifiesto(ruta_paquete)
+    miembro = next((m for m in manifiesto['miembros'] if m['nombre'] == nombre), None)
+    if miembro is None:
+        raise KeyError(f"{nombre} no esta en el paquete {os.path.basename(ruta_paquete)}")
+    ruta_salida = os.path.join(destino, nombre)
+    md5 = hashlib.md5()
+    descompresor = zlib.decompressobj(31)
+    with tarfile.open(ruta_paquete, 'r:') as tar:
+        origen = tar.extractfile(nombre + EXTENSION_MIEMBRO)
+        with open(ruta_salida + '.tmp', 'wb') as salida:
+            while bloque := origen.read(TAMANO_BLOQUE):
+                datos = descompresor.decompress(bloque)
+                md5.update(datos)
+                salida.write(datos)
+            datos = descompresor.flush()
+            md5.update(datos)
+            salida.write(datos)
+    if md5.hexdigest() != miembro['md5']:
+        os.remove(ruta_salida + '.tmp')
+        raise ValueError(f"El MD5 de {nombre} no coincide con el del manifiesto")
+    os.replace(ruta_salida + '.tmp', ruta_salida)
+    return ruta_salida
+
+
+# Comprueba todos los miembros de un paquete sin escribirlos. Devuelve la lista de nombres con errores.
+def verificar_paquete(ruta_paquete):
+    manifiesto = leer_manifiesto(ruta_paquete)
+    errores = []
+    with tarfile.open(ruta_paquete, 'r:') as tar:
+        for miembro in manifiesto['miembros']:
+            try:
+                datos = zlib.decompress(tar.extractfile(miembro['nombre'] + EXTENSION_MIEMBRO).read(), 31)
+                if len(datos) != miembro['tamano'] or hashlib.md5(datos).hexdigest() != miembro['md5']:
+                    errores.append(miembro['nombre'])
+            except (KeyError, zlib.error):
+                errores.append(miembro['nombre'])
+    return errores
+
+
+# Ruta libre para el paquete de un periodo. Si ya hay un paquete con ese nombre en el directorio o en la cola
+# de subidas (por ejemplo de un archivo convertido tarde) se agrega un sufijo _2, _3...
+def ruta_paquete_libre(directorio, codigo, inicio_periodo, conexion_cola=None):
+    base = f"{codigo}_{datetime.fromtimestamp(inicio_periodo, timezone.utc).strftime('%Y%m%d_%H%M%S')}"
+    numero = 1
+    while True:
+        ruta = os.path.join(directorio, base + (f"_{numero}" if numero > 1 else "") + EXTENSION_PAQUETE)
+        if not os.path.exists(ruta) and not (conexion_cola is not None and en_cola(conexion_cola, ruta)):
+            return ruta
+        numero += 1
+
+
+# Agrupa los mseed cerrados del directorio por estacion (prefijo del nombre) y periodo (inicio de sus datos).
+# Solo devuelve los periodos que terminaron hace mas de espera_cierre_minutos: {(codigo, inicio_periodo): [rutas]}.
+def periodos_cerrados(directorio, config_paquetes, ahora=None):
+    ahora = ahora or time.time()
+    periodo = float(config_paquetes["periodo_minutos"]) * 60
+    espera = float(config_paquetes["espera_cierre_minutos"]) * 60
+    grupos = {}
+    for entrada in os.scandir(directorio):
+        if not entrada.is_file() or not entrada.name.endswith('.mseed'):
+            continue
+        if ahora - entrada.stat().st_mtime < ANTIGUEDAD_MINIMA:
+            continue
+        try:
+            rango = rango_mseed(entrada.path)
+        except Exception:
+            continue
+        if rango is None:
+            continue
+        inicio_periodo = rango[0] // periodo * periodo
+        if inicio_periodo + periodo + espera > ahora:
+            continue
+        codigo = entrada.name.split('_')[0]
+        grupos.setdefault((codigo, inicio_periodo), []).append(entrada.path)
+    return {clave: sorted(rutas) for clave, rutas in grupos.items()}
+
+
+# Borra los archivos originales que ya estan en el paquete con el mismo MD5.
+def borrar_empaquetados(directorio, manifiesto, logger=None):
+    for miembro in manifiesto['miembros']:
+        ruta = os.path.join(directorio, miembro['nombre'])
+        try:
+            if os.path.getsize(ruta) == miembro['tamano'] and md5_archivo(ruta) == miembro['md5']:
+                os.remove(ruta)
+        except OSError as e:
+            if logger and not isinstance(e, FileNotFoundError):
+                logger.error(f"Error al borrar el archivo empaquetado {miembro['nombre']}: {e}")
+
+
+# Recupera los paquetes del directorio que no llegaron a la cola de subidas (por ejemplo si el proceso se detuvo
+# despues de crear el paquete): borra los originales que quedaron y encola el paquete. Devuelve cuantos encolo.
+def recuperar_paquetes(directorio, conexion_cola, logger=None):
+    recuperados = 0
+    for entrada in os.scandir(directorio):
+        if not entrada.is_file() or not entrada.name.endswith(EXTENSION_PAQUETE):
+            continue
+        if en_cola(conexion_cola, entrada.path):
+            continue
+        try:
+            borrar_empaquetados(directorio, leer_manifiesto(entrada.path), logger)
+        except (tarfile.TarError, KeyError, ValueError) as e:
+            if logger:
+                logger.error(f"Paquete {entrada.name} dañado, no se sube: {e}")
+            continue
+        recuperados += encolar_archivo(conexion_cola, entrada.path, 'mseed', True)
+    return recuperados
+
+
+# Empaqueta los periodos cerrados del directorio mseed: crea un paquete por estacion y periodo, borra los
+# originales y encola el paquete en la cola de subidas para subirlo y borrarlo. Devuelve las rutas de los paquetes.
+def empaquetar_directorio(directorio, config_paquetes, conexion_cola, logger=None, ahora=None):
+    recuperar_paquetes(directorio, conexion_cola, logger)
+    paquetes = []
+    for (codigo, inicio_periodo), archivos in sorted(periodos_cerrados(directorio, config_paquetes, ahora).items()):
+        ruta_paquete = ruta_paquete_libre(directorio, codigo, inicio_periodo, conexion_cola)
+        try:
+            manifiesto = crear_paquete(archivos, ruta_paquete, int(config_paquetes["nivel_compresion"]),
+                                       {'estacion': codigo, 'periodo_inicio': texto_fecha(inicio_periodo),
+                                        'periodo_minutos': config_paquetes["periodo_minutos"]})
+        except Exception as e:
+            if logger:
+                logger.error(f"Error al crear el paquete {os.path.basename(ruta_paquete)}: {e}")
+            continue
+        # Los originales se borran antes de encolar; si el proceso se detiene en medio, recuperar_paquetes termina
+        borrar_empaquetados(directorio, manifiesto, logger)
+        encolar_archivo(conexion_cola, ruta_paquete, 'mseed', True)
+        paquetes.append(ruta_paquete)
+        if logger:
+            tamano = sum(m['tamano'] for m in manifiesto['miembros'])
+            logger.info(f"Paquete {os.path.basename(ruta_paquete)} creado con {len(archivos)} archivos mseed "
+                        f"({tamano / 1e6:.2f} MB -> {os.path.getsize(ruta_paquete) / 1e6:.2f} MB)")
+    return paquetes
+
+#######################################################################################################
+
+############################################ ~Main~ ###################################################
+def main():
+    uso = ("Uso: paquetes_mseed.py empaquetar\n"
+           "     paquetes_mseed.py listar <paquete.tar>\n"
+           "     paquetes_mseed.py extraer <paquete.tar> [miembro.mseed...] [--destino directorio]\n"
+           "     paquetes_mseed.py verificar <paquete.tar>")
+    if len(sys.argv) < 2:
+        print(uso)
+        return
+    comando = sys.argv[1]
+
+    if comando == 'empaquetar':
+        project_local_root = os.getenv("PROJECT_LOCAL_ROOT")
+        if not project_local_root:
+            print("La variable de entorno no están definida.")
+            return
+        config_dispositivo = read_fileJSON(os.path.join(project_local_root, "configuracion", "configuracion_dispositivo.json"))
+        if config_dispositivo is None:
+            return
+        conexion = abrir_cola_local(project_local_root)
+        directorio = os.path.join(project_local_root, "resultados", "mseed")
+        paquetes = empaquetar_directorio(directorio, leer_config_paquetes(config_dispositivo), conexion)
+        conexion.close()
+        for ruta in paquetes:
+            print(f"Paquete creado y encolado: {os.path.basename(ruta)}")
+        print(f"{len(paquetes)} paquetes creados")
+    elif comando == 'listar' and len(sys.argv) == 3:
+        manifiesto = leer_manifiesto(sys.argv[2])
+        print(f"Estacion {manifiesto.get('estacion')}, periodo desde {manifiesto.get('periodo_inicio')} ({manifiesto.get('periodo_minutos')} min), "
+              f"{len(manifiesto['miembros'])} archivos")
+        for miembro in manifiesto['miembros']:
+            print(f"  {miembro['nombre']}  {miembro['tiempo_inicio']} - {miembro['tiempo_fin']}  "
+                  f"{miembro['tamano']} B ({miembro['tamano_comprimido']} B)  md5 {miembro['md5']}")
+    elif comando == 'extraer' and len(sys.argv) >= 3:
+        argumentos = sys.argv[3:]
+        destino = '.'
+        if '--destino' in argumentos:
+            posicion = argumentos.index('--destino')
+            destino = argumentos[posicion + 1]
+            del argumentos[posicion:posicion + 2]
+        manifiesto = leer_manifiesto(sys.argv[2])
+        nombres = argumentos or [miembro['nombre'] for miembro in manifiesto['miembros']]
+        os.makedirs(destino, exist_ok=True)
+        for nombre in nombres:
+            print(f"Extraido: {extraer_miembro(sys.argv[2], nombre, destino, manifiesto)}")
+    elif comando == 'verificar' and len(sys.argv) == 3:
+        errores = verificar_paquete(sys.argv[2])
+        print("Paquete correcto" if not errores else f"Miembros con errores: {', '.join(errores)}")
+    else:
+        print(uso)
+
+#######################################################################################################
+if __name__ == '__main__':
+    main()
+#######################################################################################################
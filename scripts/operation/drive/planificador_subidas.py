@@ -0,0 +1,290 @@
+######################################### ~Librerias~ #################################################
+import os
+import json
+import time
+import threading
+from datetime import datetime
+from collections import deque
+#######################################################################################################
+
+##################################### ~Variables globales~ ############################################
+# Parametros por defecto de la seccion "planificador_subidas" de configuracion_dispositivo.json
+CONFIG_POR_DEFECTO = {
+    "limite_kbytes_s": 0,               # Tasa maxima de subida (0: sin limite)
+    "horario_masivo": [],               # Horas en que se suben mseed y dat, ej. ["22:00-06:00"] ([]: siempre)
+    "medir_latencia_mqtt": "no",        # "si": mide la latencia del broker (publica en latencia/<id>) y reduce la tasa
+    "intervalo_latencia": 30,           # Segundos entre mediciones de latencia
+    "latencia_maxima_ms": 1000,         # Latencia a partir de la cual se reduce la tasa
+    "factor_latencia": 3,               # ... o si la latencia supera este multiplo de la latencia base
+    "limite_minimo_kbytes_s": 8         # Tasa minima cuando se reduce por latencia
+}
+# Tipos de la cola de subidas que se suben en cualquier horario; el resto solo dentro de horario_masivo
+TIPOS_PRIORITARIOS = ('evento',)
+# Ventana (segundos) para calcular la tasa de subida medida
+VENTANA_TASA = 60
+# Numero de mediciones de latencia para estimar la latencia base (la minima reciente)
+MUESTRAS_LATENCIA = 20
+# Reduccion multiplicativa del factor de tasa ante congestion y aumento por cada medicion sin congestion
+REDUCCION_FACTOR = 0.5
+AUMENTO_FACTOR = 0.1
+# Las esperas del limite de tasa se hacen en pasos de a lo sumo estos segundos, para seguir los cambios de la tasa
+PASO_ESPERA = 1.0
+# Tiempo maximo de espera de la confirmacion del mensaje de prueba (segundos)
+TIMEOUT_LATENCIA = 10
+# Cada fragmento de una subida limitada dura como maximo unos SEGUNDOS_FRAGMENTO a la tasa limitada
+SEGUNDOS_FRAGMENTO = 4
+UNIDAD_FRAGMENTO = 256 * 1024
+#######################################################################################################
+
+######################################### ~Funciones~ #################################################
+# Lee un archivo de configuración en formato JSON y devuelve su contenido como un diccionario.
+def read_fileJSON(nameFile):
+    try:
+        with open(nameFile, 'r') as f:
+            data = json.load(f)
+        return data
+    except FileNotFoundError:
+        print(f"Archivo {nameFile} no encontrado.")
+        return None
+    except json.JSONDecodeError:
+        print(f"Error al decodificar el archivo {nameFile}.")
+        return None
+
+
+# Crea el planificador con los parametros de la configuracion del dispositivo. Contiene el cubo de tokens
+# (compartido por todos los hilos de subida), el factor de reduccion por latencia y los bytes subidos recientes.
+def crear_planificador(config_dispositivo, archivo_metricas=None):
+    config = dict(CONFIG_POR_DEFECTO)
+    config.update(config_dispositivo.get("planificador_subidas", {}))
+    limite = float(config["limite_kbytes_s"]) * 1000
+    return {
+        'config': config,
+        'limite': limite,
+        'pedidos': 0.0,
+        'servidos': 0.0,
+        'ultimo_llenado': time.monotonic(),
+        'factor': 1.0,
+        'tasa_referencia': None,
+        'latencias': deque(maxlen=MUESTRAS_LATENCIA),
+        'latencia': None,
+        'subidos': deque(),
+        'inicio': time.monotonic(),
+        'bytes_totales': 0,
+        'archivo_metricas': archivo_metricas,
+        'bloqueo': threading.Lock()
+    }
+
+
+# Devuelve True si la hora esta dentro de alguno de los intervalos "HH:MM-HH:MM" (pueden cruzar la medianoche).
+# Una lista vacia permite cualquier hora.
+def en_horario(horario, ahora=None):
+    if not horario:
+        return True
+    ahora = ahora or datetime.now()
+    minuto = ahora.hour * 60 + ahora.minute
+    for intervalo in horario:
+        inicio, fin = [int(h) * 60 + int(m) for h, m in (parte.split(':') for parte in intervalo.split('-'))]
+        if (inicio <= minuto < fin) if inicio <= fin else (minuto >= inicio or minuto < fin):
+            return True
+    return False
+
+
+# Tipos de trabajo de la cola que se pueden subir ahora: los eventos siempre y el resto dentro del horario masivo.
+def tipos_permitidos(planificador, tipos):
+    if planificador is None or en_horario(planificador['config']["horario_masivo"]):
+        return list(tipos)
+    return [tipo for tipo in tipos if tipo in TIPOS_PRIORITARIOS]
+
+
+# Tasa de subida medida en la ultima ventana (bytes/s). Al iniciar, la ventana es el tiempo transcurrido.
+def tasa_medida(planificador):
+    with planificador['bloqueo']:
+        return _tasa_medida(planificador)
+
+
+def _tasa_medida(planificador):
+    ahora = time.monotonic()
+    subidos = planificador['subidos']
+    while subidos and subidos[0][0] < ahora - VENTANA_TASA:
+        subidos.popleft()
+    return sum(n for _, n in subidos) / max(1.0, min(VENTANA_TASA, ahora - planificador['inicio']))
+
+
+# Tasa permitida en este momento (bytes/s, 0 sin limite): el limite configurado por el factor de latencia.
+# Sin limite configurado, al detectar congestion se toma como referencia la tasa medida en ese momento.
+def limite_efectivo(planificador):
+    if planificador['factor'] >= 1.0:
+        return planificador['limite']
+    referencia = planificador['limite'] or planificador['tasa_referencia'] or 0
+    minimo = float(planificador['config']["limite_minimo_kbytes_s"]) * 1000
+    return max(minimo, referencia * planificador['factor'])
+
+
+# Tamaño de fragmento para una subida: con limite, el que se envia en unos SEGUNDOS_FRAGMENTO a la tasa permitida,
+# para que cada rafaga a la velocidad del enlace sea corta; sin limite, el configurado.
+def fragmento_planificado(planificador, fragmento):
+    limite = limite_efectivo(planificador) if planificador else 0
+    if not limite:
+        return fragmento
+    unidades = max(1, int(limite * SEGUNDOS_FRAGMENTO // UNIDAD_FRAGMENTO))
+    return min(fragmento, unidades * UNIDAD_FRAGMENTO)
+
+
+# Acredita los bytes que la tasa permitida habilita desde el ultimo llenado. Se guarda como maximo un segundo
+# de credito sin usar; sin limite se acredita todo lo pedido. Se llama con el bloqueo tomado.
+def _llenar(planificador):
+    ahora = time.monotonic()
+    limite = limite_efectivo(planificador)
+    if limite:
+        planificador['servidos'] = min(planificador['pedidos'] + limite,
+                                       planificador['servidos'] + (ahora - planificador['ultimo_llenado']) * limite)
+    else:
+        planificador['servidos'] = max(planificador['servidos'], planificador['pedidos'])
+    planificador['ultimo_llenado'] = ahora
+    return limite
+
+
+# Cubo de tokens compartido por los hilos de subida: pide n bytes y espera hasta que la tasa permitida los acredite.
+# Los pedidos se atienden en orden de llegada y la espera se recalcula en cada paso, de modo que un cambio del
+# limite (por ejemplo al bajar la latencia) se aplica tambien a las subidas que ya estan esperando.
+def consumir(planificador, n):
+    if planificador is None:
+        return
+    with planificador['bloqueo']:
+        _llenar(planificador)
+        planificador['pedidos'] += n
+        turno = planificador['pedidos']
+    while True:
+        with planificador['bloqueo']:
+            limite = _llenar(planificador)
+            faltan = turno - planificador['servidos']
+        if faltan <= 0:
+            return
+        time.sleep(min(PASO_ESPERA, faltan / limite))
+
+
+# Registra n bytes confirmados por Drive para la tasa medida.
+def registrar_subida(planificador, n):
+    if planificador is None or n <= 0:
+        return
+    with planificador['bloqueo']:
+        planificador['subidos'].append((time.monotonic(), n))
+        planificador['bytes_totales'] += n
+
+
+# Actualiza el factor de tasa con una medicion de latencia (segundos, None si no hubo respuesta). Hay congestion
+# si la latencia supera latencia_maxima_ms o factor_latencia veces la latencia base (la minima de las ultimas
+# mediciones); entonces el factor se reduce a la mitad, y sin congestion se recupera de a poco (AIMD).
+# Sin limite configurado solo se reduce si hay subidas en curso, tomando como referencia la tasa medida.
+def actualizar_latencia(planificador, latencia):
+    config = planificador['config']
+    with planificador['bloqueo']:
+        planificador['latencia'] = latencia
+        if latencia is None:
+            return planificador['factor']
+        base = min(planificador['latencias']) if planificador['latencias'] else latencia
+        planificador['latencias'].append(latencia)
+        congestion = latencia * 1000 > float(config["latencia_maxima_ms"]) or latencia > float(config["factor_latencia"]) * base
+        if not congestion:
+            planificador['factor'] = min(1.0, planificador['factor'] + AUMENTO_FACTOR)
+        else:
+            if planificador['factor'] >= 1.0 and not planificador['limite']:
+                planificador['tasa_referencia'] = _tasa_medida(planificador)
+            referencia = planificador['limite'] or planificador['tasa_referencia']
+            minimo = float(config["limite_minimo_kbytes_s"]) * 1000
+            if referencia:
+                planificador['factor'] = max(min(1.0, minimo / referencia), planificador['factor'] * REDUCCION_FACTOR)
+        if planificador['factor'] >= 1.0:
+            planificador['tasa_referencia'] = None
+        return planificador['factor']
+
+
+# Devuelve las metricas del planificador (tasas en kB/s).
+def metricas(planificador):
+    tasa = tasa_medida(planificador)
+    return {
+        'tasa_kbytes_s': round(tasa / 1000, 1),
+        'limite_kbytes_s': round(limite_efectivo(planificador) / 1000, 1),
+        'factor_latencia': round(planificador['factor'], 2),
+        'latencia_ms': None if planificador['latencia'] is None else round(planificador['latencia'] * 1000, 1),
+        'latencia_base_ms': round(min(planificador['latencias']) * 1000, 1) if planificador['latencias'] else None,
+        'horario_masivo': en_horario(planificador['config']["horario_masivo"]),
+        'bytes_totales': planificador['bytes_totales'],
+        'actualizado': datetime.now().strftime('%Y-%m-%dT%H:%M:%S')
+    }
+
+
+# Guarda las metricas en el archivo de metricas (tmp-files/MetricasSubidas.json) de forma atomica.
+def guardar_metricas(planificador):
+    if not planificador['archivo_metricas']:
+        return
+    archivo_temporal = planificador['archivo_metricas'] + '.tmp'
+    with open(archivo_temporal, 'w') as f:
+        json.dump(metricas(planificador), f, indent=4)
+    os.replace(archivo_temporal, planificador['archivo_metricas'])
+
+
+# Mide la latencia del broker MQTT: publica un mensaje QoS 1 y espera su confirmacion (PUBACK).
+# Devuelve los segundos transcurridos, o None si no hay conexion o no llego la confirmacion.
+def medir_latencia(client, topic):
+    if not client.is_connected():
+        return None
+    inicio = time.monotonic()
+    info = client.publish(topic, str(time.time()), qos=1)
+    info.wait_for_publish(TIMEOUT_LATENCIA)
+    if not info.is_published():
+        return TIMEOUT_LATENCIA
+    return time.monotonic() - inicio
+
+
+# Inicia un hilo que mide periodicamente la latencia del broker MQTT, ajusta el factor de tasa y guarda las
+# metricas. Devuelve el cliente MQTT (None si la medicion esta desactivada o no hay configuracion MQTT).
+def iniciar_monitor_latencia(planificador, config_mqtt, dispositivo_id, logger=None, continuar=None):
+    if planificador['config']["medir_latencia_mqtt"] != "si" or not config_mqtt:
+        return None
+    # paho solo se importa si se mide la latencia
+    import paho.mqtt.client as mqtt
+    client = mqtt.Client()
+    client.username_pw_set(config_mqtt["username"], config_mqtt["password"])
+    client.connect_async(config_mqtt["serverAddress"], 1883, 60)
+    client.loop_start()
+    topic = f"latencia/{dispositivo_id}"
+
+    def medir():
+        while continuar is None or continuar():
+            try:
+                latencia = medir_latencia(client, topic)
+                factor_anterior = planificador['factor']
+                factor = actualizar_latencia(planificador, latencia)
+                # Se registra cada reduccion y la vuelta a la tasa completa, no cada paso de la recuperacion
+                if logger and (factor < factor_anterior or factor_anterior < factor == 1.0):
+                    logger.info(f"Latencia MQTT {latencia * 1000:.0f} ms: limite de subida {limite_efectivo(planificador) / 1000:.1f} kB/s (factor {factor:.2f})")
+                guardar_metricas(planificador)
+            except Exception as e:
+                if logger:
+                    logger.warning(f"Error al medir la latencia MQTT: {e}")
+            time.sleep(float(planificador['config']["intervalo_latencia"]))
+
+    threading.Thread(target=medir, name='latencia_mqtt', daemon=True).start()
+    return client
+
+#######################################################################################################
+
+############################################ ~Main~ ###################################################
+# Muestra las metricas de subida guardadas por el servicio de subidas.
+def main():
+    project_local_root = os.getenv("PROJECT_LOCAL_ROOT")
+    if not project_local_root:
+        print("La variable de entorno no están definida.")
+        return
+    datos = read_fileJSON(os.path.join(project_local_root, "tmp-files", "MetricasSubidas.json"))
+    if datos is None:
+        print("No hay metricas de subida (el servicio de subidas no esta activo).")
+        return
+    for clave, valor in datos.items():
+        print(f"{clave}: {valor}")
+
+#######################################################################################################
+if __name__ == '__main__':
+    main()
+#######################################################################################################
@@ -0,0 +1,129 @@
+######################################### ~Librerias~ #################################################
+import os
+import sys
+import time
+import hashlib
+import sqlite3
+from datetime import datetime
+#######################################################################################################
+
+##################################### ~Variables globales~ ############################################
+# Registro de archivos subidos a Drive: uno por archivo confirmado (el MD5 de Drive coincide con el local).
+# Sirve para no volver a subir un archivo que ya esta en Drive, por ejemplo si no se pudo borrar despues de subirlo
+# o si el proceso se detuvo entre la subida y el borrado.
+ESQUEMA_REGISTRO = """
+CREATE TABLE IF NOT EXISTS subidos (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    nombre TEXT NOT NULL,
+    carpeta TEXT NOT NULL,
+    tamano INTEGER NOT NULL,
+    mtime REAL NOT NULL,
+    md5 TEXT NOT NULL,
+    drive_file_id TEXT NOT NULL,
+    subido REAL NOT NULL
+);
+CREATE UNIQUE INDEX IF NOT EXISTS subidos_archivo ON subidos (carpeta, nombre, tamano, md5);
+"""
+TAMANO_BLOQUE = 1024 * 1024
+#######################################################################################################
+
+######################################### ~Funciones~ #################################################
+# Abre (o crea) la base de datos del registro de subidas.
+def abrir_registro(archivo_registro):
+    conexion = sqlite3.connect(archivo_registro, timeout=30, isolation_level=None)
+    conexion.execute("PRAGMA journal_mode=WAL")
+    conexion.executescript(ESQUEMA_REGISTRO)
+    return conexion
+
+
+# Abre el registro de subidas del proyecto local (tmp-files/RegistroSubidas.db).
+def abrir_registro_local(project_local_root):
+    return abrir_registro(os.path.join(project_local_root, "tmp-files", "RegistroSubidas.db"))
+
+
+# Calcula el MD5 de un archivo leyendolo por bloques.
+def md5_archivo(ruta):
+    md5 = hashlib.md5()
+    with open(ruta, 'rb') as f:
+        while bloque := f.read(TAMANO_BLOQUE):
+            md5.update(bloque)
+    return md5.hexdigest()
+
+
+# Busca un archivo en el registro por carpeta, nombre y tamaño (una consulta por indice). Si la fecha de
+# modificacion tambien coincide se considera el mismo archivo sin leerlo; si solo coincide el tamaño se compara
+# el MD5 del archivo local. Devuelve {'md5', 'drive_file_id'} del archivo ya subido, o None.
+def buscar_subido(conexion, ruta, carpeta):
+    estado = os.stat(ruta)
+    filas = conexion.execute("SELECT md5, drive_file_id, mtime FROM subidos WHERE carpeta = ? AND nombre = ? AND tamano = ?",
+                             (carpeta, os.path.basename(ruta), estado.st_size)).fetchall()
+    if not filas:
+        return None
+    for md5, drive_file_id, mtime in filas:
+        if mtime == estado.st_mtime:
+            return {'md5': md5, 'drive_file_id': drive_file_id}
+    md5_local = md5_archivo(ruta)
+    for md5, drive_file_id, _ in filas:
+        if md5 == md5_local:
+            return {'md5': md5, 'drive_file_id': drive_file_id}
+    return None
+
+
+# Registra un archivo subido y confirmado.
+def registrar_subido(conexion, ruta, carpeta, md5, drive_file_id, estado=None):
+    estado = estado or os.stat(ruta)
+    conexion.execute("INSERT INTO subidos (nombre, carpeta, tamano, mtime, md5, drive_file_id, subido) VALUES (?, ?, ?, ?, ?, ?, ?) "
+                     "ON CONFLICT(carpeta, nombre, tamano, md5) DO UPDATE SET mtime = excluded.mtime, "
+                     "drive_file_id = excluded.drive_file_id, subido = excluded.subido",
+                     (os.path.basename(ruta), carpeta, estado.st_size, estado.st_mtime, md5, drive_file_id, time.time()))
+
+
+# Borra los registros de hace mas de 'dias' dias, para que la base de datos no crezca indefinidamente.
+def purgar_registro(conexion, dias=365):
+    return conexion.execute("DELETE FROM subidos WHERE subido < ?", (time.time() - dias * 86400,)).rowcount
+
+#######################################################################################################
+
+############################################ ~Main~ ###################################################
+# Consulta el registro de subidas desde la linea de comandos.
+def main():
+    uso = ("Uso: registro_subidas.py buscar <archivo>...\n"
+           "     registro_subidas.py ultimos [n]\n"
+           "     registro_subidas.py purgar [dias]")
+    if len(sys.argv) < 2:
+        print(uso)
+        return
+    project_local_root = os.getenv("PROJECT_LOCAL_ROOT")
+    if not project_local_root:
+        print("La variable de entorno no están definida.")
+        return
+    conexion = abrir_registro_local(project_local_root)
+    comando = sys.argv[1]
+
+    if comando == 'buscar' and len(sys.argv) >= 3:
+        for ruta in sys.argv[2:]:
+            filas = conexion.execute("SELECT carpeta, md5, drive_file_id, subido FROM subidos WHERE nombre = ? ORDER BY subido",
+                                     (os.path.basename(ruta),)).fetchall()
+            if not filas:
+                print(f"{os.path.basename(ruta)}: no se ha subido")
+            for carpeta, md5, drive_file_id, subido in filas:
+                local = ""
+                if os.path.isfile(ruta):
+                    local = ", copia local igual" if md5_archivo(ruta) == md5 else ", copia local distinta"
+                print(f"{os.path.basename(ruta)}: subido {datetime.fromtimestamp(subido).strftime('%Y-%m-%d %H:%M:%S')} "
+                      f"a {carpeta} (id {drive_file_id}, md5 {md5}{local})")
+    elif comando == 'ultimos':
+        limite = int(sys.argv[2]) if len(sys.argv) > 2 else 20
+        for nombre, tamano, md5, drive_file_id, subido in conexion.execute(
+                "SELECT nombre, tamano, md5, drive_file_id, subido FROM subidos ORDER BY subido DESC LIMIT ?", (limite,)):
+            print(f"{datetime.fromtimestamp(subido).strftime('%Y-%m-%d %H:%M:%S')}  {nombre}  {tamano} B  md5 {md5}  id {drive_file_id}")
+    elif comando == 'purgar':
+        print(f"{purgar_registro(conexion, float(sys.argv[2]) if len(sys.argv) > 2 else 365)} registros borrados")
+    else:
+        print(uso)
+    conexion.close()
+
+#######################################################################################################
+if __name__ == '__main__':
+    main()
+#######################################################################################################
@@ -0,0 +1,327 @@
+######################################### ~Librerias~ #################################################
+import os
+import sys
+import json
+import time
+import shutil
+from datetime import datetime
+#######################################################################################################
+
+##################################### ~Variables globales~ ############################################
+# Parametros por defecto de la seccion "retencion" de configuracion_dispositivo.json
+CONFIG_POR_DEFECTO = {
+    "umbral_espacio_libre": 10,     # Porcentaje de espacio libre por debajo del cual se libera espacio
+    "objetivo_espacio_libre": 20,   # Porcentaje de espacio libre que se busca alcanzar al liberar
+    "solo_subidos": "si",           # En modo online no se borran los archivos que todavia no se subieron a Drive
+    "cuotas_mb": {},                # Espacio maximo por categoria, ej. {"registro_continuo": 20000} (0 o ausente: sin cuota)
+    "dias_maximos": {}              # Antiguedad maxima por categoria, ej. {"registro_continuo": 90} (0 o ausente: sin limite)
+}
+# Categorias de archivos: (directorio en "directorios", carpeta de Drive en "drive", extensiones que se suben a Drive).
+# Los archivos con otras extensiones (indices, .datz, .dat de eventos) no se suben y se pueden borrar sin esperar.
+CATEGORIAS = {
+    'registro_continuo': ('registro_continuo', 'registro_continuo', ('.dat',)),
+    'mseed': ('archivos_mseed', 'registro_continuo', ('.mseed', '.tar')),
+    'eventos_extraidos': ('eventos_extraidos', 'eventos_extraidos', ('.mseed',)),
+    'decimados': ('decimados', None, ())
+}
+# Los productos decimados (decimador_registro.py) ocupan poco y son lo unico que queda de los datos antiguos:
+# para alcanzar el espacio libre objetivo solo se borran despues de todos los archivos de las demas categorias
+CATEGORIAS_ULTIMAS = ('decimados',)
+# Archivos que acompañan a otro y se borran con el: el indice .idx de cada .dat
+ACOMPANANTES = {'.dat': '.idx'}
+# No se borran los archivos modificados en este tiempo (segundos): pueden estar escribiendose o convirtiendose
+ANTIGUEDAD_MINIMA = 600
+#######################################################################################################
+
+######################################### ~Funciones~ #################################################
+# Lee un archivo de configuración en formato JSON y devuelve su contenido como un diccionario.
+def read_fileJSON(nameFile):
+    try:
+        with open(nameFile, 'r') as f:
+            data = json.load(f)
+        return data
+    except FileNotFoundError:
+        print(f"Archivo {nameFile} no encontrado.")
+        return None
+    except json.JSONDecodeError:
+        print(f"Error al decodificar el archivo {nameFile}.")
+        return None
+
+
+# Devuelve la configuracion de retencion con los valores por defecto para los parametros que no esten definidos.
+def leer_config_retencion(config_dispositivo):
+    config = dict(CONFIG_POR_DEFECTO)
+    config.update(config_dispositivo.get("retencion", {}))
+    return config
+
+
+# Recorre una sola vez (os.scandir) el directorio de cada categoria y devuelve la lista de archivos:
+# {'ruta', 'nombre', 'categoria', 'tamano', 'mtime', 'dispositivo', 'acompanante'}. Los acompañantes (.idx) no se
+# listan aparte; su tamaño se suma al archivo principal.
+def escanear_archivos(directorios):
+    archivos = []
+    for categoria, directorio in directorios.items():
+        if not os.path.isdir(directorio):
+            continue
+        entradas = {}
+        for entrada in os.scandir(directorio):
+            if entrada.is_file(follow_symlinks=False):
+                entradas[entrada.name] = entrada.stat(follow_symlinks=False)
+        acompanantes = {os.path.splitext(nombre)[0] + ACOMPANANTES[os.path.splitext(nombre)[1]]
+                        for nombre in entradas if os.path.splitext(nombre)[1] in ACOMPANANTES}
+        for nombre, estado in entradas.items():
+            if nombre in acompanantes and os.path.splitext(nombre)[1] in ACOMPANANTES.values():
+                continue
+            base, extension = os.path.splitext(nombre)
+            acompanante = base + ACOMPANANTES[extension] if extension in ACOMPANANTES else None
+            estado_acompanante = entradas.get(acompanante) if acompanante else None
+            archivos.append({
+                'ruta': os.path.join(directorio, nombre),
+                'nombre': nombre,
+                'categoria': categoria,
+                'tamano': estado.st_size + (estado_acompanante.st_size if estado_acompanante else 0),
+                'mtime': estado.st_mtime,
+                'dispositivo': estado.st_dev,
+                'acompanante': os.path.join(directorio, acompanante) if estado_acompanante else None
+            })
+    return archivos
+
+
+# Devuelve los archivos subidos a Drive como dos conjuntos para consultas O(1): (carpeta, nombre, tamaño) del
+# registro de subidas (registro_subidas.py) y rutas marcadas como subidas en la cola (cola_subidas.py).
+def archivos_subidos(project_local_root):
+    subidos = set()
+    rutas_subidas = set()
+    archivo_registro = os.path.join(project_local_root, "tmp-files", "RegistroSubidas.db")
+    archivo_cola = os.path.join(project_local_root, "tmp-files", "ColaSubidas.db")
+    if os.path.isfile(archivo_registro):
+        from registro_subidas import abrir_registro
+        conexion = abrir_registro(archivo_registro)
+        subidos = set(conexion.execute("SELECT carpeta, nombre, tamano FROM subidos"))
+        conexion.close()
+    if os.path.isfile(archivo_cola):
+        from cola_subidas import abrir_cola
+        conexion = abrir_cola(archivo_cola)
+        rutas_subidas = {ruta for (ruta,) in conexion.execute("SELECT ruta FROM trabajos WHERE estado = 'subido'")}
+        conexion.close()
+    return subidos, rutas_subidas
+
+
+# Marca en cada archivo si se puede borrar y por que no. Se protegen el archivo de registro continuo en curso,
+# los modificados hace menos de ANTIGUEDAD_MINIMA y, si requerir_subida es True, los que se suben a Drive y
+# todavia no estan subidos.
+def clasificar_archivos(archivos, config_dispositivo, subidos, rutas_subidas, protegidos=(), requerir_subida=True, ahora=None):
+    ahora = ahora or time.time()
+    carpetas = config_dispositivo.get("drive", {})
+    subir_registro_continuo = config_dispositivo.get("cola_subidas", {}).get("subir_registro_continuo", "no") == "si"
+    protegidos = {os.path.abspath(ruta) for ruta in protegidos}
+    for archivo in archivos:
+        _, carpeta, extensiones = CATEGORIAS[archivo['categoria']]
+        if archivo['categoria'] == 'registro_continuo' and not subir_registro_continuo:
+            extensiones = ()
+        archivo['motivo_conservar'] = None
+        if os.path.abspath(archivo['ruta']) in protegidos:
+            archivo['motivo_conservar'] = 'en uso'
+        elif ahora - archivo['mtime'] < ANTIGUEDAD_MINIMA:
+            archivo['motivo_conservar'] = 'reciente'
+        elif requerir_subida and os.path.splitext(archivo['nombre'])[1] in extensiones:
+            tamano = archivo['tamano'] - (os.path.getsize(archivo['acompanante']) if archivo['acompanante'] else 0)
+            if (carpetas.get(carpeta, "Unknown"), archivo['nombre'], tamano) not in subidos and os.path.abspath(archivo['ruta']) not in rutas_subidas:
+                archivo['motivo_conservar'] = 'no subido'
+    return archivos
+
+
+# Arma el plan de borrado, ordenado del archivo mas antiguo al mas reciente de cada etapa:
+#   1. archivos con mas de dias_maximos dias en su categoria,
+#   2. los mas antiguos de cada categoria que supera su cuota, hasta quedar dentro de ella,
+#   3. si el espacio libre de una particion esta por debajo de umbral_espacio_libre, los mas antiguos de todas las
+#      categorias de esa particion hasta alcanzar objetivo_espacio_libre.
+# espacio es {dispositivo: (total, libre)} en bytes. Devuelve (plan, faltante): plan es la lista de archivos con el
+# motivo de borrado, y faltante los bytes por particion que no se pudieron liberar sin borrar archivos protegidos.
+def planificar_borrado(archivos, config_retencion, espacio, ahora=None):
+    ahora = ahora or time.time()
+    borrables = sorted((a for a in archivos if a['motivo_conservar'] is None), key=lambda a: a['mtime'])
+    plan = []
+    en_plan = set()
+
+    def agregar(archivo, motivo):
+        archivo['motivo_borrar'] = motivo
+        plan.append(archivo)
+        en_plan.add(archivo['ruta'])
+
+    # 1. Antiguedad maxima por categoria
+    for archivo in borrables:
+        dias = float(config_retencion["dias_maximos"].get(archivo['categoria'], 0) or 0)
+        if dias and ahora - archivo['mtime'] > dias * 86400:
+            agregar(archivo, f"mas de {dias:g} dias")
+
+    # 2. Cuotas por categoria (el total incluye los archivos protegidos)
+    for categoria in CATEGORIAS:
+        cuota = float(config_retencion["cuotas_mb"].get(categoria, 0) or 0) * 1e6
+        if not cuota:
+            continue
+        ocupado = sum(a['tamano'] for a in archivos if a['categoria'] == categoria and a['ruta'] not in en_plan)
+        for archivo in borrables:
+            if ocupado <= cuota:
+                break
+            if archivo['categoria'] == categoria and archivo['ruta'] not in en_plan:
+                agregar(archivo, f"cuota de {cuota / 1e6:g} MB")
+                ocupado -= archivo['tamano']
+
+    # 3. Espacio libre objetivo por particion
+    faltante = {}
+    for dispositivo, (total, libre) in espacio.items():
+        libre += sum(a['tamano'] for a in plan if a['dispositivo'] == dispositivo)
+        if libre * 100 / total >= float(config_retencion["umbral_espacio_libre"]):
+            continue
+        necesario = float(config_retencion["objetivo_espacio_libre"]) / 100 * total - libre
+        for archivo in sorted(borrables, key=lambda a: (a['categoria'] in CATEGORIAS_ULTIMAS, a['mtime'])):
+            if necesario <= 0:
+                break
+            if archivo['dispositivo'] == dispositivo and archivo['ruta'] not in en_plan:
+                agregar(archivo, "espacio libre")
+                necesario -= archivo['tamano']
+        if necesario > 0:
+            faltante[dispositivo] = necesario
+    return plan, faltante
+
+
+# Espacio total y libre de la particion de cada directorio: {dispositivo: (total, libre)}.
+def espacio_particiones(directorios):
+    espacio = {}
+    for directorio in directorios.values():
+        if os.path.isdir(directorio):
+            dispositivo = os.stat(directorio).st_dev
+            if dispositivo not in espacio:
+                uso = shutil.disk_usage(directorio)
+                espacio[dispositivo] = (uso.total, uso.free)
+    return espacio
+
+
+# Borra los archivos del plan (y sus acompañantes). Devuelve los bytes liberados.
+def ejecutar_plan(plan, logger=None):
+    liberado = 0
+    for archivo in plan:
+        try:
+            os.remove(archivo['ruta'])
+            if archivo['acompanante'] and os.path.isfile(archivo['acompanante']):
+                os.remove(archivo['acompanante'])
+            liberado += archivo['tamano']
+            if logger:
+                logger.info(f"Se borró el archivo {archivo['nombre']} ({archivo['motivo_borrar']})")
+        except FileNotFoundError:
+            pass
+        except OSError as e:
+            if logger:
+                logger.error(f"Error al borrar el archivo {archivo['nombre']}: {e}")
+    return liberado
+
+
+# Directorios de cada categoria segun la configuracion del dispositivo: {categoria: directorio}.
+def directorios_categorias(config_dispositivo):
+    directorios = config_dispositivo.get("directorios", {})
+    return {categoria: directorios.get(clave, "Unknown") for categoria, (clave, _, _) in CATEGORIAS.items()}
+
+
+# Archivo de registro continuo que se esta escribiendo (primera linea de NombreArchivoRegistroContinuo.tmp).
+def archivo_en_curso(project_local_root, config_dispositivo):
+    try:
+        with open(os.path.join(project_local_root, "tmp-files", "NombreArchivoRegistroContinuo.tmp")) as f:
+            nombre = f.readline().strip()
+    except OSError:
+        return []
+    if not nombre:
+        return []
+    return [os.path.join(config_dispositivo.get("directorios", {}).get("registro_continuo", "Unknown"), nombre)]
+
+
+# Rutas de una categoria que la retencion no borraria por estar en uso, ser recientes o no haberse subido a Drive,
+# para que los procesos que reemplazan archivos (decimador_registro.py) respeten las mismas reglas.
+def archivos_protegidos(project_local_root, config_dispositivo, categoria):
+    config_retencion = leer_config_retencion(config_dispositivo)
+    requerir_subida = (config_retencion["solo_subidos"] == "si"
+                       and config_dispositivo.get("dispositivo", {}).get("modo_adquisicion", "Unknown") == "online")
+    subidos, rutas_subidas = archivos_subidos(project_local_root) if requerir_subida else (set(), set())
+    archivos = escanear_archivos({categoria: directorios_categorias(config_dispositivo)[categoria]})
+    clasificar_archivos(archivos, config_dispositivo, subidos, rutas_subidas,
+                        archivo_en_curso(project_local_root, config_dispositivo), requerir_subida)
+    return [archivo['ruta'] for archivo in archivos if archivo['motivo_conservar']]
+
+
+# Calcula el plan de retencion del proyecto local. En modo offline no se exige que los archivos esten subidos.
+# config_extra permite reemplazar parametros de la seccion "retencion". Devuelve (plan, faltante, archivos, espacio).
+def calcular_retencion(project_local_root, config_dispositivo, config_extra=None):
+    config_retencion = leer_config_retencion(config_dispositivo)
+    config_retencion.update(config_extra or {})
+    directorios = directorios_categorias(config_dispositivo)
+    requerir_subida = (config_retencion["solo_subidos"] == "si"
+                       and config_dispositivo.get("dispositivo", {}).get("modo_adquisicion", "Unknown") == "online")
+    subidos, rutas_subidas = archivos_subidos(project_local_root) if requerir_subida else (set(), set())
+    archivos = clasificar_archivos(escanear_archivos(directorios), config_dispositivo, subidos, rutas_subidas,
+                                   archivo_en_curso(project_local_root, config_dispositivo), requerir_subida)
+    espacio = espacio_particiones(directorios)
+    plan, faltante = planificar_borrado(archivos, config_retencion, espacio)
+    return plan, faltante, archivos, espacio
+
+
+# Calcula y ejecuta el plan de retencion. Devuelve (archivos borrados, bytes liberados).
+def aplicar_retencion(project_local_root, config_dispositivo, logger=None, config_extra=None):
+    plan, faltante, _, _ = calcular_retencion(project_local_root, config_dispositivo, config_extra)
+    liberado = ejecutar_plan(plan, logger)
+    if logger and plan:
+        logger.info(f"Retencion: {len(plan)} archivos borrados, {liberado / 1e6:.1f} MB liberados")
+    if logger and not plan and not faltante:
+        logger.info("Espacio disponible suficiente en la partición.")
+    if logger and faltante:
+        logger.warning(f"Retencion: faltan {sum(faltante.values()) / 1e6:.1f} MB para el espacio libre objetivo; "
+                       f"el resto de los archivos no se ha subido o es reciente")
+    return len(plan), liberado
+
+
+# Muestra el plan por pantalla.
+def mostrar_plan(plan, faltante, archivos, espacio):
+    for dispositivo, (total, libre) in espacio.items():
+        liberado = sum(a['tamano'] for a in plan if a['dispositivo'] == dispositivo)
+        print(f"Particion {dispositivo}: libre {libre * 100 / total:.1f}% -> {(libre + liberado) * 100 / total:.1f}% "
+              f"({liberado / 1e6:.1f} MB a liberar)")
+    for categoria in CATEGORIAS:
+        de_categoria = [a for a in archivos if a['categoria'] == categoria]
+        conservados = {}
+        for archivo in de_categoria:
+            if archivo['motivo_conservar']:
+                conservados[archivo['motivo_conservar']] = conservados.get(archivo['motivo_conservar'], 0) + 1
+        print(f"{categoria}: {len(de_categoria)} archivos, {sum(a['tamano'] for a in de_categoria) / 1e6:.1f} MB, "
+              f"{sum(1 for a in plan if a['categoria'] == categoria)} a borrar"
+              + (f" (protegidos: {', '.join(f'{n} {m}' for m, n in conservados.items())})" if conservados else ""))
+    for archivo in plan:
+        print(f"  {datetime.fromtimestamp(archivo['mtime']).strftime('%Y-%m-%d %H:%M:%S')}  {archivo['categoria']:17s} "
+              f"{archivo['nombre']}  {archivo['tamano'] / 1e6:.2f} MB  ({archivo['motivo_borrar']})")
+    if faltante:
+        print(f"No se alcanza el espacio libre objetivo: faltan {sum(faltante.values()) / 1e6:.1f} MB (los demas archivos estan protegidos)")
+
+#######################################################################################################
+
+############################################ ~Main~ ###################################################
+def main():
+    uso = "Uso: retencion_archivos.py <plan|ejecutar>   (plan: muestra los archivos que se borrarian sin borrarlos)"
+    if len(sys.argv) != 2 or sys.argv[1] not in ('plan', 'ejecutar'):
+        print(uso)
+        return
+    project_local_root = os.getenv("PROJECT_LOCAL_ROOT")
+    if not project_local_root:
+        print("La variable de entorno no están definida.")
+        return
+    config_dispositivo = read_fileJSON(os.path.join(project_local_root, "configuracion", "configuracion_dispositivo.json"))
+    if config_dispositivo is None:
+        return
+
+    plan, faltante, archivos, espacio = calcular_retencion(project_local_root, config_dispositivo)
+    mostrar_plan(plan, faltante, archivos, espacio)
+    if sys.argv[1] == 'ejecutar':
+        liberado = ejecutar_plan(plan)
+        print(f"{len(plan)} archivos borrados, {liberado / 1e6:.1f} MB liberados")
+
+#######################################################################################################
+if __name__ == '__main__':
+    main()
+#######################################################################################################
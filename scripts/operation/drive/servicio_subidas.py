@@ -0,0 +1,152 @@
+######################################### ~Librerias~ #################################################
+import os
+import time
+import json
+import signal
+import logging
+from cargador_drive import crear_cargador_local, cerrar_cargador
+from cola_subidas import abrir_cola_local, recuperar_trabajos, procesar_cola, espera_siguiente, resumen_cola, purgar_subidos, TIPOS_TRABAJO
+from planificador_subidas import crear_planificador, tipos_permitidos, iniciar_monitor_latencia, guardar_metricas
+#######################################################################################################
+
+##################################### ~Variables globales~ ############################################
+loggers = {}
+# Intervalo maximo entre revisiones de la cola (segundos); los productores solo escriben en la base de datos
+INTERVALO_REVISION = 5
+# Espera antes de volver a intentar la autenticacion con Drive (segundos)
+ESPERA_AUTENTICACION = 60
+# Cada cuanto se borran de la cola los trabajos subidos hace mas de DIAS_HISTORIAL dias (segundos)
+INTERVALO_PURGA = 86400
+DIAS_HISTORIAL = 30
+# Cada cuanto se guardan las metricas de subida si no hay medicion de latencia (segundos)
+INTERVALO_METRICAS = 30
+#######################################################################################################
+
+######################################### ~Funciones~ #################################################
+# Lee un archivo de configuración en formato JSON y devuelve su contenido como un diccionario.
+def read_fileJSON(nameFile):
+    try:
+        with open(nameFile, 'r') as f:
+            data = json.load(f)
+        return data
+    except FileNotFoundError:
+        print(f"Archivo {nameFile} no encontrado.")
+        return None
+    except json.JSONDecodeError:
+        print(f"Error al decodificar el archivo {nameFile}.")
+        return None
+
+
+# Función para inicializar y obtener el logger de un cliente
+def obtener_logger(id_estacion, log_directory, log_filename):
+    global loggers
+    if id_estacion not in loggers:
+        # Crear un logger para el cliente
+        logger = logging.getLogger(id_estacion)
+        logger.setLevel(logging.DEBUG)
+        # Verificar si el directorio de logs existe, si no, crearlo
+        if not os.path.isdir(log_directory):
+            try:
+                os.makedirs(log_directory)
+                logger.info(f"Directorio de logs creado: {log_directory}")
+            except Exception as e:
+                logger.error(f"Error al crear el directorio de logs {log_directory}: {e}")
+        # Ruta completa del archivo de log
+        log_path = os.path.join(log_directory, log_filename)
+        # Crear manejador de archivo, apuntando al archivo existente
+        file_handler = logging.FileHandler(log_path)
+        file_handler.setLevel(logging.DEBUG)
+        # Crear formato de logging y añadirlo al manejador
+        formatter = logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+        file_handler.setFormatter(formatter)
+        # Añadir el manejador al logger
+        logger.addHandler(file_handler)
+        loggers[id_estacion] = logger
+    return loggers[id_estacion]
+
+#######################################################################################################
+
+############################################ ~Main~ ###################################################
+def main():
+
+    project_local_root = os.getenv("PROJECT_LOCAL_ROOT")
+    if not project_local_root:
+        print("La variable de entorno no están definida.")
+        return
+    config_dispositivo = read_fileJSON(os.path.join(project_local_root, "configuracion", "configuracion_dispositivo.json"))
+    if config_dispositivo is None:
+        print("No se pudo leer el archivo de configuración del dispositivo. Terminando el programa.")
+        return
+    id_estacion = config_dispositivo.get("dispositivo", {}).get("id", "Unknown")
+    logger = obtener_logger(id_estacion, os.path.join(project_local_root, "log-files"), "drive.log")
+
+    # Al iniciar solo se recuperan los trabajos que quedaron en curso; no se recorren los directorios
+    conexion = abrir_cola_local(project_local_root)
+    recuperados = recuperar_trabajos(conexion)
+    logger.info(f"Servicio de subidas iniciado. Trabajos en curso recuperados: {recuperados}. Cola: {resumen_cola(conexion)}")
+    print(f"Servicio de subidas iniciado. Trabajos en curso recuperados: {recuperados}")
+
+    # Supervisor detiene el servicio con SIGTERM; se deja de tomar trabajos y se esperan las subidas en curso
+    estado = {'activo': True}
+    signal.signal(signal.SIGTERM, lambda signum, frame: estado.update(activo=False))
+
+    # El planificador limita la tasa de subida, decide el horario de los archivos masivos y reduce la tasa si
+    # aumenta la latencia del broker MQTT (la misma conexion que usan los eventos en vivo)
+    planificador = crear_planificador(config_dispositivo, os.path.join(project_local_root, "tmp-files", "MetricasSubidas.json"))
+    config_mqtt = None
+    if planificador['config']["medir_latencia_mqtt"] == "si":
+        config_mqtt = read_fileJSON(os.path.join(project_local_root, "configuracion", "configuracion_mqtt.json"))
+    cliente_mqtt = iniciar_monitor_latencia(planificador, config_mqtt, id_estacion, logger, lambda: estado['activo'])
+
+    cargador = None
+    ultima_purga = 0
+    ultimas_metricas = 0
+    try:
+        while estado['activo']:
+            if cliente_mqtt is None and time.time() - ultimas_metricas > INTERVALO_METRICAS:
+                guardar_metricas(planificador)
+                ultimas_metricas = time.time()
+            # Fuera del horario masivo solo cuentan los eventos; los mseed y dat esperan en la cola
+            espera = espera_siguiente(conexion, tipos_permitidos(planificador, TIPOS_TRABAJO))
+            if espera is None or espera > 0:
+                time.sleep(INTERVALO_REVISION if espera is None else min(INTERVALO_REVISION, espera))
+                continue
+
+            # La autenticacion se hace una sola vez y se reintenta si falla (por ejemplo sin conexion al arrancar)
+            if cargador is None:
+                try:
+                    cargador = crear_cargador_local(project_local_root, config_dispositivo, logger, planificador)
+                    logger.info(f"Inicio Drive Ok ({cargador['num_hilos']} hilos de subida)")
+                except Exception as e:
+                    logger.error(f"Error Inicio Drive: {e}")
+                    time.sleep(ESPERA_AUTENTICACION)
+                    continue
+
+            try:
+                subidos, fallidos = procesar_cola(conexion, cargador, config_dispositivo, logger, lambda: estado['activo'])
+                if subidos or fallidos:
+                    logger.info(f"Cola atendida: {subidos} subidos, {fallidos} fallidos. Cola: {resumen_cola(conexion)}")
+            except Exception as e:
+                logger.error(f"Error atendiendo la cola de subidas: {e}")
+                time.sleep(INTERVALO_REVISION)
+
+            if time.time() - ultima_purga > INTERVALO_PURGA:
+                purgar_subidos(conexion, DIAS_HISTORIAL)
+                ultima_purga = time.time()
+    except KeyboardInterrupt:
+        print("Finalizando servicio de subidas...")
+    finally:
+        if cargador is not None:
+            cerrar_cargador(cargador)
+        if cliente_mqtt is not None:
+            cliente_mqtt.loop_stop()
+            cliente_mqtt.disconnect()
+        guardar_metricas(planificador)
+        recuperar_trabajos(conexion)
+        conexion.close()
+        logger.info("Servicio de subidas finalizado")
+
+#######################################################################################################
+if __name__ == '__main__':
+    main()
+#######################################################################################################
@@ -1,9 +1,6 @@
 ######################################### ~Librerias~ #################################################
 from __future__ import print_function
-from googleapiclient import errors
-from googleapiclient.http import MediaFileUpload
 from googleapiclient.discovery import build
-from httplib2 import Http
 from oauth2client import file, client, tools
 import os
 from datetime import datetime
@@ -11,6 +8,8 @@ import time
 import sys
 import json
 import logging
+from cargador_drive import crear_http, insert_file, abrir_registro_sesiones, tamano_fragmento, TAMANO_FRAGMENTO_MB
+from registro_subidas import abrir_registro, buscar_subido, registrar_subido
 #######################################################################################################
 
 
@@ -47,36 +46,12 @@ def get_authenticated(SCOPES, credential_file, token_file, service_name = 'drive
     if not creds or creds.invalid:
         flow = client.flow_from_clientsecrets(credential_file, SCOPES)
         creds = tools.run_flow(flow, store)
-    service = build(service_name, api_version, http = creds.authorize(Http()))
+    service = build(service_name, api_version, http = creds.authorize(crear_http()))
 
     return service
 
-# Metodo que permite subir un archivo a la cuenta de Drive
-def insert_file(service, name, description, parent_id, mime_type, filename):
-    media_body = MediaFileUpload(filename, mimetype = mime_type, chunksize=-1, resumable = True)
-    body = {
-        'name': name,
-        'description': description,
-        'mimeType': mime_type
-    }
-        
-    # Si se recibe la ID de la carpeta superior, la coloca
-    if parent_id:
-        body['parents'] = [parent_id]
-
-    # Realiza la carga del archivo en la carpeta respectiva de Drive
-    try:
-        #print("punto de control")
-        file = service.files().create(
-            body = body,
-            media_body = media_body,
-            fields='id').execute()
-            
-        return file
-            
-    except errors.HttpError as error:
-        print('An error occurred: %s' % error)
-        return None
+# La subida del archivo (insert_file) se hace en fragmentos reanudables con cargador_drive.py, que comparte con
+# este script el registro de sesiones: una subida interrumpida continua desde el ultimo byte confirmado.
 
 
 # Metodo para intentar conectarse a Google Drive y activar la bandera de conexion
@@ -148,6 +123,8 @@ def main():
         config_dispositivo_path = os.path.join(project_local_root, "configuracion", "configuracion_dispositivo.json")
         credentials_file = os.path.join(project_local_root, "configuracion", "drive_credentials.json")
         token_file = os.path.join(project_local_root, "configuracion", "drive_token.json")
+        archivo_sesiones = os.path.join(project_local_root, "tmp-files", "SesionesSubidaDrive.json")
+        archivo_registro = os.path.join(project_local_root, "tmp-files", "RegistroSubidas.db")
         log_directory = os.path.join(project_local_root, "log-files")
     else:
         print("La variable de entorno no están definida.")
@@ -190,6 +167,17 @@ def main():
         logger.error("El archivo %s no existe. Terminando el programa." % path_completo_archivo)
         return
 
+    # Si el archivo ya esta en el registro de subidas (mismo nombre, tamaño y MD5) no se vuelve a subir
+    registro = abrir_registro(archivo_registro)
+    previo = buscar_subido(registro, path_completo_archivo, drive_id)
+    if previo is not None:
+        print('El archivo %s ya estaba subido a Google Drive' % nombre_archivo)
+        logger.info(f"Archivo {nombre_archivo} ya estaba subido a Google Drive (id {previo['drive_file_id']}), no se vuelve a subir")
+        if borrar_despues == '1':
+            os.remove(path_completo_archivo)
+            logger.info(f'Archivo {nombre_archivo} eliminado')
+        return
+
     #Llama al metodo para intentar conectarse a Google Drive
     service = Try_Autenticar_Drive(SCOPES, credentials_file, token_file, logger)
     
@@ -198,9 +186,19 @@ def main():
         try:
             print('Subiendo el archivo: %s' %path_completo_archivo)
             #logger.info("Subiendo el archivo: %s", nombre_archivo)
-            file_uploaded = insert_file(service, nombre_archivo, nombre_archivo, drive_id, 'text/plain', path_completo_archivo)
-            logger.info(f'Archivo {nombre_archivo} subido correctamente a Google Drive')
+            fragmento = tamano_fragmento(config_dispositivo.get("cargador_drive", {}).get("tamano_fragmento_mb", TAMANO_FRAGMENTO_MB))
+            estado = os.stat(path_completo_archivo)
+            progreso = {}
+            file_uploaded = insert_file(service, nombre_archivo, nombre_archivo, drive_id, 'text/plain', path_completo_archivo,
+                                        fragmento=fragmento, registro_sesiones=abrir_registro_sesiones(archivo_sesiones), progreso=progreso, logger=logger)
+            logger.info(f"Archivo {nombre_archivo} subido correctamente a Google Drive (md5 {progreso['md5']})")
             print('Archivo ' + nombre_archivo + ' subido correctamente a Google Drive ' )
+            # El archivo local solo se borra si Drive confirmo el mismo MD5
+            if progreso.get('md5_remoto') is not None:
+                registrar_subido(registro, path_completo_archivo, drive_id, progreso['md5'], file_uploaded.get('id'), estado)
+            elif borrar_despues == '1':
+                logger.warning(f'Archivo {nombre_archivo} no se borra: Drive no informo su md5Checksum')
+                borrar_despues = '0'
             if borrar_despues =='1':
                 os.remove(path_completo_archivo)
                 print('Archivo local eliminado: %s' % path_completo_archivo)
@@ -0,0 +1,482 @@
+######################################### ~Librerias~ #################################################
+import os
+import sys
+import json
+import time
+import signal
+import logging
+import calendar
+import datetime
+import threading
+from collections import OrderedDict
+import paho.mqtt.client as mqtt
+#######################################################################################################
+
+##################################### ~Variables globales~ ############################################
+# Parametros por defecto de la seccion "extraccion_eventos" de configuracion_dispositivo.json
+CONFIG_POR_DEFECTO = {
+    "hilos": 2,                 # Extracciones que se procesan a la vez
+    "max_pendientes": 100,      # Solicitudes en espera; las que lleguen con la cola llena se rechazan
+    "duracion_maxima": 600,     # Segundos
+    "ventana_maxima_lectura": 1800,  # Segundos; limite de la union de ventanas solapadas que se lee de una vez
+    "cache_mb": 64,             # Limite de la cache de lecturas y mseed recientes
+    "subir": "si"               # Encolar el mseed extraido en la cola de subidas a Drive (tipo evento)
+}
+# QoS de la suscripcion a solicitudes y de los mensajes de estado
+QOS_SOLICITUDES = 1
+QOS_ESTADO = 1
+# Mensajes de estado en vuelo y en espera en paho; con rafagas de solicitudes se publican varios por solicitud
+MAX_EN_VUELO = 100
+KEEPALIVE = 60
+# Una lectura en cache de una ventana con huecos solo se reutiliza si se hizo al menos este tiempo (s) despues
+# del fin de la ventana, cuando ya no pueden llegar mas tramas de ese intervalo.
+MARGEN_DATOS_RECIENTES = 120
+# Tiempo maximo (s) entre actualizaciones del catalogo de archivos antes de una lectura
+INTERVALO_CATALOGO = 60
+loggers = {}
+#######################################################################################################
+
+######################################### ~Funciones~ #################################################
+# Lee un archivo de configuración en formato JSON y devuelve su contenido como un diccionario.
+def read_fileJSON(nameFile):
+    try:
+        with open(nameFile, 'r') as f:
+            data = json.load(f)
+        return data
+    except FileNotFoundError:
+        print(f"Archivo {nameFile} no encontrado.")
+        return None
+    except json.JSONDecodeError:
+        print(f"Error al decodificar el archivo {nameFile}.")
+        return None
+
+
+# Devuelve la configuracion de extraccion con los valores por defecto para los parametros que no esten definidos.
+def leer_config_extraccion(config_dispositivo):
+    config = dict(CONFIG_POR_DEFECTO)
+    config.update(config_dispositivo.get("extraccion_eventos", {}))
+    return config
+
+
+# Convierte el texto de una solicitud en (inicio en segundos POSIX, duracion en segundos, id de la solicitud,
+# copia .dat). La copia .dat cruda del evento solo se escribe si la solicitud JSON trae "dat": "si" (o true).
+# Formatos aceptados:
+#   JSON {"inicio": "aaaa-mm-ddTHH:MM:SS[.fff]", "duracion": s, "id": opcional}   (como los mensajes de evento)
+#   JSON {"fecha": aammdd, "hora": segundos desde la medianoche, "duracion": s}   (como los mensajes de disparo)
+#   texto "aammdd-hhmmss-duracion"                                                (formato de extraer_evento.py)
+# Lanza ValueError si la solicitud no es valida.
+def interpretar_solicitud(payload):
+    texto = payload.decode('utf-8').strip()
+    try:
+        solicitud = json.loads(texto)
+    except json.JSONDecodeError:
+        solicitud = None
+    if not isinstance(solicitud, dict):
+        partes = texto.split('-')
+        if len(partes) != 3 or len(partes[0]) != 6 or len(partes[1]) != 6:
+            raise ValueError(f"Formato de solicitud no valido: {texto[:100]}")
+        solicitud = {"fecha": partes[0], "hora": int(partes[1][0:2]) * 3600 + int(partes[1][2:4]) * 60 + int(partes[1][4:6]),
+                     "duracion": partes[2]}
+    try:
+        duracion = float(solicitud["duracion"])
+        if "inicio" in solicitud:
+            fecha, _, fraccion = str(solicitud["inicio"]).rstrip('Z').partition('.')
+            inicio = calendar.timegm(datetime.datetime.strptime(fecha, '%Y-%m-%dT%H:%M:%S').timetuple())
+            inicio += float('0.' + fraccion) if fraccion else 0.0
+        else:
+            fecha = str(solicitud["fecha"]).zfill(6)
+            dia = datetime.datetime.strptime(fecha, '%y%m%d')
+            inicio = calendar.timegm(dia.timetuple()) + float(solicitud["hora"])
+    except (KeyError, TypeError, ValueError) as e:
+        raise ValueError(f"Solicitud incompleta o no valida ({e}): {texto[:100]}")
+    return inicio, duracion, solicitud.get("id"), solicitud.get("dat") in (True, "si")
+
+
+# Valida una solicitud y arma el trabajo. Solo hace calculos en memoria, para que el callback de paho termine
+# enseguida. Lanza ValueError con el motivo si la solicitud no es valida.
+def validar_solicitud(servicio, payload):
+    inicio, duracion, id_solicitud, copia_dat = interpretar_solicitud(payload)
+    if not 0 < duracion <= float(servicio['config']["duracion_maxima"]):
+        raise ValueError(f"La duracion debe estar entre 0 y {servicio['config']['duracion_maxima']} s")
+    if inicio + duracion > time.time() + 5:
+        raise ValueError("La ventana solicitada termina en el futuro")
+    with servicio['bloqueo']:
+        servicio['contador'] += 1
+        numero = servicio['contador']
+    return {
+        'trabajo': str(id_solicitud) if id_solicitud is not None else f"{servicio['dispositivo_id']}-{int(time.time())}-{numero}",
+        'inicio': inicio,
+        'fin': inicio + duracion,
+        'duracion': duracion,
+        'dat': copia_dat,
+        'recibido': time.time()
+    }
+
+
+# Publica un mensaje de estado de un trabajo en topicStatus. paho es seguro entre hilos: el mensaje queda en su
+# cola y lo envia el hilo de red, por lo que publicar no bloquea al hilo que llama.
+def publicar_estado(servicio, trabajo, estado, **datos):
+    mensaje = {"id": servicio['dispositivo_id'], "status": estado, "trabajo": trabajo}
+    mensaje.update(datos)
+    mensaje_json = json.dumps(mensaje)
+    result = servicio['client'].publish(servicio['config_mqtt']["topicStatus"], mensaje_json, qos=QOS_ESTADO)
+    if result.rc not in (mqtt.MQTT_ERR_SUCCESS, mqtt.MQTT_ERR_NO_CONN):
+        servicio['logger'].warning(f"No se pudo publicar el estado {estado} del trabajo {trabajo} (codigo {result.rc})")
+
+
+# Devuelve el id que trae una solicitud JSON, sin validar el resto, para informarlo aunque se rechace.
+def id_solicitud(payload):
+    try:
+        solicitud = json.loads(payload.decode('utf-8'))
+    except (UnicodeDecodeError, json.JSONDecodeError):
+        return None
+    if isinstance(solicitud, dict) and solicitud.get("id") is not None:
+        return str(solicitud["id"])
+    return None
+
+
+# Callback de mensajes: valida la solicitud y la deja en la cola de trabajos sin esperar. Todo el trabajo pesado
+# lo hacen los hilos de extraccion, asi el hilo de red de paho sigue atendiendo keepalives y nuevas solicitudes.
+# El estado "aceptado" se publica antes de dejar el trabajo en la cola, para que ningun hilo de extraccion
+# publique "en_proceso" antes que el.
+def on_message(client, servicio, msg):
+    try:
+        trabajo = validar_solicitud(servicio, msg.payload)
+    except ValueError as e:
+        servicio['logger'].warning(f"Solicitud rechazada: {e}")
+        publicar_estado(servicio, id_solicitud(msg.payload), "rechazado", motivo=str(e))
+        return
+    with servicio['condicion']:
+        pendientes = len(servicio['pendientes'])
+        aceptado = pendientes < int(servicio['config']["max_pendientes"])
+        if aceptado:
+            publicar_estado(servicio, trabajo['trabajo'], "aceptado", inicio=fecha_texto(trabajo['inicio']),
+                            duracion=trabajo['duracion'], pendientes=pendientes + 1)
+            servicio['pendientes'].append(trabajo)
+            servicio['condicion'].notify()
+    if not aceptado:
+        servicio['logger'].warning(f"Solicitud {trabajo['trabajo']} rechazada: cola de extracciones llena")
+        publicar_estado(servicio, trabajo['trabajo'], "rechazado", motivo="cola de extracciones llena")
+        return
+    servicio['logger'].info(f"Solicitud {trabajo['trabajo']} aceptada: {fecha_texto(trabajo['inicio'])}, {trabajo['duracion']:g} s")
+
+
+# Se suscribe al topico de solicitudes en cada conexion, para que la suscripcion se recupere al reconectar.
+def on_connect(client, servicio, flags, rc):
+    if rc == 0:
+        servicio['logger'].info("Conectado al broker MQTT con éxito")
+        client.subscribe(servicio['config_mqtt']["topicSuscription"], qos=QOS_SOLICITUDES)
+    else:
+        servicio['logger'].error(f"Error al conectar al broker MQTT. Codigo: {rc}")
+
+
+def on_disconnect(client, servicio, rc):
+    if rc != 0:
+        servicio['logger'].warning(f"Desconexión inesperada del broker MQTT. Código de retorno: {rc}")
+
+
+# Convierte segundos POSIX a texto 'aaaa-mm-ddTHH:MM:SS.fff'
+def fecha_texto(tiempo):
+    return datetime.datetime.fromtimestamp(tiempo, datetime.timezone.utc).strftime('%Y-%m-%dT%H:%M:%S.%f')[:-3]
+
+
+# Crea una cache LRU acotada por tamaño (en bytes) para resultados recientes. Cada entrada guarda el valor, su
+# tamaño y cuando se leyo del registro; las mas antiguas en uso se descartan al superar el limite.
+def crear_cache(limite_bytes):
+    return {'entradas': OrderedDict(), 'bytes': 0, 'limite': limite_bytes, 'bloqueo': threading.Lock()}
+
+
+# Guarda un valor en la cache con la clave (tipo, estacion, t0, t1). Los valores mayores que el limite no se guardan.
+def guardar_cache(cache, clave, valor, tamano, leido):
+    if tamano > cache['limite']:
+        return
+    with cache['bloqueo']:
+        anterior = cache['entradas'].pop(clave, None)
+        if anterior is not None:
+            cache['bytes'] -= anterior['tamano']
+        cache['entradas'][clave] = {'valor': valor, 'tamano': tamano, 'leido': leido}
+        cache['bytes'] += tamano
+        while cache['bytes'] > cache['limite']:
+            _, descartada = cache['entradas'].popitem(last=False)
+            cache['bytes'] -= descartada['tamano']
+
+
+# Devuelve la entrada con la clave exacta (y la marca como usada), o None.
+def obtener_cache(cache, clave):
+    with cache['bloqueo']:
+        entrada = cache['entradas'].get(clave)
+        if entrada is not None:
+            cache['entradas'].move_to_end(clave)
+        return entrada
+
+
+# Busca una lectura del registro en cache que contenga [t0, t1) y devuelve el recorte, o None. Una ventana que
+# terminaba cerca del momento de la lectura pudo quedar incompleta (tramas que todavia no estaban en el archivo),
+# por eso solo se usa si el recorte tiene todas las muestras o si se leyo MARGEN_DATOS_RECIENTES despues de t1.
+# Con tramas solo sirven las lecturas que conservaron las tramas crudas.
+def buscar_lectura_cache(cache, estacion, t0, t1, tramas=False):
+    from lector_registro import recortar_resultado
+    with cache['bloqueo']:
+        candidatas = [(clave, entrada) for clave, entrada in cache['entradas'].items()
+                      if clave[0] == 'registro' and clave[1] == estacion and clave[2] <= t0 and clave[3] >= t1
+                      and (not tramas or 'tramas' in entrada['valor'])]
+    for clave, entrada in candidatas:
+        recorte = recortar_resultado(entrada['valor'], t0, t1)
+        if recorte['mascara'].all() or entrada['leido'] > t1 + MARGEN_DATOS_RECIENTES:
+            obtener_cache(cache, clave)
+            return recorte
+    return None
+
+
+# Espera y devuelve el trabajo pendiente mas antiguo, o None cuando el servicio se detiene.
+def tomar_trabajo(servicio):
+    with servicio['condicion']:
+        while not servicio['pendientes'] and not servicio['detener']:
+            servicio['condicion'].wait()
+        if servicio['detener']:
+            return None
+        return servicio['pendientes'].pop(0)
+
+
+# Saca de la lista de pendientes los trabajos cuya ventana se solapa con la del grupo, ampliando la ventana del
+# grupo hasta que no quede ninguno solapado o hasta ventana_maxima_lectura. Devuelve el grupo y su ventana.
+def agrupar_pendientes(servicio, trabajo):
+    grupo = [trabajo]
+    inicio, fin = trabajo['inicio'], trabajo['fin']
+    ventana_maxima = float(servicio['config']["ventana_maxima_lectura"])
+    with servicio['condicion']:
+        agregado = True
+        while agregado:
+            agregado = False
+            for pendiente in list(servicio['pendientes']):
+                if pendiente['inicio'] < fin and pendiente['fin'] > inicio and \
+                        max(fin, pendiente['fin']) - min(inicio, pendiente['inicio']) <= ventana_maxima:
+                    servicio['pendientes'].remove(pendiente)
+                    grupo.append(pendiente)
+                    inicio, fin = min(inicio, pendiente['inicio']), max(fin, pendiente['fin'])
+                    agregado = True
+    return grupo, inicio, fin
+
+
+# Lee la ventana [inicio, fin) del registro continuo, o la toma de la cache si una lectura reciente la contiene.
+# Con tramas (algun trabajo pidio la copia .dat) tambien se conservan las tramas crudas. El catalogo (que recorre
+# los directorios) solo se actualiza si la ventana pasa del ultimo archivo catalogado o si la ultima actualizacion
+# tiene mas de INTERVALO_CATALOGO segundos; se llama con bloqueo_lectura tomado.
+# Devuelve (resultado, origen) con origen 'cache' o 'registro'.
+def leer_ventana(servicio, inicio, fin, recursos, tramas=False):
+    from lector_registro import read_range
+    from catalogo_archivos import fin_catalogado
+    estacion = servicio['dispositivo_id']
+    resultado = buscar_lectura_cache(servicio['cache'], estacion, inicio, fin, tramas)
+    if resultado is not None:
+        return resultado, 'cache'
+    ultimo = fin_catalogado(recursos['catalogo'], estacion)
+    actualizar = ultimo is None or fin > ultimo or time.time() - servicio['catalogo_actualizado'] > INTERVALO_CATALOGO
+    resultado = read_range(estacion, inicio, fin, conexion=recursos['catalogo'], directorios=servicio['directorios_catalogo'],
+                           conservar_tramas=tramas, actualizar=actualizar)
+    if actualizar:
+        servicio['catalogo_actualizado'] = time.time()
+    guardar_cache(servicio['cache'], ('registro', estacion, inicio, fin), resultado,
+                  resultado['datos'].nbytes + resultado['mascara'].nbytes + (resultado['tramas'].nbytes if tramas else 0), time.time())
+    return resultado, 'registro'
+
+
+# Genera los archivos de un trabajo (mseed y, si se pidio, la copia .dat) a partir de la lectura de su grupo y
+# devuelve sus rutas. El mseed tambien queda en cache, asi una solicitud identica posterior no vuelve a leer ni
+# a codificar.
+def extraer_trabajo(servicio, trabajo, lectura):
+    from lector_registro import recortar_resultado
+    from extractor_eventos import nombre_evento, guardar_archivo, escribir_evento
+    estacion = servicio['dispositivo_id']
+    directorio_salida = servicio['directorios'].get("eventos_extraidos", "Unknown")
+    clave = ('mseed', estacion, trabajo['inicio'], trabajo['fin'])
+    entrada = obtener_cache(servicio['cache'], clave) if not trabajo['dat'] else None
+    if entrada is not None and (entrada['valor']['completo'] or entrada['leido'] > trabajo['fin'] + MARGEN_DATOS_RECIENTES):
+        ruta = os.path.join(directorio_salida, nombre_evento(servicio['config_mseed']["CODIGO(1)"], trabajo['inicio'], trabajo['duracion']))
+        publicar_estado(servicio, trabajo['trabajo'], "progreso", etapa="lectura", origen="cache",
+                        cobertura=entrada['valor']['cobertura'])
+        guardar_archivo(ruta, entrada['valor']['mseed'])
+        publicar_estado(servicio, trabajo['trabajo'], "progreso", etapa="mseed", origen="cache", archivo=os.path.basename(ruta))
+        return [ruta]
+
+    resultado, origen, agrupados = lectura
+    resultado = recortar_resultado(resultado, trabajo['inicio'], trabajo['fin'])
+    evento = escribir_evento(resultado, trabajo['inicio'], trabajo['duracion'], servicio['config_mseed'], directorio_salida, trabajo['dat'])
+    publicar_estado(servicio, trabajo['trabajo'], "progreso", etapa="lectura", origen=origen, agrupados=agrupados,
+                    cobertura=evento['cobertura'], archivos=[os.path.basename(archivo) for archivo in evento['archivos']])
+    guardar_cache(servicio['cache'], clave, {'mseed': evento['datos_mseed'], 'cobertura': evento['cobertura'],
+                                             'completo': evento['cobertura'] == 1}, len(evento['datos_mseed']), time.time())
+    rutas = [ruta for ruta in (evento['mseed'], evento['dat']) if ruta is not None]
+    publicar_estado(servicio, trabajo['trabajo'], "progreso", etapa="mseed", archivo=os.path.basename(evento['mseed']),
+                    **({'archivo_dat': os.path.basename(evento['dat'])} if evento['dat'] else {}))
+    return rutas
+
+
+# Hilo de extraccion: toma el trabajo pendiente mas antiguo, le agrega los pendientes que se solapan con el y lee
+# una sola vez la union de las ventanas; cada trabajo del grupo se recorta de esa lectura en memoria.
+# La lectura del registro continuo se hace de a una (bloqueo_lectura): los hilos comparten la tarjeta SD y el
+# indice .idx del archivo en curso, que se completa al leer. Los trabajos se toman con el bloqueo tomado, asi las
+# solicitudes que llegan mientras otro hilo lee siguen pendientes y se agrupan en la lectura siguiente; la
+# generacion de los mseed se hace fuera del bloqueo, en paralelo. Cada hilo usa sus propias conexiones SQLite
+# (catalogo de archivos y cola de subidas), que no se pueden compartir entre hilos.
+def hilo_extraccion(servicio):
+    from lector_registro import abrir_catalogo_local
+    from cola_subidas import abrir_cola_local, encolar_archivo
+    recursos = {'catalogo': abrir_catalogo_local()[0], 'cola_subidas': abrir_cola_local(servicio['project_local_root'])}
+    try:
+        while True:
+            lectura, error = None, None
+            with servicio['bloqueo_lectura']:
+                trabajo = tomar_trabajo(servicio)
+                if trabajo is None:
+                    break
+                grupo, inicio, fin = agrupar_pendientes(servicio, trabajo)
+                for miembro in grupo:
+                    publicar_estado(servicio, miembro['trabajo'], "en_proceso", espera=round(time.time() - miembro['recibido'], 3),
+                                    agrupados=len(grupo))
+                try:
+                    resultado, origen = leer_ventana(servicio, inicio, fin, recursos, any(miembro['dat'] for miembro in grupo))
+                    lectura = (resultado, origen, len(grupo))
+                except Exception as e:
+                    error = e
+            if len(grupo) > 1:
+                servicio['logger'].info(f"{len(grupo)} solicitudes agrupadas en una lectura de {fin - inicio:g} s")
+
+            for miembro in grupo:
+                comienzo = time.time()
+                try:
+                    if error is not None:
+                        raise error
+                    rutas = extraer_trabajo(servicio, miembro, lectura)
+                    subido = False
+                    # La copia .dat queda solo en el equipo (la retencion la borra sin esperar la subida)
+                    if servicio['config']["subir"] == "si":
+                        subido = encolar_archivo(recursos['cola_subidas'], rutas[0], 'evento', True)
+                    duracion = time.time() - comienzo
+                    servicio['logger'].info(f"Trabajo {miembro['trabajo']} completado en {duracion:.2f} s: "
+                                            f"{', '.join(os.path.basename(ruta) for ruta in rutas)}")
+                    publicar_estado(servicio, miembro['trabajo'], "completado", archivo=os.path.basename(rutas[0]),
+                                    tamano=os.path.getsize(rutas[0]), duracion_proceso=round(duracion, 3), encolado_subida=bool(subido),
+                                    **({'archivo_dat': os.path.basename(rutas[1])} if len(rutas) > 1 else {}))
+                except Exception as e:
+                    servicio['logger'].error(f"Error en el trabajo {miembro['trabajo']}: {e}")
+                    publicar_estado(servicio, miembro['trabajo'], "error", motivo=str(e))
+            del lectura
+    finally:
+        recursos['catalogo'].close()
+        recursos['cola_subidas'].close()
+
+
+# Inicia el cliente MQTT con el servicio como userdata. La conexion es asincrona: paho se reconecta solo.
+def iniciar_cliente_mqtt(servicio):
+    config_mqtt = servicio['config_mqtt']
+    client = mqtt.Client(userdata=servicio)
+    client.on_connect = on_connect
+    client.on_disconnect = on_disconnect
+    client.on_message = on_message
+    client.max_inflight_messages_set(MAX_EN_VUELO)
+    # Estado propio del servicio, distinto del "offline" que publica cliente.py para el dispositivo
+    client.will_set(config_mqtt["topicStatus"], json.dumps({"id": servicio['dispositivo_id'], "status": "extraccion_offline"}), qos=1)
+    client.username_pw_set(config_mqtt["username"], config_mqtt["password"])
+    client.connect_async(config_mqtt["serverAddress"], int(config_mqtt.get("port", 1883)), KEEPALIVE)
+    client.loop_start()
+    return client
+
+
+# Función para inicializar y obtener el logger de un cliente
+def obtener_logger(id_estacion, log_directory, log_filename):
+    global loggers
+    if id_estacion not in loggers:
+        # Crear un logger para el cliente
+        logger = logging.getLogger(id_estacion)
+        logger.setLevel(logging.DEBUG)
+        # Ruta completa del archivo de log
+        log_path = os.path.join(log_directory, log_filename)
+        # Crear manejador de archivo, apuntando al archivo existente
+        file_handler = logging.FileHandler(log_path)
+        file_handler.setLevel(logging.DEBUG)
+        # Crear formato de logging y añadirlo al manejador
+        formatter = logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+        file_handler.setFormatter(formatter)
+        # Añadir el manejador al logger
+        logger.addHandler(file_handler)
+        loggers[id_estacion] = logger
+    return loggers[id_estacion]
+
+#######################################################################################################
+
+############################################ ~Main~ ###################################################
+# Servicio de extraccion de eventos por MQTT: recibe solicitudes en topicSuscription, las procesa con un grupo
+# acotado de hilos y publica el avance de cada trabajo (aceptado, en_proceso, progreso, completado, error o
+# rechazado) en topicStatus.
+def main():
+
+    # Obtiene la variable de entorno para definir la ruta de los archivos de configuracion:
+    project_local_root = os.getenv("PROJECT_LOCAL_ROOT")
+    if not project_local_root:
+        print("La variable de entorno no están definida.")
+        return
+
+    config_dispositivo = read_fileJSON(os.path.join(project_local_root, "configuracion", "configuracion_dispositivo.json"))
+    config_mqtt = read_fileJSON(os.path.join(project_local_root, "configuracion", "configuracion_mqtt.json"))
+    config_mseed = read_fileJSON(os.path.join(project_local_root, "configuracion", "configuracion_mseed.json"))
+    if config_dispositivo is None or config_mqtt is None or config_mseed is None:
+        print("No se pudo leer los archivos de configuración. Terminando el programa.")
+        return
+    sys.path.append(os.path.join(project_local_root, "scripts", "mseed"))
+    sys.path.append(os.path.join(project_local_root, "scripts", "drive"))
+
+    dispositivo_id = config_dispositivo.get("dispositivo", {}).get("id", "Unknown")
+    logger = obtener_logger(dispositivo_id, os.path.join(project_local_root, "log-files"), "extraccion_eventos.log")
+    config = leer_config_extraccion(config_dispositivo)
+    directorios = config_dispositivo.get("directorios", {})
+
+    servicio = {
+        'project_local_root': project_local_root,
+        'dispositivo_id': dispositivo_id,
+        'config': config,
+        'config_mqtt': config_mqtt,
+        'config_mseed': config_mseed,
+        'directorios': directorios,
+        'directorios_catalogo': [directorios.get("registro_continuo", "Unknown"), directorios.get("archivos_mseed", "Unknown")],
+        'logger': logger,
+        'pendientes': [],
+        'condicion': threading.Condition(),
+        'detener': False,
+        'cache': crear_cache(int(float(config["cache_mb"]) * 1024 * 1024)),
+        'bloqueo': threading.Lock(),
+        'bloqueo_lectura': threading.Lock(),
+        'catalogo_actualizado': 0.0,
+        'contador': 0
+    }
+    servicio['client'] = iniciar_cliente_mqtt(servicio)
+    hilos = [threading.Thread(target=hilo_extraccion, args=(servicio,), name=f"extraccion-{i}", daemon=True)
+             for i in range(int(config["hilos"]))]
+    for hilo in hilos:
+        hilo.start()
+    logger.info(f"Servicio de extraccion iniciado: {config}")
+
+    # Supervisor detiene el servicio con SIGTERM
+    signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
+
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        print("Finalizando servicio de extraccion...")
+    finally:
+        # Los trabajos en curso terminan; los pendientes se descartan
+        with servicio['condicion']:
+            servicio['pendientes'].clear()
+            servicio['detener'] = True
+            servicio['condicion'].notify_all()
+        for hilo in hilos:
+            hilo.join(timeout=30)
+        servicio['client'].disconnect()
+        servicio['client'].loop_stop()
+        logger.info("Servicio de extraccion finalizado")
+
+#######################################################################################################
+if __name__ == '__main__':
+    main()
+#######################################################################################################
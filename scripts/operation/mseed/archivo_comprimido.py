@@ -0,0 +1,320 @@
+######################################### ~Librerias~ #################################################
+import os
+import sys
+import glob
+import zlib
+import lzma
+import struct
+import numpy as np
+from timeit import default_timer as timer
+from decodificador_tramas import (TAMANO_TRAMA, MUESTRAS_POR_TRAMA, NUM_CANALES, DTYPE_TRAMA, mapear_archivo_tramas,
+                                  tiempo_absoluto, _complemento_a_2)
+#######################################################################################################
+
+##################################### ~Variables globales~ ############################################
+# Archivo comprimido de registro continuo (.datz). Estructura:
+#   cabecera (8 bytes): 'RSAZ', version, codec, tramas por bloque (uint16)
+#   bloques comprimidos, uno tras otro
+#   bytes sobrantes del .dat original (trama incompleta al final), sin comprimir
+#   indice de bloques (DTYPE_BLOQUE por bloque)
+#   pie (20 bytes): offset del indice, numero de bloques, tamaño de los bytes sobrantes, 'RSAZ'
+# Cada bloque se puede descomprimir por separado, por lo que un rango de tiempo solo lee los bloques que lo cubren.
+EXTENSION_COMPRIMIDO = '.datz'
+MAGIA = b'RSAZ'
+VERSION = 1
+CODECS = {'zlib': 1, 'lzma': 2}
+FORMATO_CABECERA = '<4sBBH'
+FORMATO_PIE = '<QII4s'
+TAMANO_CABECERA = struct.calcsize(FORMATO_CABECERA)
+TAMANO_PIE = struct.calcsize(FORMATO_PIE)
+
+# Tramas (segundos) por bloque y nivel de compresion por defecto
+TRAMAS_POR_BLOQUE = 60
+NIVEL_ZLIB = 6
+PRESET_LZMA = 6
+
+# Registro del indice de bloques: tiempo de la primera trama, tiempo de la ultima trama + 1 (segundos POSIX),
+# numero de tramas, offset y tamaño del bloque comprimido, y CRC32 del bloque descomprimido
+DTYPE_BLOQUE = np.dtype([
+    ('tiempo_inicio', '<i8'),
+    ('tiempo_fin', '<i8'),
+    ('num_tramas', '<u4'),
+    ('offset', '<u8'),
+    ('tamano', '<u4'),
+    ('crc', '<u4')
+])
+#######################################################################################################
+
+######################################### ~Funciones~ #################################################
+# Devuelve la ruta del archivo comprimido de un archivo binario: mismo nombre con extension .datz
+def ruta_comprimido(archivo_binario):
+    return os.path.splitext(archivo_binario)[0] + EXTENSION_COMPRIMIDO
+
+
+# Obtiene los valores crudos de 20 bits (sin aplicar el signo) de cada canal. Devuelve un arreglo int32 (3, n * 250)
+# y los 4 bits bajos del tercer byte de cada muestra, que no forman parte del valor pero se guardan para
+# reconstruir el .dat sin perdidas.
+def valores_crudos(tramas):
+    muestras = tramas['muestras']
+    crudos = np.empty((NUM_CANALES, len(tramas) * MUESTRAS_POR_TRAMA), dtype=np.int32)
+    bits_bajos = np.empty((NUM_CANALES, len(tramas) * MUESTRAS_POR_TRAMA), dtype=np.uint8)
+    for canal in range(NUM_CANALES):
+        byte_1 = muestras[:, :, canal * 3 + 1].reshape(-1).astype(np.int32)
+        byte_2 = muestras[:, :, canal * 3 + 2].reshape(-1).astype(np.int32)
+        byte_3 = muestras[:, :, canal * 3 + 3].reshape(-1)
+        crudos[canal] = (byte_1 << 12) | (byte_2 << 4) | (byte_3 >> 4)
+        bits_bajos[canal] = byte_3 & 0x0F
+    return crudos, bits_bajos
+
+
+# Codifica un bloque de tramas. Cada canal se guarda como primeras diferencias del valor de 20 bits en
+# complemento a 2, en codificacion zigzag (valores pequeños para diferencias negativas) y separadas por planos de
+# bytes, para que el compresor encuentre largas secuencias de bytes altos en cero.
+def codificar_bloque(tramas):
+    crudos, bits_bajos = valores_crudos(tramas)
+    con_signo = (crudos ^ 0x80000) - 0x80000
+    diferencias = np.diff(con_signo, axis=1, prepend=0)
+    zigzag = ((diferencias << 1) ^ (diferencias >> 31)).astype('<u4')
+    planos = zigzag.view(np.uint8).reshape(NUM_CANALES, -1, 4).transpose(0, 2, 1)
+    return b''.join((
+        planos.tobytes(),
+        np.ascontiguousarray(tramas['muestras'][:, :, 0]).tobytes(),
+        bits_bajos.tobytes(),
+        np.ascontiguousarray(tramas['fecha']).tobytes(),
+        np.ascontiguousarray(tramas['hora']).tobytes()
+    ))
+
+
+# Reconstruye las tramas (arreglo DTYPE_TRAMA, identico al del .dat original) a partir de un bloque descomprimido.
+def decodificar_bloque(datos, num_tramas):
+    num_muestras = num_tramas * MUESTRAS_POR_TRAMA
+    posicion = 0
+
+    def tomar(tamano):
+        nonlocal posicion
+        parte = np.frombuffer(datos, dtype=np.uint8, count=tamano, offset=posicion)
+        posicion += tamano
+        return parte
+
+    planos = tomar(NUM_CANALES * 4 * num_muestras).reshape(NUM_CANALES, 4, num_muestras)
+    zigzag = np.ascontiguousarray(planos.transpose(0, 2, 1)).view('<u4').reshape(NUM_CANALES, num_muestras)
+    diferencias = (zigzag >> 1).astype(np.int32) ^ -(zigzag & 1).astype(np.int32)
+    crudos = np.cumsum(diferencias, axis=1, dtype=np.int32) & 0xFFFFF
+    indicadores = tomar(num_muestras).reshape(num_tramas, MUESTRAS_POR_TRAMA)
+    bits_bajos = tomar(NUM_CANALES * num_muestras).reshape(NUM_CANALES, num_tramas, MUESTRAS_POR_TRAMA)
+
+    tramas = np.empty(num_tramas, dtype=DTYPE_TRAMA)
+    muestras = tramas['muestras']
+    muestras[:, :, 0] = indicadores
+    for canal in range(NUM_CANALES):
+        valores = crudos[canal].reshape(num_tramas, MUESTRAS_POR_TRAMA)
+        muestras[:, :, canal * 3 + 1] = valores >> 12
+        muestras[:, :, canal * 3 + 2] = (valores >> 4) & 0xFF
+        muestras[:, :, canal * 3 + 3] = ((valores & 0x0F) << 4) | bits_bajos[canal]
+    tramas['fecha'] = tomar(num_tramas * 3).reshape(num_tramas, 3)
+    tramas['hora'] = tomar(num_tramas * 3).reshape(num_tramas, 3)
+    return tramas, crudos
+
+
+# Comprime un bloque con el codec indicado
+def comprimir(datos, codec):
+    if codec == 'lzma':
+        return lzma.compress(datos, preset=PRESET_LZMA)
+    return zlib.compress(datos, NIVEL_ZLIB)
+
+
+# Descomprime un bloque con el codec indicado
+def descomprimir(datos, codec):
+    if codec == 'lzma':
+        return lzma.decompress(datos)
+    return zlib.decompress(datos)
+
+
+# Comprime un archivo .dat en el formato .datz. Devuelve un diccionario con el tamaño original, el tamaño
+# comprimido, la relacion de compresion y el tiempo empleado.
+def comprimir_archivo(archivo_binario, archivo_salida=None, codec='zlib', tramas_por_bloque=TRAMAS_POR_BLOQUE):
+    inicio = timer()
+    archivo_salida = archivo_salida or ruta_comprimido(archivo_binario)
+    tamano_original = os.path.getsize(archivo_binario)
+    tramas = mapear_archivo_tramas(archivo_binario)
+    tiempos = tiempo_absoluto(tramas)
+    with open(archivo_binario, 'rb') as f:
+        f.seek(len(tramas) * TAMANO_TRAMA)
+        sobrantes = f.read()
+
+    bloques = np.zeros((len(tramas) + tramas_por_bloque - 1) // tramas_por_bloque, dtype=DTYPE_BLOQUE)
+    archivo_temporal = archivo_salida + '.tmp'
+    with open(archivo_temporal, 'wb') as f:
+        f.write(struct.pack(FORMATO_CABECERA, MAGIA, VERSION, CODECS[codec], tramas_por_bloque))
+        for num_bloque, primera in enumerate(range(0, len(tramas), tramas_por_bloque)):
+            bloque_tramas = tramas[primera:primera + tramas_por_bloque]
+            datos = codificar_bloque(bloque_tramas)
+            comprimido = comprimir(datos, codec)
+            bloque_tiempos = tiempos[primera:primera + tramas_por_bloque]
+            bloques[num_bloque] = (bloque_tiempos.min(), bloque_tiempos.max() + 1, len(bloque_tramas), f.tell(), len(comprimido), zlib.crc32(datos))
+            f.write(comprimido)
+        f.write(sobrantes)
+        offset_indice = f.tell()
+        f.write(bloques.tobytes())
+        f.write(struct.pack(FORMATO_PIE, offset_indice, len(bloques), len(sobrantes), MAGIA))
+    del tramas
+    os.replace(archivo_temporal, archivo_salida)
+
+    tamano_comprimido = os.path.getsize(archivo_salida)
+    return {
+        'archivo': archivo_salida,
+        'tamano_original': tamano_original,
+        'tamano_comprimido': tamano_comprimido,
+        'relacion': tamano_original / tamano_comprimido if tamano_comprimido else 0,
+        'duracion': timer() - inicio
+    }
+
+
+# Abre un archivo .datz y lee su indice de bloques. Lanza ValueError si el archivo no tiene el formato esperado.
+def abrir_archivo_comprimido(ruta):
+    tamano = os.path.getsize(ruta)
+    with open(ruta, 'rb') as f:
+        magia, version, codec, tramas_por_bloque = struct.unpack(FORMATO_CABECERA, f.read(TAMANO_CABECERA))
+        if magia != MAGIA or version != VERSION or tamano < TAMANO_CABECERA + TAMANO_PIE:
+            raise ValueError(f"{os.path.basename(ruta)} no es un archivo {EXTENSION_COMPRIMIDO} valido")
+        f.seek(tamano - TAMANO_PIE)
+        offset_indice, num_bloques, tamano_sobrantes, magia_pie = struct.unpack(FORMATO_PIE, f.read(TAMANO_PIE))
+        if magia_pie != MAGIA:
+            raise ValueError(f"{os.path.basename(ruta)} esta incompleto (sin indice de bloques)")
+        f.seek(offset_indice)
+        bloques = np.frombuffer(f.read(num_bloques * DTYPE_BLOQUE.itemsize), dtype=DTYPE_BLOQUE)
+    codecs = {valor: nombre for nombre, valor in CODECS.items()}
+    return {
+        'ruta': ruta,
+        'codec': codecs[codec],
+        'tramas_por_bloque': tramas_por_bloque,
+        'bloques': bloques,
+        'offset_sobrantes': offset_indice - tamano_sobrantes,
+        'tamano_sobrantes': tamano_sobrantes
+    }
+
+
+# Lee y descomprime un bloque. Devuelve las tramas reconstruidas y los valores crudos de 20 bits de cada canal.
+def leer_bloque(archivo, num_bloque, f=None):
+    bloque = archivo['bloques'][num_bloque]
+    if f is None:
+        with open(archivo['ruta'], 'rb') as f:
+            return leer_bloque(archivo, num_bloque, f)
+    f.seek(int(bloque['offset']))
+    datos = descomprimir(f.read(int(bloque['tamano'])), archivo['codec'])
+    if zlib.crc32(datos) != bloque['crc']:
+        raise ValueError(f"Bloque {num_bloque} de {os.path.basename(archivo['ruta'])} dañado (CRC no coincide)")
+    return decodificar_bloque(datos, int(bloque['num_tramas']))
+
+
+# Devuelve el tiempo de cada trama y las muestras decodificadas (int32, igual que decodificar_tramas) de las tramas
+# con tiempo en [tiempo_inicio, tiempo_fin). Solo se descomprimen los bloques que se solapan con el intervalo.
+# Con devolver_tramas tambien devuelve las tramas reconstruidas (identicas a las del .dat original).
+def leer_rango(archivo, tiempo_inicio, tiempo_fin, devolver_tramas=False):
+    if isinstance(archivo, str):
+        archivo = abrir_archivo_comprimido(archivo)
+    bloques = archivo['bloques']
+    seleccion = np.flatnonzero((bloques['tiempo_fin'] > tiempo_inicio) & (bloques['tiempo_inicio'] < tiempo_fin))
+    partes_tiempos = []
+    partes_datos = []
+    partes_tramas = []
+    with open(archivo['ruta'], 'rb') as f:
+        for num_bloque in seleccion:
+            tramas, crudos = leer_bloque(archivo, int(num_bloque), f)
+            tiempos = tiempo_absoluto(tramas)
+            dentro = np.flatnonzero((tiempos >= tiempo_inicio) & (tiempos < tiempo_fin))
+            muestras = (dentro[:, None] * MUESTRAS_POR_TRAMA + np.arange(MUESTRAS_POR_TRAMA)).reshape(-1)
+            partes_tiempos.append(tiempos[dentro])
+            partes_datos.append(_complemento_a_2(crudos[:, muestras]))
+            partes_tramas.append(tramas[dentro])
+    if not partes_tiempos:
+        vacio = (np.zeros(0, dtype=np.int64), np.zeros((NUM_CANALES, 0), dtype=np.int32))
+        return vacio + (np.zeros(0, dtype=DTYPE_TRAMA),) if devolver_tramas else vacio
+    resultado = (np.concatenate(partes_tiempos), np.concatenate(partes_datos, axis=1))
+    return resultado + (np.concatenate(partes_tramas),) if devolver_tramas else resultado
+
+
+# Reconstruye el archivo .dat original (identico byte a byte) a partir de un archivo .datz.
+def descomprimir_archivo(archivo_comprimido, archivo_binario=None):
+    archivo = abrir_archivo_comprimido(archivo_comprimido)
+    archivo_binario = archivo_binario or os.path.splitext(archivo_comprimido)[0] + '.dat'
+    archivo_temporal = archivo_binario + '.tmp'
+    with open(archivo_comprimido, 'rb') as entrada, open(archivo_temporal, 'wb') as salida:
+        for num_bloque in range(len(archivo['bloques'])):
+            tramas, _ = leer_bloque(archivo, num_bloque, entrada)
+            salida.write(tramas.tobytes())
+        entrada.seek(archivo['offset_sobrantes'])
+        salida.write(entrada.read(archivo['tamano_sobrantes']))
+    os.replace(archivo_temporal, archivo_binario)
+    return archivo_binario
+
+
+# Descomprime todos los bloques de un archivo .datz y compara con el .dat original si existe. Devuelve la
+# velocidad de decodificacion en MB/s (de datos .dat reconstruidos) y si el contenido es identico.
+def verificar_archivo(archivo_comprimido, archivo_binario=None):
+    archivo = abrir_archivo_comprimido(archivo_comprimido)
+    archivo_binario = archivo_binario or os.path.splitext(archivo_comprimido)[0] + '.dat'
+    original = mapear_archivo_tramas(archivo_binario) if os.path.isfile(archivo_binario) else None
+    identico = original is not None and len(original) == int(archivo['bloques']['num_tramas'].sum())
+    inicio = timer()
+    primera = 0
+    with open(archivo_comprimido, 'rb') as f:
+        for num_bloque in range(len(archivo['bloques'])):
+            tramas, _ = leer_bloque(archivo, num_bloque, f)
+            if identico:
+                identico = original[primera:primera + len(tramas)].tobytes() == tramas.tobytes()
+            primera += len(tramas)
+    duracion = timer() - inicio
+    megabytes = primera * TAMANO_TRAMA / 1e6
+    return {'tramas': primera, 'mb_por_segundo': megabytes / duracion if duracion > 0 else 0, 'identico': identico}
+
+
+# Devuelve la lista ordenada de archivos con la extension indicada de los archivos, directorios o patrones glob recibidos.
+def listar_archivos(origenes, extension):
+    archivos = []
+    for origen in origenes:
+        if os.path.isdir(origen):
+            origen = os.path.join(origen, '*' + extension)
+        archivos.extend(sorted(f for f in glob.glob(origen) if os.path.isfile(f)))
+    return archivos
+
+#######################################################################################################
+
+############################################ ~Main~ ###################################################
+def main():
+    uso = ("Uso: archivo_comprimido.py comprimir <archivo.dat|directorio|patron_glob> [zlib|lzma]\n"
+           "     archivo_comprimido.py descomprimir <archivo.datz|directorio|patron_glob>\n"
+           "     archivo_comprimido.py verificar <archivo.datz|directorio|patron_glob>")
+    if len(sys.argv) < 3 or sys.argv[1] not in ('comprimir', 'descomprimir', 'verificar'):
+        print(uso)
+        return
+
+    if sys.argv[1] == 'comprimir':
+        codec = sys.argv[3] if len(sys.argv) > 3 else 'zlib'
+        if codec not in CODECS:
+            print(uso)
+            return
+        total_original = 0
+        total_comprimido = 0
+        for archivo_binario in listar_archivos([sys.argv[2]], '.dat'):
+            resultado = comprimir_archivo(archivo_binario, codec=codec)
+            total_original += resultado['tamano_original']
+            total_comprimido += resultado['tamano_comprimido']
+            print(f"{os.path.basename(archivo_binario)}: {resultado['tamano_original'] / 1e6:.1f} MB -> "
+                  f"{resultado['tamano_comprimido'] / 1e6:.1f} MB (relacion {resultado['relacion']:.2f}) en {resultado['duracion']:.2f} s")
+        if total_comprimido:
+            print(f"Total: {total_original / 1e6:.1f} MB -> {total_comprimido / 1e6:.1f} MB (relacion {total_original / total_comprimido:.2f})")
+    elif sys.argv[1] == 'descomprimir':
+        for archivo_comprimido in listar_archivos([sys.argv[2]], EXTENSION_COMPRIMIDO):
+            print(f"{os.path.basename(archivo_comprimido)} -> {os.path.basename(descomprimir_archivo(archivo_comprimido))}")
+    else:
+        for archivo_comprimido in listar_archivos([sys.argv[2]], EXTENSION_COMPRIMIDO):
+            resultado = verificar_archivo(archivo_comprimido)
+            estado = "identico al .dat" if resultado['identico'] else "sin .dat para comparar o distinto"
+            print(f"{os.path.basename(archivo_comprimido)}: {resultado['tramas']} tramas, decodificacion "
+                  f"{resultado['mb_por_segundo']:.1f} MB/s ({estado})")
+
+#######################################################################################################
+if __name__ == '__main__':
+    main()
+#######################################################################################################
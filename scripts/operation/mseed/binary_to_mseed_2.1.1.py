@@ -8,11 +8,22 @@ import sys
 import json
 from time import time as timer
 import logging
-import datetime
+import glob
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from decodificador_tramas import TAMANO_TRAMA, mapear_archivo_tramas, decodificar_tramas, tiempo_absoluto, posiciones_tramas, calcular_huecos
+from indice_tramas import actualizar_indice
+from catalogo_archivos import abrir_catalogo, actualizar_catalogo
 #######################################################################################################
 
 ##################################### ~Variables globales~ ############################################
 loggers = {}
+# Modos de tratamiento de los segundos faltantes al crear las trazas
+MODOS_HUECOS = ('ceros', 'segmentos')
+# Modos de salida de la conversion incremental: agregar al Mini-SEED existente o crear un archivo por ejecucion
+MODOS_SALIDA = ('anexar', 'segmento')
+USO = ("Uso: conversor_mseed.py <tipo_archivo: 1.Registro continuo 2.Evento extraido> [modo_huecos: ceros|segmentos]\n"
+       "     conversor_mseed.py 3 [directorio|patron_glob] [modo_huecos]  (conversion por lotes)\n"
+       "     conversor_mseed.py 4 [modo_salida: anexar|segmento] [modo_huecos]  (conversion incremental)")
 #######################################################################################################
 
 ######################################### ~Funciones~ #################################################
@@ -30,86 +41,45 @@ def read_fileJSON(nameFile):
         return None
     
 
-def leer_archivo_binario(archivo_binario, logger):
+# Lee el archivo binario mapeado en memoria y decodifica los tres canales en un arreglo int32 de forma (3, n).
+# Devuelve tambien el tiempo absoluto (segundos POSIX) de cada trama, necesario para ubicar los huecos.
+# Con offset se leen solo las tramas a partir de esa posicion en bytes (conversion incremental).
+def leer_archivo_binario(archivo_binario, logger, offset=0):
     start_time = timer()
-    datos = [[], [], []]
-    tiempos = []
-
-    chunk_size = 2506 * 60  # Leer en bloques de aproximadamente 2.5 MB
-    with open(archivo_binario, "rb") as f:
-        while True:
-            chunk = np.fromfile(f, dtype=np.uint8, count=chunk_size)
-            if chunk.size == 0:
-                break
-
-            num_tramas = len(chunk) // 2506
-            if num_tramas == 0:
-                continue
-
-            chunk = chunk[:num_tramas * 2506].reshape((num_tramas, 2506))
-
-            horas = chunk[:, 2503].astype(np.uint32)
-            minutos = chunk[:, 2504].astype(np.uint32)
-            segundos = chunk[:, 2505].astype(np.uint32)
-
-            n_segundos = horas * 3600 + minutos * 60 + segundos
-            tiempos.extend(n_segundos)
-            
-            # Procesar los datos de forma vectorizada
-            datos_crudos = chunk[:, :2500].reshape((-1, 250, 10))
-
-            for j in range(3):
-                dato_1 = datos_crudos[:, :, j * 3 + 1].flatten()
-                dato_2 = datos_crudos[:, :, j * 3 + 2].flatten()
-                dato_3 = datos_crudos[:, :, j * 3 + 3].flatten()
-
-                xValue = ((dato_1.astype(np.uint32) << 12) & 0xFF000) + ((dato_2.astype(np.uint32) << 4) & 0xFF0) + ((dato_3.astype(np.uint32) >> 4) & 0xF)
-
-                # Convertir xValue a int32 para manejar valores negativos
-                xValue = xValue.astype(np.int32)
-
-                mask = xValue >= 0x80000
-                #xValue[mask] = xValue[mask] & 0x7FFFF
-                xValue[mask] = -1 * ((~xValue[mask] + 1) & 0x7FFFF)
-
-                datos[j].extend(xValue)
 
-    datos_np = np.array(datos)
+    tramas = mapear_archivo_tramas(archivo_binario, offset)
+    datos_np = decodificar_tramas(tramas)
+    tiempos_np = tiempo_absoluto(tramas)
+    del tramas
 
     logger.info(f"Archivo {os.path.basename(archivo_binario)} leido con exito")
 
     # Detectar segundos faltantes en el array tiempos
-    tiempos_np = np.array(tiempos)
-    segundos_faltantes = []
-    dif_segundos = np.diff(tiempos_np)
-    missing_indices = np.where(dif_segundos > 1)[0]
-    for idx in missing_indices:
-        segundos_faltantes.extend(range(tiempos_np[idx] + 1, tiempos_np[idx + 1]))
-
-    tiempo_incio = datetime.timedelta(seconds=int(tiempos_np[0]))
-    tiempo_final = datetime.timedelta(seconds=int(tiempos_np[-1]))
-    
-    # Imprimir primeros y últimos elementos de tiempos_np y segundos_faltantes
-    print(f"Primer elemento de tiempos_np: {tiempos_np[0]}")
-    print(f"Último elemento de tiempos_np: {tiempos_np[-1]}")
+    _, duracion_huecos = calcular_huecos(tiempos_np)
+    num_segundos_faltantes = int(duracion_huecos.sum())
+
+    tiempo_incio = UTCDateTime(int(tiempos_np[0]))
+    tiempo_final = UTCDateTime(int(tiempos_np[-1]))
 
     print(f"Tiempo primer elemento: {tiempo_incio}")
     print(f"Tiempo ultimo elemento: {tiempo_final}")
 
-    if segundos_faltantes:
-        logger.warning(f"Tiempo primera muestra: {tiempo_incio}. Tiempo ultima muestra: {tiempo_final}. Segundos faltantes: {len(segundos_faltantes)}")
+    if num_segundos_faltantes:
+        logger.warning(f"Tiempo primera muestra: {tiempo_incio}. Tiempo ultima muestra: {tiempo_final}. Segundos faltantes: {num_segundos_faltantes} en {len(duracion_huecos)} huecos")
     else:
         logger.info(f"Tiempo primera muestra: {tiempo_incio}. Tiempo ultima muestra: {tiempo_final}")
 
     end_time = timer()
     print(f"Tiempo de ejecución de leer_archivo_binario: {end_time - start_time:.4f} segundos")
-    return datos_np, segundos_faltantes if segundos_faltantes else None
+    return datos_np, tiempos_np
 
 
 # Extrae y convierte valores de tiempo del archivo binario y los devuelve en un diccionario.
-def extraer_tiempo_binario(archivo):
+# Por defecto usa la primera trama; con offset usa la trama que comienza en esa posicion en bytes.
+def extraer_tiempo_binario(archivo, offset=0):
     # Abrir el archivo en modo de lectura binaria
     with open(archivo, "rb") as f:
+        f.seek(offset)
         # Leer 2506 bytes del archivo y almacenarlos en un arreglo de numpy
         tramaDatos = np.fromfile(f, np.int8, 2506)
     
@@ -159,26 +129,48 @@ def nombrar_archivo_mseed(codigo_estacion,tiempo_binario):
     
 
 # Convierte los datos procesados del archivo binario a formato Mini-SEED y los guarda con el nombre especificado.
-def conversion_mseed_digital(fileName, path, tiempo_binario, datos_archivo_binario, segundos_faltantes, parametros_mseed, logger):
+# modo_huecos: 'ceros' rellena los segundos faltantes con ceros (por defecto); 'segmentos' escribe solo los tramos
+# con datos, un registro Mini-SEED independiente por cada segmento continuo.
+# Con anexar=True los registros se agregan al final del archivo existente en lugar de sobrescribirlo.
+def conversion_mseed_digital(fileName, path, tiempo_binario, datos_archivo_binario, tiempos, parametros_mseed, logger, modo_huecos='ceros', anexar=False):
     nombre = parametros_mseed["SENSOR(2)"]
 
     # Crear trazas para cada canal
-    trazaCH1 = obtenerTraza(nombre, 1, datos_archivo_binario[0], tiempo_binario, segundos_faltantes, parametros_mseed)
-    trazaCH2 = obtenerTraza(nombre, 2, datos_archivo_binario[1], tiempo_binario, segundos_faltantes, parametros_mseed)        
-    trazaCH3 = obtenerTraza(nombre, 3, datos_archivo_binario[2], tiempo_binario, segundos_faltantes, parametros_mseed)
+    trazaCH1 = obtenerTraza(nombre, 1, datos_archivo_binario[0], tiempo_binario, tiempos, parametros_mseed, modo_huecos)
+    trazaCH2 = obtenerTraza(nombre, 2, datos_archivo_binario[1], tiempo_binario, tiempos, parametros_mseed, modo_huecos)
+    trazaCH3 = obtenerTraza(nombre, 3, datos_archivo_binario[2], tiempo_binario, tiempos, parametros_mseed, modo_huecos)
 
     # Crear un objeto Stream con las trazas
     stData = Stream(traces=[trazaCH1, trazaCH2, trazaCH3])
+    # El formato Mini-SEED no admite arreglos enmascarados: cada tramo continuo se escribe como una traza
+    if modo_huecos == 'segmentos':
+        stData = stData.split()
 
     fileNameCompleto = path + fileName
     
-    stData.write(fileNameCompleto, format='MSEED', encoding='STEIM1', reclen=512)
-    print('Se ha creado el archivo: %s' %fileNameCompleto)
-    logger.info(f"Archivo {fileName} creado con exito")
-
-
-# Crea una traza de datos con los parámetros especificados y ajusta los datos para incluir ceros en los segundos faltantes si es necesario.
-def obtenerTraza(nombreCanal, num_canal, data, tiempo_binario, segundos_faltantes, parametros_mseed):
+    if anexar:
+        # Un archivo Mini-SEED es una secuencia de registros independientes, por lo que se pueden agregar al final
+        with open(fileNameCompleto, 'ab') as f:
+            stData.write(f, format='MSEED', encoding='STEIM1', reclen=512)
+        print('Se han agregado registros al archivo: %s' %fileNameCompleto)
+        logger.info(f"Registros agregados al archivo {fileName}")
+    else:
+        # Se escribe en un temporal y se renombra: si la conversion se interrumpe no queda un mseed truncado
+        # mas reciente que el binario, que mseed_actualizado tomaria por convertido
+        temporal = fileNameCompleto + f".tmp{os.getpid()}"
+        try:
+            stData.write(temporal, format='MSEED', encoding='STEIM1', reclen=512)
+            os.replace(temporal, fileNameCompleto)
+        finally:
+            if os.path.exists(temporal):
+                os.remove(temporal)
+        print('Se ha creado el archivo: %s' %fileNameCompleto)
+        logger.info(f"Archivo {fileName} creado con exito")
+
+
+# Crea una traza de datos con los parámetros especificados, ubicando cada trama segun su tiempo.
+# Los segundos faltantes se rellenan con ceros (modo 'ceros') o quedan enmascarados (modo 'segmentos').
+def obtenerTraza(nombreCanal, num_canal, data, tiempo_binario, tiempos, parametros_mseed, modo_huecos='ceros'):
     anio = tiempo_binario["anio"]
     mes = tiempo_binario["mes"]
     dia = tiempo_binario["dia"]
@@ -218,21 +210,19 @@ def obtenerTraza(nombreCanal, num_canal, data, tiempo_binario, segundos_faltante
         'starttime': UTCDateTime(anio, mes, dia, horas, minutos, segundos, microsegundos)
     }
 
-    # Si hay segundos faltantes, ajustar los datos para incluir ceros en los segundos faltantes
-    if segundos_faltantes is not None:
-        segundo_inicio = (horas * 3600) + (minutos * 60) + segundos
-        muestras_por_segundo = fsample
-        lista_ceros = np.zeros(muestras_por_segundo, dtype=np.int32)
-        npts_completo = len(data) + int(len(segundos_faltantes) * muestras_por_segundo)
-        data_completo = np.zeros(npts_completo, dtype=np.int32)
-        data_completo[:len(data)] = data
-        stats['npts'] = npts_completo
-
-        for segundo_faltante in segundos_faltantes:
-            tiempo_muestra_faltante = int(segundo_faltante - segundo_inicio)
-            indice_muestra_faltante = tiempo_muestra_faltante * muestras_por_segundo
-            data_completo = np.insert(data_completo, indice_muestra_faltante, lista_ceros)
-
+    # Cada trama se copia a su posicion final en un solo paso; solo se reserva memoria para la traza completa
+    posiciones = posiciones_tramas(tiempos)
+    num_segundos = int(posiciones[-1]) + 1
+    if num_segundos != len(tiempos):
+        muestras_por_trama = len(data) // len(tiempos)
+        data_completo = np.zeros((num_segundos, muestras_por_trama), dtype=data.dtype)
+        data_completo[posiciones] = data.reshape(len(tiempos), muestras_por_trama)
+        data_completo = data_completo.reshape(-1)
+        if modo_huecos == 'segmentos':
+            con_datos = np.zeros(num_segundos, dtype=bool)
+            con_datos[posiciones] = True
+            data_completo = np.ma.masked_array(data_completo, mask=np.repeat(~con_datos, muestras_por_trama))
+        stats['npts'] = len(data_completo)
         traza = Trace(data=data_completo, header=stats)
     else:
         traza = Trace(data=data, header=stats)
@@ -240,6 +230,170 @@ def obtenerTraza(nombreCanal, num_canal, data, tiempo_binario, segundos_faltante
     return traza
 
 
+# Convierte un archivo binario completo a Mini-SEED en el directorio de salida.
+# Devuelve el nombre del archivo creado, el numero de tramas y el tamaño del binario, o None si no se pudo convertir.
+def convertir_archivo_binario(binary_file, path_archivo_salida, config_mseed, logger, modo_huecos='ceros'):
+    tiempo_binario = extraer_tiempo_binario(binary_file)
+    if tiempo_binario is None:
+        print("Error al extraer el tiempo del archivo binario.")
+        logger.error(f'Tamaño de trama insuficiente en {os.path.basename(binary_file)}. Archivo binario podría estar dañado o incompleto')
+        return None
+
+    nombre_archivo_mseed = nombrar_archivo_mseed(config_mseed["CODIGO(1)"], tiempo_binario)
+    datos_archivo_binario, tiempos = leer_archivo_binario(binary_file, logger)
+    conversion_mseed_digital(nombre_archivo_mseed, path_archivo_salida, tiempo_binario, datos_archivo_binario, tiempos, config_mseed, logger, modo_huecos)
+    indexar_archivo_binario(binary_file, logger)
+    return nombre_archivo_mseed, len(tiempos), os.path.getsize(binary_file)
+
+
+# Crea o completa el indice .idx del archivo binario (tiempo y offset de cada trama) para ubicar un segundo
+# sin leer el archivo. Un error al escribir el indice no interrumpe la conversion.
+def indexar_archivo_binario(binary_file, logger):
+    try:
+        indice = actualizar_indice(binary_file)
+        logger.info(f"Indice de {os.path.basename(binary_file)} actualizado: {len(indice)} tramas")
+    except Exception as e:
+        logger.warning(f"No se pudo actualizar el indice de {os.path.basename(binary_file)}: {e}")
+
+
+# Devuelve la lista ordenada de archivos binarios de un directorio o que coinciden con un patron glob.
+def listar_archivos_binarios(origen):
+    if os.path.isdir(origen):
+        origen = os.path.join(origen, '*.dat')
+    return sorted(f for f in glob.glob(origen) if os.path.isfile(f))
+
+
+# Indica si el archivo Mini-SEED correspondiente al binario ya existe y es mas reciente que el binario.
+def mseed_actualizado(binary_file, path_archivo_salida, codigo_estacion):
+    if os.path.getsize(binary_file) < TAMANO_TRAMA:
+        return False
+    archivo_mseed = path_archivo_salida + nombrar_archivo_mseed(codigo_estacion, extraer_tiempo_binario(binary_file))
+    return os.path.isfile(archivo_mseed) and os.path.getmtime(archivo_mseed) >= os.path.getmtime(binary_file)
+
+
+# Tarea que ejecuta cada proceso del pool: inicializa su propio logger y convierte un archivo.
+def _convertir_en_proceso(binary_file, path_archivo_salida, config_mseed, dispositivo_id, log_directory, modo_huecos):
+    logger = obtener_logger(dispositivo_id, log_directory, "mseed.log")
+    try:
+        return convertir_archivo_binario(binary_file, path_archivo_salida, config_mseed, logger, modo_huecos)
+    except Exception as e:
+        logger.error(f"Error al convertir el archivo {os.path.basename(binary_file)}: {e}")
+        return None
+
+
+# Convierte en paralelo todos los archivos binarios pendientes usando un pool de procesos
+# (por defecto uno por cada nucleo). Omite los archivos cuyo Mini-SEED ya esta actualizado
+# e imprime un resumen del rendimiento al finalizar.
+def conversion_por_lotes(archivos_binarios, path_archivo_salida, config_mseed, dispositivo_id, log_directory, logger, modo_huecos='ceros', num_procesos=None):
+    start_time = timer()
+    codigo_estacion = config_mseed["CODIGO(1)"]
+    pendientes = [f for f in archivos_binarios if not mseed_actualizado(f, path_archivo_salida, codigo_estacion)]
+    omitidos = len(archivos_binarios) - len(pendientes)
+    logger.info(f"Conversion por lotes: {len(pendientes)} archivos pendientes, {omitidos} ya actualizados")
+    print(f"Archivos pendientes: {len(pendientes)}. Archivos ya actualizados: {omitidos}")
+
+    total_tramas = 0
+    total_bytes = 0
+    convertidos = 0
+    fallidos = 0
+    if pendientes:
+        num_procesos = num_procesos or os.cpu_count() or 1
+        with ProcessPoolExecutor(max_workers=min(num_procesos, len(pendientes))) as pool:
+            futuros = {pool.submit(_convertir_en_proceso, f, path_archivo_salida, config_mseed, dispositivo_id, log_directory, modo_huecos): f for f in pendientes}
+            for futuro in as_completed(futuros):
+                resultado = futuro.result()
+                if resultado is None:
+                    fallidos += 1
+                    continue
+                _, num_tramas, tamano = resultado
+                convertidos += 1
+                total_tramas += num_tramas
+                total_bytes += tamano
+
+    duracion = timer() - start_time
+    tramas_por_segundo = total_tramas / duracion if duracion > 0 else 0
+    mb_por_segundo = total_bytes / 1e6 / duracion if duracion > 0 else 0
+    resumen = (f"Conversion por lotes finalizada: {convertidos} convertidos, {fallidos} con error, {omitidos} omitidos. "
+               f"{total_tramas} tramas ({total_bytes / 1e6:.1f} MB) en {duracion:.2f} s: "
+               f"{tramas_por_segundo:.0f} tramas/s, {mb_por_segundo:.2f} MB/s")
+    print(resumen)
+    logger.info(resumen)
+    return convertidos, fallidos, omitidos
+
+
+# Lee los puntos de control de la conversion incremental: por cada archivo binario se guarda el offset en bytes
+# hasta el que ya se convirtio (siempre al final de una trama completa) y el tiempo de la ultima trama convertida.
+# En modo 'anexar' se guarda tambien el nombre del mseed mientras el binario siga recibiendo tramas, para que el
+# gestor de archivos no lo suba (y lo borre) antes de completarlo.
+def leer_puntos_control(archivo_puntos_control):
+    if not os.path.isfile(archivo_puntos_control):
+        return {}
+    puntos_control = read_fileJSON(archivo_puntos_control)
+    return puntos_control if isinstance(puntos_control, dict) else {}
+
+
+# Guarda los puntos de control en un archivo temporal y lo reemplaza de forma atomica,
+# para que una interrupcion no deje el archivo a medio escribir.
+def guardar_puntos_control(archivo_puntos_control, puntos_control):
+    archivo_temporal = archivo_puntos_control + '.tmp'
+    with open(archivo_temporal, 'w') as f:
+        json.dump(puntos_control, f, indent=4)
+    os.replace(archivo_temporal, archivo_puntos_control)
+
+
+# Convierte unicamente las tramas agregadas al archivo binario desde el ultimo punto de control.
+# modo_salida 'anexar' agrega los registros al Mini-SEED del archivo binario; 'segmento' crea un Mini-SEED nuevo
+# nombrado con el tiempo de la primera trama convertida. Devuelve el numero de tramas convertidas.
+def conversion_incremental(binary_file, path_archivo_salida, config_mseed, puntos_control, logger, modo_huecos='ceros', modo_salida='anexar'):
+    nombre_binario = os.path.basename(binary_file)
+    punto_control = puntos_control.get(nombre_binario, {})
+    offset = punto_control.get("offset", 0)
+
+    tamano = os.path.getsize(binary_file)
+    if tamano < offset:
+        logger.warning(f"El archivo {nombre_binario} es menor que su punto de control ({tamano} < {offset}). Se convertira desde el inicio")
+        offset = 0
+    if tamano - offset < TAMANO_TRAMA:
+        print(f'No hay tramas nuevas en el archivo: {nombre_binario}')
+        return 0
+
+    codigo_estacion = config_mseed["CODIGO(1)"]
+    tiempo_binario = extraer_tiempo_binario(binary_file, offset)
+    if modo_salida == 'anexar':
+        nombre_archivo_mseed = nombrar_archivo_mseed(codigo_estacion, extraer_tiempo_binario(binary_file))
+    else:
+        nombre_archivo_mseed = nombrar_archivo_mseed(codigo_estacion, tiempo_binario)
+
+    datos_archivo_binario, tiempos = leer_archivo_binario(binary_file, logger, offset)
+    # Solo se anexa al retomar desde un punto de control: con offset 0 (primera ejecucion, puntos de control
+    # perdidos o archivo que se achico) el Mini-SEED se reescribe para no duplicar los registros que ya tenia
+    anexar = modo_salida == 'anexar' and offset > 0
+    conversion_mseed_digital(nombre_archivo_mseed, path_archivo_salida, tiempo_binario, datos_archivo_binario, tiempos, config_mseed, logger, modo_huecos, anexar=anexar)
+
+    puntos_control[nombre_binario] = {
+        "offset": offset + len(tiempos) * TAMANO_TRAMA,
+        "ultimo_tiempo": int(tiempos[-1])
+    }
+    if modo_salida == 'anexar':
+        puntos_control[nombre_binario]["mseed"] = nombre_archivo_mseed
+    logger.info(f"Conversion incremental de {nombre_binario}: {len(tiempos)} tramas nuevas desde el byte {offset}")
+    indexar_archivo_binario(binary_file, logger)
+    return len(tiempos)
+
+
+# Actualiza el catalogo de disponibilidad con los archivos nuevos o modificados de los directorios indicados.
+# Un error en el catalogo no interrumpe la conversion.
+def actualizar_catalogo_archivos(archivo_catalogo, directorios, logger):
+    try:
+        conexion = abrir_catalogo(archivo_catalogo)
+        try:
+            actualizar_catalogo(conexion, directorios, logger)
+        finally:
+            conexion.close()
+    except Exception as e:
+        logger.warning(f"No se pudo actualizar el catalogo de archivos: {e}")
+
+
 # Función para inicializar y obtener el logger de un cliente
 def obtener_logger(id_estacion, log_directory, log_filename):
     global loggers
@@ -267,12 +421,27 @@ def main():
 
     start_time_total = timer()
 
-    # Recibe como parametro el tipo de archivo binario a convertir (1:Resgistro continuo 2:Eventos extraidos)
-    if len(sys.argv) != 2:
-        print("Uso: conversor_mseed.py <tipo_archivo: 1.Registro continuo 2.Evento extraido>")
+    # Recibe como parametro el tipo de archivo binario a convertir (1:Resgistro continuo 2:Eventos extraidos 3:Lote 4:Incremental)
+    # Opcionalmente recibe el modo de tratamiento de los segundos faltantes (ceros o segmentos),
+    # el origen de la conversion por lotes y el modo de salida de la conversion incremental
+    if len(sys.argv) < 2 or sys.argv[1] not in ('1', '2', '3', '4'):
+        print(USO)
         return
 
     tipoArchivo = sys.argv[1] 
+    origen_lote = None
+    modo_huecos = 'ceros'
+    modo_salida = 'anexar'
+    for argumento in sys.argv[2:]:
+        if argumento in MODOS_HUECOS:
+            modo_huecos = argumento
+        elif tipoArchivo == '4' and argumento in MODOS_SALIDA:
+            modo_salida = argumento
+        elif tipoArchivo == '3' and origen_lote is None:
+            origen_lote = argumento
+        else:
+            print(USO)
+            return
 
     # Obtiene la variable de entorno para definir la ruta del archivo de configuracion:
     project_local_root = os.getenv("PROJECT_LOCAL_ROOT")
@@ -284,6 +453,8 @@ def main():
         archivoNombresArchivosRC = os.path.join(project_local_root,"tmp-files", "NombreArchivoRegistroContinuo.tmp")
         archivoNombresArchivosEE = os.path.join(project_local_root,"tmp-files","NombreArchivoEventoExtraido.tmp")
         script_subir_archivo_drive = os.path.join(project_local_root,"scripts", "drive","subir_archivo.py")
+        archivoPuntosControl = os.path.join(project_local_root, "tmp-files", "PuntosControlMseed.json")
+        archivoCatalogo = os.path.join(project_local_root, "tmp-files", "CatalogoArchivos.db")
         log_directory = os.path.join(project_local_root, "log-files")
     else:
         print("La variable de entorno no están definida.")
@@ -301,6 +472,16 @@ def main():
         print("No se pudo leer el archivo de configuración del dispositivo. Terminando el programa.")
         return
     
+    # Obtiene el ID del dispositivo
+    dispositivo_id = config_dispositivo.get("dispositivo", {}).get("id", "Unknown")
+
+    # Inicializa el logger
+    logger = obtener_logger(dispositivo_id, log_directory, "mseed.log")
+
+    # Directorios que se registran en el catalogo de disponibilidad despues de convertir
+    directorios_catalogo = [config_dispositivo.get("directorios", {}).get("registro_continuo", "Unknown"),
+                            config_dispositivo.get("directorios", {}).get("archivos_mseed", "Unknown")]
+
     if tipoArchivo=='1':
         #Archivos registro continuo
         path_registro_continuo = config_dispositivo.get("directorios", {}).get("registro_continuo", "Unknown")
@@ -324,27 +505,50 @@ def main():
             binary_file = path_eventos_extraidos + lineasFicheroNombresArchivos[0].rstrip('\n')
             path_archivo_salida = path_eventos_extraidos
             print(f'Convirtiendo el archivo: {binary_file}')
-
-    # Extraer tiempo del archivo binario
-    tiempo_binario = extraer_tiempo_binario(binary_file)
-    if tiempo_binario is None:
-        print("Error al extraer el tiempo del archivo binario.")
-        logger.error(f'Tamaño de trama insuficiente. Archivo binario podría estar dañado o incompleto')
-        return  
-        
-    # Obtiene el codigo de la estacion
-    codigo_estacion = config_mseed["CODIGO(1)"]
-
-    # Obtiene el ID del dispositivo
-    dispositivo_id = config_dispositivo.get("dispositivo", {}).get("id", "Unknown")
-
-    # Inicializa el logger
-    logger = obtener_logger(dispositivo_id, log_directory, "mseed.log")
+    elif tipoArchivo=='3':
+        #Conversion por lotes de los archivos de registro continuo pendientes
+        if origen_lote is None:
+            origen_lote = config_dispositivo.get("directorios", {}).get("registro_continuo", "Unknown")
+        path_archivo_salida = config_dispositivo.get("directorios", {}).get("archivos_mseed", "Unknown")
+        archivos_binarios = listar_archivos_binarios(origen_lote)
+        print(f'Convirtiendo {len(archivos_binarios)} archivos de: {origen_lote}')
+        conversion_por_lotes(archivos_binarios, path_archivo_salida, config_mseed, dispositivo_id, log_directory, logger, modo_huecos)
+        actualizar_catalogo_archivos(archivoCatalogo, directorios_catalogo, logger)
+        end_time_total = timer()
+        print(f"Tiempo total de ejecución: {end_time_total - start_time_total:.4f} segundos")
+        return
+    elif tipoArchivo=='4':
+        #Conversion incremental de los archivos de registro continuo actual y anterior
+        path_registro_continuo = config_dispositivo.get("directorios", {}).get("registro_continuo", "Unknown")
+        path_archivo_salida = config_dispositivo.get("directorios", {}).get("archivos_mseed", "Unknown")
+        with open(archivoNombresArchivosRC) as ficheroNombresArchivos:
+            nombres_binarios = [linea.strip() for linea in ficheroNombresArchivos if linea.strip()]
+        puntos_control = leer_puntos_control(archivoPuntosControl)
+        # Primero se completa el archivo anterior y luego se avanza sobre el actual
+        for binary_filename in reversed(nombres_binarios):
+            binary_file = path_registro_continuo + binary_filename
+            if not binary_filename.endswith('.dat') or not os.path.isfile(binary_file):
+                continue
+            print(f'Convirtiendo de forma incremental el archivo: {binary_filename}')
+            conversion_incremental(binary_file, path_archivo_salida, config_mseed, puntos_control, logger, modo_huecos, modo_salida)
+            # El archivo anterior ya no recibe tramas: su mseed queda completo y se puede subir
+            if binary_filename != nombres_binarios[0]:
+                puntos_control.get(binary_filename, {}).pop("mseed", None)
+            guardar_puntos_control(archivoPuntosControl, puntos_control)
+        # Se descartan los puntos de control de los archivos que ya no estan en rotacion
+        puntos_control = {nombre: punto for nombre, punto in puntos_control.items() if nombre in nombres_binarios}
+        guardar_puntos_control(archivoPuntosControl, puntos_control)
+        actualizar_catalogo_archivos(archivoCatalogo, directorios_catalogo, logger)
+        end_time_total = timer()
+        print(f"Tiempo total de ejecución: {end_time_total - start_time_total:.4f} segundos")
+        return
 
     # Inicializa la conversion del archivo
-    nombre_archivo_mseed = nombrar_archivo_mseed(codigo_estacion, tiempo_binario)
-    datos_archivo_binario, segundos_faltantes = leer_archivo_binario(binary_file, logger)
-    conversion_mseed_digital(nombre_archivo_mseed, path_archivo_salida, tiempo_binario, datos_archivo_binario, segundos_faltantes, config_mseed, logger)
+    resultado = convertir_archivo_binario(binary_file, path_archivo_salida, config_mseed, logger, modo_huecos)
+    if resultado is None:
+        return
+    nombre_archivo_mseed = resultado[0]
+    actualizar_catalogo_archivos(archivoCatalogo, directorios_catalogo, logger)
 
     #print('Se ha creado el archivo: %s' %nombre_archivo_mseed)
 
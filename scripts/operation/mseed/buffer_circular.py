@@ -0,0 +1,265 @@
+######################################### ~Librerias~ #################################################
+import os
+import sys
+import json
+import time
+import signal
+import logging
+import numpy as np
+from multiprocessing import shared_memory, resource_tracker
+from decodificador_tramas import MUESTRAS_POR_TRAMA, NUM_CANALES, tramas_desde_bytes, tiempo_absoluto, decodificar_tramas
+from distribuidor_tramas import SOCKET_TRAMAS, recibir_tramas
+#######################################################################################################
+
+##################################### ~Variables globales~ ############################################
+loggers = {}
+# Nombre del segmento de memoria compartida (/dev/shm/rsa_buffer_tramas)
+NOMBRE_BUFFER = "rsa_buffer_tramas"
+# Ventana por defecto del buffer si no se define en configuracion_dispositivo.json
+MINUTOS_POR_DEFECTO = 30
+# Identificador del formato del segmento
+MAGIA_BUFFER = 0x52534142
+# Posiciones de la cabecera (int64):
+# CAB_SECUENCIA: numero total de tramas escritas por completo
+# CAB_INICIADAS: numero total de tramas cuya escritura empezo; una trama f sigue siendo valida mientras
+#                f >= CAB_INICIADAS - capacidad (su posicion aun no fue reutilizada)
+CAB_MAGIA, CAB_CAPACIDAD, CAB_SECUENCIA, CAB_INICIADAS = range(4)
+TAMANO_CABECERA = 8
+# Tiempo de espera antes de reconectarse al distribuidor de tramas (segundos)
+ESPERA_RECONEXION = 5
+#######################################################################################################
+
+######################################### ~Funciones~ #################################################
+# Lee un archivo de configuración en formato JSON y devuelve su contenido como un diccionario.
+def read_fileJSON(nameFile):
+    try:
+        with open(nameFile, 'r') as f:
+            data = json.load(f)
+        return data
+    except FileNotFoundError:
+        print(f"Archivo {nameFile} no encontrado.")
+        return None
+    except json.JSONDecodeError:
+        print(f"Error al decodificar el archivo {nameFile}.")
+        return None
+
+
+# Tamaño en bytes del segmento para una capacidad dada: cabecera, tiempos (int64) y muestras (int32)
+def tamano_segmento(capacidad):
+    return (TAMANO_CABECERA + capacidad) * 8 + NUM_CANALES * capacidad * MUESTRAS_POR_TRAMA * 4
+
+
+# Crea los arreglos numpy sobre el segmento de memoria compartida
+def mapear_segmento(shm, capacidad):
+    cabecera = np.ndarray((TAMANO_CABECERA,), dtype=np.int64, buffer=shm.buf, offset=0)
+    tiempos = np.ndarray((capacidad,), dtype=np.int64, buffer=shm.buf, offset=TAMANO_CABECERA * 8)
+    datos = np.ndarray((NUM_CANALES, capacidad * MUESTRAS_POR_TRAMA), dtype=np.int32, buffer=shm.buf, offset=(TAMANO_CABECERA + capacidad) * 8)
+    return {'shm': shm, 'capacidad': capacidad, 'cabecera': cabecera, 'tiempos': tiempos, 'datos': datos}
+
+
+# Crea el buffer circular con capacidad para el numero de tramas (segundos) indicado.
+# Si existe un segmento anterior con el mismo nombre (por ejemplo tras un reinicio) se reemplaza.
+def crear_buffer(capacidad, nombre=NOMBRE_BUFFER):
+    try:
+        anterior = shared_memory.SharedMemory(name=nombre)
+        anterior.close()
+        anterior.unlink()
+    except FileNotFoundError:
+        pass
+    shm = shared_memory.SharedMemory(name=nombre, create=True, size=tamano_segmento(capacidad))
+    buffer = mapear_segmento(shm, capacidad)
+    buffer['cabecera'][:] = 0
+    buffer['cabecera'][CAB_CAPACIDAD] = capacidad
+    buffer['cabecera'][CAB_MAGIA] = MAGIA_BUFFER
+    return buffer
+
+
+# Se conecta a un buffer circular existente desde otro proceso. El segmento se quita del resource_tracker
+# para que el lector no lo borre al terminar (solo lo borra el proceso que lo creo).
+def conectar_buffer(nombre=NOMBRE_BUFFER):
+    shm = shared_memory.SharedMemory(name=nombre)
+    try:
+        resource_tracker.unregister(shm._name, 'shared_memory')
+    except Exception:
+        pass
+    cabecera = np.ndarray((TAMANO_CABECERA,), dtype=np.int64, buffer=shm.buf)
+    if cabecera[CAB_MAGIA] != MAGIA_BUFFER:
+        del cabecera
+        shm.close()
+        raise ValueError(f"El segmento {nombre} no es un buffer de tramas")
+    capacidad = int(cabecera[CAB_CAPACIDAD])
+    del cabecera
+    return mapear_segmento(shm, capacidad)
+
+
+# Libera el buffer. El proceso que lo creo ademas lo elimina del sistema.
+def cerrar_buffer(buffer, eliminar=False):
+    shm = buffer['shm']
+    buffer.clear()
+    shm.close()
+    if eliminar:
+        shm.unlink()
+
+
+# Decodifica las tramas recibidas (bytes de tramas completas) y las escribe en el buffer.
+# Primero se marca que posiciones se van a reutilizar (CAB_INICIADAS) y al final se publica la nueva
+# secuencia (CAB_SECUENCIA): asi un lector puede detectar si los datos que tomo fueron sobrescritos.
+def escribir_tramas(buffer, datos_tramas):
+    tramas = tramas_desde_bytes(datos_tramas)
+    capacidad = buffer['capacidad']
+    cabecera = buffer['cabecera']
+    if len(tramas) > capacidad:
+        tramas = tramas[-capacidad:]
+    num_tramas = len(tramas)
+    if num_tramas == 0:
+        return 0
+
+    secuencia = int(cabecera[CAB_SECUENCIA])
+    cabecera[CAB_INICIADAS] = secuencia + num_tramas
+    tiempos = tiempo_absoluto(tramas)
+    escritas = 0
+    while escritas < num_tramas:
+        posicion = (secuencia + escritas) % capacidad
+        cantidad = min(num_tramas - escritas, capacidad - posicion)
+        bloque = tramas[escritas:escritas + cantidad]
+        decodificar_tramas(bloque, buffer['datos'][:, posicion * MUESTRAS_POR_TRAMA:(posicion + cantidad) * MUESTRAS_POR_TRAMA])
+        buffer['tiempos'][posicion:posicion + cantidad] = tiempos[escritas:escritas + cantidad]
+        escritas += cantidad
+    cabecera[CAB_SECUENCIA] = secuencia + num_tramas
+    return num_tramas
+
+
+# Devuelve el intervalo de tiempo [inicio, fin) disponible en el buffer, o None si esta vacio.
+def rango_disponible(buffer):
+    secuencia = int(buffer['cabecera'][CAB_SECUENCIA])
+    if secuencia == 0:
+        return None
+    primera = max(0, secuencia - buffer['capacidad'] + 1)
+    return int(buffer['tiempos'][primera % buffer['capacidad']]), int(buffer['tiempos'][(secuencia - 1) % buffer['capacidad']]) + 1
+
+
+# Devuelve vistas (sin copia) de los tiempos y las muestras de las tramas con tiempo en [tiempo_inicio, tiempo_fin).
+# Si el rango da la vuelta al buffer se devuelven dos segmentos. Las vistas apuntan a la memoria compartida:
+# despues de usarlas se debe llamar a lectura_valida() para confirmar que no fueron sobrescritas.
+# Devuelve None si el buffer no tiene tramas en ese rango.
+def obtener_vistas(buffer, tiempo_inicio, tiempo_fin):
+    capacidad = buffer['capacidad']
+    secuencia = int(buffer['cabecera'][CAB_SECUENCIA])
+    # Se omite la trama mas antigua: es la primera que se sobrescribe con la siguiente escritura
+    primera = max(0, secuencia - capacidad + 1)
+    if secuencia <= primera:
+        return None
+
+    # Tiempos en orden de llegada (copia pequeña: un valor por trama)
+    tiempos = buffer['tiempos'][np.arange(primera, secuencia) % capacidad]
+    seleccion = np.flatnonzero((tiempos >= tiempo_inicio) & (tiempos < tiempo_fin))
+    if len(seleccion) == 0:
+        return None
+    trama_inicio = primera + int(seleccion[0])
+    trama_fin = primera + int(seleccion[-1]) + 1
+
+    segmentos = []
+    trama = trama_inicio
+    while trama < trama_fin:
+        posicion = trama % capacidad
+        cantidad = min(trama_fin - trama, capacidad - posicion)
+        segmentos.append({
+            'tiempos': buffer['tiempos'][posicion:posicion + cantidad],
+            'datos': buffer['datos'][:, posicion * MUESTRAS_POR_TRAMA:(posicion + cantidad) * MUESTRAS_POR_TRAMA]
+        })
+        trama += cantidad
+    return {'primera_trama': trama_inicio, 'num_tramas': trama_fin - trama_inicio, 'segmentos': segmentos}
+
+
+# Indica si las tramas de una lectura siguen en el buffer (no fueron sobrescritas por el escritor).
+def lectura_valida(buffer, lectura):
+    return lectura['primera_trama'] >= int(buffer['cabecera'][CAB_INICIADAS]) - buffer['capacidad']
+
+
+# Copia las tramas de [tiempo_inicio, tiempo_fin) en arreglos propios: tiempos (n,) y datos (3, n * 250).
+# Si el escritor sobrescribio los datos durante la copia se reintenta. Devuelve None si no hay datos.
+def copiar_rango(buffer, tiempo_inicio, tiempo_fin, intentos=3):
+    for _ in range(intentos):
+        lectura = obtener_vistas(buffer, tiempo_inicio, tiempo_fin)
+        if lectura is None:
+            return None
+        tiempos = np.concatenate([segmento['tiempos'] for segmento in lectura['segmentos']])
+        datos = np.concatenate([segmento['datos'] for segmento in lectura['segmentos']], axis=1)
+        if lectura_valida(buffer, lectura):
+            return tiempos, datos
+    return None
+
+
+# Función para inicializar y obtener el logger de un cliente
+def obtener_logger(id_estacion, log_directory, log_filename):
+    global loggers
+    if id_estacion not in loggers:
+        # Crear un logger para el cliente
+        logger = logging.getLogger(id_estacion)
+        logger.setLevel(logging.DEBUG)
+        # Ruta completa del archivo de log
+        log_path = os.path.join(log_directory, log_filename)
+        # Crear manejador de archivo, apuntando al archivo existente
+        file_handler = logging.FileHandler(log_path)
+        file_handler.setLevel(logging.DEBUG)
+        # Crear formato de logging y añadirlo al manejador
+        formatter = logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+        file_handler.setFormatter(formatter)
+        # Añadir el manejador al logger
+        logger.addHandler(file_handler)
+        loggers[id_estacion] = logger
+    return loggers[id_estacion]
+
+#######################################################################################################
+
+############################################ ~Main~ ###################################################
+# Servicio que alimenta el buffer circular con las tramas del distribuidor de tramas.
+def main():
+
+    # Obtiene la variable de entorno para definir la ruta de los archivos de configuracion:
+    project_local_root = os.getenv("PROJECT_LOCAL_ROOT")
+    if not project_local_root:
+        print("La variable de entorno no están definida.")
+        return
+
+    config_dispositivo = read_fileJSON(os.path.join(project_local_root, "configuracion", "configuracion_dispositivo.json"))
+    if config_dispositivo is None:
+        print("No se pudo leer el archivo de configuración del dispositivo. Terminando el programa.")
+        return
+    dispositivo_id = config_dispositivo.get("dispositivo", {}).get("id", "Unknown")
+    logger = obtener_logger(dispositivo_id, os.path.join(project_local_root, "log-files"), "buffer_circular.log")
+
+    minutos = config_dispositivo.get("buffer_circular", {}).get("minutos", MINUTOS_POR_DEFECTO)
+    ruta_socket = sys.argv[1] if len(sys.argv) > 1 else SOCKET_TRAMAS
+    buffer = crear_buffer(int(minutos * 60))
+    logger.info(f"Buffer circular creado: /dev/shm/{NOMBRE_BUFFER}, {minutos} minutos ({tamano_segmento(buffer['capacidad']) / 1e6:.1f} MB)")
+    print(f"Buffer circular creado: {minutos} minutos")
+
+    # Supervisor detiene el servicio con SIGTERM; el loop termina entre bloques de tramas (sin dejar una escritura
+    # del buffer a medias) y se borra el segmento
+    estado = {'activo': True}
+    signal.signal(signal.SIGTERM, lambda signum, frame: estado.update(activo=False))
+
+    try:
+        while estado['activo']:
+            try:
+                for datos_tramas in recibir_tramas(ruta_socket, tramas_por_lectura=16):
+                    escribir_tramas(buffer, datos_tramas)
+                    if not estado['activo']:
+                        break
+                else:
+                    logger.warning("El distribuidor de tramas cerro la conexion")
+            except OSError as e:
+                logger.warning(f"No se pudo conectar al distribuidor de tramas: {e}")
+            if estado['activo']:
+                time.sleep(ESPERA_RECONEXION)
+    except KeyboardInterrupt:
+        print("Finalizando buffer circular...")
+    finally:
+        logger.info(f"Buffer circular finalizado. Tramas escritas: {int(buffer['cabecera'][CAB_SECUENCIA])}")
+        cerrar_buffer(buffer, eliminar=True)
+
+#######################################################################################################
+if __name__ == '__main__':
+    main()
+#######################################################################################################
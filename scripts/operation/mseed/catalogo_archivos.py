@@ -0,0 +1,296 @@
+######################################### ~Librerias~ #################################################
+import os
+import sys
+import json
+import sqlite3
+import calendar
+import datetime
+import numpy as np
+from indice_tramas import actualizar_indice, leer_indice, buscar_rango, FLAG_HUECO_PREVIO
+from archivo_comprimido import abrir_archivo_comprimido
+#######################################################################################################
+
+##################################### ~Variables globales~ ############################################
+# Catalogo de disponibilidad del archivo: un registro por cada .dat y .mseed con su intervalo de tiempo
+# [tiempo_inicio, tiempo_fin) en segundos POSIX y los huecos internos de cada archivo
+ESQUEMA_CATALOGO = """
+CREATE TABLE IF NOT EXISTS archivos (
+    ruta TEXT PRIMARY KEY,
+    tipo TEXT NOT NULL,
+    estacion TEXT NOT NULL,
+    tiempo_inicio REAL NOT NULL,
+    tiempo_fin REAL NOT NULL,
+    num_tramas INTEGER NOT NULL,
+    tamano INTEGER NOT NULL,
+    mtime REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS huecos (
+    ruta TEXT NOT NULL,
+    tiempo_inicio REAL NOT NULL,
+    tiempo_fin REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_archivos_tiempo ON archivos (estacion, tipo, tiempo_fin);
+CREATE INDEX IF NOT EXISTS idx_huecos_ruta ON huecos (ruta);
+"""
+# Extensiones que se catalogan y tipo con el que se registran
+TIPOS_ARCHIVO = {'.dat': 'dat', '.mseed': 'mseed', '.datz': 'datz'}
+# Tolerancia (en muestras) para considerar continuos dos segmentos Mini-SEED consecutivos
+TOLERANCIA_MUESTRAS = 1.5
+#######################################################################################################
+
+######################################### ~Funciones~ #################################################
+# Abre (o crea) la base de datos del catalogo. El timeout permite que varios procesos la actualicen.
+def abrir_catalogo(archivo_catalogo):
+    conexion = sqlite3.connect(archivo_catalogo, timeout=30)
+    conexion.execute("PRAGMA journal_mode=WAL")
+    conexion.executescript(ESQUEMA_CATALOGO)
+    return conexion
+
+
+# Obtiene el codigo de la estacion a partir del nombre del archivo (<estacion>_<fecha>...)
+def estacion_desde_nombre(nombre_archivo):
+    return nombre_archivo.split('_')[0]
+
+
+# Describe un archivo binario a partir de su indice .idx (que se crea o completa si hace falta).
+# Devuelve el intervalo cubierto, el numero de tramas y la lista de huecos [(inicio, fin)], o None si esta vacio.
+def describir_binario(ruta):
+    indice = actualizar_indice(ruta)
+    if len(indice) == 0:
+        return None
+    tiempos = indice['tiempo']
+    posiciones = np.flatnonzero(indice['flags'][1:] & FLAG_HUECO_PREVIO) + 1
+    huecos = [(float(tiempos[i - 1] + 1), float(tiempos[i])) for i in posiciones]
+    return float(tiempos.min()), float(tiempos.max() + 1), len(indice), huecos
+
+
+# Describe un archivo comprimido .datz a partir de su indice de bloques, sin descomprimirlo. Solo se registran
+# los huecos entre bloques; los segundos que faltan dentro de un bloque no aparecen en el catalogo.
+def describir_comprimido(ruta):
+    bloques = abrir_archivo_comprimido(ruta)['bloques']
+    if len(bloques) == 0:
+        return None
+    posiciones = np.flatnonzero(bloques['tiempo_inicio'][1:] > bloques['tiempo_fin'][:-1]) + 1
+    huecos = [(float(bloques['tiempo_fin'][i - 1]), float(bloques['tiempo_inicio'][i])) for i in posiciones]
+    return float(bloques['tiempo_inicio'].min()), float(bloques['tiempo_fin'].max()), int(bloques['num_tramas'].sum()), huecos
+
+
+# Describe un archivo Mini-SEED leyendo solo las cabeceras. Los segmentos del primer canal definen los huecos.
+def describir_mseed(ruta):
+    # obspy solo se importa aqui para que las consultas al catalogo no paguen su tiempo de carga
+    from obspy import read
+    stream = read(ruta, headonly=True)
+    if len(stream) == 0:
+        return None
+    canal = sorted(traza.id for traza in stream)[0]
+    segmentos = sorted(((traza.stats.starttime.timestamp, traza.stats.endtime.timestamp + traza.stats.delta, traza.stats.delta, traza.stats.npts)
+                        for traza in stream if traza.id == canal))
+
+    huecos = []
+    fin_anterior = segmentos[0][1]
+    for inicio, fin, delta, _ in segmentos[1:]:
+        if inicio - fin_anterior > TOLERANCIA_MUESTRAS * delta:
+            huecos.append((fin_anterior, inicio))
+        fin_anterior = max(fin_anterior, fin)
+    num_tramas = int(round(sum(npts * delta for _, _, delta, npts in segmentos)))
+    return segmentos[0][0], fin_anterior, num_tramas, huecos
+
+
+# Registra (o reemplaza) un archivo en el catalogo. Devuelve False si el archivo no tiene datos.
+def catalogar_archivo(conexion, ruta, estado=None):
+    nombre = os.path.basename(ruta)
+    tipo = TIPOS_ARCHIVO[os.path.splitext(nombre)[1]]
+    estado = estado or os.stat(ruta)
+    if tipo == 'dat':
+        descripcion = describir_binario(ruta)
+    elif tipo == 'datz':
+        descripcion = describir_comprimido(ruta)
+    else:
+        descripcion = describir_mseed(ruta)
+
+    conexion.execute("DELETE FROM huecos WHERE ruta = ?", (ruta,))
+    conexion.execute("DELETE FROM archivos WHERE ruta = ?", (ruta,))
+    if descripcion is None:
+        return False
+    tiempo_inicio, tiempo_fin, num_tramas, huecos = descripcion
+    conexion.execute("INSERT INTO archivos VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                     (ruta, tipo, estacion_desde_nombre(nombre), tiempo_inicio, tiempo_fin, num_tramas, estado.st_size, estado.st_mtime))
+    conexion.executemany("INSERT INTO huecos VALUES (?, ?, ?)", [(ruta, inicio, fin) for inicio, fin in huecos])
+    return True
+
+
+# Actualiza el catalogo con el contenido de los directorios. Solo se vuelven a describir los archivos nuevos
+# o cuyo tamaño o fecha de modificacion cambio (por ejemplo, el archivo de registro continuo en curso),
+# y se eliminan los registros de archivos que ya no existen. Devuelve (actualizados, eliminados).
+def actualizar_catalogo(conexion, directorios, logger=None):
+    actualizados = 0
+    eliminados = 0
+    for directorio in directorios:
+        directorio = os.path.abspath(directorio)
+        if not os.path.isdir(directorio):
+            continue
+        catalogados = {ruta: (tamano, mtime) for ruta, tamano, mtime in conexion.execute(
+            "SELECT ruta, tamano, mtime FROM archivos WHERE ruta LIKE ?", (os.path.join(directorio, '%'),))}
+
+        presentes = set()
+        for entrada in os.scandir(directorio):
+            if not entrada.is_file() or os.path.splitext(entrada.name)[1] not in TIPOS_ARCHIVO:
+                continue
+            presentes.add(entrada.path)
+            estado = entrada.stat()
+            if catalogados.get(entrada.path) == (estado.st_size, estado.st_mtime):
+                continue
+            try:
+                catalogar_archivo(conexion, entrada.path, estado)
+                actualizados += 1
+            except Exception as e:
+                if logger:
+                    logger.warning(f"No se pudo catalogar el archivo {entrada.name}: {e}")
+
+        for ruta in catalogados:
+            if ruta not in presentes and os.path.dirname(ruta) == directorio:
+                conexion.execute("DELETE FROM huecos WHERE ruta = ?", (ruta,))
+                conexion.execute("DELETE FROM archivos WHERE ruta = ?", (ruta,))
+                eliminados += 1
+        conexion.commit()
+
+    if logger and (actualizados or eliminados):
+        logger.info(f"Catalogo actualizado: {actualizados} archivos catalogados, {eliminados} eliminados")
+    return actualizados, eliminados
+
+
+# Devuelve los archivos que cubren el intervalo [tiempo_inicio, tiempo_fin) ordenados por tiempo.
+# Para los .dat se incluye el offset en bytes de la primera trama del intervalo y el numero de tramas. Si el archivo
+# crecio desde que se indexo, las tramas nuevas se indexan en memoria: la consulta no escribe los .idx.
+def archivos_en_rango(conexion, estacion, tiempo_inicio, tiempo_fin, tipo='dat'):
+    filas = conexion.execute(
+        "SELECT ruta, tiempo_inicio, tiempo_fin FROM archivos "
+        "WHERE estacion = ? AND tipo = ? AND tiempo_fin > ? AND tiempo_inicio < ? ORDER BY tiempo_inicio",
+        (estacion, tipo, tiempo_inicio, tiempo_fin)).fetchall()
+
+    resultado = []
+    for ruta, inicio_archivo, fin_archivo in filas:
+        # Un archivo borrado o comprimido despues de la ultima actualizacion del catalogo se omite
+        if not os.path.isfile(ruta):
+            continue
+        archivo = {'ruta': ruta, 'tiempo_inicio': inicio_archivo, 'tiempo_fin': fin_archivo}
+        if tipo == 'dat':
+            rango = buscar_rango(leer_indice(ruta), int(np.floor(tiempo_inicio)), int(np.ceil(tiempo_fin)))
+            if rango is None:
+                continue
+            archivo['offset'], archivo['num_tramas'] = rango
+        resultado.append(archivo)
+    return resultado
+
+
+# Devuelve el fin (segundos POSIX) del ultimo archivo catalogado de una estacion, o None si no hay ninguno.
+def fin_catalogado(conexion, estacion, tipo='dat'):
+    return conexion.execute("SELECT MAX(tiempo_fin) FROM archivos WHERE estacion = ? AND tipo = ?", (estacion, tipo)).fetchone()[0]
+
+
+# Devuelve los intervalos [(inicio, fin)] sin datos dentro de [tiempo_inicio, tiempo_fin): tanto los huecos
+# internos de los archivos como los periodos que no cubre ningun archivo.
+def huecos_en_rango(conexion, estacion, tiempo_inicio, tiempo_fin, tipo='dat'):
+    filas = conexion.execute(
+        "SELECT ruta, tiempo_inicio, tiempo_fin FROM archivos "
+        "WHERE estacion = ? AND tipo = ? AND tiempo_fin > ? AND tiempo_inicio < ?",
+        (estacion, tipo, tiempo_inicio, tiempo_fin)).fetchall()
+
+    # Tramos con datos: el intervalo de cada archivo menos sus huecos internos
+    cobertura = []
+    for ruta, inicio_archivo, fin_archivo in filas:
+        cursor = inicio_archivo
+        for inicio_hueco, fin_hueco in conexion.execute(
+                "SELECT tiempo_inicio, tiempo_fin FROM huecos WHERE ruta = ? ORDER BY tiempo_inicio", (ruta,)):
+            if inicio_hueco > cursor:
+                cobertura.append((cursor, inicio_hueco))
+            cursor = max(cursor, fin_hueco)
+        if fin_archivo > cursor:
+            cobertura.append((cursor, fin_archivo))
+    cobertura.sort()
+
+    huecos = []
+    cursor = tiempo_inicio
+    for inicio, fin in cobertura:
+        if inicio > cursor:
+            huecos.append((cursor, min(inicio, tiempo_fin)))
+        cursor = max(cursor, fin)
+        if cursor >= tiempo_fin:
+            break
+    if cursor < tiempo_fin:
+        huecos.append((cursor, tiempo_fin))
+    return huecos
+
+
+# Convierte una fecha 'aaaa-mm-ddTHH:MM:SS' (tiempo de las tramas, UTC) a segundos POSIX
+def fecha_a_posix(fecha):
+    return calendar.timegm(datetime.datetime.strptime(fecha, '%Y-%m-%dT%H:%M:%S').timetuple())
+
+
+# Convierte segundos POSIX a texto 'aaaa-mm-ddTHH:MM:SS.fff'
+def posix_a_fecha(tiempo):
+    return datetime.datetime.fromtimestamp(tiempo, datetime.timezone.utc).strftime('%Y-%m-%dT%H:%M:%S.%f')[:-3]
+
+
+# Lee un archivo de configuración en formato JSON y devuelve su contenido como un diccionario.
+def read_fileJSON(nameFile):
+    try:
+        with open(nameFile, 'r') as f:
+            data = json.load(f)
+        return data
+    except FileNotFoundError:
+        print(f"Archivo {nameFile} no encontrado.")
+        return None
+    except json.JSONDecodeError:
+        print(f"Error al decodificar el archivo {nameFile}.")
+        return None
+
+#######################################################################################################
+
+############################################ ~Main~ ###################################################
+def main():
+    uso = ("Uso: catalogo_archivos.py actualizar\n"
+           "     catalogo_archivos.py buscar <inicio> <fin> [dat|datz|mseed]\n"
+           "     catalogo_archivos.py huecos <inicio> <fin> [dat|datz|mseed]\n"
+           "     Fechas en formato aaaa-mm-ddTHH:MM:SS")
+    if len(sys.argv) < 2 or sys.argv[1] not in ('actualizar', 'buscar', 'huecos'):
+        print(uso)
+        return
+
+    project_local_root = os.getenv("PROJECT_LOCAL_ROOT")
+    if not project_local_root:
+        print("La variable de entorno no están definida.")
+        return
+    config_dispositivo = read_fileJSON(os.path.join(project_local_root, "configuracion", "configuracion_dispositivo.json"))
+    if config_dispositivo is None:
+        print("No se pudo leer el archivo de configuración del dispositivo. Terminando el programa.")
+        return
+    directorios = config_dispositivo.get("directorios", {})
+    estacion = config_dispositivo.get("dispositivo", {}).get("id", "Unknown")
+    conexion = abrir_catalogo(os.path.join(project_local_root, "tmp-files", "CatalogoArchivos.db"))
+
+    if sys.argv[1] == 'actualizar':
+        actualizados, eliminados = actualizar_catalogo(conexion, [directorios.get("registro_continuo", "Unknown"), directorios.get("archivos_mseed", "Unknown")])
+        print(f"Archivos catalogados: {actualizados}. Archivos eliminados del catalogo: {eliminados}")
+        return
+
+    if len(sys.argv) < 4:
+        print(uso)
+        return
+    tiempo_inicio = fecha_a_posix(sys.argv[2])
+    tiempo_fin = fecha_a_posix(sys.argv[3])
+    tipo = sys.argv[4] if len(sys.argv) > 4 else 'dat'
+    if sys.argv[1] == 'buscar':
+        for archivo in archivos_en_rango(conexion, estacion, tiempo_inicio, tiempo_fin, tipo):
+            detalle = f" offset {archivo['offset']}, {archivo['num_tramas']} tramas" if tipo == 'dat' else ''
+            print(f"{os.path.basename(archivo['ruta'])}: {posix_a_fecha(archivo['tiempo_inicio'])} - {posix_a_fecha(archivo['tiempo_fin'])}{detalle}")
+    else:
+        huecos = huecos_en_rango(conexion, estacion, tiempo_inicio, tiempo_fin, tipo)
+        for inicio, fin in huecos:
+            print(f"{posix_a_fecha(inicio)} - {posix_a_fecha(fin)} ({fin - inicio:.3f} s)")
+        print(f"Segundos sin datos: {sum(fin - inicio for inicio, fin in huecos):.3f}")
+
+#######################################################################################################
+if __name__ == '__main__':
+    main()
+#######################################################################################################
@@ -0,0 +1,414 @@
+######################################### ~Librerias~ #################################################
+import os
+import sys
+import json
+import time
+import numpy as np
+from decodificador_tramas import MUESTRAS_POR_TRAMA, NUM_CANALES, DTYPE_TRAMA, tiempo_absoluto, decodificar_tramas
+from archivo_comprimido import EXTENSION_COMPRIMIDO, abrir_archivo_comprimido, leer_bloque, _complemento_a_2
+#######################################################################################################
+
+##################################### ~Variables globales~ ############################################
+# Parametros por defecto de la seccion "decimacion" de configuracion_dispositivo.json
+CONFIG_POR_DEFECTO = {
+    "activar": "no",
+    "dias_completos": 30,           # Dias que se conservan los datos a 250 Hz antes de reemplazarlos por los decimados
+    "productos": ["50hz", "1hz"],   # 50hz: señal filtrada y decimada; 1hz: minimo, maximo y RMS de cada segundo
+    "formato": "mseed"              # mseed o npy
+}
+PRODUCTOS = ('50hz', '1hz')
+FORMATOS = ('mseed', 'npy')
+
+F_MUESTREO = 250
+F_DECIMADO = 50
+FACTOR_DECIMACION = F_MUESTREO // F_DECIMADO
+# Filtro antialias FIR de fase lineal: 101 coeficientes con corte en 20 Hz (80% del Nyquist de 50 Hz).
+# Su retardo de (101 - 1) / 2 = 50 muestras (0.2 s) se compensa descartando las primeras 50 muestras filtradas de
+# cada tramo continuo y completando el final con 50 muestras iguales a la ultima, para que la salida quede
+# alineada en el tiempo con la entrada.
+NUM_COEFICIENTES = 101
+CORTE_HZ = 20.0
+RETARDO = (NUM_COEFICIENTES - 1) // 2
+
+# Tramas (segundos) que se leen y procesan a la vez: la memoria no depende del tamaño del archivo
+TRAMAS_POR_BLOQUE = 600
+# Codigos de ubicacion de los estadisticos de 1 Hz en los archivos Mini-SEED (el canal es el mismo para los tres)
+UBICACIONES_ESTADISTICOS = {'min': 'MN', 'max': 'MX', 'rms': 'RM'}
+#######################################################################################################
+
+######################################### ~Funciones~ #################################################
+# Lee un archivo de configuración en formato JSON y devuelve su contenido como un diccionario.
+def read_fileJSON(nameFile):
+    try:
+        with open(nameFile, 'r') as f:
+            data = json.load(f)
+        return data
+    except FileNotFoundError:
+        print(f"Archivo {nameFile} no encontrado.")
+        return None
+    except json.JSONDecodeError:
+        print(f"Error al decodificar el archivo {nameFile}.")
+        return None
+
+
+# Devuelve la configuracion de decimacion con los valores por defecto para los parametros que no esten definidos.
+def leer_config_decimacion(config_dispositivo):
+    config = dict(CONFIG_POR_DEFECTO)
+    config.update(config_dispositivo.get("decimacion", {}))
+    return config
+
+
+# Recorre un archivo .dat o .datz por bloques de tramas y devuelve, para cada bloque, el tiempo de cada trama
+# (segundos POSIX) y las muestras decodificadas (int32, (3, tramas * 250)). Solo un bloque esta en memoria.
+def bloques_archivo(ruta, tramas_por_bloque=TRAMAS_POR_BLOQUE):
+    if ruta.endswith(EXTENSION_COMPRIMIDO):
+        # Los bloques del .datz (60 tramas) se agrupan hasta tramas_por_bloque para no cortar la salida en
+        # registros Mini-SEED pequeños
+        archivo = abrir_archivo_comprimido(ruta)
+        tiempos, datos = [], []
+        with open(ruta, 'rb') as f:
+            for num_bloque in range(len(archivo['bloques'])):
+                tramas, crudos = leer_bloque(archivo, num_bloque, f)
+                tiempos.append(tiempo_absoluto(tramas))
+                datos.append(_complemento_a_2(crudos))
+                if sum(len(t) for t in tiempos) >= tramas_por_bloque or num_bloque == len(archivo['bloques']) - 1:
+                    yield np.concatenate(tiempos), np.concatenate(datos, axis=1)
+                    tiempos, datos = [], []
+        return
+    # Se lee por bloques en lugar de mapear el archivo para que las paginas ya procesadas no sigan ocupando memoria
+    with open(ruta, 'rb') as f:
+        while len(bloque := np.fromfile(f, dtype=DTYPE_TRAMA, count=tramas_por_bloque)):
+            yield tiempo_absoluto(bloque), decodificar_tramas(bloque)
+
+
+# Divide un bloque en tramos de tramas consecutivas (cada una 1 segundo despues de la anterior).
+# Devuelve la lista de pares (inicio, fin) de indices de tramas.
+def tramos_continuos(tiempos):
+    cortes = np.flatnonzero(np.diff(tiempos) != 1) + 1
+    limites = np.concatenate(([0], cortes, [len(tiempos)]))
+    return [(int(inicio), int(fin)) for inicio, fin in zip(limites[:-1], limites[1:])]
+
+
+# Coeficientes del filtro antialias de 250 Hz a 50 Hz.
+def coeficientes_filtro():
+    from scipy.signal import firwin
+    return firwin(NUM_COEFICIENTES, CORTE_HZ, fs=F_MUESTREO)
+
+
+# Inicia un tramo continuo del producto de 50 Hz. El estado del filtro se inicia con la primera muestra de cada
+# canal como si la señal hubiera sido constante antes, para evitar el transitorio de arranque.
+def iniciar_tramo(estado, tiempo, primeras_muestras):
+    from scipy.signal import lfilter_zi
+    estado['tiempo_tramo'] = tiempo
+    estado['emitidas'] = 0
+    estado['descartar'] = RETARDO
+    estado['zi'] = lfilter_zi(estado['coeficientes'], 1.0)[None, :] * primeras_muestras[:, None].astype(np.float64)
+    estado['ultima'] = primeras_muestras
+
+
+# Filtra las muestras de un tramo (continuacion de las anteriores) y devuelve el tiempo de la primera muestra
+# decimada y las muestras decimadas (int32, (3, n)). Todas las longitudes son multiplos de 5 (250 muestras por
+# trama, 50 de retardo), por lo que basta con tomar una de cada 5 muestras.
+def filtrar_tramo(estado, datos):
+    from scipy.signal import lfilter
+    filtrado, estado['zi'] = lfilter(estado['coeficientes'], 1.0, datos, axis=1, zi=estado['zi'])
+    descartar = min(estado['descartar'], filtrado.shape[1])
+    estado['descartar'] -= descartar
+    estado['ultima'] = datos[:, -1]
+    decimado = np.rint(filtrado[:, descartar::FACTOR_DECIMACION]).astype(np.int32)
+    tiempo = estado['tiempo_tramo'] + estado['emitidas'] / F_DECIMADO
+    estado['emitidas'] += decimado.shape[1]
+    return tiempo, decimado
+
+
+# Termina el tramo continuo actual: entrega las muestras que quedaron retenidas por el retardo del filtro.
+def cerrar_tramo(estado):
+    if estado.get('tiempo_tramo') is None:
+        return None
+    relleno = np.repeat(estado['ultima'][:, None], RETARDO, axis=1).astype(np.float64)
+    resultado = filtrar_tramo(estado, relleno)
+    estado['tiempo_tramo'] = None
+    return resultado
+
+
+# Minimo, maximo y RMS de cada segundo (trama) por canal, cada uno de forma (3, tramas). El RMS se calcula sobre
+# la señal menos su media en ese segundo, para que el nivel de continua (la gravedad) no oculte la vibracion.
+def estadisticos_por_segundo(datos):
+    por_segundo = datos.reshape(NUM_CANALES, -1, MUESTRAS_POR_TRAMA)
+    media = por_segundo.mean(axis=2, keepdims=True)
+    rms = np.sqrt(np.mean(np.square(por_segundo - media), axis=2))
+    return por_segundo.min(axis=2), por_segundo.max(axis=2), rms.astype(np.float32)
+
+
+# Nombre del canal Mini-SEED segun la frecuencia de muestreo, igual que en binary_to_mseed (E: mas de 80 Hz,
+# S: 10 a 80 Hz; se agrega L: menos de 10 Hz), el tipo de sensor y la orientacion de configuracion_mseed.json.
+def nombre_canal(frecuencia, config_mseed, num_canal):
+    nombre = 'E' if frecuencia > 80 else 'S' if frecuencia >= 10 else 'L'
+    nombre += 'L' if config_mseed["SENSOR(2)"] == 'SISMICO' else 'N'
+    return nombre + config_mseed["CANAL(18)"][num_canal:num_canal + 1]
+
+
+# Crea las trazas Mini-SEED de un arreglo (3, n) que empieza en 'tiempo' (segundos POSIX).
+def trazas_mseed(datos, tiempo, frecuencia, config_mseed, ubicacion=None):
+    from obspy import Trace, UTCDateTime
+    trazas = []
+    for num_canal in range(NUM_CANALES):
+        stats = {
+            'network': config_mseed["RED(19)"],
+            'station': config_mseed["CODIGO(1)"],
+            'location': ubicacion if ubicacion is not None else str(config_mseed["UBICACION(17)"]),
+            'channel': nombre_canal(frecuencia, config_mseed, num_canal),
+            'sampling_rate': frecuencia,
+            'mseed': {'dataquality': config_mseed["CALIDAD(16)"]},
+            'starttime': UTCDateTime(float(tiempo))
+        }
+        trazas.append(Trace(data=np.ascontiguousarray(datos[num_canal]), header=stats))
+    return trazas
+
+
+# Abre los archivos de salida de un archivo de registro. En formato npy los arreglos se crean con su tamaño final
+# (del primer al ultimo segundo del archivo, segun su indice) rellenos con NaN y se escriben por partes.
+# Todos se escriben con extension .tmp y se renombran en cerrar_salida().
+def abrir_salida(ruta, directorio_salida, productos, formato, config_mseed):
+    base = os.path.join(directorio_salida, os.path.splitext(os.path.basename(ruta))[0])
+    salida = {'formato': formato, 'config_mseed': config_mseed, 'archivos': {}, 'temporales': {}, 'base': base}
+    if formato == 'mseed':
+        for producto in productos:
+            salida['archivos'][producto] = f"{base}_{producto}.mseed"
+            salida['temporales'][producto] = open(salida['archivos'][producto] + '.tmp', 'wb')
+        return salida
+
+    from catalogo_archivos import describir_binario, describir_comprimido
+    descripcion = describir_comprimido(ruta) if ruta.endswith(EXTENSION_COMPRIMIDO) else describir_binario(ruta)
+    salida['tiempo_inicio'], tiempo_fin = (descripcion[0], descripcion[1]) if descripcion else (0.0, 0.0)
+    segundos = int(tiempo_fin - salida['tiempo_inicio'])
+    formas = {'50hz': (NUM_CANALES, segundos * F_DECIMADO), '1hz': (len(UBICACIONES_ESTADISTICOS), NUM_CANALES, segundos)}
+    for producto in productos:
+        salida['archivos'][producto] = f"{base}_{producto}.npy"
+        arreglo = np.lib.format.open_memmap(salida['archivos'][producto] + '.tmp', mode='w+', dtype=np.float32, shape=formas[producto])
+        arreglo[...] = np.nan
+        salida['temporales'][producto] = arreglo
+    return salida
+
+
+# Escribe una parte de un producto. '50hz': valores (3, n) desde 'tiempo'; '1hz': (minimo, maximo, rms), cada uno
+# (3, n), un valor por segundo desde 'tiempo'. Devuelve el numero de valores por canal que quedaron fuera del
+# intervalo del archivo npy (reloj no monotono).
+def escribir_producto(salida, producto, tiempo, valores):
+    frecuencia = F_DECIMADO if producto == '50hz' else 1
+    if salida['formato'] == 'mseed':
+        from obspy import Stream
+        f = salida['temporales'][producto]
+        if producto == '50hz':
+            Stream(trazas_mseed(valores, tiempo, frecuencia, salida['config_mseed'])).write(f, format='MSEED', encoding='STEIM2', reclen=512)
+        else:
+            minimo, maximo, rms = valores
+            enteros = Stream(trazas_mseed(minimo.astype(np.int32), tiempo, frecuencia, salida['config_mseed'], UBICACIONES_ESTADISTICOS['min'])
+                             + trazas_mseed(maximo.astype(np.int32), tiempo, frecuencia, salida['config_mseed'], UBICACIONES_ESTADISTICOS['max']))
+            enteros.write(f, format='MSEED', encoding='STEIM2', reclen=512)
+            Stream(trazas_mseed(rms, tiempo, frecuencia, salida['config_mseed'], UBICACIONES_ESTADISTICOS['rms'])).write(f, format='MSEED', encoding='FLOAT32', reclen=512)
+        return 0
+
+    arreglo = salida['temporales'][producto]
+    valores = np.stack(valores) if producto == '1hz' else valores
+    num_valores = valores.shape[-1]
+    inicio = int(round((tiempo - salida['tiempo_inicio']) * frecuencia))
+    desde, hasta = max(inicio, 0), min(inicio + num_valores, arreglo.shape[-1])
+    if hasta > desde:
+        arreglo[..., desde:hasta] = valores[..., desde - inicio:hasta - inicio]
+    return num_valores - max(hasta - desde, 0)
+
+
+# Cierra los archivos de salida y los renombra a su nombre final. En formato npy se escribe ademas un JSON con
+# el tiempo de la primera muestra y la descripcion de cada arreglo.
+def cerrar_salida(salida, estacion):
+    for producto, temporal in salida['temporales'].items():
+        if salida['formato'] == 'mseed':
+            temporal.close()
+        else:
+            temporal.flush()
+            del temporal
+        os.replace(salida['archivos'][producto] + '.tmp', salida['archivos'][producto])
+    salida['temporales'] = {}
+    if salida['formato'] == 'npy':
+        descripcion = {
+            'estacion': estacion,
+            'tiempo_inicio': salida['tiempo_inicio'],
+            'canales': ['x', 'y', 'z'],
+            'productos': {
+                '50hz': {'f_muestreo': F_DECIMADO, 'forma': '(canal, muestra)', 'filtro': f"FIR {NUM_COEFICIENTES} coeficientes, corte {CORTE_HZ:g} Hz"},
+                '1hz': {'f_muestreo': 1, 'forma': '(estadistico, canal, segundo)', 'estadisticos': list(UBICACIONES_ESTADISTICOS)}
+            },
+            'huecos': 'NaN'
+        }
+        descripcion['productos'] = {p: dict(d, archivo=os.path.basename(salida['archivos'][p]))
+                                    for p, d in descripcion['productos'].items() if p in salida['archivos']}
+        with open(salida['base'] + '_decimado.json.tmp', 'w') as f:
+            json.dump(descripcion, f, indent=4)
+        os.replace(salida['base'] + '_decimado.json.tmp', salida['base'] + '_decimado.json')
+        salida['archivos']['descripcion'] = salida['base'] + '_decimado.json'
+    return salida['archivos']
+
+
+# Decima un archivo de registro continuo (.dat o .datz) en un solo recorrido por bloques: cada bloque se filtra y
+# decima a 50 Hz y se resume en minimo, maximo y RMS por segundo, y se escribe antes de leer el siguiente.
+# Un hueco o un salto de reloj termina el tramo continuo (se vacia el filtro) y el siguiente empieza de cero.
+# Devuelve un diccionario con los archivos creados, las tramas procesadas y los tamaños de entrada y salida.
+def decimar_archivo(ruta, directorio_salida, config_mseed, productos=PRODUCTOS, formato='mseed'):
+    os.makedirs(directorio_salida, exist_ok=True)
+    salida = abrir_salida(ruta, directorio_salida, productos, formato, config_mseed)
+    estado = {'coeficientes': coeficientes_filtro(), 'tiempo_tramo': None, 'siguiente': None}
+    tramas = 0
+    descartados = 0
+    try:
+        for tiempos, datos in bloques_archivo(ruta):
+            for inicio, fin in tramos_continuos(tiempos):
+                datos_tramo = datos[:, inicio * MUESTRAS_POR_TRAMA:fin * MUESTRAS_POR_TRAMA]
+                if '50hz' in productos:
+                    if estado['siguiente'] != tiempos[inicio]:
+                        cerrado = cerrar_tramo(estado)
+                        if cerrado is not None:
+                            descartados += escribir_producto(salida, '50hz', *cerrado)
+                        iniciar_tramo(estado, int(tiempos[inicio]), datos_tramo[:, 0])
+                    descartados += escribir_producto(salida, '50hz', *filtrar_tramo(estado, datos_tramo))
+                if '1hz' in productos:
+                    descartados += escribir_producto(salida, '1hz', int(tiempos[inicio]), estadisticos_por_segundo(datos_tramo))
+                estado['siguiente'] = int(tiempos[fin - 1]) + 1
+                tramas += fin - inicio
+        if '50hz' in productos:
+            cerrado = cerrar_tramo(estado)
+            if cerrado is not None:
+                descartados += escribir_producto(salida, '50hz', *cerrado)
+        archivos = cerrar_salida(salida, config_mseed["CODIGO(1)"])
+    except BaseException:
+        for producto, temporal in salida['temporales'].items():
+            if salida['formato'] == 'mseed':
+                temporal.close()
+            if os.path.isfile(salida['archivos'][producto] + '.tmp'):
+                os.remove(salida['archivos'][producto] + '.tmp')
+        raise
+    return {
+        'archivos': archivos,
+        'tramas': tramas,
+        'descartados': descartados,
+        'tamano_original': os.path.getsize(ruta),
+        'tamano_decimado': sum(os.path.getsize(archivo) for archivo in archivos.values())
+    }
+
+
+# Busca en el directorio de registro continuo los archivos (.dat o .datz) con mas de 'dias' dias sin modificarse.
+# Si de un registro existen el .dat y el .datz se devuelve solo el .dat, que es mas rapido de leer.
+def archivos_envejecidos(directorio, dias, excluir=()):
+    limite = time.time() - dias * 86400
+    excluir = {os.path.abspath(ruta) for ruta in excluir}
+    candidatos = {}
+    if not os.path.isdir(directorio):
+        return []
+    for entrada in os.scandir(directorio):
+        base, extension = os.path.splitext(entrada.name)
+        if extension not in ('.dat', EXTENSION_COMPRIMIDO) or not entrada.is_file():
+            continue
+        if entrada.stat().st_mtime >= limite or os.path.abspath(entrada.path) in excluir:
+            continue
+        if extension == '.dat' or base not in candidatos:
+            candidatos[base] = entrada.path
+    return sorted(candidatos.values())
+
+
+# Borra el registro original decimado: el .dat, su indice .idx y el .datz, si existen.
+def borrar_original(ruta):
+    base = os.path.splitext(ruta)[0]
+    for extension in ('.dat', '.idx', EXTENSION_COMPRIMIDO):
+        if os.path.isfile(base + extension):
+            os.remove(base + extension)
+
+
+# Reemplaza los registros continuos con mas de dias_completos dias por sus productos decimados, uno a la vez.
+# 'excluir' son las rutas que no se deben tocar (archivo en curso, registros que todavia no se subieron a Drive).
+# El original solo se borra despues de escribir y renombrar todos sus productos. Devuelve la lista de resultados.
+def decimar_envejecidos(config_dispositivo, config_mseed, logger=None, excluir=()):
+    config = leer_config_decimacion(config_dispositivo)
+    productos = [producto for producto in config["productos"] if producto in PRODUCTOS]
+    if config["formato"] not in FORMATOS or not productos:
+        if logger:
+            logger.error(f"Configuracion de decimacion no valida: formato {config['formato']}, productos {config['productos']}")
+        return []
+    directorios = config_dispositivo.get("directorios", {})
+    directorio_salida = directorios.get("decimados", os.path.join(os.path.dirname(os.path.normpath(directorios.get("registro_continuo", "Unknown"))), "decimados"))
+    resultados = []
+    for ruta in archivos_envejecidos(directorios.get("registro_continuo", "Unknown"), float(config["dias_completos"]), excluir):
+        try:
+            inicio = time.time()
+            resultado = decimar_archivo(ruta, directorio_salida, config_mseed, productos, config["formato"])
+            borrar_original(ruta)
+            resultados.append(resultado)
+            if logger:
+                logger.info(f"Archivo {os.path.basename(ruta)} decimado en {time.time() - inicio:.1f} s: "
+                            f"{resultado['tamano_original'] / 1e6:.1f} MB -> {resultado['tamano_decimado'] / 1e6:.2f} MB "
+                            f"({', '.join(os.path.basename(a) for a in resultado['archivos'].values())})")
+                if resultado['descartados']:
+                    logger.warning(f"{resultado['descartados']} valores de {os.path.basename(ruta)} quedaron fuera del intervalo del archivo (reloj no monotono)")
+        except Exception as e:
+            if logger:
+                logger.error(f"Error al decimar el archivo {os.path.basename(ruta)}: {e}")
+    return resultados
+
+#######################################################################################################
+
+############################################ ~Main~ ###################################################
+def main():
+    uso = ("Uso: decimador_registro.py envejecidos   (reemplaza los registros con mas de dias_completos dias)\n"
+           "     decimador_registro.py decimar <archivo.dat|archivo.datz>... [--formato mseed|npy] [--destino directorio]\n"
+           "     (decimar no borra los archivos originales)")
+    argumentos = sys.argv[1:]
+    if not argumentos or argumentos[0] not in ('envejecidos', 'decimar'):
+        print(uso)
+        return
+    project_local_root = os.getenv("PROJECT_LOCAL_ROOT")
+    if not project_local_root:
+        print("La variable de entorno no están definida.")
+        return
+    config_dispositivo = read_fileJSON(os.path.join(project_local_root, "configuracion", "configuracion_dispositivo.json"))
+    config_mseed = read_fileJSON(os.path.join(project_local_root, "configuracion", "configuracion_mseed.json"))
+    if config_dispositivo is None or config_mseed is None:
+        return
+    config = leer_config_decimacion(config_dispositivo)
+
+    if argumentos[0] == 'envejecidos':
+        # Se respetan las mismas protecciones que la retencion (archivo en curso, registros sin subir a Drive)
+        sys.path.append(os.path.join(project_local_root, "scripts", "drive"))
+        from retencion_archivos import archivos_protegidos
+        resultados = decimar_envejecidos(config_dispositivo, config_mseed,
+                                         excluir=archivos_protegidos(project_local_root, config_dispositivo, 'registro_continuo'))
+    else:
+        opciones = {'--formato': config["formato"], '--destino': config_dispositivo.get("directorios", {}).get("decimados", ".")}
+        archivos = []
+        i = 1
+        while i < len(argumentos):
+            if argumentos[i] in opciones and i + 1 < len(argumentos):
+                opciones[argumentos[i]] = argumentos[i + 1]
+                i += 2
+            else:
+                archivos.append(argumentos[i])
+                i += 1
+        if opciones['--formato'] not in FORMATOS:
+            print(uso)
+            return
+        resultados = []
+        for ruta in archivos:
+            inicio = time.time()
+            resultado = decimar_archivo(ruta, opciones['--destino'], config_mseed, [p for p in config["productos"] if p in PRODUCTOS], opciones['--formato'])
+            resultado['duracion'] = time.time() - inicio
+            resultados.append(resultado)
+
+    for resultado in resultados:
+        print(f"{resultado['tramas']} s de datos: {resultado['tamano_original'] / 1e6:.1f} MB -> {resultado['tamano_decimado'] / 1e6:.2f} MB "
+              f"(relacion {resultado['tamano_original'] / max(resultado['tamano_decimado'], 1):.0f})"
+              + (f" en {resultado['duracion']:.1f} s" if 'duracion' in resultado else ""))
+        for archivo in resultado['archivos'].values():
+            print(f"  {archivo}")
+
+#######################################################################################################
+if __name__ == '__main__':
+    main()
+#######################################################################################################
@@ -0,0 +1,115 @@
+######################################### ~Librerias~ #################################################
+import numpy as np
+import os
+#######################################################################################################
+
+##################################### ~Variables globales~ ############################################
+# Estructura de la trama de 1 segundo que genera el programa registro_continuo:
+# 250 muestras de 10 bytes (1 byte indicador + 3 bytes por cada eje X, Y, Z) seguidas de 6 bytes de tiempo
+TAMANO_TRAMA = 2506
+MUESTRAS_POR_TRAMA = 250
+BYTES_POR_MUESTRA = 10
+NUM_CANALES = 3
+
+DTYPE_TRAMA = np.dtype([
+    ('muestras', np.uint8, (MUESTRAS_POR_TRAMA, BYTES_POR_MUESTRA)),
+    ('fecha', np.uint8, (3,)),   # aa, mm, dd
+    ('hora', np.uint8, (3,))     # hh, mm, ss
+])
+
+# Numero de tramas que se decodifican a la vez, limita el tamaño de los arreglos temporales
+TRAMAS_POR_BLOQUE = 3600
+#######################################################################################################
+
+######################################### ~Funciones~ #################################################
+# Mapea el archivo binario en memoria y lo devuelve como un arreglo de tramas sin copiar los datos.
+# Los bytes de una trama incompleta al final del archivo se ignoran.
+def mapear_archivo_tramas(archivo_binario, offset=0, num_tramas=None):
+    tramas_disponibles = max(0, (os.path.getsize(archivo_binario) - offset) // TAMANO_TRAMA)
+    if num_tramas is None or num_tramas > tramas_disponibles:
+        num_tramas = tramas_disponibles
+    if num_tramas == 0:
+        return np.zeros(0, dtype=DTYPE_TRAMA)
+    return np.memmap(archivo_binario, dtype=DTYPE_TRAMA, mode='r', offset=offset, shape=(num_tramas,))
+
+
+# Convierte un arreglo de bytes (de cualquier origen: archivo, pipe o memoria) en un arreglo de tramas.
+def tramas_desde_bytes(buffer):
+    num_tramas = len(buffer) // TAMANO_TRAMA
+    return np.frombuffer(buffer, dtype=DTYPE_TRAMA, count=num_tramas)
+
+
+# Devuelve el tiempo de cada trama en segundos desde la medianoche.
+def segundos_del_dia(tramas):
+    hora = tramas['hora'].astype(np.int32)
+    return hora[:, 0] * 3600 + hora[:, 1] * 60 + hora[:, 2]
+
+
+# Devuelve el tiempo de cada trama en segundos POSIX (int64) a partir de la fecha y hora de la trama.
+# A diferencia de segundos_del_dia(), es monotono al cruzar la medianoche.
+def tiempo_absoluto(tramas):
+    fecha = tramas['fecha'].astype(np.int64)
+    anio = fecha[:, 0] + 2000
+    mes = fecha[:, 1]
+    dia = fecha[:, 2]
+    # Dias desde 1970-01-01 (algoritmo days_from_civil, valido para el calendario gregoriano)
+    anio = anio - (mes <= 2)
+    era = anio // 400
+    anio_era = anio - era * 400
+    dia_anio = (153 * np.where(mes > 2, mes - 3, mes + 9) + 2) // 5 + dia - 1
+    dia_era = anio_era * 365 + anio_era // 4 - anio_era // 100 + dia_anio
+    dias = era * 146097 + dia_era - 719468
+    return dias * 86400 + segundos_del_dia(tramas)
+
+
+# Calcula la posicion (en segundos desde la primera trama) que ocupa cada trama en la traza final.
+# Un salto mayor a 1 segundo deja un hueco; un salto nulo o negativo (reloj reiniciado) se coloca a continuacion.
+def posiciones_tramas(tiempos):
+    posiciones = np.zeros(len(tiempos), dtype=np.int64)
+    if len(tiempos) > 1:
+        np.cumsum(np.maximum(np.diff(tiempos), 1), out=posiciones[1:])
+    return posiciones
+
+
+# Devuelve los huecos del registro como dos arreglos: tiempo del primer segundo faltante y numero de segundos faltantes.
+def calcular_huecos(tiempos):
+    saltos = np.diff(tiempos)
+    indices = np.flatnonzero(saltos > 1)
+    return tiempos[indices] + 1, saltos[indices] - 1
+
+
+# Aplica el complemento a 2 de 20 bits sobre los valores crudos, igual que ObtenerValorAceleracion en C.
+# Se modifica el arreglo recibido (int32) para no crear copias adicionales.
+def _complemento_a_2(valores):
+    negativos = valores >= 0x80000
+    np.negative(valores, out=valores, where=negativos)
+    np.bitwise_and(valores, 0x7FFFF, out=valores, where=negativos)
+    np.negative(valores, out=valores, where=negativos)
+    return valores
+
+
+# Decodifica los tres canales de 20 bits de las tramas en un arreglo int32 de forma (3, num_tramas * 250).
+# Si se recibe el arreglo de salida se escribe directamente sobre el; la decodificacion se hace por bloques
+# de tramas para que la memoria temporal no dependa del tamaño del archivo.
+def decodificar_tramas(tramas, salida=None):
+    num_tramas = len(tramas)
+    if salida is None:
+        salida = np.empty((NUM_CANALES, num_tramas * MUESTRAS_POR_TRAMA), dtype=np.int32)
+
+    for inicio in range(0, num_tramas, TRAMAS_POR_BLOQUE):
+        fin = min(inicio + TRAMAS_POR_BLOQUE, num_tramas)
+        muestras = tramas['muestras'][inicio:fin]
+        for canal in range(NUM_CANALES):
+            destino = salida[canal, inicio * MUESTRAS_POR_TRAMA:fin * MUESTRAS_POR_TRAMA].reshape(fin - inicio, MUESTRAS_POR_TRAMA)
+            byte_1 = muestras[:, :, canal * 3 + 1]
+            byte_2 = muestras[:, :, canal * 3 + 2]
+            byte_3 = muestras[:, :, canal * 3 + 3]
+            # xValue = (byte1 << 12) + (byte2 << 4) + (byte3 >> 4)
+            np.left_shift(byte_1, 12, out=destino, dtype=np.int32)
+            destino += np.left_shift(byte_2, 4, dtype=np.int32)
+            destino += np.right_shift(byte_3, 4, dtype=np.int32)
+            _complemento_a_2(destino)
+
+    return salida
+
+#######################################################################################################
@@ -0,0 +1,287 @@
+######################################### ~Librerias~ #################################################
+import os
+import sys
+import json
+import time
+import signal
+import logging
+import numpy as np
+import paho.mqtt.client as mqtt
+from decodificador_tramas import NUM_CANALES, MUESTRAS_POR_TRAMA, tramas_desde_bytes, tiempo_absoluto, decodificar_tramas
+from distribuidor_tramas import SOCKET_TRAMAS, recibir_tramas
+from detector_sta_lta import (LONGITUD_HISTORIAL, F_MUESTREO, parametros_detector, crear_estado, aceleracion,
+                              filtrar_fir, sta_lta_rapido, relacion_sta_lta, aplicar_histeresis, registrar_eventos)
+from catalogo_archivos import posix_a_fecha
+#######################################################################################################
+
+##################################### ~Variables globales~ ############################################
+loggers = {}
+# Canales que se pueden usar para la deteccion y su fila en el arreglo decodificado
+CANALES = {'x': 0, 'y': 1, 'z': 2}
+# Configuracion por defecto (seccion detector_eventos de configuracion_dispositivo.json). Los valores son los
+# del detector en C, pero se analizan los tres canales.
+# modo 'canales': un STA/LTA por cada canal de la lista; hay evento mientras alguno de ellos este disparado
+# modo 'magnitud': un solo STA/LTA sobre la magnitud vectorial de los canales filtrados
+CONFIG_POR_DEFECTO = {
+    'modo': 'canales',
+    'canales': ['x', 'y', 'z'],
+    'n_sta': 125,
+    'n_lta': 12500,
+    'val_trigger': 4,
+    'val_detrigger': 2,
+    'tiempo_pre_evento': 2,
+    'ventana_evento': 30,
+    'tiempo_entre_eventos': 60
+}
+# Tiempo de espera antes de reconectarse al distribuidor de tramas (segundos)
+ESPERA_RECONEXION = 5
+# Calidad de servicio de los mensajes de eventos: con QoS 1 paho los guarda y reenvia si el broker no esta conectado
+QOS_EVENTOS = 1
+#######################################################################################################
+
+######################################### ~Funciones~ #################################################
+# Lee un archivo de configuración en formato JSON y devuelve su contenido como un diccionario.
+def read_fileJSON(nameFile):
+    try:
+        with open(nameFile, 'r') as f:
+            data = json.load(f)
+        return data
+    except FileNotFoundError:
+        print(f"Archivo {nameFile} no encontrado.")
+        return None
+    except json.JSONDecodeError:
+        print(f"Error al decodificar el archivo {nameFile}.")
+        return None
+
+
+# Obtiene los parametros del detector de la seccion detector_eventos de la configuracion del dispositivo.
+# Los valores que faltan o no son validos toman el valor por defecto.
+def leer_parametros(config_dispositivo, logger):
+    config = dict(CONFIG_POR_DEFECTO)
+    config.update(config_dispositivo.get("detector_eventos", {}))
+    if config['modo'] not in ('canales', 'magnitud'):
+        logger.warning(f"Modo de deteccion no valido: {config['modo']}. Se usa '{CONFIG_POR_DEFECTO['modo']}'")
+        config['modo'] = CONFIG_POR_DEFECTO['modo']
+    canales = [str(c).lower() for c in config['canales'] if str(c).lower() in CANALES]
+    if not canales:
+        logger.warning(f"Canales de deteccion no validos: {config['canales']}. Se usan {CONFIG_POR_DEFECTO['canales']}")
+        canales = CONFIG_POR_DEFECTO['canales']
+    parametros = parametros_detector(int(config['n_sta']), int(config['n_lta']), float(config['val_trigger']), float(config['val_detrigger']),
+                                     tiempo_pre_evento=int(config['tiempo_pre_evento']), ventana_evento=int(config['ventana_evento']),
+                                     tiempo_entre_eventos=int(config['tiempo_entre_eventos']))
+    parametros['modo'] = config['modo']
+    parametros['canales'] = canales
+    return parametros
+
+
+# Crea el estado del detector: historial del filtro FIR de cada canal, un estado STA/LTA por cada serie analizada
+# (cada canal o la magnitud) y el estado de los eventos combinados.
+def crear_detector(parametros):
+    series = ['magnitud'] if parametros['modo'] == 'magnitud' else parametros['canales']
+    return {
+        'historial_fir': np.zeros((NUM_CANALES, LONGITUD_HISTORIAL), dtype=np.float64),
+        'series': {serie: crear_estado() for serie in series},
+        'eventos': crear_estado(),
+        'evento': 0,
+        'tramas': 0
+    }
+
+
+# Procesa un bloque de tramas completas. Todo el calculo es vectorizado sobre las 250 muestras de cada trama:
+# filtro FIR, STA/LTA recursivo (filtro IIR con estado) e histeresis. Devuelve la lista de disparos (inicio de
+# deteccion en alguna serie) y la lista de eventos terminados, agrupados igual que en el detector en C.
+def procesar_tramas(detector, datos_tramas, parametros):
+    tramas = tramas_desde_bytes(datos_tramas)
+    tiempos = tiempo_absoluto(tramas)
+    valores = aceleracion(decodificar_tramas(tramas))
+
+    canales = sorted({CANALES[c] for c in parametros['canales']})
+    filtrados = {}
+    for canal in canales:
+        filtrados[canal], detector['historial_fir'][canal] = filtrar_fir(valores[canal], detector['historial_fir'][canal])
+    if parametros['modo'] == 'magnitud':
+        series = {'magnitud': np.sqrt(sum(np.square(filtrados[c], dtype=np.float64) for c in canales)).astype(np.float32)}
+    else:
+        series = {c: filtrados[CANALES[c]] for c in parametros['canales']}
+
+    relaciones = []
+    eventos_series = []
+    for serie, filtrado in series.items():
+        estado = detector['series'][serie]
+        sta, lta = sta_lta_rapido(filtrado, estado, parametros)
+        relacion = relacion_sta_lta(sta, lta, estado, parametros)
+        relaciones.append(relacion)
+        eventos_series.append(aplicar_histeresis(relacion, estado, parametros))
+    relaciones = np.vstack(relaciones)
+    eventos_series = np.vstack(eventos_series)
+    relacion = relaciones.max(axis=0)
+    evento = eventos_series.max(axis=0)
+
+    # Disparos: muestras en las que empieza un evento combinado
+    evento_anterior = detector['evento']
+    disparos = []
+    for indice in np.flatnonzero(np.diff(evento, prepend=np.int8(evento_anterior)) == 1):
+        tiempo = int(tiempos[indice // MUESTRAS_POR_TRAMA]) + (indice % MUESTRAS_POR_TRAMA) / F_MUESTREO
+        disparadas = [serie for serie, ev in zip(series, eventos_series[:, indice]) if ev]
+        disparos.append({'tiempo': tiempo, 'series': disparadas, 'relacion': float(relacion[indice])})
+
+    eventos = []
+    registrar_eventos(evento, evento_anterior, relacion, tiempos, detector['eventos'], eventos, '', parametros)
+    detector['evento'] = int(evento[-1]) if len(evento) else evento_anterior
+    detector['tramas'] += len(tramas)
+    return disparos, eventos
+
+
+# Arma el mensaje JSON de un disparo. fecha y hora tienen el mismo formato que los parametros que el detector en C
+# pasa a publicar_evento_mqtt.py (aammdd y segundos desde la medianoche).
+def mensaje_disparo(dispositivo_id, disparo):
+    tiempo = int(disparo['tiempo'])
+    fecha = posix_a_fecha(tiempo)
+    return {
+        "id": dispositivo_id,
+        "tipo": "disparo",
+        "fecha": int(fecha[2:4] + fecha[5:7] + fecha[8:10]),
+        "hora": tiempo % 86400,
+        "tiempo": posix_a_fecha(disparo['tiempo']),
+        "canales": disparo['series'],
+        "relacion": round(disparo['relacion'], 3)
+    }
+
+
+# Arma el mensaje JSON de un evento terminado con su ventana de extraccion.
+def mensaje_evento(dispositivo_id, evento):
+    return {
+        "id": dispositivo_id,
+        "tipo": "evento",
+        "inicio": posix_a_fecha(evento['inicio']),
+        "fin": posix_a_fecha(evento['fin']),
+        "duracion": evento['fin'] - evento['inicio'],
+        "primer_disparo": posix_a_fecha(evento['primer_disparo']),
+        "num_disparos": evento['num_disparos'],
+        "relacion_maxima": round(evento['relacion_maxima'], 3)
+    }
+
+
+# Inicia el cliente MQTT. La conexion es asincrona: paho se reconecta solo y el detector no se detiene si el broker
+# no esta disponible.
+def iniciar_cliente_mqtt(config_mqtt, logger):
+    client = mqtt.Client()
+    client.on_connect = lambda client, userdata, flags, rc: logger.info(f"Conectado al broker MQTT. Codigo: {rc}")
+    client.on_disconnect = lambda client, userdata, rc: logger.warning(f"Desconectado del broker MQTT. Codigo: {rc}")
+    client.username_pw_set(config_mqtt["username"], config_mqtt["password"])
+    client.connect_async(config_mqtt["serverAddress"], 1883, 60)
+    client.loop_start()
+    return client
+
+
+# Publica un mensaje en el topico de eventos. Si no hay conexion el mensaje queda en la cola de paho.
+def publicar_mensaje(client, topic, mensaje, logger):
+    mensaje_json = json.dumps(mensaje)
+    if client is None:
+        logger.info(f"Publicacion desactivada: {mensaje_json}")
+        return
+    result = client.publish(topic, mensaje_json, qos=QOS_EVENTOS)
+    if result.rc == mqtt.MQTT_ERR_SUCCESS:
+        logger.info(f"Mensaje publicado en el tópico {topic}: {mensaje_json}")
+    else:
+        logger.warning(f"Mensaje en espera de conexion (codigo {result.rc}) para el tópico {topic}: {mensaje_json}")
+
+
+# Función para inicializar y obtener el logger de un cliente
+def obtener_logger(id_estacion, log_directory, log_filename):
+    global loggers
+    if id_estacion not in loggers:
+        # Crear un logger para el cliente
+        logger = logging.getLogger(id_estacion)
+        logger.setLevel(logging.DEBUG)
+        # Ruta completa del archivo de log
+        log_path = os.path.join(log_directory, log_filename)
+        # Crear manejador de archivo, apuntando al archivo existente
+        file_handler = logging.FileHandler(log_path)
+        file_handler.setLevel(logging.DEBUG)
+        # Crear formato de logging y añadirlo al manejador
+        formatter = logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+        file_handler.setFormatter(formatter)
+        # Añadir el manejador al logger
+        logger.addHandler(file_handler)
+        loggers[id_estacion] = logger
+    return loggers[id_estacion]
+
+#######################################################################################################
+
+############################################ ~Main~ ###################################################
+# Servicio de deteccion de eventos en vivo con las tramas del distribuidor de tramas.
+def main():
+
+    # Obtiene la variable de entorno para definir la ruta de los archivos de configuracion:
+    project_local_root = os.getenv("PROJECT_LOCAL_ROOT")
+    if not project_local_root:
+        print("La variable de entorno no están definida.")
+        return
+
+    config_dispositivo_file = os.path.join(project_local_root, "configuracion", "configuracion_dispositivo.json")
+    config_dispositivo = read_fileJSON(config_dispositivo_file)
+    if config_dispositivo is None:
+        print("No se pudo leer el archivo de configuración del dispositivo. Terminando el programa.")
+        return
+    config_mqtt = read_fileJSON(os.path.join(project_local_root, "configuracion", "configuracion_mqtt.json"))
+    if config_mqtt is None:
+        print("No se pudo leer el archivo de configuración MQTT. Terminando el programa.")
+        return
+    dispositivo_id = config_dispositivo.get("dispositivo", {}).get("id", "Unknown")
+    logger = obtener_logger(dispositivo_id, os.path.join(project_local_root, "log-files"), "detector_eventos.log")
+
+    parametros = leer_parametros(config_dispositivo, logger)
+    detector = crear_detector(parametros)
+    logger.info(f"Detector de eventos iniciado: {parametros}")
+
+    client = None
+    if config_dispositivo.get("dispositivo", {}).get("publicar_eventos", "no") == "si":
+        client = iniciar_cliente_mqtt(config_mqtt, logger)
+    topic = config_mqtt.get("topicPublish", "registrocontinuo/eventos")
+    ruta_socket = sys.argv[1] if len(sys.argv) > 1 else SOCKET_TRAMAS
+
+    # SIGHUP vuelve a leer los parametros sin reiniciar el servicio; SIGTERM (supervisor) termina el servicio despues
+    # de procesar la trama en curso
+    recargar = {'pendiente': False}
+    estado = {'activo': True}
+    signal.signal(signal.SIGHUP, lambda signum, frame: recargar.update(pendiente=True))
+    signal.signal(signal.SIGTERM, lambda signum, frame: estado.update(activo=False))
+
+    try:
+        while estado['activo']:
+            try:
+                for datos_tramas in recibir_tramas(ruta_socket, tramas_por_lectura=1):
+                    if recargar['pendiente']:
+                        recargar['pendiente'] = False
+                        nuevos = leer_parametros(read_fileJSON(config_dispositivo_file) or config_dispositivo, logger)
+                        if nuevos['modo'] != parametros['modo'] or nuevos['canales'] != parametros['canales']:
+                            detector = crear_detector(nuevos)
+                        parametros = nuevos
+                        logger.info(f"Parametros del detector actualizados: {parametros}")
+
+                    disparos, eventos = procesar_tramas(detector, datos_tramas, parametros)
+                    for disparo in disparos:
+                        publicar_mensaje(client, topic, mensaje_disparo(dispositivo_id, disparo), logger)
+                    for evento in eventos:
+                        publicar_mensaje(client, topic, mensaje_evento(dispositivo_id, evento), logger)
+                    if not estado['activo']:
+                        break
+                else:
+                    logger.warning("El distribuidor de tramas cerro la conexion")
+            except OSError as e:
+                logger.warning(f"No se pudo conectar al distribuidor de tramas: {e}")
+            if estado['activo']:
+                time.sleep(ESPERA_RECONEXION)
+    except KeyboardInterrupt:
+        print("Finalizando detector de eventos...")
+    finally:
+        logger.info(f"Detector de eventos finalizado. Tramas procesadas: {detector['tramas']}")
+        if client:
+            client.loop_stop()
+            client.disconnect()
+
+#######################################################################################################
+if __name__ == '__main__':
+    main()
+#######################################################################################################
@@ -0,0 +1,414 @@
+######################################### ~Librerias~ #################################################
+import os
+import csv
+import glob
+import argparse
+from array import array
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from timeit import default_timer as timer
+import numpy as np
+from decodificador_tramas import TAMANO_TRAMA, MUESTRAS_POR_TRAMA, mapear_archivo_tramas, decodificar_tramas, tiempo_absoluto
+from catalogo_archivos import posix_a_fecha
+#######################################################################################################
+
+##################################### ~Variables globales~ ############################################
+# Parametros del detector en C (libraries/detector_eventos.c). Se mantienen los mismos valores por defecto
+# para que los disparos coincidan con los del registro continuo
+F_MUESTREO = 250
+N_STA = 125             # 0.5 segundos * F_MUESTREO
+N_LTA = 12500           # 50 segundos * F_MUESTREO
+VAL_TRIGGER = 4
+VAL_DETRIGGER = 2
+TIEMPO_PRE_EVENTO = 2
+VENTANA_EVENTO = 30
+TIEMPO_ENTRE_EVENTOS = 60
+
+# Canal usado para la deteccion (0: X, 1: Y, 2: Z). El detector en C solo usa el eje Y
+CANAL_DETECCION = 1
+# Conversion de cuentas de 20 bits a gales, igual que ObtenerValorAceleracion
+FACTOR_ACELERACION = 980 / 2 ** 18
+
+# Coeficientes del filtro FIR pasa alto de 1 Hz (ventana Kaiser, orden 63, beta = 5), copiados de detector_eventos.c
+COEFICIENTES_FIR = np.array([
+    -0.0002607120740672, -0.0003948152676513, -0.0005637464517517, -0.0007728729580176,
+    -0.001028015561932, -0.001335475734722, -0.00170207452642, -0.00213520803273,
+    -0.002642925970776, -0.003234042043891, -0.003918287787646, -0.004706525881195,
+    -0.005611045142428, -0.006645968660266, -0.007827820476902, -0.00917631779097,
+    -0.01071548972453, -0.01247527892566, -0.01449387435105, -0.01682118197898,
+    -0.01952412263954, -0.02269497075544, -0.02646496949405, -0.03102756147795,
+    -0.03668020238467, -0.0439047613983, -0.05353560928689, -0.06715178559783,
+    -0.08814138938659, -0.1253204018087, -0.2110265970226, -0.6363397139696,
+    0.6363397139696, 0.2110265970226, 0.1253204018087, 0.08814138938659,
+    0.06715178559783, 0.05353560928689, 0.0439047613983, 0.03668020238467,
+    0.03102756147795, 0.02646496949405, 0.02269497075544, 0.01952412263954,
+    0.01682118197898, 0.01449387435105, 0.01247527892566, 0.01071548972453,
+    0.00917631779097, 0.007827820476902, 0.006645968660266, 0.005611045142428,
+    0.004706525881195, 0.003918287787646, 0.003234042043891, 0.002642925970776,
+    0.00213520803273, 0.00170207452642, 0.001335475734722, 0.001028015561932,
+    0.0007728729580176, 0.0005637464517517, 0.0003948152676513, 0.0002607120740672,
+])
+LONGITUD_HISTORIAL = len(COEFICIENTES_FIR) - 1
+
+# Numero de tramas que se procesan a la vez en el calculo STA/LTA, limita la memoria temporal
+TRAMAS_POR_BLOQUE = 3600
+
+# Columnas del catalogo de eventos
+COLUMNAS_CATALOGO = ['inicio', 'fin', 'duracion', 'primer_disparo', 'ultimo_detrigger', 'num_disparos', 'relacion_maxima', 'archivo']
+#######################################################################################################
+
+######################################### ~Funciones~ #################################################
+# Devuelve los parametros del detector; los que no se indican toman el valor del detector en C.
+def parametros_detector(n_sta=N_STA, n_lta=N_LTA, val_trigger=VAL_TRIGGER, val_detrigger=VAL_DETRIGGER, canal=CANAL_DETECCION,
+                        tiempo_pre_evento=TIEMPO_PRE_EVENTO, ventana_evento=VENTANA_EVENTO, tiempo_entre_eventos=TIEMPO_ENTRE_EVENTOS):
+    return {'n_sta': n_sta, 'n_lta': n_lta, 'val_trigger': val_trigger, 'val_detrigger': val_detrigger, 'canal': canal,
+            'tiempo_pre_evento': tiempo_pre_evento, 'ventana_evento': ventana_evento, 'tiempo_entre_eventos': tiempo_entre_eventos}
+
+
+# Crea el estado del detector, equivalente a las variables static de detector_eventos.c. Se pasa de un archivo
+# al siguiente para que el filtro, el STA/LTA y los eventos continuen como si el registro no se hubiera cortado.
+def crear_estado():
+    return {
+        'historial_fir': np.zeros(LONGITUD_HISTORIAL, dtype=np.float64),
+        'sta': 0.0,
+        'lta': 0.0,
+        'contador': 0,          # Muestras procesadas (hasta n_lta - 1), igual que contadorMuestras
+        'evento': 0,            # Salida de calcularIsEvento para la ultima muestra
+        'activo': None,         # Evento en curso (entre el trigger y el detrigger)
+        'pendiente': None,      # Evento terminado que espera tiempo_entre_eventos antes de emitirse
+        'muestras': 0,
+    }
+
+
+# Convierte las muestras de un canal a aceleracion en gales. En C el resultado se redondea a float.
+def aceleracion(valores):
+    return (valores * FACTOR_ACELERACION).astype(np.float32)
+
+
+# Lee un archivo binario y devuelve el tiempo de cada trama y la aceleracion del canal de deteccion.
+def leer_canal(archivo_binario, canal=CANAL_DETECCION, offset=0, num_tramas=None):
+    tramas = mapear_archivo_tramas(archivo_binario, offset, num_tramas)
+    tiempos = tiempo_absoluto(tramas)
+    valores = aceleracion(decodificar_tramas(tramas)[canal])
+    del tramas
+    return tiempos, valores
+
+
+# Devuelve las ultimas muestras de aceleracion de un archivo, que forman el historial del filtro FIR
+# para el archivo siguiente.
+def historial_archivo(archivo_binario, canal=CANAL_DETECCION):
+    num_tramas = os.path.getsize(archivo_binario) // TAMANO_TRAMA
+    if num_tramas == 0:
+        return None
+    _, valores = leer_canal(archivo_binario, canal, (num_tramas - 1) * TAMANO_TRAMA, 1)
+    return valores[-LONGITUD_HISTORIAL:].astype(np.float64)
+
+
+# Aplica el filtro FIR a todo el arreglo. Para obtener los mismos valores que calcular_Salida_Filtro se acumula
+# en double en el mismo orden que en C (coeficiente 0 con la muestra actual, 1 con la anterior, ...) y el
+# resultado se redondea a float. historial son las 63 muestras anteriores (ceros al iniciar el filtro).
+def filtrar_fir(valores, historial):
+    entrada = np.concatenate((historial, valores.astype(np.float64)))
+    num_muestras = len(valores)
+    acumulado = COEFICIENTES_FIR[0] * entrada[LONGITUD_HISTORIAL:]
+    for k in range(1, len(COEFICIENTES_FIR)):
+        acumulado += COEFICIENTES_FIR[k] * entrada[LONGITUD_HISTORIAL - k:LONGITUD_HISTORIAL - k + num_muestras]
+    return acumulado.astype(np.float32), entrada[-LONGITUD_HISTORIAL:].copy()
+
+
+# Calcula el STA y el LTA recursivos exactamente como calcular_STA_recursivo y calcular_LTA_recursivo: cada
+# operacion en float se redondea con un array('f'), en el mismo orden que en C. La recursion es secuencial, por lo
+# que es la unica parte que recorre las muestras una a una.
+def sta_lta_exacto(filtrado, estado, parametros):
+    n_sta = float(parametros['n_sta'])
+    n_lta = float(parametros['n_lta'])
+    redondeo = array('f', [0.0])
+    sta = array('f', bytes(4 * len(filtrado)))
+    lta = array('f', bytes(4 * len(filtrado)))
+    s = estado['sta']
+    l = estado['lta']
+    i = 0
+    for x in filtrado.tolist():
+        redondeo[0] = x * x
+        q = redondeo[0]
+        # valSTA = valSTA_ant + (double)((numCuad_STA - valSTA_ant) / n_STA)
+        redondeo[0] = q - s
+        redondeo[0] = redondeo[0] / n_sta
+        redondeo[0] = s + redondeo[0]
+        s = redondeo[0]
+        redondeo[0] = q - l
+        redondeo[0] = redondeo[0] / n_lta
+        redondeo[0] = l + redondeo[0]
+        l = redondeo[0]
+        sta[i] = s
+        lta[i] = l
+        i += 1
+    estado['sta'] = s
+    estado['lta'] = l
+    return np.frombuffer(sta, dtype=np.float32), np.frombuffer(lta, dtype=np.float32)
+
+
+# Calcula el STA y el LTA recursivos en double con un filtro IIR de primer orden vectorizado (scipy.signal.lfilter).
+# Con una hora de datos a 250 Hz (900000 muestras) tardo 0.022 s contra 1.02 s de sta_lta_exacto en la PC de
+# desarrollo (unas 46 veces menos), pero difiere del detector en C en el redondeo (del orden de 1e-5 en la
+# relacion), por lo que un disparo muy cerca del umbral puede moverse una muestra.
+def sta_lta_rapido(filtrado, estado, parametros):
+    from scipy.signal import lfilter
+    cuadrado = np.square(filtrado, dtype=np.float64)
+    resultados = []
+    for clave, n in (('sta', parametros['n_sta']), ('lta', parametros['n_lta'])):
+        a = 1.0 - 1.0 / n
+        resultado, _ = lfilter([1.0 / n], [1.0, -a], cuadrado, zi=[a * estado[clave]])
+        estado[clave] = float(resultado[-1]) if len(resultado) else estado[clave]
+        resultados.append(resultado)
+    return resultados[0], resultados[1]
+
+
+# Devuelve la relacion STA/LTA en float. Igual que en C, es 0 durante las primeras n_lta - 1 muestras desde el
+# inicio del detector o si alguno de los dos valores es 0.
+def relacion_sta_lta(sta, lta, estado, parametros):
+    relacion = np.zeros(len(sta), dtype=np.float32)
+    validas = (sta != 0) & (lta != 0)
+    sin_completar = max(0, parametros['n_lta'] - 1 - estado['contador'])
+    validas[:sin_completar] = False
+    estado['contador'] = min(parametros['n_lta'] - 1, estado['contador'] + len(sta))
+    np.divide(sta.astype(np.float32), lta.astype(np.float32), out=relacion, where=validas)
+    return relacion
+
+
+# Aplica la histeresis de calcularIsEvento sin recorrer las muestras: desde cada trigger (relacion >= val_trigger)
+# se busca el siguiente detrigger (relacion < val_detrigger) y viceversa. Devuelve el valor de evento de cada muestra.
+def aplicar_histeresis(relacion, estado, parametros):
+    evento = np.zeros(len(relacion), dtype=np.int8)
+    triggers = np.flatnonzero(relacion >= parametros['val_trigger'])
+    detriggers = np.flatnonzero(relacion < parametros['val_detrigger'])
+    actual = estado['evento']
+    posicion = 0
+    while posicion < len(relacion):
+        if actual == 0:
+            siguiente = np.searchsorted(triggers, posicion)
+            if siguiente == len(triggers):
+                break
+            posicion = int(triggers[siguiente])
+            actual = 1
+        else:
+            siguiente = np.searchsorted(detriggers, posicion)
+            fin = int(detriggers[siguiente]) if siguiente < len(detriggers) else len(relacion)
+            evento[posicion:fin] = 1
+            posicion = fin
+            if fin < len(relacion):
+                actual = 0
+    estado['evento'] = actual
+    return evento
+
+
+# Devuelve la primera muestra en [inicio, fin) cuya trama tiene un tiempo mayor o igual al limite, o None.
+def _primera_muestra(tiempos, inicio, fin, limite):
+    if inicio >= fin:
+        return None
+    trama_inicio = inicio // MUESTRAS_POR_TRAMA
+    trama_fin = (fin - 1) // MUESTRAS_POR_TRAMA + 1
+    tramas = np.flatnonzero(tiempos[trama_inicio:trama_fin] >= limite)
+    if len(tramas) == 0:
+        return None
+    return max(inicio, (trama_inicio + int(tramas[0])) * MUESTRAS_POR_TRAMA)
+
+
+# Emite el evento pendiente si en [inicio, fin) hay una muestra (sin evento) tiempo_entre_eventos despues de su fin.
+def _emitir_pendiente(tiempos, inicio, fin, estado, eventos, parametros):
+    pendiente = estado['pendiente']
+    if pendiente is None or _primera_muestra(tiempos, inicio, fin, pendiente['fin'] + parametros['tiempo_entre_eventos']) is None:
+        return
+    eventos.append(pendiente)
+    estado['pendiente'] = None
+
+
+# Agrupa los disparos en eventos con la misma logica que DetectarEvento: la ventana del evento se amplia con un
+# tiempo de pre evento antes y despues, y un disparo que ocurre antes de tiempo_entre_eventos desde el fin del
+# anterior se une a el. evento_anterior es el valor de evento de la muestra previa al bloque. Se usa el tiempo
+# absoluto de las tramas en lugar de la hora del dia, por lo que los eventos que cruzan la medianoche no necesitan
+# las correcciones de 86400 s del codigo en C.
+def registrar_eventos(evento, evento_anterior, relacion, tiempos, estado, eventos, archivo, parametros):
+    cambios = np.flatnonzero(np.diff(evento, prepend=np.int8(evento_anterior)))
+    inicio_segmento = 0
+    for indice in list(cambios) + [len(evento)]:
+        indice = int(indice)
+        # Tramo [inicio_segmento, indice) sin cambios de estado
+        if estado['activo'] is not None:
+            if indice > inicio_segmento:
+                maximo = float(relacion[inicio_segmento:indice].max())
+                estado['activo']['relacion_maxima'] = max(estado['activo']['relacion_maxima'], maximo)
+        else:
+            _emitir_pendiente(tiempos, inicio_segmento, indice, estado, eventos, parametros)
+        if indice == len(evento):
+            break
+
+        tiempo_trama = int(tiempos[indice // MUESTRAS_POR_TRAMA])
+        tiempo_muestra = tiempo_trama + (indice % MUESTRAS_POR_TRAMA) / F_MUESTREO
+        if evento[indice] == 1:
+            # Inicio de evento: si hay un evento pendiente se continua desde su inicio
+            pendiente = estado['pendiente']
+            estado['activo'] = {
+                'inicio': pendiente['inicio'] if pendiente else tiempo_trama,
+                'primer_disparo': pendiente['primer_disparo'] if pendiente else tiempo_muestra,
+                'num_disparos': (pendiente['num_disparos'] if pendiente else 0) + 1,
+                'relacion_maxima': pendiente['relacion_maxima'] if pendiente else 0.0,
+                'archivo': pendiente['archivo'] if pendiente else os.path.basename(archivo),
+            }
+            inicio_segmento = indice
+        else:
+            # Fin de evento: antes se revisa el pendiente en esta misma muestra, como en C
+            _emitir_pendiente(tiempos, indice, indice + 1, estado, eventos, parametros)
+            activo = estado['activo']
+            duracion = tiempo_trama - activo['inicio']
+            ventana = parametros['ventana_evento']
+            pre_evento = (ventana - duracion) // 2 if ventana >= duracion else parametros['tiempo_pre_evento']
+            activo['inicio'] -= pre_evento
+            activo['fin'] = tiempo_trama + pre_evento
+            activo['ultimo_detrigger'] = tiempo_muestra
+            estado['pendiente'] = activo
+            estado['activo'] = None
+            inicio_segmento = indice + 1
+
+
+# Aplica el STA/LTA y la deteccion a la salida del filtro de un archivo, por bloques de tramas.
+def detectar_archivo(filtrado, tiempos, estado, parametros, eventos, archivo, exacto=True):
+    calcular_sta_lta = sta_lta_exacto if exacto else sta_lta_rapido
+    muestras_bloque = TRAMAS_POR_BLOQUE * MUESTRAS_POR_TRAMA
+    for inicio in range(0, len(filtrado), muestras_bloque):
+        bloque = filtrado[inicio:inicio + muestras_bloque]
+        sta, lta = calcular_sta_lta(bloque, estado, parametros)
+        relacion = relacion_sta_lta(sta, lta, estado, parametros)
+        evento_anterior = estado['evento']
+        evento = aplicar_histeresis(relacion, estado, parametros)
+        trama_inicio = inicio // MUESTRAS_POR_TRAMA
+        registrar_eventos(evento, evento_anterior, relacion, tiempos[trama_inicio:trama_inicio + TRAMAS_POR_BLOQUE], estado, eventos, archivo, parametros)
+    estado['muestras'] += len(filtrado)
+
+
+# Decodifica y filtra un archivo (se ejecuta en los procesos del pool). El historial del filtro se toma del archivo
+# anterior de la lista; el proceso principal comprueba que coincide con el que realmente dejo el archivo anterior.
+def _preparar_archivo(archivo_binario, archivo_anterior, canal):
+    historial = None
+    if archivo_anterior is not None:
+        historial = historial_archivo(archivo_anterior, canal)
+    if historial is None:
+        historial = np.zeros(LONGITUD_HISTORIAL, dtype=np.float64)
+    tiempos, valores = leer_canal(archivo_binario, canal)
+    filtrado, historial_final = filtrar_fir(valores, historial)
+    return tiempos, filtrado, historial, historial_final
+
+
+# Procesa los archivos en orden con un estado continuo. La decodificacion y el filtro FIR se reparten en un pool de
+# procesos (un archivo por proceso); el STA/LTA, que depende de la muestra anterior, se calcula en este proceso en el
+# orden de los archivos mientras el pool prepara los siguientes. Devuelve la lista de eventos y el estado final.
+def reprocesar_archivos(archivos_binarios, parametros=None, exacto=True, num_procesos=None, estado=None):
+    parametros = parametros or parametros_detector()
+    estado = estado or crear_estado()
+    eventos = []
+    num_procesos = num_procesos or os.cpu_count() or 1
+
+    def procesar(archivo, resultado):
+        tiempos, filtrado, historial, historial_final = resultado
+        if not np.array_equal(historial, estado['historial_fir']):
+            # El archivo anterior estaba vacio o el estado no empezo en cero: se filtra con el historial correcto
+            _, valores = leer_canal(archivo, parametros['canal'])
+            filtrado, historial_final = filtrar_fir(valores, estado['historial_fir'])
+        if len(filtrado):
+            estado['historial_fir'] = historial_final
+        detectar_archivo(filtrado, tiempos, estado, parametros, eventos, archivo, exacto)
+
+    anteriores = [None] + list(archivos_binarios[:-1])
+    if num_procesos == 1 or len(archivos_binarios) == 1:
+        for archivo, anterior in zip(archivos_binarios, anteriores):
+            procesar(archivo, _preparar_archivo(archivo, anterior, parametros['canal']))
+    else:
+        with ProcessPoolExecutor(max_workers=num_procesos) as pool:
+            # Se limita el numero de archivos preparados en espera para acotar la memoria
+            en_curso = deque()
+            pendientes = iter(zip(archivos_binarios, anteriores))
+            for archivo, anterior in pendientes:
+                en_curso.append((archivo, pool.submit(_preparar_archivo, archivo, anterior, parametros['canal'])))
+                if len(en_curso) > num_procesos:
+                    archivo_listo, futuro = en_curso.popleft()
+                    procesar(archivo_listo, futuro.result())
+            while en_curso:
+                archivo_listo, futuro = en_curso.popleft()
+                procesar(archivo_listo, futuro.result())
+    return eventos, estado
+
+
+# Agrega al final el evento pendiente al terminar los archivos, aunque no haya pasado tiempo_entre_eventos
+# desde su fin.
+def cerrar_eventos(eventos, estado):
+    if estado['pendiente'] is not None:
+        eventos.append(estado['pendiente'])
+        estado['pendiente'] = None
+    return eventos
+
+
+# Guarda el catalogo de eventos en un archivo CSV con los tiempos en UTC.
+def guardar_catalogo(eventos, archivo_salida):
+    with open(archivo_salida, 'w', newline='') as f:
+        escritor = csv.writer(f)
+        escritor.writerow(COLUMNAS_CATALOGO)
+        for evento in eventos:
+            escritor.writerow([
+                posix_a_fecha(evento['inicio']),
+                posix_a_fecha(evento['fin']),
+                evento['fin'] - evento['inicio'],
+                posix_a_fecha(evento['primer_disparo']),
+                posix_a_fecha(evento['ultimo_detrigger']),
+                evento['num_disparos'],
+                f"{evento['relacion_maxima']:.3f}",
+                evento['archivo'],
+            ])
+
+
+# Devuelve la lista ordenada de archivos .dat de los archivos, directorios o patrones glob recibidos.
+def listar_archivos_binarios(origenes):
+    archivos_binarios = []
+    for origen in origenes:
+        if os.path.isdir(origen):
+            origen = os.path.join(origen, '*.dat')
+        archivos_binarios.extend(sorted(f for f in glob.glob(origen) if os.path.isfile(f)))
+    return archivos_binarios
+
+#######################################################################################################
+
+############################################ ~Main~ ###################################################
+def main():
+    parser = argparse.ArgumentParser(description="Reprocesa archivos .dat con el detector STA/LTA de detector_eventos.c y genera un catalogo de eventos.")
+    parser.add_argument('origenes', nargs='+', help="Archivos .dat, directorios o patrones glob (se procesan en orden de nombre)")
+    parser.add_argument('--salida', default='catalogo_eventos.csv', help="Archivo CSV del catalogo de eventos")
+    parser.add_argument('--n-sta', type=int, default=N_STA)
+    parser.add_argument('--n-lta', type=int, default=N_LTA)
+    parser.add_argument('--trigger', type=float, default=VAL_TRIGGER)
+    parser.add_argument('--detrigger', type=float, default=VAL_DETRIGGER)
+    parser.add_argument('--canal', type=int, default=CANAL_DETECCION, choices=(0, 1, 2), help="0: X, 1: Y, 2: Z")
+    parser.add_argument('--rapido', action='store_true', help="STA/LTA vectorizado en double (no identico al detector en C)")
+    parser.add_argument('--procesos', type=int, default=None, help="Procesos para decodificar y filtrar (por defecto, uno por nucleo)")
+    args = parser.parse_args()
+
+    archivos_binarios = listar_archivos_binarios(args.origenes)
+    if not archivos_binarios:
+        print("No se encontraron archivos .dat")
+        return
+
+    parametros = parametros_detector(args.n_sta, args.n_lta, args.trigger, args.detrigger, args.canal)
+    inicio = timer()
+    eventos, estado = reprocesar_archivos(archivos_binarios, parametros, not args.rapido, args.procesos)
+    cerrar_eventos(eventos, estado)
+    duracion = timer() - inicio
+    guardar_catalogo(eventos, args.salida)
+
+    segundos_registro = estado['muestras'] / F_MUESTREO
+    velocidad = segundos_registro / duracion if duracion > 0 else 0
+    print(f"{len(archivos_binarios)} archivos, {segundos_registro / 3600:.1f} h de registro procesadas en {duracion:.1f} s "
+          f"({velocidad:.0f} veces el tiempo real)")
+    print(f"{len(eventos)} eventos guardados en {args.salida}")
+
+#######################################################################################################
+if __name__ == '__main__':
+    main()
+#######################################################################################################
@@ -0,0 +1,333 @@
+######################################### ~Librerias~ #################################################
+import os
+import sys
+import json
+import signal
+import socket
+import logging
+import selectors
+import collections
+import numpy as np
+from time import time as timer
+from decodificador_tramas import TAMANO_TRAMA
+#######################################################################################################
+
+##################################### ~Variables globales~ ############################################
+loggers = {}
+# Pipe en el que registro_continuo escribe cada trama de 1 segundo (PIPE_NAME en registro_continuo.c)
+PIPE_NAME = "/tmp/my_pipe"
+# Socket Unix en el que se publican las tramas para los suscriptores locales
+SOCKET_TRAMAS = "/tmp/tramas.sock"
+# Tramas que se leen del pipe como maximo en cada lectura (tamaño del buffer preasignado)
+TRAMAS_POR_LECTURA = 64
+# Tramas que se guardan por suscriptor; si un suscriptor no las consume se descartan las mas antiguas
+MAX_TRAMAS_COLA = 300
+# Intervalo para registrar las estadisticas del servicio (segundos)
+INTERVALO_ESTADISTICAS = 600
+# Tramas que se envian como maximo en cada llamada a sendmsg
+TRAMAS_POR_ENVIO = 64
+#######################################################################################################
+
+######################################### ~Funciones~ #################################################
+# Lee un archivo de configuración en formato JSON y devuelve su contenido como un diccionario.
+def read_fileJSON(nameFile):
+    try:
+        with open(nameFile, 'r') as f:
+            data = json.load(f)
+        return data
+    except FileNotFoundError:
+        print(f"Archivo {nameFile} no encontrado.")
+        return None
+    except json.JSONDecodeError:
+        print(f"Error al decodificar el archivo {nameFile}.")
+        return None
+
+
+# Devuelve un arreglo booleano que indica, para cada posicion de inicio posible en datos, si los 6 bytes de
+# fecha y hora de una trama que empezara ahi tienen valores validos. No hay bytes de sincronismo en la trama,
+# por lo que la fecha y hora son la unica referencia para encontrar el inicio de una trama.
+def inicios_validos(datos):
+    num_posiciones = len(datos) - TAMANO_TRAMA + 1
+    if num_posiciones <= 0:
+        return np.zeros(0, dtype=bool)
+    tiempo = [datos[TAMANO_TRAMA - 6 + i:TAMANO_TRAMA - 6 + i + num_posiciones] for i in range(6)]
+    return ((tiempo[0] < 100) & (tiempo[1] >= 1) & (tiempo[1] <= 12) & (tiempo[2] >= 1) & (tiempo[2] <= 31) &
+            (tiempo[3] < 24) & (tiempo[4] < 60) & (tiempo[5] < 60))
+
+
+# Busca el inicio de la siguiente trama en los datos leidos cuando se perdio la alineacion. Una posicion se
+# acepta si la fecha y hora de la trama que empieza ahi y de la trama siguiente son validas.
+# Devuelve la posicion encontrada o None si hacen falta mas datos.
+def buscar_alineacion(datos):
+    validos = inicios_validos(datos)
+    for posicion in np.flatnonzero(validos[1:len(validos) - TAMANO_TRAMA]) + 1:
+        if validos[posicion + TAMANO_TRAMA]:
+            return int(posicion)
+    return None
+
+
+# Abre el pipe en modo lectura/escritura: el propio servicio cuenta como escritor, por lo que el pipe no
+# devuelve fin de archivo cada vez que registro_continuo lo cierra despues de escribir una trama.
+def abrir_pipe(ruta_pipe):
+    if not os.path.exists(ruta_pipe):
+        os.mkfifo(ruta_pipe, 0o666)
+    return os.open(ruta_pipe, os.O_RDWR | os.O_NONBLOCK)
+
+
+# Crea el socket Unix de publicacion, reemplazando el archivo de un socket anterior si existe.
+def crear_servidor(ruta_socket):
+    if os.path.exists(ruta_socket):
+        os.remove(ruta_socket)
+    servidor = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    servidor.bind(ruta_socket)
+    os.chmod(ruta_socket, 0o666)
+    servidor.listen()
+    servidor.setblocking(False)
+    return servidor
+
+
+# Acepta un suscriptor nuevo. Cada suscriptor tiene su propia cola acotada y el envio pendiente de la trama actual.
+def agregar_suscriptor(distribuidor, servidor):
+    conexion, _ = servidor.accept()
+    conexion.setblocking(False)
+    suscriptor = {
+        'socket': conexion,
+        'cola': collections.deque(),
+        'pendiente': None,
+        'descartadas': 0,
+        'enviadas': 0
+    }
+    distribuidor['selector'].register(conexion, selectors.EVENT_READ, ('suscriptor', suscriptor))
+    distribuidor['suscriptores'].append(suscriptor)
+    distribuidor['logger'].info(f"Suscriptor conectado. Suscriptores activos: {len(distribuidor['suscriptores'])}")
+
+
+# Cierra la conexion de un suscriptor que se desconecto o fallo.
+def cerrar_suscriptor(distribuidor, suscriptor):
+    distribuidor['selector'].unregister(suscriptor['socket'])
+    suscriptor['socket'].close()
+    distribuidor['suscriptores'].remove(suscriptor)
+    distribuidor['logger'].info(f"Suscriptor desconectado ({suscriptor['enviadas']} tramas enviadas, {suscriptor['descartadas']} descartadas). "
+                                f"Suscriptores activos: {len(distribuidor['suscriptores'])}")
+
+
+# Registra el interes de escritura del suscriptor solo mientras tenga datos pendientes de enviar.
+def actualizar_eventos(distribuidor, suscriptor):
+    eventos = selectors.EVENT_READ
+    if suscriptor['pendiente'] is not None or suscriptor['cola']:
+        eventos |= selectors.EVENT_WRITE
+    distribuidor['selector'].modify(suscriptor['socket'], eventos, ('suscriptor', suscriptor))
+
+
+# Envia al suscriptor todo lo que el socket acepte sin bloquear. Las tramas se envian completas: si un envio
+# queda a medias, el resto se guarda en 'pendiente' y se completa antes de la siguiente trama.
+def enviar_pendientes(distribuidor, suscriptor):
+    while suscriptor['pendiente'] is not None or suscriptor['cola']:
+        buffers = [] if suscriptor['pendiente'] is None else [suscriptor['pendiente']]
+        while suscriptor['cola'] and len(buffers) < TRAMAS_POR_ENVIO:
+            buffers.append(memoryview(suscriptor['cola'].popleft()))
+        try:
+            enviados = suscriptor['socket'].sendmsg(buffers)
+        except BlockingIOError:
+            enviados = 0
+        except OSError:
+            cerrar_suscriptor(distribuidor, suscriptor)
+            return
+
+        # Lo que no se envio vuelve a la cola en el mismo orden
+        suscriptor['pendiente'] = None
+        for i, buffer in enumerate(buffers):
+            if enviados >= len(buffer):
+                enviados -= len(buffer)
+                suscriptor['enviadas'] += 1
+                continue
+            suscriptor['pendiente'] = buffer[enviados:]
+            suscriptor['cola'].extendleft(reversed([b.obj for b in buffers[i + 1:]]))
+            break
+        if suscriptor['pendiente'] is not None:
+            break
+    actualizar_eventos(distribuidor, suscriptor)
+
+
+# Agrega una trama a la cola de cada suscriptor. Si la cola esta llena se descarta la trama mas antigua,
+# de modo que un suscriptor lento nunca detiene la lectura del pipe ni a los demas suscriptores.
+# Todos los suscriptores comparten el mismo objeto de la trama, no se copia por suscriptor.
+def distribuir_trama(distribuidor, trama):
+    for suscriptor in distribuidor['suscriptores']:
+        if len(suscriptor['cola']) >= MAX_TRAMAS_COLA:
+            suscriptor['cola'].popleft()
+            suscriptor['descartadas'] += 1
+            distribuidor['descartadas'] += 1
+        suscriptor['cola'].append(trama)
+
+
+# Lee del pipe sobre el buffer preasignado y distribuye las tramas completas. Los bytes de una trama
+# incompleta se mueven al inicio del buffer para completarla en la siguiente lectura.
+def leer_pipe(distribuidor):
+    buffer = distribuidor['buffer']
+    vista = distribuidor['vista']
+    try:
+        leidos = os.readv(distribuidor['pipe'], [vista[distribuidor['llenado']:]])
+    except BlockingIOError:
+        return
+    distribuidor['llenado'] += leidos
+
+    datos = np.frombuffer(buffer, dtype=np.uint8, count=distribuidor['llenado'])
+    posicion = 0
+    while distribuidor['llenado'] - posicion >= TAMANO_TRAMA:
+        if not inicios_validos(datos[posicion:posicion + TAMANO_TRAMA])[0]:
+            nueva_posicion = buscar_alineacion(datos[posicion:])
+            if nueva_posicion is None:
+                # Se conserva solo lo necesario para encontrar la alineacion en la siguiente lectura
+                posicion = max(posicion, distribuidor['llenado'] - 2 * TAMANO_TRAMA + 1)
+                break
+            distribuidor['logger'].warning(f"Trama desalineada: se descartaron {nueva_posicion} bytes")
+            distribuidor['realineaciones'] += 1
+            posicion += nueva_posicion
+            continue
+        distribuir_trama(distribuidor, bytes(vista[posicion:posicion + TAMANO_TRAMA]))
+        distribuidor['tramas'] += 1
+        posicion += TAMANO_TRAMA
+
+    for suscriptor in list(distribuidor['suscriptores']):
+        enviar_pendientes(distribuidor, suscriptor)
+
+    restantes = distribuidor['llenado'] - posicion
+    if restantes and posicion:
+        buffer[:restantes] = buffer[posicion:distribuidor['llenado']]
+    distribuidor['llenado'] = restantes
+
+
+# Registra las estadisticas acumuladas del servicio.
+def registrar_estadisticas(distribuidor):
+    distribuidor['logger'].info(f"Tramas recibidas: {distribuidor['tramas']}. Realineaciones: {distribuidor['realineaciones']}. "
+                                f"Suscriptores: {len(distribuidor['suscriptores'])}. Tramas descartadas por suscriptores lentos: {distribuidor['descartadas']}")
+
+
+# Se conecta al socket del distribuidor y devuelve las tramas recibidas como bloques de bytes de tramas
+# completas (hasta tramas_por_lectura tramas por bloque). Lo usan los procesos suscriptores.
+def recibir_tramas(ruta_socket=SOCKET_TRAMAS, tramas_por_lectura=1):
+    cliente = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    cliente.connect(ruta_socket)
+    buffer = bytearray(tramas_por_lectura * TAMANO_TRAMA)
+    vista = memoryview(buffer)
+    llenado = 0
+    try:
+        while True:
+            leidos = cliente.recv_into(vista[llenado:])
+            if leidos == 0:
+                return
+            llenado += leidos
+            completos = (llenado // TAMANO_TRAMA) * TAMANO_TRAMA
+            if completos:
+                yield bytes(vista[:completos])
+                buffer[:llenado - completos] = buffer[completos:llenado]
+                llenado -= completos
+    finally:
+        cliente.close()
+
+
+# Función para inicializar y obtener el logger de un cliente
+def obtener_logger(id_estacion, log_directory, log_filename):
+    global loggers
+    if id_estacion not in loggers:
+        # Crear un logger para el cliente
+        logger = logging.getLogger(id_estacion)
+        logger.setLevel(logging.DEBUG)
+        # Ruta completa del archivo de log
+        log_path = os.path.join(log_directory, log_filename)
+        # Crear manejador de archivo, apuntando al archivo existente
+        file_handler = logging.FileHandler(log_path)
+        file_handler.setLevel(logging.DEBUG)
+        # Crear formato de logging y añadirlo al manejador
+        formatter = logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+        file_handler.setFormatter(formatter)
+        # Añadir el manejador al logger
+        logger.addHandler(file_handler)
+        loggers[id_estacion] = logger
+    return loggers[id_estacion]
+
+#######################################################################################################
+
+############################################ ~Main~ ###################################################
+def main():
+
+    # Obtiene la variable de entorno para definir la ruta de los archivos de configuracion:
+    project_local_root = os.getenv("PROJECT_LOCAL_ROOT")
+    if not project_local_root:
+        print("La variable de entorno no están definida.")
+        return
+
+    config_dispositivo = read_fileJSON(os.path.join(project_local_root, "configuracion", "configuracion_dispositivo.json"))
+    if config_dispositivo is None:
+        print("No se pudo leer el archivo de configuración del dispositivo. Terminando el programa.")
+        return
+    dispositivo_id = config_dispositivo.get("dispositivo", {}).get("id", "Unknown")
+    logger = obtener_logger(dispositivo_id, os.path.join(project_local_root, "log-files"), "distribuidor_tramas.log")
+
+    ruta_pipe = sys.argv[1] if len(sys.argv) > 1 else PIPE_NAME
+    ruta_socket = sys.argv[2] if len(sys.argv) > 2 else SOCKET_TRAMAS
+
+    buffer = bytearray(TRAMAS_POR_LECTURA * TAMANO_TRAMA)
+    distribuidor = {
+        'logger': logger,
+        'selector': selectors.DefaultSelector(),
+        'pipe': abrir_pipe(ruta_pipe),
+        'buffer': buffer,
+        'vista': memoryview(buffer),
+        'llenado': 0,
+        'suscriptores': [],
+        'tramas': 0,
+        'realineaciones': 0,
+        'descartadas': 0
+    }
+    servidor = crear_servidor(ruta_socket)
+    distribuidor['selector'].register(distribuidor['pipe'], selectors.EVENT_READ, ('pipe', None))
+    distribuidor['selector'].register(servidor, selectors.EVENT_READ, ('servidor', None))
+
+    logger.info(f"Distribuidor de tramas iniciado: {ruta_pipe} -> {ruta_socket}")
+    print(f"Distribuidor de tramas iniciado: {ruta_pipe} -> {ruta_socket}")
+
+    # Supervisor detiene el servicio con SIGTERM; el loop termina despues de atender los eventos en curso y se borra el socket
+    estado = {'activo': True}
+    signal.signal(signal.SIGTERM, lambda signum, frame: estado.update(activo=False))
+
+    ultimo_registro = timer()
+    try:
+        while estado['activo']:
+            for clave, eventos in distribuidor['selector'].select(timeout=1):
+                tipo, suscriptor = clave.data
+                if tipo == 'pipe':
+                    leer_pipe(distribuidor)
+                elif tipo == 'servidor':
+                    agregar_suscriptor(distribuidor, servidor)
+                elif suscriptor in distribuidor['suscriptores']:
+                    if eventos & selectors.EVENT_READ:
+                        # Los suscriptores no envian datos: una lectura vacia o con error indica desconexion
+                        try:
+                            datos = suscriptor['socket'].recv(4096)
+                        except BlockingIOError:
+                            datos = None
+                        except OSError:
+                            datos = b''
+                        if datos == b'':
+                            cerrar_suscriptor(distribuidor, suscriptor)
+                            continue
+                    if eventos & selectors.EVENT_WRITE:
+                        enviar_pendientes(distribuidor, suscriptor)
+            if timer() - ultimo_registro >= INTERVALO_ESTADISTICAS:
+                registrar_estadisticas(distribuidor)
+                ultimo_registro = timer()
+    except KeyboardInterrupt:
+        print("Finalizando distribuidor de tramas...")
+    finally:
+        registrar_estadisticas(distribuidor)
+        servidor.close()
+        if os.path.exists(ruta_socket):
+            os.remove(ruta_socket)
+        os.close(distribuidor['pipe'])
+
+#######################################################################################################
+if __name__ == '__main__':
+    main()
+#######################################################################################################
@@ -0,0 +1,174 @@
+######################################### ~Librerias~ #################################################
+import io
+import os
+import sys
+import json
+import time
+import datetime
+import threading
+from lector_registro import read_range, abrir_catalogo_local
+from catalogo_archivos import fecha_a_posix
+#######################################################################################################
+
+##################################### ~Variables globales~ ############################################
+# Formato de los archivos Mini-SEED de eventos
+ENCODING_MSEED = 'STEIM1'
+RECLEN_MSEED = 512
+#######################################################################################################
+
+######################################### ~Funciones~ #################################################
+# Lee un archivo de configuración en formato JSON y devuelve su contenido como un diccionario.
+def read_fileJSON(nameFile):
+    try:
+        with open(nameFile, 'r') as f:
+            data = json.load(f)
+        return data
+    except FileNotFoundError:
+        print(f"Archivo {nameFile} no encontrado.")
+        return None
+    except json.JSONDecodeError:
+        print(f"Error al decodificar el archivo {nameFile}.")
+        return None
+
+
+# Nombre de los archivos de un evento: <estacion>_<aaaammdd>_<hhmmss>_<milisegundos>_<duracion en ms><extension>.
+# Se conservan los milisegundos del inicio y de la duracion para que dos solicitudes distintas no escriban el
+# mismo archivo.
+def nombre_evento(estacion, tiempo_inicio, duracion, extension='.mseed'):
+    inicio_ms = int(round(tiempo_inicio * 1000))
+    fecha = datetime.datetime.fromtimestamp(inicio_ms // 1000, datetime.timezone.utc)
+    return f"{estacion}_{fecha.strftime('%Y%m%d_%H%M%S')}_{inicio_ms % 1000:03d}_{int(round(duracion * 1000)):06d}{extension}"
+
+
+# Arma el Mini-SEED de un resultado de lector_registro.read_range, una traza por canal, y lo devuelve como bytes.
+# Los nombres de canal son los de binary_to_mseed. Los huecos no se rellenan: cada tramo con datos se escribe
+# como una traza independiente.
+def mseed_evento(resultado, config_mseed):
+    import numpy as np
+    from obspy import Trace, Stream, UTCDateTime
+    from decimador_registro import nombre_canal
+    trazas = []
+    for num_canal, canal in enumerate(resultado['canales']):
+        stats = {
+            'network': config_mseed["RED(19)"],
+            'station': config_mseed["CODIGO(1)"],
+            'location': str(config_mseed["UBICACION(17)"]),
+            'channel': nombre_canal(resultado['f_muestreo'], config_mseed, 'xyz'.index(canal)),
+            'sampling_rate': resultado['f_muestreo'],
+            'mseed': {'dataquality': config_mseed["CALIDAD(16)"]},
+            'starttime': UTCDateTime(resultado['tiempo_inicio'])
+        }
+        datos = np.ma.masked_array(resultado['datos'][num_canal], mask=~resultado['mascara'])
+        trazas.append(Trace(data=datos, header=stats))
+    salida = io.BytesIO()
+    Stream(trazas).split().write(salida, format='MSEED', encoding=ENCODING_MSEED, reclen=RECLEN_MSEED)
+    return salida.getvalue()
+
+
+# Escribe un archivo de forma atomica (temporal y os.replace). Si ya existe un archivo con el mismo contenido
+# (solicitud repetida) no se reescribe.
+def guardar_archivo(ruta, datos):
+    if os.path.exists(ruta) and os.path.getsize(ruta) == len(datos):
+        with open(ruta, 'rb') as f:
+            if f.read() == datos:
+                return
+    temporal = ruta + f".tmp{os.getpid()}-{threading.get_ident()}"
+    with open(temporal, 'wb') as f:
+        f.write(datos)
+    os.replace(temporal, ruta)
+
+
+# Escribe los archivos de un evento a partir de las muestras ya leidas: el Mini-SEED y, si se pide, la copia
+# cruda .dat con las tramas originales (el resultado debe venir de read_range con conservar_tramas=True).
+# Devuelve un diccionario con las rutas ('mseed', 'dat'), la cobertura (fraccion de muestras con datos) y los
+# bytes del mseed. Lanza ValueError si la ventana no tiene datos.
+def escribir_evento(resultado, tiempo_inicio, duracion, config_mseed, directorio_salida, copia_dat=False):
+    presentes = int(resultado['mascara'].sum())
+    if presentes == 0:
+        raise ValueError("No hay datos del registro continuo en la ventana solicitada")
+    estacion = config_mseed["CODIGO(1)"]
+    datos_mseed = mseed_evento(resultado, config_mseed)
+    evento = {
+        'mseed': os.path.join(directorio_salida, nombre_evento(estacion, tiempo_inicio, duracion)),
+        'dat': None,
+        'cobertura': round(presentes / len(resultado['mascara']), 4),
+        'archivos': resultado['archivos'],
+        'datos_mseed': datos_mseed
+    }
+    guardar_archivo(evento['mseed'], datos_mseed)
+    if copia_dat:
+        if 'tramas' not in resultado:
+            raise ValueError("El resultado no tiene las tramas crudas (read_range sin conservar_tramas)")
+        evento['dat'] = os.path.join(directorio_salida, nombre_evento(estacion, tiempo_inicio, duracion, '.dat'))
+        guardar_archivo(evento['dat'], resultado['tramas'].tobytes())
+    return evento
+
+
+# Extrae un evento del registro continuo y lo escribe en Mini-SEED directamente desde memoria. Reemplaza la cadena
+# extraerevento -> binary_to_mseed.py 2: read_range salta con el indice .idx a la primera trama de la ventana en
+# cada archivo y solo lee y decodifica esas tramas, aunque la ventana cruce varios archivos o la medianoche.
+# La copia .dat cruda solo se escribe con copia_dat, con las mismas tramas leidas (sin otra lectura). Con
+# actualizar, el catalogo se actualiza antes de buscar (ver read_range).
+def extraer_evento(estacion, tiempo_inicio, duracion, config_mseed, directorio_salida, conexion=None, directorios=None,
+                   copia_dat=False, actualizar=False):
+    resultado = read_range(estacion, tiempo_inicio, tiempo_inicio + duracion, conexion=conexion, directorios=directorios,
+                           conservar_tramas=copia_dat, actualizar=actualizar)
+    return escribir_evento(resultado, tiempo_inicio, duracion, config_mseed, directorio_salida, copia_dat)
+
+#######################################################################################################
+
+############################################ ~Main~ ###################################################
+# Extrae un evento a eventos-extraidos y, con --subir, agrega el mseed a la cola de subidas a Drive (tipo evento).
+def main():
+    uso = "Uso: extractor_eventos.py <aaaa-mm-ddTHH:MM:SS> <duracion_s> [--dat] [--subir] [--destino directorio]"
+    argumentos = sys.argv[1:]
+    if len(argumentos) < 2:
+        print(uso)
+        return
+    try:
+        tiempo_inicio = fecha_a_posix(argumentos[0])
+        duracion = float(argumentos[1])
+    except ValueError:
+        print(uso)
+        return
+    project_local_root = os.getenv("PROJECT_LOCAL_ROOT")
+    if not project_local_root:
+        print("La variable de entorno no están definida.")
+        return
+    config_dispositivo = read_fileJSON(os.path.join(project_local_root, "configuracion", "configuracion_dispositivo.json"))
+    config_mseed = read_fileJSON(os.path.join(project_local_root, "configuracion", "configuracion_mseed.json"))
+    if config_dispositivo is None or config_mseed is None:
+        return
+    destino = config_dispositivo.get("directorios", {}).get("eventos_extraidos", ".")
+    if '--destino' in argumentos and argumentos.index('--destino') + 1 < len(argumentos):
+        destino = argumentos[argumentos.index('--destino') + 1]
+
+    conexion, directorios = abrir_catalogo_local()
+    try:
+        inicio = time.time()
+        evento = extraer_evento(config_dispositivo.get("dispositivo", {}).get("id", "Unknown"), tiempo_inicio, duracion,
+                                config_mseed, destino, conexion, directorios, '--dat' in argumentos, actualizar=True)
+    except ValueError as e:
+        print(e)
+        return
+    finally:
+        conexion.close()
+    print(f"Evento extraido en {time.time() - inicio:.2f} s (cobertura {evento['cobertura']:.1%}) de:")
+    for archivo in evento['archivos']:
+        print(f"  {archivo}")
+    for ruta in (evento['mseed'], evento['dat']):
+        if ruta is not None:
+            print(ruta)
+
+    if '--subir' in argumentos:
+        sys.path.append(os.path.join(project_local_root, "scripts", "drive"))
+        from cola_subidas import abrir_cola_local, encolar_archivo
+        # Solo se sube el mseed; la copia .dat queda en el equipo
+        cola = abrir_cola_local(project_local_root)
+        encolar_archivo(cola, evento['mseed'], 'evento', True)
+        cola.close()
+
+#######################################################################################################
+if __name__ == '__main__':
+    main()
+#######################################################################################################
@@ -0,0 +1,168 @@
+######################################### ~Librerias~ #################################################
+import os
+import sys
+import glob
+import numpy as np
+from decodificador_tramas import TAMANO_TRAMA, mapear_archivo_tramas, tiempo_absoluto
+#######################################################################################################
+
+##################################### ~Variables globales~ ############################################
+# Indice de tramas: archivo .idx junto a cada .dat con un registro por trama (17 bytes):
+# tiempo absoluto de la trama (segundos POSIX), posicion en bytes dentro del .dat y banderas
+DTYPE_INDICE = np.dtype([
+    ('tiempo', '<i8'),
+    ('offset', '<i8'),
+    ('flags', 'u1')
+])
+EXTENSION_INDICE = '.idx'
+
+# Banderas de cada trama
+FLAG_HUECO_PREVIO = 0x01        # Faltan segundos entre la trama anterior y esta
+FLAG_TIEMPO_NO_MONOTONO = 0x02  # El tiempo es igual o menor al de la trama anterior (reloj reiniciado)
+FLAG_FECHA_INVALIDA = 0x04      # Mes, dia u hora fuera de rango
+#######################################################################################################
+
+######################################### ~Funciones~ #################################################
+# Devuelve la ruta del indice de un archivo binario: mismo nombre con extension .idx
+def ruta_indice(archivo_binario):
+    return os.path.splitext(archivo_binario)[0] + EXTENSION_INDICE
+
+
+# Calcula las banderas de cada trama a partir de sus tiempos. tiempo_anterior es el tiempo de la ultima trama
+# ya indexada, para que las banderas sean correctas al agregar tramas a un indice existente.
+def calcular_flags(tramas, tiempos, tiempo_anterior=None):
+    flags = np.zeros(len(tiempos), dtype=np.uint8)
+    if len(tiempos) == 0:
+        return flags
+    if tiempo_anterior is None:
+        saltos = np.diff(tiempos, prepend=tiempos[0] - 1)
+    else:
+        saltos = np.diff(tiempos, prepend=tiempo_anterior)
+    flags[saltos > 1] |= FLAG_HUECO_PREVIO
+    flags[saltos < 1] |= FLAG_TIEMPO_NO_MONOTONO
+
+    fecha = tramas['fecha']
+    hora = tramas['hora']
+    invalidas = ((fecha[:, 1] < 1) | (fecha[:, 1] > 12) | (fecha[:, 2] < 1) | (fecha[:, 2] > 31) |
+                 (hora[:, 0] > 23) | (hora[:, 1] > 59) | (hora[:, 2] > 59))
+    flags[invalidas] |= FLAG_FECHA_INVALIDA
+    return flags
+
+
+# Lee el indice de un archivo binario. Devuelve un arreglo vacio si no existe o si no corresponde al binario
+# (indexa mas tramas de las que tiene el archivo). Un registro incompleto al final, por una escritura
+# interrumpida, se descarta.
+def cargar_indice(archivo_binario):
+    archivo_indice = ruta_indice(archivo_binario)
+    if not os.path.isfile(archivo_indice) or not os.path.isfile(archivo_binario):
+        return np.zeros(0, dtype=DTYPE_INDICE)
+    num_registros = os.path.getsize(archivo_indice) // DTYPE_INDICE.itemsize
+    indice = np.fromfile(archivo_indice, dtype=DTYPE_INDICE, count=num_registros)
+    if num_registros * TAMANO_TRAMA > os.path.getsize(archivo_binario):
+        return np.zeros(0, dtype=DTYPE_INDICE)
+    return indice
+
+
+# Indexa en memoria las tramas de un archivo binario que estan despues de las del indice recibido. Devuelve solo
+# los registros nuevos (vacio si el archivo no crecio); no escribe el .idx.
+def indexar_tramas_nuevas(archivo_binario, indice):
+    num_indexadas = len(indice)
+    offset = num_indexadas * TAMANO_TRAMA
+    tramas = mapear_archivo_tramas(archivo_binario, offset)
+    nuevos = np.empty(len(tramas), dtype=DTYPE_INDICE)
+    if len(tramas) == 0:
+        return nuevos
+    nuevos['tiempo'] = tiempo_absoluto(tramas)
+    nuevos['offset'] = offset + np.arange(len(tramas), dtype=np.int64) * TAMANO_TRAMA
+    tiempo_anterior = int(indice['tiempo'][-1]) if num_indexadas else None
+    nuevos['flags'] = calcular_flags(tramas, nuevos['tiempo'], tiempo_anterior)
+    del tramas
+    return nuevos
+
+
+# Devuelve el indice completo de un archivo binario sin modificar el .idx: el indice guardado mas las tramas
+# escritas despues, indexadas en memoria. Sirve para consultas que no deben escribir en disco.
+def leer_indice(archivo_binario):
+    indice = cargar_indice(archivo_binario)
+    nuevos = indexar_tramas_nuevas(archivo_binario, indice)
+    return np.concatenate((indice, nuevos)) if len(nuevos) else indice
+
+
+# Crea o completa el indice de un archivo binario. Solo se leen las tramas que todavia no estan indexadas,
+# por lo que se puede llamar cada vez que el archivo crece. Devuelve el indice completo.
+def actualizar_indice(archivo_binario):
+    archivo_indice = ruta_indice(archivo_binario)
+    indice = cargar_indice(archivo_binario)
+    num_indexadas = len(indice)
+    nuevos = indexar_tramas_nuevas(archivo_binario, indice)
+    if len(nuevos) == 0:
+        return indice
+
+    # Si el indice existente no era valido se reescribe; si no, se agregan los registros nuevos al final
+    modo = 'ab' if num_indexadas else 'wb'
+    with open(archivo_indice, modo) as f:
+        if num_indexadas:
+            f.truncate(num_indexadas * DTYPE_INDICE.itemsize)
+        nuevos.tofile(f)
+    return np.concatenate((indice, nuevos)) if num_indexadas else nuevos
+
+
+# Devuelve la posicion en el indice de la trama con el tiempo indicado (segundos POSIX) o, si ese segundo
+# falta, de la primera trama posterior. Devuelve None si el tiempo es posterior a la ultima trama.
+# Sin huecos la posicion se calcula directamente; con huecos se usa una busqueda binaria.
+def buscar_trama(indice, tiempo):
+    tiempos = indice['tiempo']
+    if len(tiempos) == 0:
+        return None
+    posicion = int(tiempo - tiempos[0])
+    if 0 <= posicion < len(tiempos) and tiempos[posicion] == tiempo:
+        return posicion
+    if np.any(indice['flags'] & FLAG_TIEMPO_NO_MONOTONO):
+        # Con el reloj reiniciado los tiempos no estan ordenados: se toma la primera trama en orden de archivo
+        posiciones = np.flatnonzero(tiempos >= tiempo)
+        return int(posiciones[0]) if len(posiciones) else None
+    posicion = int(np.searchsorted(tiempos, tiempo, side='left'))
+    return posicion if posicion < len(tiempos) else None
+
+
+# Devuelve el offset en bytes dentro del .dat de la trama con el tiempo indicado (o de la primera posterior).
+def buscar_offset(indice, tiempo):
+    posicion = buscar_trama(indice, tiempo)
+    return None if posicion is None else int(indice['offset'][posicion])
+
+
+# Devuelve el offset en bytes y el numero de tramas que cubren el intervalo [tiempo_inicio, tiempo_fin).
+# Devuelve None si el archivo no tiene tramas en ese intervalo.
+def buscar_rango(indice, tiempo_inicio, tiempo_fin):
+    inicio = buscar_trama(indice, tiempo_inicio)
+    if inicio is None or indice['tiempo'][inicio] >= tiempo_fin:
+        return None
+    fin = buscar_trama(indice, tiempo_fin)
+    if fin is None or fin < inicio:
+        fin = len(indice)
+    return int(indice['offset'][inicio]), fin - inicio
+
+#######################################################################################################
+
+############################################ ~Main~ ###################################################
+# Crea o actualiza los indices de los archivos, directorios o patrones glob recibidos como parametros.
+def main():
+    if len(sys.argv) < 2:
+        print("Uso: indice_tramas.py <archivo.dat|directorio|patron_glob> [...]")
+        return
+
+    archivos_binarios = []
+    for origen in sys.argv[1:]:
+        if os.path.isdir(origen):
+            origen = os.path.join(origen, '*.dat')
+        archivos_binarios.extend(sorted(f for f in glob.glob(origen) if os.path.isfile(f)))
+
+    for archivo_binario in archivos_binarios:
+        indice = actualizar_indice(archivo_binario)
+        num_huecos = int(np.count_nonzero(indice['flags'] & FLAG_HUECO_PREVIO))
+        print(f"{os.path.basename(archivo_binario)}: {len(indice)} tramas indexadas, {num_huecos} huecos")
+
+#######################################################################################################
+if __name__ == '__main__':
+    main()
+#######################################################################################################
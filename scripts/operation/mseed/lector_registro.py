@@ -0,0 +1,207 @@
+######################################### ~Librerias~ #################################################
+import os
+import sys
+import json
+import numpy as np
+from decodificador_tramas import DTYPE_TRAMA, MUESTRAS_POR_TRAMA, mapear_archivo_tramas, tiempo_absoluto, decodificar_tramas
+from catalogo_archivos import abrir_catalogo, actualizar_catalogo, archivos_en_rango, fecha_a_posix, posix_a_fecha
+from archivo_comprimido import leer_rango
+#######################################################################################################
+
+##################################### ~Variables globales~ ############################################
+F_MUESTREO = 250
+# Canales disponibles y su fila en el arreglo decodificado
+CANALES = {'x': 0, 'y': 1, 'z': 2}
+#######################################################################################################
+
+######################################### ~Funciones~ #################################################
+# Lee un archivo de configuración en formato JSON y devuelve su contenido como un diccionario.
+def read_fileJSON(nameFile):
+    try:
+        with open(nameFile, 'r') as f:
+            data = json.load(f)
+        return data
+    except FileNotFoundError:
+        print(f"Archivo {nameFile} no encontrado.")
+        return None
+    except json.JSONDecodeError:
+        print(f"Error al decodificar el archivo {nameFile}.")
+        return None
+
+
+# Abre el catalogo de archivos del proyecto local (tmp-files/CatalogoArchivos.db) y devuelve la conexion y los
+# directorios que se catalogan, segun configuracion_dispositivo.json.
+def abrir_catalogo_local():
+    project_local_root = os.getenv("PROJECT_LOCAL_ROOT")
+    if not project_local_root:
+        raise RuntimeError("La variable de entorno PROJECT_LOCAL_ROOT no está definida")
+    config_dispositivo = read_fileJSON(os.path.join(project_local_root, "configuracion", "configuracion_dispositivo.json")) or {}
+    directorios = config_dispositivo.get("directorios", {})
+    conexion = abrir_catalogo(os.path.join(project_local_root, "tmp-files", "CatalogoArchivos.db"))
+    return conexion, [directorios.get("registro_continuo", "Unknown"), directorios.get("archivos_mseed", "Unknown")]
+
+
+# Copia las muestras de las tramas en su posicion de la salida segun el tiempo de cada trama. Las posiciones ya
+# ocupadas solo se sobrescriben si sobrescribir es True. Devuelve el numero de muestras copiadas.
+def ubicar_muestras(resultado, tiempos, datos, filas, sobrescribir=True):
+    num_muestras = resultado['mascara'].shape[0]
+    posiciones = ((tiempos[:, None] * F_MUESTREO - resultado['muestra_inicio']) + np.arange(MUESTRAS_POR_TRAMA)).reshape(-1)
+    validas = (posiciones >= 0) & (posiciones < num_muestras)
+    if not sobrescribir:
+        validas[validas] = ~resultado['mascara'][posiciones[validas]]
+    destino = posiciones[validas]
+    resultado['datos'][:, destino] = datos[filas][:, validas]
+    resultado['mascara'][destino] = True
+    return len(destino)
+
+
+# Lee las muestras de una estacion en el intervalo [tiempo_inicio, tiempo_fin) (segundos POSIX) de todos los archivos
+# que lo cubren, aunque el intervalo cruce varios archivos o la medianoche. Los archivos se buscan en el catalogo y
+# en cada .dat se salta con su indice .idx directamente a las tramas del intervalo, por lo que solo se leen y
+# decodifican esos bytes. Los segundos que no estan en ningun .dat se buscan en los archivos comprimidos .datz.
+#
+# Devuelve un diccionario con:
+#   'tiempo_inicio': tiempo absoluto (segundos POSIX) de la primera muestra de los arreglos
+#   'datos': arreglo int32 (canales, muestras) contiguo en el tiempo a 250 Hz, con ceros en los huecos
+#   'mascara': arreglo bool (muestras), True donde hay datos
+#   'canales', 'f_muestreo' y 'archivos' (archivos leidos)
+#   'tramas' y 'tiempos_tramas' (solo con conservar_tramas): las tramas crudas (DTYPE_TRAMA) de los segundos del
+#   intervalo en orden de tiempo y su tiempo absoluto, para guardar una copia .dat sin volver a leer el registro
+# La consulta no escribe en disco. Solo con actualizar=True el catalogo se actualiza antes de buscar con los
+# directorios recibidos (o los del proyecto local), para incluir archivos nuevos; esto recorre los directorios.
+def read_range(estacion, tiempo_inicio, tiempo_fin, canales=('x', 'y', 'z'), conexion=None, directorios=None,
+               conservar_tramas=False, actualizar=False):
+    filas = [CANALES[str(canal).lower()] for canal in canales]
+    cerrar_conexion = conexion is None
+    if conexion is None:
+        conexion, directorios_locales = abrir_catalogo_local()
+        directorios = directorios if directorios is not None else directorios_locales
+    try:
+        if actualizar and directorios:
+            actualizar_catalogo(conexion, directorios)
+
+        muestra_inicio = int(np.floor(tiempo_inicio * F_MUESTREO))
+        muestra_fin = max(muestra_inicio, int(np.ceil(tiempo_fin * F_MUESTREO)))
+        resultado = {
+            'tiempo_inicio': muestra_inicio / F_MUESTREO,
+            'muestra_inicio': muestra_inicio,
+            'f_muestreo': F_MUESTREO,
+            'canales': [str(canal).lower() for canal in canales],
+            'datos': np.zeros((len(filas), muestra_fin - muestra_inicio), dtype=np.int32),
+            'mascara': np.zeros(muestra_fin - muestra_inicio, dtype=bool),
+            'archivos': []
+        }
+        tramas_leidas = []
+        if muestra_fin == muestra_inicio:
+            if conservar_tramas:
+                resultado['tiempos_tramas'], resultado['tramas'] = unir_tramas(tramas_leidas)
+            return resultado
+
+        # Segundos (tramas) que cubren el intervalo
+        segundo_inicio = int(np.floor(tiempo_inicio))
+        segundo_fin = int(np.ceil(tiempo_fin))
+        for archivo in archivos_en_rango(conexion, estacion, segundo_inicio, segundo_fin, 'dat'):
+            tramas = mapear_archivo_tramas(archivo['ruta'], archivo['offset'], archivo['num_tramas'])
+            tiempos = tiempo_absoluto(tramas)
+            if ubicar_muestras(resultado, tiempos, decodificar_tramas(tramas), filas):
+                resultado['archivos'].append(archivo['ruta'])
+            if conservar_tramas:
+                dentro = (tiempos >= segundo_inicio) & (tiempos < segundo_fin)
+                tramas_leidas.append((tiempos[dentro], np.array(tramas[dentro])))
+            del tramas
+
+        if not resultado['mascara'].all():
+            for archivo in archivos_en_rango(conexion, estacion, segundo_inicio, segundo_fin, 'datz'):
+                if conservar_tramas:
+                    tiempos, datos, tramas = leer_rango(archivo['ruta'], segundo_inicio, segundo_fin, devolver_tramas=True)
+                    # Del .datz solo se toman los segundos que no estaban en los .dat
+                    nuevas = ~np.isin(tiempos, unir_tramas(tramas_leidas)[0])
+                    tramas_leidas.append((tiempos[nuevas], tramas[nuevas]))
+                else:
+                    tiempos, datos = leer_rango(archivo['ruta'], segundo_inicio, segundo_fin)
+                if ubicar_muestras(resultado, tiempos, datos, filas, sobrescribir=False):
+                    resultado['archivos'].append(archivo['ruta'])
+        if conservar_tramas:
+            resultado['tiempos_tramas'], resultado['tramas'] = unir_tramas(tramas_leidas)
+        return resultado
+    finally:
+        if cerrar_conexion:
+            conexion.close()
+
+
+# Une las tramas leidas de varios archivos [(tiempos, tramas)] en un solo arreglo ordenado por tiempo.
+def unir_tramas(partes):
+    if not partes:
+        return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=DTYPE_TRAMA)
+    tiempos = np.concatenate([tiempos for tiempos, _ in partes])
+    tramas = np.concatenate([tramas for _, tramas in partes])
+    orden = np.argsort(tiempos, kind='stable')
+    return tiempos[orden], tramas[orden]
+
+
+# Devuelve la parte [tiempo_inicio, tiempo_fin) de un resultado de read_range() sin volver a leer el registro.
+# Los arreglos son vistas del resultado original (no se copian). Las muestras se ubican igual que en read_range,
+# asi el recorte coincide con lo que devolveria leer ese intervalo (las tramas crudas, si las hay, se filtran por
+# segundo). Lanza ValueError si el intervalo no esta
+# contenido en el resultado.
+def recortar_resultado(resultado, tiempo_inicio, tiempo_fin):
+    muestra_inicio = int(np.floor(tiempo_inicio * F_MUESTREO))
+    muestra_fin = max(muestra_inicio, int(np.ceil(tiempo_fin * F_MUESTREO)))
+    desde = muestra_inicio - resultado['muestra_inicio']
+    hasta = muestra_fin - resultado['muestra_inicio']
+    if desde < 0 or hasta > len(resultado['mascara']):
+        raise ValueError("El intervalo no esta contenido en el resultado")
+    recorte = dict(resultado)
+    recorte.update({
+        'tiempo_inicio': muestra_inicio / F_MUESTREO,
+        'muestra_inicio': muestra_inicio,
+        'datos': resultado['datos'][:, desde:hasta],
+        'mascara': resultado['mascara'][desde:hasta]
+    })
+    if 'tramas' in resultado:
+        dentro = (resultado['tiempos_tramas'] >= np.floor(tiempo_inicio)) & (resultado['tiempos_tramas'] < np.ceil(tiempo_fin))
+        recorte['tiempos_tramas'] = resultado['tiempos_tramas'][dentro]
+        recorte['tramas'] = resultado['tramas'][dentro]
+    return recorte
+
+
+# Devuelve los tramos [(inicio, fin)] en segundos POSIX sin datos de un resultado de read_range().
+def huecos_resultado(resultado):
+    mascara = resultado['mascara'].astype(np.int8)
+    cambios = np.diff(mascara, prepend=1, append=1)
+    inicios = np.flatnonzero(cambios == -1)
+    fines = np.flatnonzero(cambios == 1)
+    return [(resultado['tiempo_inicio'] + int(i) / F_MUESTREO, resultado['tiempo_inicio'] + int(f) / F_MUESTREO) for i, f in zip(inicios, fines)]
+
+#######################################################################################################
+
+############################################ ~Main~ ###################################################
+# Muestra un resumen de los datos disponibles en un intervalo.
+def main():
+    if len(sys.argv) < 3:
+        print("Uso: lector_registro.py <aaaa-mm-ddTHH:MM:SS> <aaaa-mm-ddTHH:MM:SS> [canales, ej. xyz] [estacion]")
+        return
+    canales = list(sys.argv[3]) if len(sys.argv) > 3 else ['x', 'y', 'z']
+
+    conexion, directorios = abrir_catalogo_local()
+    estacion = sys.argv[4] if len(sys.argv) > 4 else None
+    if estacion is None:
+        config_dispositivo = read_fileJSON(os.path.join(os.getenv("PROJECT_LOCAL_ROOT"), "configuracion", "configuracion_dispositivo.json")) or {}
+        estacion = config_dispositivo.get("dispositivo", {}).get("id", "Unknown")
+
+    resultado = read_range(estacion, fecha_a_posix(sys.argv[1]), fecha_a_posix(sys.argv[2]), canales, conexion, directorios,
+                           actualizar=True)
+    conexion.close()
+    total = len(resultado['mascara'])
+    presentes = int(resultado['mascara'].sum())
+    print(f"Inicio: {posix_a_fecha(resultado['tiempo_inicio'])}, {total} muestras por canal ({', '.join(resultado['canales'])})")
+    print(f"Muestras con datos: {presentes} ({100 * presentes / total if total else 0:.1f} %)")
+    for archivo in resultado['archivos']:
+        print(f"  {os.path.basename(archivo)}")
+    for inicio, fin in huecos_resultado(resultado):
+        print(f"Hueco: {posix_a_fecha(inicio)} - {posix_a_fecha(fin)} ({fin - inicio:.3f} s)")
+
+#######################################################################################################
+if __name__ == '__main__':
+    main()
+#######################################################################################################
@@ -0,0 +1,249 @@
+######################################### ~Librerias~ #################################################
+import os
+import sys
+import time
+import logging
+import signal
+from time import time as timer
+#######################################################################################################
+
+##################################### ~Variables globales~ ############################################
+# Intervalo de revision del archivo de nombres y de la cola de trabajos (segundos)
+INTERVALO_REVISION = 2
+# Extension de los archivos de trabajo que se dejan en la cola de conversion
+EXTENSION_TRABAJO = '.job'
+#######################################################################################################
+
+######################################### ~Funciones~ #################################################
+# Todos los modulos crean su logger con el id de la estacion como nombre. Dentro de un mismo proceso
+# compartirian el mismo logger, por eso aqui se crea uno distinto por archivo de log y se registra en
+# el diccionario de loggers del modulo, que lo reutiliza en lugar de crear uno nuevo.
+def registrar_logger(modulo, id_estacion, log_directory, log_filename):
+    logger = logging.getLogger(f"{id_estacion}.{os.path.splitext(log_filename)[0]}")
+    logger.setLevel(logging.DEBUG)
+    logger.propagate = False
+    if not logger.handlers:
+        file_handler = logging.FileHandler(os.path.join(log_directory, log_filename))
+        file_handler.setLevel(logging.DEBUG)
+        file_handler.setFormatter(logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s'))
+        logger.addHandler(file_handler)
+    if modulo is not None:
+        modulo.loggers[id_estacion] = logger
+    return logger
+
+
+# Lee las lineas del archivo temporal de nombres (archivo actual en la primera linea, anterior en la segunda).
+def leer_nombres_archivos(archivo_nombres):
+    try:
+        with open(archivo_nombres) as f:
+            return [linea.strip() for linea in f.readlines()]
+    except OSError:
+        return []
+
+
+# Agrega un archivo a la cola de subidas a Drive (tipo evento, mseed o dat), que atiende servicio_subidas.py.
+def encolar_subida(servicio, ruta, tipo, borrar_despues):
+    try:
+        if servicio['cola_subidas'].encolar_archivo(servicio['conexion_cola'], ruta, tipo, borrar_despues):
+            servicio['logger'].info(f"Archivo {os.path.basename(ruta)} agregado a la cola de subidas ({tipo})")
+    except Exception as e:
+        servicio['logger'].error(f"Error al encolar el archivo {os.path.basename(ruta)}: {e}")
+
+
+# Convierte un archivo binario y registra el tiempo empleado frente al de lanzar un proceso nuevo.
+# Si se indica tipo_subida, el mseed creado se encola para subirlo a Drive y borrarlo despues.
+def convertir(servicio, binary_file, path_archivo_salida, tipo_subida=None):
+    logger = servicio['logger']
+    start_time = timer()
+    try:
+        resultado = servicio['binary_to_mseed'].convertir_archivo_binario(binary_file, path_archivo_salida, servicio['config_mseed'], servicio['logger_mseed'])
+    except Exception as e:
+        logger.error(f"Error al convertir el archivo {os.path.basename(binary_file)}: {e}")
+        return None
+    duracion = timer() - start_time
+    servicio['trabajos_atendidos'] += 1
+    servicio['binary_to_mseed'].actualizar_catalogo_archivos(servicio['rutas']['catalogo'], servicio['directorios_catalogo'], servicio['logger_mseed'])
+    servicio['tiempo_ahorrado'] += servicio['tiempo_carga']
+    logger.info(f"Archivo {os.path.basename(binary_file)} convertido en {duracion:.2f} s. "
+                f"Un proceso nuevo tardaria ~{duracion + servicio['tiempo_carga']:.2f} s (carga de modulos {servicio['tiempo_carga']:.2f} s). "
+                f"Ahorro acumulado: {servicio['tiempo_ahorrado']:.1f} s en {servicio['trabajos_atendidos']} trabajos")
+    if resultado is not None and tipo_subida is not None:
+        encolar_subida(servicio, os.path.join(path_archivo_salida, resultado[0]), tipo_subida, True)
+    return resultado
+
+
+# Ejecuta el gestor de archivos (subida a Drive y control de espacio) dentro del mismo proceso.
+def gestionar_archivos(servicio):
+    try:
+        servicio['gestor_archivos_acq'].main()
+    except Exception as e:
+        servicio['logger'].error(f"Error en el gestor de archivos: {e}")
+
+
+# Convierte el archivo de registro continuo anterior (el que se acaba de cerrar) y luego gestiona los archivos.
+def convertir_registro_anterior(servicio):
+    nombres = leer_nombres_archivos(servicio['rutas']['nombres_rc'])
+    if len(nombres) < 2 or not nombres[1].endswith('.dat'):
+        return
+    if nombres[1] == servicio['ultimo_convertido']:
+        servicio['logger'].info(f"El archivo {nombres[1]} ya fue convertido")
+        return
+    binary_file = servicio['directorios'].get("registro_continuo", "Unknown") + nombres[1]
+    if not os.path.isfile(binary_file):
+        servicio['logger'].warning(f"No existe el archivo de registro continuo {binary_file}")
+        return
+    if convertir(servicio, binary_file, servicio['directorios'].get("archivos_mseed", "Unknown"), servicio['tipo_subida_mseed']) is not None:
+        servicio['ultimo_convertido'] = nombres[1]
+        # El .dat crudo solo se sube si esta habilitado; se conserva en el equipo
+        if servicio['subir_registro_continuo']:
+            encolar_subida(servicio, binary_file, 'dat', False)
+        gestionar_archivos(servicio)
+
+
+# Convierte el ultimo evento extraido indicado en el archivo temporal de eventos.
+def convertir_evento_extraido(servicio):
+    nombres = leer_nombres_archivos(servicio['rutas']['nombres_ee'])
+    if not nombres or not nombres[0]:
+        return
+    path_eventos_extraidos = servicio['directorios'].get("eventos_extraidos", "Unknown")
+    convertir(servicio, path_eventos_extraidos + nombres[0], path_eventos_extraidos, 'evento')
+
+
+# Revisa si el programa registro_continuo creo un archivo nuevo; en ese caso convierte el anterior.
+def revisar_rotacion(servicio):
+    nombres = leer_nombres_archivos(servicio['rutas']['nombres_rc'])
+    if not nombres or nombres[0] == servicio['archivo_actual']:
+        return
+    servicio['logger'].info(f"Rotacion detectada: {servicio['archivo_actual']} -> {nombres[0]}")
+    servicio['archivo_actual'] = nombres[0]
+    convertir_registro_anterior(servicio)
+
+
+# Atiende los trabajos de la cola en orden de nombre. Contenido del archivo de trabajo:
+# '1' registro continuo anterior, '2' evento extraido, o la ruta de un archivo .dat a convertir.
+# activo() se consulta entre trabajos: al detener el servicio los trabajos restantes quedan en la cola.
+def procesar_cola(servicio, activo):
+    logger = servicio['logger']
+    directorio_cola = servicio['rutas']['cola']
+    trabajos = sorted(f for f in os.listdir(directorio_cola) if f.endswith(EXTENSION_TRABAJO))
+    for nombre_trabajo in trabajos:
+        if not activo():
+            return
+        ruta_trabajo = os.path.join(directorio_cola, nombre_trabajo)
+        try:
+            with open(ruta_trabajo) as f:
+                contenido = f.read().strip()
+            os.remove(ruta_trabajo)
+        except OSError as e:
+            logger.error(f"No se pudo leer el trabajo {nombre_trabajo}: {e}")
+            continue
+
+        logger.info(f"Trabajo recibido {nombre_trabajo}: {contenido}")
+        if contenido == '1':
+            convertir_registro_anterior(servicio)
+        elif contenido == '2':
+            convertir_evento_extraido(servicio)
+        elif contenido.endswith('.dat') and os.path.isfile(contenido):
+            convertir(servicio, contenido, servicio['directorios'].get("archivos_mseed", "Unknown"), servicio['tipo_subida_mseed'])
+        else:
+            logger.warning(f"Trabajo no reconocido {nombre_trabajo}: {contenido}")
+
+#######################################################################################################
+
+############################################ ~Main~ ###################################################
+def main():
+
+    # Obtiene la variable de entorno para definir la ruta de los archivos de configuracion:
+    project_local_root = os.getenv("PROJECT_LOCAL_ROOT")
+    if not project_local_root:
+        print("La variable de entorno no están definida.")
+        return
+
+    rutas = {
+        "nombres_rc": os.path.join(project_local_root, "tmp-files", "NombreArchivoRegistroContinuo.tmp"),
+        "nombres_ee": os.path.join(project_local_root, "tmp-files", "NombreArchivoEventoExtraido.tmp"),
+        "cola": os.path.join(project_local_root, "tmp-files", "cola-conversion"),
+        "pid": os.path.join(project_local_root, "tmp-files", "servicio_conversion.pid"),
+        "catalogo": os.path.join(project_local_root, "tmp-files", "CatalogoArchivos.db"),
+    }
+    config_mseed_file = os.path.join(project_local_root, "configuracion", "configuracion_mseed.json")
+    config_dispositivo_file = os.path.join(project_local_root, "configuracion", "configuracion_dispositivo.json")
+    log_directory = os.path.join(project_local_root, "log-files")
+
+    # Carga los modulos pesados una sola vez y mide el tiempo que cada proceso nuevo pagaria en cada reinicio
+    start_time = timer()
+    sys.path.append(os.path.join(project_local_root, "scripts", "drive"))
+    import binary_to_mseed
+    import gestor_archivos_acq
+    import cola_subidas
+    tiempo_carga = timer() - start_time
+
+    config_mseed = binary_to_mseed.read_fileJSON(config_mseed_file)
+    config_dispositivo = binary_to_mseed.read_fileJSON(config_dispositivo_file)
+    if config_mseed is None or config_dispositivo is None:
+        print("No se pudo leer los archivos de configuración. Terminando el programa.")
+        return
+
+    dispositivo_id = config_dispositivo.get("dispositivo", {}).get("id", "Unknown")
+    logger = registrar_logger(None, dispositivo_id, log_directory, "servicio_conversion.log")
+    logger_mseed = registrar_logger(binary_to_mseed, dispositivo_id, log_directory, "mseed.log")
+    registrar_logger(gestor_archivos_acq, dispositivo_id, log_directory, "gestor_acq.log")
+
+    os.makedirs(rutas["cola"], exist_ok=True)
+    with open(rutas["pid"], 'w') as f:
+        f.write(str(os.getpid()))
+
+    logger.info(f"Servicio de conversion iniciado. Tiempo de carga de modulos: {tiempo_carga:.2f} s")
+    print(f"Servicio de conversion iniciado. Tiempo de carga de modulos: {tiempo_carga:.2f} s")
+
+    # Estado del servicio. Al iniciar solo se registra el archivo actual; la conversion se hace en la siguiente rotacion
+    nombres = leer_nombres_archivos(rutas["nombres_rc"])
+    servicio = {
+        'binary_to_mseed': binary_to_mseed,
+        'gestor_archivos_acq': gestor_archivos_acq,
+        'cola_subidas': cola_subidas,
+        'conexion_cola': cola_subidas.abrir_cola_local(project_local_root),
+        'subir_registro_continuo': config_dispositivo.get("cola_subidas", {}).get("subir_registro_continuo", "no") == "si",
+        # Si los mseed se agrupan en paquetes (paquetes_mseed.py) no se encolan uno por uno; el gestor encola los paquetes
+        'tipo_subida_mseed': None if config_dispositivo.get("paquetes_mseed", {}).get("agrupar", "no") == "si" else 'mseed',
+        'config_mseed': config_mseed,
+        'directorios': config_dispositivo.get("directorios", {}),
+        'directorios_catalogo': [config_dispositivo.get("directorios", {}).get("registro_continuo", "Unknown"),
+                                 config_dispositivo.get("directorios", {}).get("archivos_mseed", "Unknown")],
+        'rutas': rutas,
+        'logger': logger,
+        'logger_mseed': logger_mseed,
+        'tiempo_carga': tiempo_carga,
+        'archivo_actual': nombres[0] if nombres else None,
+        'ultimo_convertido': None,
+        'trabajos_atendidos': 0,
+        'tiempo_ahorrado': 0.0
+    }
+
+    # Supervisor detiene el servicio con SIGTERM; el loop termina al acabar la conversion en curso (no se deja un
+    # mseed a medio escribir) y se borra el archivo pid
+    estado = {'activo': True}
+    signal.signal(signal.SIGTERM, lambda signum, frame: estado.update(activo=False))
+
+    try:
+        # Loop principal
+        while estado['activo']:
+            try:
+                revisar_rotacion(servicio)
+                procesar_cola(servicio, lambda: estado['activo'])
+            except Exception as e:
+                logger.error(f"Error en el servicio de conversion: {e}")
+            if estado['activo']:
+                time.sleep(INTERVALO_REVISION)
+    except KeyboardInterrupt:
+        print("Finalizando servicio de conversion...")
+    finally:
+        if os.path.isfile(rutas["pid"]):
+            os.remove(rutas["pid"])
+        servicio['conexion_cola'].close()
+        logger.info(f"Servicio de conversion finalizado. Ahorro acumulado: {servicio['tiempo_ahorrado']:.1f} s en {servicio['trabajos_atendidos']} trabajos")
+
+#######################################################################################################
+if __name__ == '__main__':
+    main()
+#######################################################################################################
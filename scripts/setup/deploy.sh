@@ -12,6 +12,7 @@ mkdir -p $PROJECT_LOCAL_ROOT/resultados/eventos-detectados
 mkdir -p $PROJECT_LOCAL_ROOT/resultados/eventos-extraidos
 mkdir -p $PROJECT_LOCAL_ROOT/resultados/registro-continuo
 mkdir -p $PROJECT_LOCAL_ROOT/resultados/mseed
+mkdir -p $PROJECT_LOCAL_ROOT/resultados/decimados
 mkdir -p $PROJECT_LOCAL_ROOT/scripts/acelerografo/ejecutables
 mkdir -p $PROJECT_LOCAL_ROOT/scripts/acelerografo/libraries
 mkdir -p $PROJECT_LOCAL_ROOT/scripts/mseed
@@ -32,6 +33,11 @@ touch $PROJECT_LOCAL_ROOT/log-files/gestor_acq.log
 touch $PROJECT_LOCAL_ROOT/log-files/mqtt.log
 touch $PROJECT_LOCAL_ROOT/log-files/mseed.log
 touch $PROJECT_LOCAL_ROOT/log-files/registro_continuo.log
+touch $PROJECT_LOCAL_ROOT/log-files/servicio_conversion.log
+touch $PROJECT_LOCAL_ROOT/log-files/distribuidor_tramas.log
+touch $PROJECT_LOCAL_ROOT/log-files/buffer_circular.log
+touch $PROJECT_LOCAL_ROOT/log-files/detector_eventos.log
+touch $PROJECT_LOCAL_ROOT/log-files/extraccion_eventos.log
 
 # Copiar los archivos de configuración del proyecto en Git al proyecto local
 cp $PROJECT_GIT_ROOT/configuration/configuracion_dispositivo.json $PROJECT_LOCAL_ROOT/configuracion/
@@ -40,9 +46,29 @@ cp $PROJECT_GIT_ROOT/configuration/configuracion_mseed.json $PROJECT_LOCAL_ROOT/
 
 # Copiar los scripts de Python del proyecto en Git al proyecto local
 cp $PROJECT_GIT_ROOT/scripts/operation/mqtt/cliente*.py $PROJECT_LOCAL_ROOT/scripts/mqtt/cliente.py
+cp $PROJECT_GIT_ROOT/scripts/operation/mqtt/servicio_extraccion.py $PROJECT_LOCAL_ROOT/scripts/mqtt/
 cp $PROJECT_GIT_ROOT/scripts/operation/mseed/binary_to_mseed*.py $PROJECT_LOCAL_ROOT/scripts/mseed/binary_to_mseed.py
+cp $PROJECT_GIT_ROOT/scripts/operation/mseed/decodificador_tramas.py $PROJECT_LOCAL_ROOT/scripts/mseed/
+cp $PROJECT_GIT_ROOT/scripts/operation/mseed/indice_tramas.py $PROJECT_LOCAL_ROOT/scripts/mseed/
+cp $PROJECT_GIT_ROOT/scripts/operation/mseed/catalogo_archivos.py $PROJECT_LOCAL_ROOT/scripts/mseed/
+cp $PROJECT_GIT_ROOT/scripts/operation/mseed/servicio_conversion.py $PROJECT_LOCAL_ROOT/scripts/mseed/
+cp $PROJECT_GIT_ROOT/scripts/operation/mseed/distribuidor_tramas.py $PROJECT_LOCAL_ROOT/scripts/mseed/
+cp $PROJECT_GIT_ROOT/scripts/operation/mseed/buffer_circular.py $PROJECT_LOCAL_ROOT/scripts/mseed/
+cp $PROJECT_GIT_ROOT/scripts/operation/mseed/detector_sta_lta.py $PROJECT_LOCAL_ROOT/scripts/mseed/
+cp $PROJECT_GIT_ROOT/scripts/operation/mseed/detector_eventos_vivo.py $PROJECT_LOCAL_ROOT/scripts/mseed/
+cp $PROJECT_GIT_ROOT/scripts/operation/mseed/archivo_comprimido.py $PROJECT_LOCAL_ROOT/scripts/mseed/
+cp $PROJECT_GIT_ROOT/scripts/operation/mseed/lector_registro.py $PROJECT_LOCAL_ROOT/scripts/mseed/
+cp $PROJECT_GIT_ROOT/scripts/operation/mseed/extractor_eventos.py $PROJECT_LOCAL_ROOT/scripts/mseed/
+cp $PROJECT_GIT_ROOT/scripts/operation/mseed/decimador_registro.py $PROJECT_LOCAL_ROOT/scripts/mseed/
 cp $PROJECT_GIT_ROOT/scripts/operation/drive/subir_archivo*.py $PROJECT_LOCAL_ROOT/scripts/drive/subir_archivo.py
-cp $PROJECT_GIT_ROOT/scripts/operation/drive/subir_pendientes_drive*.py $PROJECT_LOCAL_ROOT/scripts/drive/gestor_archivos_acq.py
+cp $PROJECT_GIT_ROOT/scripts/operation/drive/gestor_archivos_acq.py $PROJECT_LOCAL_ROOT/scripts/drive/
+cp $PROJECT_GIT_ROOT/scripts/operation/drive/cargador_drive.py $PROJECT_LOCAL_ROOT/scripts/drive/
+cp $PROJECT_GIT_ROOT/scripts/operation/drive/cola_subidas.py $PROJECT_LOCAL_ROOT/scripts/drive/
+cp $PROJECT_GIT_ROOT/scripts/operation/drive/planificador_subidas.py $PROJECT_LOCAL_ROOT/scripts/drive/
+cp $PROJECT_GIT_ROOT/scripts/operation/drive/paquetes_mseed.py $PROJECT_LOCAL_ROOT/scripts/drive/
+cp $PROJECT_GIT_ROOT/scripts/operation/drive/registro_subidas.py $PROJECT_LOCAL_ROOT/scripts/drive/
+cp $PROJECT_GIT_ROOT/scripts/operation/drive/retencion_archivos.py $PROJECT_LOCAL_ROOT/scripts/drive/
+cp $PROJECT_GIT_ROOT/scripts/operation/drive/servicio_subidas.py $PROJECT_LOCAL_ROOT/scripts/drive/
 
 # Copiar el task-script crontab.txt al directorio de proyectos
 cp $PROJECT_GIT_ROOT/scripts/task/crontab.txt $PROJECT_LOCAL_ROOT/scripts/task/
@@ -50,11 +76,23 @@ cp $PROJECT_GIT_ROOT/scripts/task/crontab.txt $PROJECT_LOCAL_ROOT/tmp-files/cron
 
 # Copiar los archivos de configuracion de Supervisor al directorio de configuracion (esto sí requiere sudo)
 sudo cp $PROJECT_GIT_ROOT/scripts/task/mqttcliente.conf /etc/supervisor/conf.d/
+sudo cp $PROJECT_GIT_ROOT/scripts/task/servicioconversion.conf /etc/supervisor/conf.d/
+sudo cp $PROJECT_GIT_ROOT/scripts/task/distribuidortramas.conf /etc/supervisor/conf.d/
+sudo cp $PROJECT_GIT_ROOT/scripts/task/buffercircular.conf /etc/supervisor/conf.d/
+sudo cp $PROJECT_GIT_ROOT/scripts/task/detectoreventos.conf /etc/supervisor/conf.d/
+sudo cp $PROJECT_GIT_ROOT/scripts/task/serviciosubidas.conf /etc/supervisor/conf.d/
+sudo cp $PROJECT_GIT_ROOT/scripts/task/servicioextraccion.conf /etc/supervisor/conf.d/
 
 # Actualizar Supervisor
 sudo supervisorctl reread
 sudo supervisorctl update
 sudo supervisorctl start mqttcliente
+sudo supervisorctl start servicioconversion
+sudo supervisorctl start distribuidortramas
+sudo supervisorctl start buffercircular
+sudo supervisorctl start detectoreventos
+sudo supervisorctl start serviciosubidas
+sudo supervisorctl start servicioextraccion
 
 # Copiar los task-scripts al directorio /usr/local/bin sin la extensión .sh 
 for script in $PROJECT_GIT_ROOT/scripts/task/*.sh; do
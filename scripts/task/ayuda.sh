@@ -10,11 +10,68 @@ echo "  Iniciar: registrocontinuo start"
 echo "  Detener: registrocontinuo stop"
 echo " "
 echo "Extraer evento:"
-echo "  /home/rsa/ejecutables/extraerevento <nombreArchivoBinario> <tiempoSegundos> <duracionSegundos>"
+echo "  python3 \$PROJECT_LOCAL_ROOT/scripts/mseed/extractor_eventos.py <aaaa-mm-ddTHH:MM:SS> <duracion_s> [--dat] [--subir] [--destino directorio]"
+echo "    Mini-SEED directo del registro continuo (cruza archivos y medianoche); --dat: copia cruda .dat; --subir: encola el mseed"
+echo "  Anterior: /home/rsa/ejecutables/extraerevento <nombreArchivoBinario> <tiempoSegundos> <duracionSegundos>"
 echo "  "
 echo "Convertir mseed:"
-echo "  python3 /home/rsa/ejecutables/conversor_mseed.py <1-2> "
+echo "  python3 /home/rsa/ejecutables/conversor_mseed.py <1-4> [directorio|patron_glob] [ceros|segmentos]"
 echo "    <1>: Registro continuo"
 echo "    <2>: Evento extraido"
+echo "    <3>: Lote de archivos de registro continuo pendientes (por defecto todo el directorio)"
+echo "    <4>: Incremental, solo las tramas nuevas de los archivos actual y anterior [anexar|segmento]"
+echo "  "
+echo "Catalogo de archivos (disponibilidad y huecos):"
+echo "  python3 \$PROJECT_LOCAL_ROOT/scripts/mseed/catalogo_archivos.py actualizar"
+echo "  python3 \$PROJECT_LOCAL_ROOT/scripts/mseed/catalogo_archivos.py <buscar|huecos> <aaaa-mm-ddTHH:MM:SS> <aaaa-mm-ddTHH:MM:SS> [dat|datz|mseed]"
+echo "  python3 \$PROJECT_LOCAL_ROOT/scripts/mseed/lector_registro.py <aaaa-mm-ddTHH:MM:SS> <aaaa-mm-ddTHH:MM:SS> [canales, ej. xyz] [estacion]"
+echo "  "
+echo "Distribuidor de tramas en vivo (supervisor: distribuidortramas):"
+echo "  Lee /tmp/my_pipe y publica cada trama de 2506 bytes en el socket Unix /tmp/tramas.sock"
+echo "  Suscribirse desde Python: distribuidor_tramas.recibir_tramas('/tmp/tramas.sock')"
+echo "  "
+echo "Buffer circular en memoria compartida (supervisor: buffercircular):"
+echo "  Ultimos N minutos (buffer_circular.minutos en configuracion_dispositivo.json) en /dev/shm/rsa_buffer_tramas"
+echo "  Leer desde Python: buffer_circular.conectar_buffer() y buffer_circular.copiar_rango(buffer, t_inicio, t_fin)"
+echo "  "
+echo "Archivo comprimido de registro continuo (.datz, sin perdidas):"
+echo "  python3 \$PROJECT_LOCAL_ROOT/scripts/mseed/archivo_comprimido.py comprimir <archivo.dat|directorio|patron_glob> [zlib|lzma]"
+echo "  python3 \$PROJECT_LOCAL_ROOT/scripts/mseed/archivo_comprimido.py <descomprimir|verificar> <archivo.datz|directorio|patron_glob>"
+echo "  "
+echo "Decimacion de registros antiguos (seccion decimacion; se aplica con gestor_archivos_acq.py):"
+echo "  python3 \$PROJECT_LOCAL_ROOT/scripts/mseed/decimador_registro.py envejecidos   (reemplaza los registros con mas de dias_completos dias)"
+echo "  python3 \$PROJECT_LOCAL_ROOT/scripts/mseed/decimador_registro.py decimar <archivo.dat|archivo.datz>... [--formato mseed|npy] [--destino directorio]"
+echo "  "
+echo "Detector de eventos en vivo (supervisor: detectoreventos):"
+echo "  Parametros en detector_eventos de configuracion_dispositivo.json (modo canales|magnitud, canales, n_sta, n_lta, val_trigger, ...)"
+echo "  Recargar parametros sin reiniciar: sudo supervisorctl signal HUP detectoreventos"
+echo "  "
+echo "Reprocesar archivos .dat con el detector STA/LTA (catalogo de eventos en CSV):"
+echo "  python3 \$PROJECT_LOCAL_ROOT/scripts/mseed/detector_sta_lta.py <archivo.dat|directorio|patron_glob> [--salida eventos.csv]"
+echo "    [--n-sta 125] [--n-lta 12500] [--trigger 4] [--detrigger 2] [--canal 1] [--rapido] [--procesos N]"
+echo "  "
+echo "Subir archivos a Drive en paralelo (una sola autenticacion, hilos en cargador_drive.hilos):"
+echo "  python3 \$PROJECT_LOCAL_ROOT/scripts/drive/cargador_drive.py <1|2|3> <borrar_despues: 0|1> <archivo|directorio|patron_glob>..."
+echo "  Subidas en fragmentos de cargador_drive.tamano_fragmento_mb; las interrumpidas se reanudan (tmp-files/SesionesSubidaDrive.json)"
+echo "  "
+echo "Cola de subidas a Drive (supervisor: serviciosubidas, prioridad evento > mseed > dat):"
+echo "  python3 \$PROJECT_LOCAL_ROOT/scripts/drive/cola_subidas.py encolar <evento|mseed|dat> <borrar_despues: 0|1> <archivo>..."
+echo "  python3 \$PROJECT_LOCAL_ROOT/scripts/drive/cola_subidas.py <estado|reintentar [tipo]|purgar [dias]>"
+echo "  python3 \$PROJECT_LOCAL_ROOT/scripts/drive/planificador_subidas.py   (tasa de subida, limite, latencia MQTT)"
+echo "  python3 \$PROJECT_LOCAL_ROOT/scripts/drive/registro_subidas.py <buscar <archivo>...|ultimos [n]|purgar [dias]>   (archivos subidos y MD5)"
+echo "Paquetes de archivos mseed (paquetes_mseed.agrupar):"
+echo "  python3 \$PROJECT_LOCAL_ROOT/scripts/drive/paquetes_mseed.py empaquetar"
+echo "  python3 \$PROJECT_LOCAL_ROOT/scripts/drive/paquetes_mseed.py <listar|verificar> <paquete.tar>"
+echo "  python3 \$PROJECT_LOCAL_ROOT/scripts/drive/paquetes_mseed.py extraer <paquete.tar> [miembro.mseed...] [--destino directorio]"
+echo "Retencion de archivos (seccion retencion; se aplica con gestor_archivos_acq.py):"
+echo "  python3 \$PROJECT_LOCAL_ROOT/scripts/drive/retencion_archivos.py <plan|ejecutar>   (plan: muestra lo que se borraria sin borrar)"
+echo "  "
+echo "Servicio de extraccion de eventos por MQTT (supervisor: servicioextraccion; seccion extraccion_eventos):"
+echo "  Solicitud en topicSuscription: {\"inicio\": \"aaaa-mm-ddTHH:MM:SS\", \"duracion\": s, \"id\": opcional, \"dat\": \"si\" opcional} o aammdd-hhmmss-duracion"
+echo "  Estados en topicStatus: aceptado, en_proceso, progreso, completado, error o rechazado (con el id del trabajo)"
+echo "  Prueba local: python3 scripts/dev-tests/mqtt/broker_local.py [puerto] y scripts/dev-tests/mqtt/probar_extraccion.py"
+echo "  "
+echo "Servicio de conversion (supervisor: servicioconversion):"
+echo "  Encolar un trabajo: echo <1|2|ruta_archivo.dat> > \$PROJECT_LOCAL_ROOT/tmp-files/cola-conversion/\$(date +%s%N).job"
 echo "  "
 exit 0
\ No newline at end of file
@@ -9,10 +9,17 @@ case "$1" in
     echo "Arrancando sistema de registro continuo..."
     sudo -E "$PROJECT_LOCAL_ROOT/scripts/acelerografo/ejecutables/registro_continuo" &
     sleep 5
-    /usr/bin/python3 "$PROJECT_LOCAL_ROOT/scripts/mseed/binary_to_mseed.py" 1 &
-    pid_mseed=$!
-    wait $pid_mseed
-    /usr/bin/python3 "$PROJECT_LOCAL_ROOT/scripts/drive/gestor_archivos_acq.py" 
+    # Si el servicio de conversion esta activo, detecta la rotacion del archivo y realiza la conversion
+    # y la gestion de archivos sin lanzar nuevos procesos de Python
+    pid_file="$PROJECT_LOCAL_ROOT/tmp-files/servicio_conversion.pid"
+    if [ -f "$pid_file" ] && kill -0 "$(cat "$pid_file")" 2>/dev/null; then
+      echo "Conversion a cargo del servicio de conversion"
+    else
+      /usr/bin/python3 "$PROJECT_LOCAL_ROOT/scripts/mseed/binary_to_mseed.py" 1 &
+      pid_mseed=$!
+      wait $pid_mseed
+      /usr/bin/python3 "$PROJECT_LOCAL_ROOT/scripts/drive/gestor_archivos_acq.py" 
+    fi
     ;;
   
   stop)